@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from models import AnalysisResponse, JobRequest
+
+Analyzer = Callable[[JobRequest], Tuple[AnalysisResponse, Optional[str]]]
+
+# Warming requests go through the fair scheduler under their own tenant
+WARMING_TENANT = "_warming"
+
+
+class FrequencySketch:
+    """
+    Count-min sketch of request frequencies with saturating counters, aged the
+    TinyLFU way: after `sample_size` increments every counter is halved, so
+    combinations that were hot an hour ago give way to what is hot now.
+    Memory is depth x width small integers whatever the number of distinct keys.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width: int = 4096):
+        self.width = 1 << max(4, (width - 1).bit_length())  # power of two
+        self.sample_size = 10 * self.width
+        self._rows = [[0] * self.width for _ in range(self.DEPTH)]
+        self._additions = 0
+
+    def indexes(self, key: str) -> Tuple[int, ...]:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.DEPTH).digest()
+        mask = self.width - 1
+        return tuple(int.from_bytes(digest[4 * i:4 * i + 4], "little") & mask for i in range(self.DEPTH))
+
+    def estimate(self, indexes: Tuple[int, ...]) -> int:
+        return min(row[i] for row, i in zip(self._rows, indexes))
+
+    def increment(self, indexes: Tuple[int, ...]) -> int:
+        """Count one occurrence; returns the new estimate"""
+        # Conservative update: only the counters at the current minimum grow
+        current = self.estimate(indexes)
+        if current < self.MAX_COUNT:
+            for row, i in zip(self._rows, indexes):
+                if row[i] == current:
+                    row[i] += 1
+            current += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._age()
+        return current
+
+    def _age(self) -> None:
+        for row in self._rows:
+            for i, count in enumerate(row):
+                row[i] = count >> 1
+        self._additions //= 2
+
+
+class HotJobs:
+    """
+    The most requested jobs (by job_key: data location, GPU shape, constraints and
+    risk block), estimated with a FrequencySketch. Only `capacity` candidates are
+    kept; a job not among them replaces the least frequent one once the sketch
+    says it is requested more often.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.sketch = FrequencySketch(width=16 * capacity)
+        self._candidates: Dict[str, Tuple[Tuple[int, ...], JobRequest]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, job_request: JobRequest) -> None:
+        indexes = self.sketch.indexes(key)
+        with self._lock:
+            count = self.sketch.increment(indexes)
+            if key in self._candidates or len(self._candidates) < self.capacity:
+                self._candidates[key] = (indexes, job_request)
+                return
+            coldest = min(self._candidates, key=lambda k: self.sketch.estimate(self._candidates[k][0]))
+            if count > self.sketch.estimate(self._candidates[coldest][0]):
+                del self._candidates[coldest]
+                self._candidates[key] = (indexes, job_request)
+
+    def top(self, n: int) -> List[Tuple[str, JobRequest]]:
+        """The n most requested jobs, most requested first"""
+        with self._lock:
+            ranked = sorted(
+                ((self.sketch.estimate(indexes), key, job_request)
+                 for key, (indexes, job_request) in self._candidates.items()),
+                key=lambda entry: entry[0],
+                reverse=True,
+            )
+        return [(key, job_request) for count, key, job_request in ranked[:n] if count > 0]
+
+
+class AnalysisCache:
+    """
+    Bounded LRU of complete analyses by job_key, each valid for one price version.
+    A lookup must name the current version; entries from older versions are misses
+    (and are overwritten by the next analysis or warming of the same job).
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Tuple[str, AnalysisResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def is_fresh(self, key: str, price_version: str) -> bool:
+        """Whether key is cached at price_version, without counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] == price_version
+
+    def get(self, key: str, price_version: str) -> Optional[AnalysisResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != price_version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, price_version: str, analysis: AnalysisResponse) -> None:
+        if not self.enabled or analysis.partial:
+            return
+        with self._lock:
+            self._entries[key] = (price_version, analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+class CacheWarmer:
+    """
+    Re-runs the most requested analyses after every price reload, so the next
+    wave of users finds them in the AnalysisCache instead of all paying full
+    latency at once.
+
+    Runs as a task on the API's event loop: it polls the engine's price version
+    every poll_interval seconds and, when it moved, analyzes the top_n hot jobs
+    one at a time through the fair scheduler, as its own tenant at the lowest
+    priority class. A warming pass stops early when the version moves again.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: AnalysisCache,
+        hot_jobs: HotJobs,
+        analyze: Analyzer,
+        scheduler=None,
+        top_n: int = 50,
+        poll_interval: float = 5.0,
+    ):
+        self.client = client
+        self.cache = cache
+        self.hot_jobs = hot_jobs
+        self.analyze = analyze
+        self.scheduler = scheduler
+        self.top_n = top_n
+        self.poll_interval = poll_interval
+        self.price_version: Optional[str] = None
+        self.last_warmed = 0
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, client, cache: AnalysisCache, hot_jobs: HotJobs, analyze: Analyzer, scheduler) -> "CacheWarmer":
+        return cls(
+            client, cache, hot_jobs, analyze, scheduler,
+            top_n=int(os.getenv("CACHE_WARM_TOP_N", "50")),
+            poll_interval=float(os.getenv("CACHE_WARM_POLL_SECONDS", "5")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled and self.top_n > 0
+
+    async def poll(self) -> int:
+        """One warmer step; returns how many analyses were warmed"""
+        version = await run_in_threadpool(self.client.price_version)
+        if version == self.price_version:
+            return 0
+        first = self.price_version is None
+        self.price_version = version
+        if first:
+            return 0  # Nothing was served at an older version by this replica yet
+        return await self.warm(version)
+
+    async def warm(self, version: str) -> int:
+        started = time.perf_counter()
+        warmed = 0
+        for key, job_request in self.hot_jobs.top(self.top_n):
+            if self.cache.is_fresh(key, version):
+                continue  # A user request got there first
+            priority = None
+            if self.scheduler is not None and self.scheduler.enabled:
+                # The least weighted class: warming never crowds out user requests
+                priority = min(self.scheduler.weights, key=self.scheduler.weights.get)
+                await self.scheduler.acquire(WARMING_TENANT, priority)
+            try:
+                analysis, analyzed_version = await run_in_threadpool(self.analyze, job_request)
+            except Exception as e:
+                self.last_error = str(e)
+                continue
+            finally:
+                if priority is not None:
+                    self.scheduler.release(WARMING_TENANT)
+            if analyzed_version is not None:
+                self.cache.put(key, analyzed_version, analysis)
+                warmed += 1
+            if analyzed_version != version:
+                break  # Prices moved again; the next poll starts a pass for the new version
+        self.last_warmed = warmed
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+        return warmed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                self.last_error = str(e)
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "cache": self.cache.status(),
+            "price_version": self.price_version,
+            "top_n": self.top_n,
+            "last_warmed": self.last_warmed,
+            "last_duration_ms": None if self.last_duration_ms is None else round(self.last_duration_ms, 1),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,96 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from models import AnalysisOption, AnalysisResponse
+
+# Media type a client lists in Accept to receive remote options column by column
+COLUMNAR_MEDIA_TYPE = "application/vnd.finops.columnar+json"
+
+# String columns sent as indexes into a per-response dictionary
+DICTIONARY_COLUMNS = ("provider", "region", "instance_type", "interruption_risk")
+
+# Numbers inside advisory messages become template arguments; they are kept as
+# text so expanding a template gives back the exact original message
+ADVISORY_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+ADVISORY_PLACEHOLDER = "{}"
+
+
+def wants_columnar(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for the columnar representation (and does not refuse it)"""
+    if not accept:
+        return False
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        if media_type.lower() != COLUMNAR_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class _Dictionary:
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def encode_options(options: List[AnalysisOption]) -> Dict[str, Any]:
+    """
+    Columnar form of a list of options.
+
+    Every AnalysisOption field becomes a column with one entry per option, or
+    null when no option has a value. provider, region, instance_type,
+    interruption_risk and the locations of egress_route are indexes into
+    "dictionaries". advisory_message is an index into the templates in
+    dictionaries["advisory_message"], whose "{}" placeholders are filled from
+    the advisory_args column.
+    """
+    rows = [option.model_dump() for option in options]
+    dictionaries = {name: _Dictionary() for name in (*DICTIONARY_COLUMNS, "egress_route", "advisory_message")}
+    columns: Dict[str, Optional[List[Any]]] = {}
+
+    for name in AnalysisOption.model_fields:
+        values = [row[name] for row in rows]
+        if all(value is None for value in values):
+            columns[name] = None
+        elif name in DICTIONARY_COLUMNS:
+            columns[name] = [None if value is None else dictionaries[name].encode(value) for value in values]
+        elif name == "egress_route":
+            encode = dictionaries[name].encode
+            columns[name] = [None if route is None else [encode(location) for location in route] for route in values]
+        elif name == "advisory_message":
+            columns[name] = [
+                dictionaries[name].encode(ADVISORY_NUMBER.sub(ADVISORY_PLACEHOLDER, message)) for message in values
+            ]
+            columns["advisory_args"] = [ADVISORY_NUMBER.findall(message) for message in values]
+        else:
+            columns[name] = values
+
+    return {
+        "length": len(rows),
+        "dictionaries": {name: dictionary.values for name, dictionary in dictionaries.items()},
+        "columns": columns,
+    }
+
+
+def encode_analysis(analysis: AnalysisResponse) -> Dict[str, Any]:
+    """Analysis in the columnar representation: the single data-local option stays an object"""
+    return {
+        "data_local_option": analysis.data_local_option.model_dump(),
+        "remote_options": encode_options(analysis.remote_options),
+        "partial": analysis.partial,
+        "options_skipped": analysis.options_skipped,
+    }
@@ -1,29 +1,317 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import httpx
-from typing import Optional
-from models import JobRequest, AnalysisResponse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from models import ENGINE_SORT_KEYS, JobRequest, AnalysisResponse, PlacementRequest, PlacementResponse
+from engine_ring import EngineNode, HashRing, route_key
+from tracing import tracer
+import deadline
+from deadline import DeadlineExceeded, REQUEST_DEADLINE_HEADER
+
+
+UNIX_SCHEME = "unix://"
+PRICE_VERSION_HEADER = "X-Price-Version"
+RECORD_DEPENDENCIES_HEADER = "X-Record-Dependencies"
+# Engine errors that mean "try another replica": it could not be reached, or it
+# is up but cannot serve (e.g. lost its Redis connection)
+FAILOVER_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+FAILOVER_STATUS = 503
 
 
 class CostEngineClient:
-    def __init__(self, base_url: str = "http://cost-engine:8080"):
-        self.base_url = base_url
-        self.client = httpx.Client(timeout=30.0)
+    """
+    Client for one or more Cost Engine replicas.
+
+    base_url may list several engines, comma-separated. Requests are then routed
+    by consistent hashing with bounded loads (engine_ring.HashRing): analyses by
+    their (data location, GPU shape), so each replica's price caches only see
+    their share of the key space. An engine that cannot be reached or answers
+    503 is passed over for a few seconds and the request goes to the next engine
+    on the ring.
+    """
+
+    def __init__(self, base_url: str = "http://cost-engine:8080", pool_size: int = 20):
+        # pool_size bounds the open connections (requests beyond it wait for one to
+        # free up) and how many warmed connections survive between requests
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # Shared by every engine reached over TCP (httpx pools connections per host)
+        self.client = httpx.Client(timeout=30.0, limits=limits)
+        nodes = []
+        for endpoint in (url.strip() for url in base_url.split(",")):
+            if not endpoint:
+                continue
+            if endpoint.startswith(UNIX_SCHEME):
+                # unix:///path/to/engine.sock: HTTP over the engine's Unix domain socket.
+                # The host in request URLs is only used for the Host header.
+                transport = httpx.HTTPTransport(uds=endpoint[len(UNIX_SCHEME):], limits=limits)
+                nodes.append(EngineNode(endpoint, "http://cost-engine", httpx.Client(timeout=30.0, transport=transport)))
+            else:
+                nodes.append(EngineNode(endpoint, endpoint.rstrip("/")))
+        if not nodes:
+            self.client.close()
+            raise ValueError(f"No Cost Engine endpoints in {base_url!r}")
+        if len(nodes) == 1 and nodes[0].client is not None:
+            self.client.close()
+            self.client, nodes[0].client = nodes[0].client, None
+        self.ring = HashRing(nodes)
+        # Engine whose /changes sequence numbers the caller holds (they are per replica)
+        self._changes_node: Optional[EngineNode] = None
+
+    def _client(self, node: EngineNode) -> httpx.Client:
+        return node.client or self.client
+
+    def _send(self, route: str, method: str, path: str, stream: bool = False, **kwargs) -> Tuple[httpx.Response, EngineNode]:
+        """
+        Send a request to the first engine in route order that can serve it.
+        Raises the last connection error when none could be reached; when every
+        engine that answered did so with 503, the last answer is returned (still
+        open, for streamed requests).
+        """
+        error: Optional[Exception] = None
+        unavailable: Optional[Tuple[httpx.Response, EngineNode]] = None
+        for node in self.ring.route(route):
+            client = self._client(node)
+            self.ring.acquire(node)
+            try:
+                response = client.send(client.build_request(method, f"{node.base_url}{path}", **kwargs), stream=stream)
+            except FAILOVER_ERRORS as e:
+                error = e
+                self.ring.mark_down(node)
+                continue
+            finally:
+                self.ring.release(node)
+            if unavailable is not None:
+                unavailable[0].close()
+            if response.status_code == FAILOVER_STATUS and len(self.ring.nodes) > 1:
+                self.ring.mark_down(node)
+                unavailable = (response, node)
+                continue
+            node.mark_up()
+            return response, node
+        if unavailable is not None:
+            return unavailable
+        raise error
 
     def analyze(self, request: JobRequest) -> AnalysisResponse:
         """Send analysis request to Cost Engine"""
-        url = f"{self.base_url}/analyze"
-        
+        return self.analyze_versioned(request)[0]
+
+    def analyze_versioned(self, request: JobRequest) -> Tuple[AnalysisResponse, Optional[str]]:
+        """
+        Send analysis request to Cost Engine; also returns the price snapshot
+        version the engine analyzed against (None for engines that do not report it)
+        """
+        body, price_version = self._analyze(request, {})
+        return AnalysisResponse(**body), price_version
+
+    def analyze_with_dependencies(self, request: JobRequest) -> Tuple[AnalysisResponse, Optional[str], List[str]]:
+        """
+        Like analyze_versioned, but also returns the Redis price keys (compute:*,
+        egress:*, gpu_map:*, ...) the analysis read, for invalidating stored results
+        """
+        body, price_version = self._analyze(request, {RECORD_DEPENDENCIES_HEADER: "1"})
+        return AnalysisResponse(**body), price_version, body.get("dependencies") or []
+
+    def _analyze(self, request: JobRequest, headers: Dict[str, str]) -> Tuple[Dict[str, Any], Optional[str]]:
+        # Within a request that has a deadline, the engine gets what is left of it
+        # (and returns a partial analysis rather than overrunning it)
+        timeout = self.client.timeout
+        budget = deadline.forward_budget()
+        if budget is not None:
+            if budget <= 0:
+                raise DeadlineExceeded("Request deadline reached before the Cost Engine was called")
+            headers = {**headers, REQUEST_DEADLINE_HEADER: deadline.header_value(budget)}
+            timeout = httpx.Timeout(min(self.client.timeout.read or budget, deadline.remaining()))
+
+        # The risk block is evaluated by the API, not the engine
+        body = request.model_dump(exclude={"risk"})
+        constraints = body.get("constraints")
+        if constraints and constraints["sort_by"] is not None and constraints["sort_by"] not in ENGINE_SORT_KEYS:
+            # Sorted (and truncated) by the API once the risk model ran; the engine returns every option
+            constraints.update(sort_by=None, top_k=None)
+
         try:
-            response = self.client.post(url, json=request.model_dump())
-            response.raise_for_status()
-            return AnalysisResponse(**response.json())
+            with tracer.span("cost_engine.analyze") as span:
+                response, node = self._send(
+                    route_key(request), "POST", "/analyze",
+                    json=body,
+                    headers=tracer.inject(headers),
+                    timeout=timeout,
+                )
+                if span is not None:
+                    span.set_attribute("http.url", f"{node.endpoint}/analyze")
+                tracer.collect(response.headers)
+                response.raise_for_status()
+                return response.json(), response.headers.get(PRICE_VERSION_HEADER)
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 504 and budget is not None:
+                raise DeadlineExceeded(f"Cost Engine ran out of time: {e.response.text.strip()}")
             raise Exception(f"Cost Engine returned error {e.response.status_code}: {e.response.text}")
+        except httpx.TimeoutException as e:
+            if budget is not None:
+                raise DeadlineExceeded("Cost Engine did not answer before the request deadline")
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
         except httpx.RequestError as e:
             raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
         except Exception as e:
             raise Exception(f"Unexpected error: {str(e)}")
 
+    def placement(self, request: PlacementRequest) -> PlacementResponse:
+        """
+        Cheapest plan from every candidate storage location for every GPU shape,
+        computed by the engine in one pass. Requests the engine rejects raise ValueError.
+        """
+        headers: Dict[str, str] = {}
+        timeout = self.client.timeout
+        budget = deadline.forward_budget()
+        if budget is not None:
+            if budget <= 0:
+                raise DeadlineExceeded("Request deadline reached before the Cost Engine was called")
+            headers[REQUEST_DEADLINE_HEADER] = deadline.header_value(budget)
+            timeout = httpx.Timeout(min(self.client.timeout.read or budget, deadline.remaining()))
+
+        try:
+            with tracer.span("cost_engine.placement", shapes=len(request.shapes)):
+                response, _ = self._send(
+                    "placement", "POST", "/placement",
+                    json=request.model_dump(exclude_none=True),
+                    headers=tracer.inject(headers),
+                    timeout=timeout,
+                )
+                tracer.collect(response.headers)
+        except httpx.TimeoutException as e:
+            if budget is not None:
+                raise DeadlineExceeded("Cost Engine did not answer before the request deadline")
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
+        if response.status_code == 400:
+            raise ValueError(response.text.strip())
+        if response.status_code == 504 and budget is not None:
+            raise DeadlineExceeded(f"Cost Engine ran out of time: {response.text.strip()}")
+        if response.status_code != 200:
+            raise Exception(f"Cost Engine returned error {response.status_code}: {response.text}")
+        return PlacementResponse(**response.json())
+
+    def catalog(self, kind: str, params: Dict[str, Any], timeout: float = 30.0) -> Iterator[bytes]:
+        """
+        One page of the Cost Engine's price catalog (gpu-maps, compute or egress),
+        as the raw JSON bytes the engine streams. A request the engine rejects
+        raises ValueError; errors surface before the first chunk is returned.
+        """
+        try:
+            # Any engine will do (they share Redis); cursors are valid on all of them
+            response, _ = self._send(kind, "GET", f"/catalog/{kind}", stream=True, params=params, timeout=timeout)
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
+        if response.status_code != 200:
+            response.read()
+            response.close()
+            if response.status_code in (400, 404):
+                raise ValueError(response.text.strip())
+            raise Exception(f"Cost Engine returned error {response.status_code}: {response.text}")
+
+        def chunks() -> Iterator[bytes]:
+            try:
+                yield from response.iter_bytes()
+            finally:
+                response.close()
+        return chunks()
+
+    def price_version(self, timeout: float = 2.0) -> str:
+        """Current price snapshot version (prices:version) as seen by the Cost Engine"""
+        try:
+            response, _ = self._send("price-version", "GET", "/price-version", timeout=timeout)
+            response.raise_for_status()
+            return response.json()["version"]
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"Cost Engine returned error {e.response.status_code}: {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
+
+    def changes(self, since: Optional[int] = None, timeout: float = 5.0) -> Dict[str, Any]:
+        """
+        Price keys the Cost Engine saw change after sequence number `since`:
+        {"seq", "keys", "reset", "version"}. reset means the engine cannot tell which
+        keys changed (log overflow, restart, full reload) and everything is suspect.
+        Without `since` only the current sequence number is returned.
+        """
+        params = {} if since is None else {"since": since}
+        try:
+            response, node = self._send("changes", "GET", "/changes", params=params, timeout=timeout)
+            response.raise_for_status()
+            changes = response.json()
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"Cost Engine returned error {e.response.status_code}: {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
+        if since is not None and node is not self._changes_node:
+            # Sequence numbers are per replica: after a failover the caller cannot know what changed
+            changes.update(keys=[], reset=True)
+        self._changes_node = node
+        return changes
+
+    def health(self, timeout: float = 2.0) -> float:
+        """
+        Call every Cost Engine's health check; returns the fastest latency in
+        seconds. Raises only when no engine answers.
+        """
+        latencies, errors = [], []
+        for node in self.ring.nodes:
+            try:
+                latencies.append(self._health(node, timeout))
+                node.mark_up()
+            except Exception as e:
+                self.ring.mark_down(node)
+                errors.append(f"{node.endpoint}: {e}" if len(self.ring.nodes) > 1 else str(e))
+        if not latencies:
+            raise Exception("; ".join(errors))
+        return min(latencies)
+
+    def _health(self, node: EngineNode, timeout: float) -> float:
+        started = time.perf_counter()
+        try:
+            response = self._client(node).get(f"{node.base_url}/health", timeout=timeout)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"Cost Engine returned error {e.response.status_code}: {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to Cost Engine: {str(e)}")
+        return time.perf_counter() - started
+
+    def warm(self, connections: int, timeout: float = 2.0) -> int:
+        """
+        Pre-open pooled connections to each Cost Engine.
+
+        Health checks are held at a barrier and released together so each one needs
+        its own connection; all of them return to the keep-alive pool afterwards.
+        Returns how many connections were opened.
+        """
+        if connections <= 0:
+            return 0
+        nodes = self.ring.nodes
+        barrier = threading.Barrier(connections * len(nodes))
+
+        def open_connection(i: int) -> bool:
+            try:
+                barrier.wait(timeout=timeout)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                self._health(nodes[i % len(nodes)], timeout=timeout)
+                return True
+            except Exception:
+                return False
+
+        with ThreadPoolExecutor(max_workers=connections * len(nodes)) as pool:
+            return sum(pool.map(open_connection, range(connections * len(nodes))))
+
     def close(self):
-        """Close the HTTP client"""
+        """Close the HTTP clients"""
         self.client.close()
+        for node in self.ring.nodes:
+            if node.client is not None:
+                node.client.close()
 
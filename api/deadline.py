@@ -0,0 +1,57 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+# The caller's remaining time budget in milliseconds. It is relative rather than
+# an absolute timestamp so clock skew between hosts does not matter; each hop
+# forwards what is left of it, minus the time it needs for its own work.
+REQUEST_DEADLINE_HEADER = "X-Request-Deadline-Ms"
+# Bounds of the share of the budget kept back when forwarding (a tenth of it)
+MIN_RESERVE_SECONDS = 0.02
+MAX_RESERVE_SECONDS = 0.5
+
+_deadline: ContextVar[Optional[float]] = ContextVar("finops_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before a downstream call could answer"""
+
+
+def parse_budget(header: Optional[str]) -> Optional[float]:
+    """Budget in seconds from a deadline header; None when absent or malformed"""
+    if header is None:
+        return None
+    try:
+        return int(header.strip()) / 1000
+    except ValueError:
+        return None
+
+
+def start(budget: float) -> Token:
+    """Bound the current context (request) by budget seconds from now"""
+    return _deadline.set(time.monotonic() + budget)
+
+
+def reset(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def forward_budget() -> Optional[float]:
+    """Budget to hand to a downstream call, keeping back time to use its answer"""
+    left = remaining()
+    if left is None:
+        return None
+    reserve = min(max(left / 10, MIN_RESERVE_SECONDS), MAX_RESERVE_SECONDS)
+    return left - reserve
+
+
+def header_value(budget: float) -> str:
+    return str(max(0, int(budget * 1000)))
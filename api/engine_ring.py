@@ -0,0 +1,132 @@
+import bisect
+import hashlib
+import math
+import threading
+import time
+from typing import List, Sequence
+
+from models import JobRequest
+
+# Ring points per engine; more points spread keys more evenly between engines
+VIRTUAL_NODES = 128
+# Bounded loads: no engine takes more than this factor of the mean in-flight load
+LOAD_FACTOR = 1.25
+# How long an engine that failed a request is passed over before it is tried again
+DOWN_SECONDS = 5.0
+
+
+def route_key(job_request: JobRequest) -> str:
+    """
+    Canonical (data location, GPU shape) of a job: every request for the same
+    location and shape goes to the same engine, whose price caches then hold
+    the compute and egress entries that combination reads
+    """
+    compute = job_request.compute
+    return "|".join(str(part) for part in (
+        job_request.data.location, compute.gpu_type, compute.gpu_count,
+        compute.gpu_memory_gb or "", compute.interconnect or "",
+    ))
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class EngineNode:
+    """One Cost Engine replica: its endpoint, base URL, in-flight requests and health"""
+
+    def __init__(self, endpoint: str, base_url: str, client=None):
+        # As configured (http://host:port or unix:///path); names the engine on the ring
+        self.endpoint = endpoint
+        self.base_url = base_url
+        # None: requests go through the CostEngineClient's shared client
+        self.client = client
+        self.inflight = 0
+        self.down_until = 0.0
+        self.failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, seconds: float) -> None:
+        self.failures += 1
+        self.down_until = time.monotonic() + seconds
+
+    def mark_up(self) -> None:
+        self.down_until = 0.0
+
+
+class HashRing:
+    """
+    Consistent hashing with bounded loads over Cost Engine replicas.
+
+    Each engine owns VIRTUAL_NODES points on a 64-bit ring; a key belongs to the
+    first engine clockwise from its hash. route() returns every engine in the
+    order a request for the key should try them: unhealthy engines last, and
+    the key's owner passed over while it has more than LOAD_FACTOR times the
+    mean in-flight load (Mirrokni et al.), so a hot key spills to the next
+    engine on the ring instead of overloading its owner. Adding or removing an
+    engine only moves the keys next to its points.
+    """
+
+    def __init__(self, nodes: Sequence[EngineNode], load_factor: float = LOAD_FACTOR, down_seconds: float = DOWN_SECONDS):
+        self.nodes = list(nodes)
+        self.load_factor = load_factor
+        self.down_seconds = down_seconds
+        points = sorted(
+            (_hash(f"{node.endpoint}#{i}"), index)
+            for index, node in enumerate(self.nodes)
+            for i in range(VIRTUAL_NODES)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [index for _, index in points]
+        self._lock = threading.Lock()
+
+    def preference(self, key: str) -> List[EngineNode]:
+        """Every engine, in ring order from the key's owner"""
+        if len(self.nodes) == 1:
+            return list(self.nodes)
+        start = bisect.bisect(self._hashes, _hash(key))
+        seen: List[int] = []
+        for offset in range(len(self._owners)):
+            index = self._owners[(start + offset) % len(self._owners)]
+            if index not in seen:
+                seen.append(index)
+                if len(seen) == len(self.nodes):
+                    break
+        return [self.nodes[index] for index in seen]
+
+    def route(self, key: str) -> List[EngineNode]:
+        order = self.preference(key)
+        if len(order) == 1:
+            return order
+        healthy = [node for node in order if node.healthy]
+        unhealthy = [node for node in order if not node.healthy]
+        if healthy:
+            with self._lock:
+                total = sum(node.inflight for node in healthy)
+            capacity = math.ceil(self.load_factor * (total + 1) / len(healthy))
+            for i, node in enumerate(healthy):
+                if node.inflight < capacity:
+                    healthy = healthy[i:] + healthy[:i]
+                    break
+        return healthy + unhealthy
+
+    def acquire(self, node: EngineNode) -> None:
+        with self._lock:
+            node.inflight += 1
+
+    def release(self, node: EngineNode) -> None:
+        with self._lock:
+            node.inflight -= 1
+
+    def mark_down(self, node: EngineNode) -> None:
+        if len(self.nodes) > 1:
+            node.mark_down(self.down_seconds)
+
+    def status(self) -> List[dict]:
+        return [
+            {"endpoint": node.endpoint, "healthy": node.healthy, "inflight": node.inflight, "failures": node.failures}
+            for node in self.nodes
+        ]
@@ -0,0 +1,42 @@
+import hashlib
+import json
+from typing import Optional
+
+from models import JobRequest
+
+
+def job_key(job_request: JobRequest) -> str:
+    """
+    Canonical key of everything that determines an analysis: the job without its
+    name, as sorted compact JSON, hashed. Jobs that differ only in name share a key.
+    """
+    canonical = json.dumps(
+        job_request.model_dump(exclude={"job_name"}),
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def make_etag(job_request: JobRequest, price_version: str, representation: str = "") -> str:
+    """
+    Strong ETag for an analysis: changes with the job or with any price reload.
+    Each representation of the same analysis (e.g. "c" for columnar) gets its own tag.
+    """
+    suffix = f".{representation}" if representation else ""
+    return f'"{job_key(job_request)[:32]}.{price_version}{suffix}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the current ETag (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,160 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+from models import AnalysisResponse, JobRequest, SavedJob
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_jobs (
+    id TEXT PRIMARY KEY,
+    job TEXT NOT NULL,
+    break_even_threshold_hours REAL,
+    created_at REAL NOT NULL,
+    analysis TEXT,
+    recommendation TEXT,
+    best_break_even_hours REAL,
+    price_version TEXT,
+    computed_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_dependencies (
+    price_key TEXT NOT NULL,
+    job_id TEXT NOT NULL REFERENCES saved_jobs(id) ON DELETE CASCADE,
+    PRIMARY KEY (price_key, job_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS job_dependencies_by_job ON job_dependencies(job_id);
+"""
+
+# SQLite's default limit on host parameters per statement is 999 on older builds
+KEY_BATCH = 500
+
+
+class JobRegistry:
+    """
+    SQLite store of saved jobs and their last results.
+
+    job_dependencies is the reverse index: one row per (price key, job) for every
+    Redis key the job's last analysis read. jobs_for_keys() turns a batch of
+    changed keys into the jobs that need recomputing through the primary key
+    index, without scanning the jobs. One connection is shared by the API's
+    threads behind a lock; SAVED_JOBS_DB names the file (":memory:" for tests).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "JobRegistry":
+        return cls(os.getenv("SAVED_JOBS_DB", "saved_jobs.db"))
+
+    def add(self, job: JobRequest, threshold: Optional[float]) -> str:
+        job_id = secrets.token_hex(8)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO saved_jobs (id, job, break_even_threshold_hours, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, job.model_dump_json(exclude_none=True), threshold, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[SavedJob]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM saved_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _saved_job(row) if row is not None else None
+
+    def list(self) -> List[SavedJob]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM saved_jobs ORDER BY created_at").fetchall()
+        return [_saved_job(row) for row in rows]
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM saved_jobs WHERE id = ?", (job_id,)).rowcount > 0
+
+    def all_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM saved_jobs")]
+
+    def failed_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM saved_jobs WHERE error IS NOT NULL")]
+
+    def dependencies(self, job_id: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT price_key FROM job_dependencies WHERE job_id = ? ORDER BY price_key", (job_id,)
+            )
+            return [row[0] for row in rows]
+
+    def jobs_for_keys(self, keys: Iterable[str]) -> Set[str]:
+        """Saved jobs whose last analysis read any of the given price keys"""
+        keys = list(keys)
+        job_ids: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(keys), KEY_BATCH):
+                batch = keys[start:start + KEY_BATCH]
+                rows = self._db.execute(
+                    f"SELECT DISTINCT job_id FROM job_dependencies WHERE price_key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                job_ids.update(row[0] for row in rows)
+        return job_ids
+
+    def set_result(
+        self,
+        job_id: str,
+        analysis: AnalysisResponse,
+        recommendation: str,
+        best_break_even_hours: Optional[float],
+        price_version: Optional[str],
+        dependencies: List[str],
+    ) -> bool:
+        """Store a recompute and replace the job's dependencies; False if the job was deleted meanwhile"""
+        with self._lock, self._db:
+            updated = self._db.execute(
+                "UPDATE saved_jobs SET analysis = ?, recommendation = ?, best_break_even_hours = ?, "
+                "price_version = ?, computed_at = ?, error = NULL WHERE id = ?",
+                (analysis.model_dump_json(exclude_none=True), recommendation, best_break_even_hours,
+                 price_version, time.time(), job_id),
+            ).rowcount > 0
+            if updated:
+                self._db.execute("DELETE FROM job_dependencies WHERE job_id = ?", (job_id,))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO job_dependencies (price_key, job_id) VALUES (?, ?)",
+                    [(key, job_id) for key in dependencies],
+                )
+            return updated
+
+    def set_error(self, job_id: str, error: str) -> None:
+        """Record a failed recompute; the previous result and dependencies are kept"""
+        with self._lock, self._db:
+            self._db.execute("UPDATE saved_jobs SET error = ? WHERE id = ?", (error, job_id))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _saved_job(row: sqlite3.Row) -> SavedJob:
+    return SavedJob(
+        id=row["id"],
+        job=JobRequest(**json.loads(row["job"])),
+        break_even_threshold_hours=row["break_even_threshold_hours"],
+        created_at=row["created_at"],
+        recommendation=row["recommendation"],
+        best_break_even_hours=row["best_break_even_hours"],
+        analysis=AnalysisResponse(**json.loads(row["analysis"])) if row["analysis"] else None,
+        price_version=row["price_version"],
+        computed_at=row["computed_at"],
+        error=row["error"],
+    )
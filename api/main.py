@@ -1,10 +1,90 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from models import JobRequest, AnalysisResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional, Tuple
+from analysis_cache import AnalysisCache, CacheWarmer, HotJobs
+from models import (
+    JobRequest, AnalysisResponse, PlacementRequest, PlacementResponse, PortfolioRequest, PortfolioResponse,
+    SavedJob, SavedJobRequest,
+)
 from cost_engine_client import CostEngineClient
+from deadline import REQUEST_DEADLINE_HEADER, DeadlineExceeded
+import deadline
+from columnar import COLUMNAR_MEDIA_TYPE, encode_analysis, wants_columnar
+from etag import etag_matches, job_key, make_etag
+from job_registry import JobRegistry
+from portfolio import analyze_portfolio
+from risk import apply_risk_model
+from readiness import Readiness
+from request_log import request_log
+from saved_jobs import EventBroker, SavedJobWatcher
+from scheduler import (
+    DEFAULT_PRIORITY, PRIORITY_HEADER, QUEUE_WAIT_HEADER, TENANT_HEADER,
+    FairScheduler, QueueFull, QueueTimeout, tenant_id,
+)
+from profiling import PROFILE_HEADER, PROFILE_ID_HEADER, profiler
+from tracing import TRACE_DEBUG_HEADER, TRACE_SPANS_HEADER, TRACEPARENT_HEADER, tracer
 import os
 
-app = FastAPI(title="FinOps Orchestrator API", version="0.1.0")
+# Initialize Cost Engine client
+cost_engine_url = os.getenv("COST_ENGINE_URL", "http://cost-engine:8080")
+cost_engine_client = CostEngineClient(
+    base_url=cost_engine_url,
+    pool_size=int(os.getenv("ENGINE_POOL_SIZE", "20")),
+)
+readiness = Readiness.from_env(cost_engine_client)
+# Analysis work shares the engine connection pool; by default one slot per pooled connection
+scheduler = FairScheduler.from_env(default_slots=int(os.getenv("ENGINE_POOL_SIZE", "20")))
+SCHEDULED_PATHS = {"/api/v1/analyze", "/api/v1/portfolio", "/api/v1/placement"}
+
+
+def analyze_saved_job(job_request: JobRequest):
+    """Saved-job recompute: engine analysis with its price dependencies, then the risk model"""
+    analysis, price_version, dependencies = cost_engine_client.analyze_with_dependencies(job_request)
+    if job_request.risk is not None:
+        analysis = apply_risk_model(analysis, job_request.risk, job_request.constraints)
+    return analysis, price_version, dependencies
+
+
+def analyze_job(job_request: JobRequest) -> Tuple[AnalysisResponse, Optional[str]]:
+    """Engine analysis, then the risk model; also returns the price version analyzed against"""
+    analysis, price_version = cost_engine_client.analyze_versioned(job_request)
+    if job_request.risk is not None:
+        with tracer.span("risk_model", trials=job_request.risk.trials):
+            analysis = apply_risk_model(analysis, job_request.risk, job_request.constraints)
+    return analysis, price_version
+
+
+# Complete analyses of the current price version; the most requested jobs are
+# re-analyzed in the background after every price reload
+analysis_cache = AnalysisCache(capacity=int(os.getenv("ANALYSIS_CACHE_SIZE", "1000")))
+hot_jobs = HotJobs(capacity=int(os.getenv("HOT_JOBS_TRACKED", "256")))
+cache_warmer = CacheWarmer.from_env(cost_engine_client, analysis_cache, hot_jobs, analyze_job, scheduler)
+
+job_registry = JobRegistry.from_env()
+job_events = EventBroker()
+job_watcher = SavedJobWatcher.from_env(job_registry, cost_engine_client, analyze_saved_job, job_events)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm Cost Engine connections before serving; clean up on shutdown"""
+    await run_in_threadpool(readiness.start)
+    job_watcher.start()
+    cache_warmer.start()
+    yield
+    cache_warmer.stop()
+    job_watcher.stop()
+    job_registry.close()
+    readiness.stop()
+    cost_engine_client.close()
+    request_log.close()
+    tracer.shutdown()
+
+
+app = FastAPI(title="FinOps Orchestrator API", version="0.1.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -15,33 +95,361 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Cost Engine client
-cost_engine_url = os.getenv("COST_ENGINE_URL", "http://cost-engine:8080")
-cost_engine_client = CostEngineClient(base_url=cost_engine_url)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Continue the caller's W3C trace and record a server span for the request"""
+    trace = tracer.start_trace(
+        request.headers.get(TRACEPARENT_HEADER),
+        debug=tracer.debug_authorized(request.headers.get(TRACE_DEBUG_HEADER)),
+    )
+    if trace is None:
+        return await call_next(request)
+
+    with tracer.span(f"{request.method} {request.url.path}") as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+
+    spans_header = tracer.finish(trace)
+    if spans_header:
+        response.headers[TRACE_SPANS_HEADER] = spans_header
+    return response
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Profile a request carrying a valid X-Profile token (only when PROFILE_TOKEN is configured)"""
+    header = request.headers.get(PROFILE_HEADER)
+    if header is None or not profiler.enabled or request.url.path.startswith("/api/v1/profiles"):
+        return await call_next(request)
+    if not profiler.authorized(header):
+        return JSONResponse(status_code=403, content={"detail": "Invalid X-Profile token"})
+
+    profile = profiler.begin(f"{request.method} {request.url.path}")
+    if profile is None:
+        return JSONResponse(status_code=429, content={"detail": "Another request is being profiled, retry shortly"})
+    try:
+        response = await call_next(request)
+    finally:
+        # Snapshotting allocations takes a moment; keep it off the event loop
+        await run_in_threadpool(profiler.end, profile)
+
+    response.headers[PROFILE_ID_HEADER] = profile.id
+    return response
+
+
+@app.middleware("http")
+async def schedule_requests(request: Request, call_next):
+    """Queue analysis work by tenant and priority class (see scheduler.py) before it takes a worker thread"""
+    if request.url.path not in SCHEDULED_PATHS or not scheduler.enabled:
+        return await call_next(request)
+    priority = request.headers.get(PRIORITY_HEADER, DEFAULT_PRIORITY)
+    if priority not in scheduler.weights:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Unknown {PRIORITY_HEADER} '{priority}' (expected one of: {', '.join(scheduler.weights)})"},
+        )
+    tenant = tenant_id(request.headers.get(TENANT_HEADER))
+    try:
+        waited = await scheduler.acquire(tenant, priority, deadline.remaining())
+    except QueueFull as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)})
+    except QueueTimeout as e:
+        return JSONResponse(status_code=504, content={"detail": str(e)})
+    try:
+        response = await call_next(request)
+    finally:
+        scheduler.release(tenant)
+    response.headers[QUEUE_WAIT_HEADER] = f"{waited * 1000:.1f}"
+    return response
+
+
+@app.middleware("http")
+async def request_deadlines(request: Request, call_next):
+    """Bound the request by the caller's X-Request-Deadline-Ms budget, if it sent one"""
+    budget = deadline.parse_budget(request.headers.get(REQUEST_DEADLINE_HEADER))
+    if budget is None:
+        return await call_next(request)
+    if budget <= 0:
+        return JSONResponse(status_code=504, content={"detail": "Request deadline already passed"})
+    token = deadline.start(budget)
+    try:
+        return await call_next(request)
+    finally:
+        deadline.reset(token)
 
 
 @app.post("/api/v1/analyze", response_model=AnalysisResponse)
-def analyze(job_request: JobRequest) -> AnalysisResponse:
+def analyze(
+    job_request: JobRequest,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+) -> AnalysisResponse:
     """
     Analyze cost profile for a job configuration.
     
     Validates the job request and forwards it to the Cost Engine for analysis.
+    When the request carries a risk block, spot interruptions are simulated and
+    expected/P90 costs are attached to every option.
+
+    The response carries an ETag built from the job and the price snapshot
+    version. A request whose If-None-Match still matches gets a 304 after a
+    version check, without running the analysis.
+
+    Clients that accept application/vnd.finops.columnar+json get the remote
+    options as dictionary-encoded columns (see columnar.py) instead of objects.
+
+    With an X-Request-Deadline-Ms budget, the Cost Engine gets what is left of
+    it and may answer with a partial analysis (partial=true), which is never
+    given an ETag; a deadline that passes without any answer is a 504.
+
+    Complete analyses are cached for the current price version. After a price
+    reload the most requested jobs are re-analyzed in the background (see
+    analysis_cache.py), so popular requests keep answering from the cache.
+    """
+    # FastAPI parsed and validated the body before calling us
+    tracer.record_elapsed("parse_and_validate")
+    request_log.record(job_request)
+    columnar = wants_columnar(accept)
+    representation = "c" if columnar else ""
+    # Both representations live at this URL; caches must key on Accept
+    headers = {"Vary": "Accept"}
+
+    key = job_key(job_request)
+    if analysis_cache.enabled:
+        hot_jobs.record(key, job_request)
+
+    # The current price version decides both revalidation and cache hits
+    current_version = None
+    if if_none_match or key in analysis_cache:
+        try:
+            with tracer.span("revalidate"):
+                current_version = cost_engine_client.price_version()
+        except Exception:
+            pass  # Engine without /price-version or unreachable: answer in full
+
+    if if_none_match and current_version is not None:
+        etag = make_etag(job_request, current_version, representation)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={**headers, "ETag": etag, "Cache-Control": "no-cache"})
+
+    analysis = analysis_cache.get(key, current_version) if current_version is not None else None
+    if analysis is not None:
+        price_version = current_version
+    else:
+        try:
+            analysis, price_version = analyze_job(job_request)
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if price_version is not None:
+            analysis_cache.put(key, price_version, analysis)
+
+    if analysis.partial:
+        # A partial answer must not be revalidated into looking complete later
+        headers["Cache-Control"] = "no-store"
+    elif price_version is not None:
+        headers["ETag"] = make_etag(job_request, price_version, representation)
+        # Clients may keep the result but must revalidate before reusing it
+        headers["Cache-Control"] = "no-cache"
+    if columnar:
+        with tracer.span("encode_columnar", options=len(analysis.remote_options)):
+            body = encode_analysis(analysis)
+        return JSONResponse(body, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+    response.headers.update(headers)
+    return analysis
+
+
+@app.post("/api/v1/portfolio", response_model=PortfolioResponse)
+def portfolio(portfolio_request: PortfolioRequest) -> PortfolioResponse:
+    """
+    Analyze a columnar batch of jobs.
+
+    Each distinct (location, GPU shape) is priced once by the Cost Engine; egress,
+    break-even and the recommended option are then computed for every row.
+    """
+    tracer.record_elapsed("parse_and_validate", rows=len(portfolio_request.job_name))
+    try:
+        return analyze_portfolio(portfolio_request, cost_engine_client)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/v1/placement", response_model=PlacementResponse)
+def placement(placement_request: PlacementRequest) -> PlacementResponse:
+    """
+    Where to store a dataset: for every candidate storage location (all known
+    locations by default) and every GPU shape, the cheapest plan and its
+    break-even against the data-local one.
+
+    The Cost Engine fills the whole matrix in one pass, pricing each shape's
+    instances and each egress route once. Cells index into the response's
+    instances; with duration_hours plans are ranked by total cost instead of
+    hourly cost.
     """
+    tracer.record_elapsed("parse_and_validate", shapes=len(placement_request.shapes))
     try:
-        response = cost_engine_client.analyze(job_request)
-        return response
+        return cost_engine_client.placement(placement_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/v1/catalog/{kind}")
+def catalog(
+    kind: Literal["gpu-maps", "compute", "egress"],
+    provider: Optional[str] = None,
+    region: Optional[str] = None,
+    gpu_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+) -> StreamingResponse:
+    """
+    Browse the price catalog: GPU maps, compute prices or egress prices.
+
+    Returns {"kind", "items", "next_cursor"}; pass next_cursor back as cursor
+    for the following page, until it is null. Pages are read with incremental
+    SCAN (or, for compute prices of one gpu_type, from its GPU maps) and
+    streamed through from the Cost Engine, so they never block Redis or need
+    buffering here. A page holds about `limit` entries, fewer when filters are
+    selective; an entry may repeat across pages while Redis resizes.
+    """
+    params = {
+        name: value for name, value in
+        {"provider": provider, "region": region, "gpu_type": gpu_type, "cursor": cursor, "limit": limit}.items()
+        if value is not None
+    }
+    try:
+        chunks = cost_engine_client.catalog(kind, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(chunks, media_type="application/json")
+
+
+@app.post("/api/v1/jobs", response_model=SavedJob, status_code=201)
+def save_job(request: SavedJobRequest) -> SavedJob:
+    """
+    Save a job so its recommendation is kept current as prices change.
+
+    The job is analyzed right away. From then on it is recomputed only when a
+    price it depends on changes, and subscribers to /api/v1/jobs/events are told
+    when its recommendation changes or its best break-even crosses the threshold.
+    """
+    return job_watcher.register(request)
+
+
+@app.get("/api/v1/jobs", response_model=List[SavedJob])
+def list_jobs() -> List[SavedJob]:
+    """List saved jobs with their latest results"""
+    return job_registry.list()
+
+
+@app.get("/api/v1/jobs/events")
+async def job_events_stream(
+    job_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events stream of saved-job events: recommendation_changed,
+    break_even_crossed and recompute_failed. job_id limits it to one job;
+    reconnecting clients resume after Last-Event-ID.
+    """
+    resume_after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        job_events.stream(resume_after, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/v1/jobs/{job_id}", response_model=SavedJob)
+def get_job(job_id: str) -> SavedJob:
+    """A saved job and its latest result"""
+    saved = job_registry.get(job_id)
+    if saved is None:
+        raise HTTPException(status_code=404, detail=f"Saved job {job_id} not found")
+    return saved
+
+
+@app.delete("/api/v1/jobs/{job_id}", status_code=204)
+def delete_job(job_id: str) -> Response:
+    """Stop tracking a saved job"""
+    if not job_registry.delete(job_id):
+        raise HTTPException(status_code=404, detail=f"Saved job {job_id} not found")
+    return Response(status_code=204)
+
+
+def _require_profile_token(token: Optional[str]) -> None:
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILE_TOKEN)")
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid X-Profile token")
+
+
+@app.get("/api/v1/profiles")
+def list_profiles(x_profile: Optional[str] = Header(None)):
+    """List stored request profiles (id -> request)"""
+    _require_profile_token(x_profile)
+    return profiler.list()
+
+
+@app.get("/api/v1/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, format: str = "text", x_profile: Optional[str] = Header(None)):
+    """
+    Download a request profile.
+
+    format=text returns the sampling report and allocation summary; format=folded
+    returns collapsed stacks for flamegraph.pl or speedscope.
+    """
+    _require_profile_token(x_profile)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    if format == "folded":
+        return profile.folded
+    if format != "text":
+        raise HTTPException(status_code=400, detail="format must be 'text' or 'folded'")
+    return profile.report
+
+
+@app.get("/api/v1/scheduler")
+async def scheduler_status():
+    """
+    Analysis scheduler state: slots, per-tenant running and queued requests, and
+    per-tenant, per-priority queue-wait statistics (count, mean, p50/p90/p99, max,
+    histogram, rejected and timed-out requests) since the replica started.
+    Async so it reads the scheduler on the event loop that updates it
+    """
+    return scheduler.status()
+
+
+@app.get("/api/v1/cache")
+async def cache_status():
+    """Analysis cache size and hit counts, and the last background warming pass"""
+    return cache_warmer.status()
+
+
 @app.get("/health")
 def health():
     """Health check endpoint"""
     return {"status": "healthy"}
 
 
-@app.on_event("shutdown")
-def shutdown():
-    """Cleanup on shutdown"""
-    cost_engine_client.close()
+@app.get("/ready")
+def ready():
+    """
+    Readiness check for load balancers.
+
+    Returns 200 once the startup probe analysis has succeeded and the Cost Engine
+    is reachable, 503 otherwise; the body reports engine and probe latency.
+    """
+    status = readiness.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
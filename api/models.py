@@ -1,5 +1,5 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 import re
 
 
@@ -21,6 +21,11 @@ class JobCompute(BaseModel):
     gpu_count: int = Field(..., gt=0, description="Number of GPUs required")
     gpu_memory_gb: Optional[int] = Field(None, gt=0, description="Optional: GPU memory in GB")
     interconnect: Optional[str] = Field(None, description="Optional: Interconnect type (e.g., 'infiniband', 'ethernet')")
+    max_nodes: Optional[int] = Field(
+        None, ge=1, le=256,
+        description="Optional: nodes the job may span. Unset: several nodes only when no single instance has gpu_count GPUs",
+    )
+    mixed_shapes: bool = Field(False, description="Multi-node options may combine different instance types")
 
 
 class JobOutput(BaseModel):
@@ -28,11 +33,56 @@ class JobOutput(BaseModel):
     path: str = Field(..., description="Storage path (e.g., 's3://bucket/path/')")
 
 
+class JobRisk(BaseModel):
+    duration_hours: float = Field(..., gt=0, description="Expected runtime of the job without interruptions")
+    checkpoint_interval_hours: float = Field(..., gt=0, description="Hours of work between checkpoints")
+    restart_overhead_hours: float = Field(0.0, ge=0, description="Billed hours to restart after an interruption")
+    trials: int = Field(100_000, gt=0, le=1_000_000, description="Number of Monte Carlo trials")
+    seed: Optional[int] = Field(None, description="Optional seed for reproducible simulations")
+
+
+# Orders the Cost Engine can return remote options in (the CLI's --sort names);
+# "expected-cost" needs the risk model, so the API sorts by it after the engine answers
+ENGINE_SORT_KEYS = ("break-even", "hourly-cost", "egress")
+SortKey = Literal["break-even", "hourly-cost", "egress", "expected-cost"]
+
+
+class JobConstraints(BaseModel):
+    """Which remote options to return; the data-local option is always returned"""
+    providers: Optional[List[str]] = Field(None, description="Only return options from these providers")
+    exclude_providers: Optional[List[str]] = Field(None, description="Never return options from these providers")
+    max_break_even_hours: Optional[float] = Field(
+        None, ge=0, description="Drop options that break even later than this (or never)"
+    )
+    max_cost_per_hour: Optional[float] = Field(None, gt=0, description="Drop options with a higher hourly compute cost")
+    recommended_only: bool = Field(False, description="Drop options that never break even")
+    spot: Optional[bool] = Field(None, description="true: spot options only; false: on-demand only; unset: both")
+    sort_by: Optional[SortKey] = Field(None, description="Order of the remote options")
+    top_k: Optional[int] = Field(None, gt=0, description="Return only the first top_k remote options (after sorting)")
+
+
 class JobRequest(BaseModel):
     job_name: str = Field(..., description="Unique name for the job")
     data: JobData
     compute: JobCompute
     output: Optional[JobOutput] = Field(None, description="Optional output configuration (for MVP 3, ignored in MVP 1)")
+    risk: Optional[JobRisk] = Field(None, description="Optional: simulate spot interruptions for this job")
+    constraints: Optional[JobConstraints] = Field(
+        None, description="Optional: filter, sort and truncate the remote options server-side"
+    )
+
+    @model_validator(mode='after')
+    def validate_sort_needs_risk(self) -> 'JobRequest':
+        if self.constraints is not None and self.constraints.sort_by == "expected-cost" and self.risk is None:
+            raise ValueError('sort_by "expected-cost" requires a risk block')
+        return self
+
+
+class CompositionNode(BaseModel):
+    instance_type: str
+    gpu_count: int = Field(..., description="GPUs per node")
+    count: int = Field(..., description="Nodes of this instance type")
+    cost_per_hour: float = Field(..., description="Per node")
 
 
 class AnalysisOption(BaseModel):
@@ -45,9 +95,145 @@ class AnalysisOption(BaseModel):
     advisory_message: str
     is_spot_instance: bool = False
     interruption_risk: Optional[str] = Field(None, description="Risk level: LOW, MEDIUM, or HIGH")
+    egress_route: Optional[List[str]] = Field(
+        None, description="Locations the data passes through, from the source to the compute region"
+    )
+    node_count: Optional[int] = Field(None, description="Multi-node options: compute_cost_per_hour covers all nodes")
+    nodes: Optional[List[CompositionNode]] = None
+    expected_cost: Optional[float] = Field(None, description="Risk mode: mean total cost over simulated runs")
+    p90_cost: Optional[float] = Field(None, description="Risk mode: 90th percentile total cost")
+    expected_interruptions: Optional[float] = Field(None, description="Risk mode: mean interruptions per run")
+    risk_adjusted_break_even_hours: Optional[float] = Field(
+        None, description="Risk mode: break-even using the interruption-inflated hourly cost"
+    )
 
 
 class AnalysisResponse(BaseModel):
     data_local_option: AnalysisOption
     remote_options: List[AnalysisOption]
+    partial: bool = Field(
+        False, description="The request deadline cut the analysis short; remote_options is incomplete"
+    )
+    options_skipped: int = Field(0, description="Partial results: candidate options that were not priced")
+
+
+PORTFOLIO_COLUMNS = [
+    "job_name", "location", "size_gb", "gpu_type", "gpu_count",
+    "gpu_memory_gb", "interconnect", "duration_hours",
+]
+
+
+class PortfolioRequest(BaseModel):
+    """Columnar batch of jobs: every field is a column with one entry per job"""
+    job_name: List[str] = Field(..., description="Job name column")
+    location: List[str] = Field(..., description="Data location column (provider:service:region)")
+    size_gb: List[float] = Field(..., description="Data size column in gigabytes")
+    gpu_type: List[str] = Field(..., description="GPU type column")
+    gpu_count: List[int] = Field(..., description="GPU count column")
+    gpu_memory_gb: Optional[List[Optional[int]]] = Field(None, description="Optional GPU memory column")
+    interconnect: Optional[List[Optional[str]]] = Field(None, description="Optional interconnect column")
+    duration_hours: Optional[List[float]] = Field(
+        None, description="Optional expected runtime column; enables savings totals"
+    )
+
+    @model_validator(mode='after')
+    def validate_column_lengths(self) -> 'PortfolioRequest':
+        n = len(self.job_name)
+        for name in PORTFOLIO_COLUMNS:
+            column = getattr(self, name)
+            if column is not None and len(column) != n:
+                raise ValueError(f'column {name} has {len(column)} rows, expected {n}')
+        if any(size <= 0 for size in self.size_gb):
+            raise ValueError('size_gb must be greater than 0 for every row')
+        if any(count <= 0 for count in self.gpu_count):
+            raise ValueError('gpu_count must be greater than 0 for every row')
+        if self.duration_hours is not None and any(hours <= 0 for hours in self.duration_hours):
+            raise ValueError('duration_hours must be greater than 0 for every row')
+        for location in set(self.location):
+            JobData.validate_location_format(location)
+        return self
+
+
+class PortfolioTotals(BaseModel):
+    jobs: int
+    jobs_moved: int = Field(..., description="Jobs whose recommended option is not data-local")
+    jobs_failed: int = Field(..., description="Jobs whose (location, GPU shape) group could not be priced")
+    total_egress_cost: float = Field(..., description="One-time egress paid by the recommended options")
+    local_cost: Optional[float] = Field(None, description="Total cost if every job stays data-local")
+    recommended_cost: Optional[float] = Field(None, description="Total cost of the recommended options")
+    savings: Optional[float] = Field(None, description="local_cost - recommended_cost")
+
+
+class PortfolioResponse(BaseModel):
+    columns: Dict[str, List[Any]] = Field(..., description="Per-job result columns, aligned with the request rows")
+    totals: PortfolioTotals
+    errors: Dict[str, str] = Field(default_factory=dict, description="Engine errors by (location, GPU shape) group")
+
+
+class PlacementRequest(BaseModel):
+    """Where to store a dataset: the cheapest plan from every candidate location, for every GPU shape"""
+    size_gb: float = Field(..., gt=0, description="Dataset size in gigabytes")
+    shapes: List[JobCompute] = Field(..., min_length=1, description="GPU shapes the dataset will be used with")
+    locations: Optional[List[str]] = Field(
+        None, description="Candidate storage locations (provider:service:region); default: every known location"
+    )
+    duration_hours: Optional[float] = Field(
+        None, gt=0, description="Rank plans by total cost over this runtime (egress included) instead of hourly cost"
+    )
+
+    @field_validator('locations')
+    @classmethod
+    def validate_locations(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        for location in v or []:
+            JobData.validate_location_format(location)
+        return v
+
+
+class PlacementInstance(BaseModel):
+    provider: str
+    region: str
+    instance_type: str
+    cost_per_hour: float
+    node_count: Optional[int] = Field(None, description="Multi-node compositions only")
+
+
+class PlacementCell(BaseModel):
+    local: Optional[int] = Field(None, description="Index into instances of the data-local plan, if there is one")
+    best: int = Field(..., description="Index into instances of the cheapest plan")
+    one_time_egress_cost: float
+    break_even_hours: Optional[float] = Field(None, description="When the best plan is remote and beats the local one")
+    total_cost: Optional[float] = Field(None, description="With duration_hours: compute plus egress of the best plan")
+
+
+class PlacementResponse(BaseModel):
+    """locations x shapes matrix; a null cell means no plan is reachable from that location"""
+    locations: List[str]
+    shapes: List[JobCompute]
+    instances: List[PlacementInstance]
+    cells: List[List[Optional[PlacementCell]]]
+
+
+
+class SavedJobRequest(BaseModel):
+    job: JobRequest
+    break_even_threshold_hours: Optional[float] = Field(
+        None, gt=0,
+        description="Recommend moving only if the best remote option breaks even within this many hours",
+    )
+
 
+class SavedJob(BaseModel):
+    id: str
+    job: JobRequest
+    break_even_threshold_hours: Optional[float] = None
+    created_at: float
+    recommendation: Optional[str] = Field(
+        None, description="Recommended option as provider:region:instance_type (':spot' for spot options)"
+    )
+    best_break_even_hours: Optional[float] = Field(
+        None, description="Lowest break-even among the remote options at the last recompute"
+    )
+    analysis: Optional[AnalysisResponse] = Field(None, description="Result of the last recompute")
+    price_version: Optional[str] = None
+    computed_at: Optional[float] = None
+    error: Optional[str] = Field(None, description="Error from the last recompute, if it failed")
@@ -0,0 +1,171 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import (
+    AnalysisResponse,
+    JobCompute,
+    JobData,
+    JobRequest,
+    PortfolioRequest,
+    PortfolioResponse,
+    PortfolioTotals,
+)
+from tracing import tracer
+
+# Maximum number of (location, GPU shape) groups priced concurrently
+PORTFOLIO_MAX_WORKERS = int(os.getenv("PORTFOLIO_MAX_WORKERS", "8"))
+
+# (location, gpu_type, gpu_count, gpu_memory_gb, interconnect)
+GroupKey = Tuple[str, str, int, Optional[int], Optional[str]]
+
+
+def _group_label(key: GroupKey) -> str:
+    location, gpu_type, gpu_count, gpu_memory_gb, interconnect = key
+    label = f"{location}|{gpu_type}:{gpu_count}"
+    if gpu_memory_gb is not None:
+        label += f":{gpu_memory_gb}GB"
+    if interconnect is not None:
+        label += f":{interconnect}"
+    return label
+
+
+def _resolve_group(client, key: GroupKey) -> AnalysisResponse:
+    """Price one (location, GPU shape) group with a 1 GB job so egress comes back per GB"""
+    location, gpu_type, gpu_count, gpu_memory_gb, interconnect = key
+    return client.analyze(JobRequest(
+        job_name=f"portfolio:{_group_label(key)}",
+        data=JobData(location=location, size_gb=1.0),
+        compute=JobCompute(
+            gpu_type=gpu_type,
+            gpu_count=gpu_count,
+            gpu_memory_gb=gpu_memory_gb,
+            interconnect=interconnect,
+        ),
+    ))
+
+
+def _to_column(values: np.ndarray) -> List[Any]:
+    """Convert a numeric array to a JSON-friendly list (NaN/inf become None)"""
+    return [v if v is not None and np.isfinite(v) else None for v in values.tolist()]
+
+
+def analyze_portfolio(request: PortfolioRequest, client) -> PortfolioResponse:
+    """
+    Analyze a columnar batch of jobs.
+
+    Rows are grouped by distinct (location, GPU shape) and each group is priced
+    once through the Cost Engine. The per-group rates are packed into padded
+    (groups x options) matrices, broadcast to every row and evaluated with NumPy.
+    """
+    n = len(request.job_name)
+    gpu_memory = request.gpu_memory_gb or [None] * n
+    interconnect = request.interconnect or [None] * n
+
+    keys: List[GroupKey] = list(zip(
+        request.location, request.gpu_type, request.gpu_count, gpu_memory, interconnect,
+    ))
+    group_index: Dict[GroupKey, int] = {}
+    row_group = np.empty(n, dtype=np.intp)
+    for row, key in enumerate(keys):
+        row_group[row] = group_index.setdefault(key, len(group_index))
+    groups = list(group_index)
+
+    # Resolve candidate rates once per group
+    responses: List[Optional[AnalysisResponse]] = [None] * len(groups)
+    errors: Dict[str, str] = {}
+    with tracer.span("portfolio.resolve_groups", groups=len(groups)), \
+            ThreadPoolExecutor(max_workers=max(1, min(PORTFOLIO_MAX_WORKERS, len(groups)))) as pool:
+        # Each task runs in a copy of this context so engine calls join the request's trace
+        futures = [
+            pool.submit(contextvars.copy_context().run, _resolve_group, client, key)
+            for key in groups
+        ]
+        for g, future in enumerate(futures):
+            try:
+                responses[g] = future.result()
+            except Exception as e:
+                errors[_group_label(groups[g])] = str(e)
+
+    # Pack group rates into padded matrices; padding never wins (infinite hourly cost)
+    width = max([len(r.remote_options) for r in responses if r is not None] + [1])
+    local_rate = np.full(len(groups), np.nan)
+    remote_rate = np.full((len(groups), width), np.inf)
+    egress_per_gb = np.zeros((len(groups), width))
+    local_labels = np.full((len(groups), 3), None, dtype=object)
+    remote_labels = np.full((len(groups), width, 3), None, dtype=object)
+    remote_spot = np.zeros((len(groups), width), dtype=bool)
+    for g, response in enumerate(responses):
+        if response is None:
+            continue
+        local = response.data_local_option
+        local_rate[g] = local.compute_cost_per_hour
+        local_labels[g] = (local.provider, local.region, local.instance_type)
+        for k, option in enumerate(response.remote_options):
+            remote_rate[g, k] = option.compute_cost_per_hour
+            egress_per_gb[g, k] = option.one_time_egress_cost
+            remote_labels[g, k] = (option.provider, option.region, option.instance_type)
+            remote_spot[g, k] = option.is_spot_instance
+
+    # Broadcast group rates to rows: (n,) and (n, width)
+    size_gb = np.asarray(request.size_gb, dtype=float)
+    row_local = local_rate[row_group]
+    row_remote = remote_rate[row_group]
+    ok = np.isfinite(row_local)
+
+    egress = size_gb[:, None] * egress_per_gb[row_group]
+    diff = row_local[:, None] - row_remote
+    with np.errstate(divide="ignore", invalid="ignore"):
+        break_even = np.where(diff > 0, np.round(egress / diff, 1), np.inf)
+
+    rows = np.arange(n)
+    if request.duration_hours is not None:
+        hours = np.asarray(request.duration_hours, dtype=float)
+        remote_total = row_remote * hours[:, None] + egress
+        best = np.argmin(remote_total, axis=1)
+        local_total = row_local * hours
+        best_total = remote_total[rows, best]
+        move = ok & (best_total < local_total)
+        chosen_total = np.where(move, best_total, local_total)
+    else:
+        # Without a runtime, recommend the remote option that pays for itself soonest
+        best = np.argmin(break_even, axis=1)
+        move = ok & np.isfinite(break_even[rows, best])
+
+    chosen_labels = np.where(move[:, None], remote_labels[row_group, best], local_labels[row_group])
+    chosen_rate = np.where(move, row_remote[rows, best], row_local)
+    chosen_egress = np.where(move, egress[rows, best], np.where(ok, 0.0, np.nan))
+    chosen_break_even = np.where(move, break_even[rows, best], np.nan)
+
+    columns: Dict[str, List[Any]] = {
+        "job_name": list(request.job_name),
+        "status": np.where(ok, "ok", "error").tolist(),
+        "recommended": np.where(move, "remote", np.where(ok, "data-local", None)).tolist(),
+        "provider": chosen_labels[:, 0].tolist(),
+        "region": chosen_labels[:, 1].tolist(),
+        "instance_type": chosen_labels[:, 2].tolist(),
+        "is_spot_instance": (move & remote_spot[row_group, best]).tolist(),
+        "local_cost_per_hour": _to_column(row_local),
+        "compute_cost_per_hour": _to_column(chosen_rate),
+        "one_time_egress_cost": _to_column(chosen_egress),
+        "break_even_hours": _to_column(chosen_break_even),
+    }
+
+    totals = PortfolioTotals(
+        jobs=n,
+        jobs_moved=int(move.sum()),
+        jobs_failed=int((~ok).sum()),
+        total_egress_cost=float(chosen_egress[ok].sum()),
+    )
+    if request.duration_hours is not None:
+        columns["local_cost"] = _to_column(local_total)
+        columns["recommended_cost"] = _to_column(chosen_total)
+        columns["savings"] = _to_column(local_total - chosen_total)
+        totals.local_cost = float(local_total[ok].sum())
+        totals.recommended_cost = float(chosen_total[ok].sum())
+        totals.savings = totals.local_cost - totals.recommended_cost
+
+    return PortfolioResponse(columns=columns, totals=totals, errors=errors)
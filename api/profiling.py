@@ -0,0 +1,231 @@
+import hmac
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Leaf frames that mean a thread is parked rather than working for a request
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    # uvloop waits for events in C, so its thread's innermost Python frame is asyncio.run
+    ("runners.py", "run"),
+}
+
+FunctionKey = Tuple[str, int, str]  # (filename, first line, function name)
+
+
+def _short_path(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _format_function(key: FunctionKey) -> str:
+    filename, lineno, name = key
+    return f"{name} ({_short_path(filename)}:{lineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread in the process.
+
+    Sync FastAPI endpoints run on worker threads that the middleware cannot see,
+    so instead of cProfile (which only follows the thread that enabled it) a
+    background thread snapshots all stacks every `interval` seconds. Threads
+    parked on a lock, queue or selector are skipped; threads blocked in I/O for
+    the request (e.g. the Cost Engine call) are counted, so the report shows where
+    the request spent its time, not just its CPU.
+    """
+
+    def __init__(self, interval: float = 0.001, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self._record(frame)
+
+    def _record(self, frame) -> None:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+            return
+        stack: List[FunctionKey] = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+
+        self.samples += 1
+        self.self_counts[stack[0]] += 1
+        for key in set(stack):
+            self.total_counts[key] += 1
+        self.stacks[";".join(key[2] for key in reversed(stack))] += 1
+
+    def report(self, limit: int = 25) -> str:
+        lines = [f"Samples: {self.samples} (every {self.interval * 1000:.1f} ms, all threads)", ""]
+        if not self.samples:
+            return "\n".join(lines + ["No samples recorded (request finished too quickly)."])
+
+        lines.append(f"Top {limit} functions by cumulative samples:")
+        lines.append(f"{'cumulative':>12} {'self':>8}  function")
+        for key, total in self.total_counts.most_common(limit):
+            lines.append(f"{100 * total / self.samples:>11.1f}% {100 * self.self_counts[key] / self.samples:>7.1f}%  {_format_function(key)}")
+        return "\n".join(lines)
+
+    def folded(self) -> str:
+        """Collapsed stacks (flamegraph.pl / speedscope input)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def allocation_summary(snapshot: tracemalloc.Snapshot, peak_bytes: int, limit: int = 15) -> str:
+    """Summarize live allocations made while tracing, grouped by source line"""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    stats = snapshot.statistics("lineno")
+    lines = [
+        f"Peak traced memory: {peak_bytes / 1024:.1f} KiB",
+        f"Still allocated at end: {sum(stat.size for stat in stats) / 1024:.1f} KiB in {sum(stat.count for stat in stats)} blocks",
+        "",
+        f"Top {limit} allocation sites:",
+    ]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>7} blocks  {_short_path(frame.filename)}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+class RequestProfile:
+    """Profile of one request: a sampling report plus a tracemalloc allocation summary"""
+
+    def __init__(self, profile_id: str, description: str, interval: float):
+        self.id = profile_id
+        self.description = description
+        self.sampler = SamplingProfiler(interval=interval)
+        self.report = ""
+        self.folded = ""
+        self._started_tracemalloc = False
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self) -> None:
+        self.sampler.stop()
+        elapsed = time.perf_counter() - self._started
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        self.report = "\n".join([
+            f"Profile {self.id}: {self.description}",
+            f"Wall time: {elapsed * 1000:.1f} ms",
+            "",
+            self.sampler.report(),
+            "",
+            allocation_summary(snapshot, peak),
+            "",
+        ])
+        self.folded = self.sampler.folded()
+
+
+class Profiler:
+    """
+    Opt-in request profiling behind the X-Profile header.
+
+    Disabled unless PROFILE_TOKEN is set; a request is profiled only when its
+    X-Profile header matches the token. One request is profiled at a time since
+    tracemalloc and the sampler are process-wide. Reports are kept in memory
+    (the most recent PROFILE_HISTORY) for download by id.
+    """
+
+    def __init__(self, token: Optional[str], interval: float = 0.001, history: int = 20):
+        self.token = token
+        self.interval = interval
+        self.history = history
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(
+            token=os.getenv("PROFILE_TOKEN") or None,
+            interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1")) / 1000,
+            history=int(os.getenv("PROFILE_HISTORY", "20")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def authorized(self, header: Optional[str]) -> bool:
+        return self.enabled and header is not None and hmac.compare_digest(header.encode(), self.token.encode())
+
+    def begin(self, description: str) -> Optional[RequestProfile]:
+        """Start profiling a request; returns None if another profile is running"""
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = RequestProfile(secrets.token_hex(8), description, self.interval)
+        try:
+            profile.start()
+        except Exception:
+            self._active.release()
+            raise
+        return profile
+
+    def end(self, profile: RequestProfile) -> None:
+        try:
+            profile.stop()
+        finally:
+            self._active.release()
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.history:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> Dict[str, str]:
+        with self._lock:
+            return {profile_id: profile.description for profile_id, profile in self._profiles.items()}
+
+
+profiler = Profiler.from_env()
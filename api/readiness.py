@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from models import JobRequest
+
+# Probe job used when ENGINE_PROBE_JOB is not set; matches the seeded sample catalog
+DEFAULT_PROBE_JOB = {
+    "job_name": "readiness-probe",
+    "data": {"location": "aws:s3:us-east-1", "size_gb": 1},
+    "compute": {"gpu_type": "H100", "gpu_count": 8},
+}
+
+
+class Readiness:
+    """
+    Startup warm-up and readiness state for the API.
+
+    warm_up() pre-opens pooled connections to the Cost Engine and runs a probe
+    analysis end to end. The replica reports ready only once a probe has
+    succeeded and the engine still answers its health check. If the engine is not
+    up at startup, probes are retried in the background until one succeeds.
+    """
+
+    def __init__(self, client, warm_connections: int, probe_job: JobRequest, retry_interval: float):
+        self.client = client
+        self.warm_connections = warm_connections
+        self.probe_job = probe_job
+        self.retry_interval = retry_interval
+        self.warmed_connections = 0
+        self.probe_latency_ms: Optional[float] = None
+        self.probe_error: Optional[str] = None
+        self.ready_since: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, client) -> "Readiness":
+        probe_job = json.loads(os.getenv("ENGINE_PROBE_JOB") or "null") or DEFAULT_PROBE_JOB
+        return cls(
+            client,
+            warm_connections=int(os.getenv("ENGINE_WARM_CONNECTIONS", "4")),
+            probe_job=JobRequest(**probe_job),
+            retry_interval=float(os.getenv("ENGINE_PROBE_RETRY_SECONDS", "5")),
+        )
+
+    @property
+    def warmed_up(self) -> bool:
+        return self.ready_since is not None
+
+    def warm_up(self) -> bool:
+        """Open pooled connections and run the probe analysis; returns True on success"""
+        self.warmed_connections = self.client.warm(self.warm_connections)
+        started = time.perf_counter()
+        try:
+            self.client.analyze(self.probe_job)
+        except Exception as e:
+            self.probe_error = str(e)
+            return False
+        self.probe_latency_ms = (time.perf_counter() - started) * 1000
+        self.probe_error = None
+        self.ready_since = time.time()
+        return True
+
+    def start(self) -> None:
+        """Warm up now; if the engine is not ready yet, keep retrying in the background"""
+        if self.warm_up():
+            return
+        self._thread = threading.Thread(target=self._retry, name="readiness-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _retry(self) -> None:
+        while not self._stop.wait(self.retry_interval):
+            if self.warm_up():
+                return
+
+    def status(self) -> Dict[str, Any]:
+        """Current readiness, including a live engine reachability check"""
+        engine: Dict[str, Any] = {"reachable": False}
+        try:
+            engine["latency_ms"] = round(self.client.health() * 1000, 2)
+            engine["reachable"] = True
+        except Exception as e:
+            engine["error"] = str(e)
+
+        return {
+            "ready": self.warmed_up and engine["reachable"],
+            "engine": engine,
+            "warmed_connections": self.warmed_connections,
+            "probe": {
+                "succeeded": self.warmed_up,
+                "latency_ms": None if self.probe_latency_ms is None else round(self.probe_latency_ms, 2),
+                "error": self.probe_error,
+            },
+        }
@@ -0,0 +1,56 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from models import JobRequest
+
+
+class RequestLog:
+    """
+    Append-only NDJSON log of analyze requests, for replay by scripts/load-generator.py.
+
+    Disabled unless REQUEST_LOG names a file. Each line is
+    {"timestamp": <unix seconds>, "request": <JobRequest>}; REQUEST_LOG_SAMPLE_RATE
+    (0-1, default 1) keeps only a share of requests on busy replicas.
+    """
+
+    def __init__(self, path: Optional[str], sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def from_env(cls) -> "RequestLog":
+        return cls(
+            path=os.getenv("REQUEST_LOG") or None,
+            sample_rate=float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "1")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, job_request: JobRequest) -> None:
+        if not self.enabled or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return
+        line = json.dumps({
+            "timestamp": time.time(),
+            "request": job_request.model_dump(exclude_none=True),
+        })
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+request_log = RequestLog.from_env()
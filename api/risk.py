@@ -0,0 +1,133 @@
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+from models import AnalysisResponse, JobConstraints, JobRisk
+
+# Representative monthly interruption frequency for each Spot Advisor bucket
+# (see MapInterruptionRateToRisk in the Cost Engine: <5%, 5-15%, >15%)
+INTERRUPTION_FREQUENCY = {
+    "LOW": 0.05,
+    "MEDIUM": 0.15,
+    "HIGH": 0.25,
+}
+# Spot options without a risk label are simulated as if they were MEDIUM
+DEFAULT_INTERRUPTION_RISK = "MEDIUM"
+HOURS_PER_MONTH = 730.0
+
+
+def interruption_rate_per_hour(interruption_risk: Optional[str]) -> float:
+    """Poisson interruption rate per running hour implied by a risk label"""
+    frequency = INTERRUPTION_FREQUENCY.get(
+        interruption_risk or DEFAULT_INTERRUPTION_RISK,
+        INTERRUPTION_FREQUENCY[DEFAULT_INTERRUPTION_RISK],
+    )
+    return -math.log1p(-frequency) / HOURS_PER_MONTH
+
+
+def simulate_billed_hours(
+    duration_hours: float,
+    checkpoint_interval_hours: float,
+    restart_overhead_hours: float,
+    rate_per_hour: float,
+    trials: int,
+    rng: np.random.Generator,
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate billed hours for a checkpointed job under Poisson interruptions.
+
+    The job is split into checkpoint segments. A segment of length L completes with
+    probability q = exp(-rate * L); otherwise the work since the last checkpoint is
+    lost and restart_overhead_hours are billed before retrying. The number of failed
+    attempts across n segments is therefore negative-binomial(n, q), and each failed
+    attempt bills a truncated-exponential amount of lost work on [0, L). All trials
+    are drawn at once, so cost is O(trials + total interruptions).
+    """
+    billed = np.full(trials, float(duration_hours))
+    interruptions = np.zeros(trials, dtype=np.int64)
+    if rate_per_hour <= 0:
+        return {"billed_hours": billed, "interruptions": interruptions}
+
+    full_segments, tail = divmod(duration_hours, checkpoint_interval_hours)
+    segments = [(checkpoint_interval_hours, int(full_segments))]
+    if tail > 1e-9:
+        segments.append((tail, 1))
+
+    for length, count in segments:
+        if count == 0:
+            continue
+        q = math.exp(-rate_per_hour * length)
+        failures = rng.negative_binomial(count, q, size=trials)
+        total = int(failures.sum())
+        if total:
+            # Inverse CDF of an exponential truncated to [0, length)
+            u = rng.random(total)
+            lost = -np.log1p(-u * (1.0 - q)) / rate_per_hour
+            owner = np.repeat(np.arange(trials), failures)
+            billed += np.bincount(owner, weights=lost, minlength=trials)
+        billed += failures * restart_overhead_hours
+        interruptions += failures
+
+    return {"billed_hours": billed, "interruptions": interruptions}
+
+
+def _break_even(local_cost: float, remote_cost: float, egress_cost: float) -> Optional[float]:
+    # Same rule and rounding as Calculator.CalculateBreakEven in the Cost Engine
+    if remote_cost >= local_cost:
+        return None
+    return round(egress_cost / (local_cost - remote_cost), 1)
+
+
+def apply_risk_model(
+    response: AnalysisResponse,
+    risk: JobRisk,
+    constraints: Optional[JobConstraints] = None,
+) -> AnalysisResponse:
+    """
+    Attach expected cost, P90 cost and a risk-adjusted break-even to every option.
+
+    Spot options are simulated with the interruption rate implied by their risk label;
+    options sharing a label reuse the same simulated trials. On-demand options are
+    deterministic, so their expected and P90 cost are equal.
+
+    Constraints sorting by expected cost are applied here, since the engine cannot.
+    """
+    rng = np.random.default_rng(risk.seed)
+    local_cost = response.data_local_option.compute_cost_per_hour
+    simulations: Dict[float, Dict[str, np.ndarray]] = {}
+
+    for option in [response.data_local_option, *response.remote_options]:
+        egress = option.one_time_egress_cost
+        rate = option.compute_cost_per_hour
+
+        if option.is_spot_instance:
+            interruption_rate = interruption_rate_per_hour(option.interruption_risk)
+            if interruption_rate not in simulations:
+                simulations[interruption_rate] = simulate_billed_hours(
+                    risk.duration_hours,
+                    risk.checkpoint_interval_hours,
+                    risk.restart_overhead_hours,
+                    interruption_rate,
+                    risk.trials,
+                    rng,
+                )
+            simulation = simulations[interruption_rate]
+            costs = simulation["billed_hours"] * rate + egress
+            option.expected_cost = float(costs.mean())
+            option.p90_cost = float(np.percentile(costs, 90))
+            option.expected_interruptions = float(simulation["interruptions"].mean())
+            effective_rate = rate * float(simulation["billed_hours"].mean()) / risk.duration_hours
+        else:
+            option.expected_cost = option.p90_cost = rate * risk.duration_hours + egress
+            option.expected_interruptions = 0.0
+            effective_rate = rate
+
+        if option is not response.data_local_option:
+            option.risk_adjusted_break_even_hours = _break_even(local_cost, effective_rate, egress)
+
+    if constraints is not None and constraints.sort_by == "expected-cost":
+        # Stable, so ties keep the engine's order (as the CLI's sort does)
+        ranked = sorted(response.remote_options, key=lambda option: option.expected_cost)
+        response.remote_options = ranked[:constraints.top_k] if constraints.top_k else ranked
+    return response
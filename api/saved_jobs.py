@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from job_registry import JobRegistry
+from models import AnalysisOption, AnalysisResponse, JobRequest, SavedJob, SavedJobRequest
+
+# analyze(job) -> (analysis, price version, price keys the analysis read)
+Analyzer = Callable[[JobRequest], Tuple[AnalysisResponse, Optional[str], List[str]]]
+
+
+def option_label(option: AnalysisOption) -> str:
+    label = f"{option.provider}:{option.region}:{option.instance_type or '-'}"
+    return f"{label}:spot" if option.is_spot_instance else label
+
+
+def _break_even(option: AnalysisOption) -> Optional[float]:
+    # Risk mode: the interruption-inflated break-even is the one worth acting on
+    if option.risk_adjusted_break_even_hours is not None:
+        return option.risk_adjusted_break_even_hours
+    return option.break_even_hours
+
+
+def recommend(analysis: AnalysisResponse, threshold: Optional[float]) -> Tuple[str, Optional[float]]:
+    """
+    Recommended option for a saved job, and the best (lowest) remote break-even.
+
+    The remote option that breaks even soonest is recommended if it does so within
+    the job's threshold (or at all, without a threshold); otherwise data-local.
+    """
+    candidates = [option for option in analysis.remote_options if _break_even(option) is not None]
+    best = min(candidates, key=_break_even, default=None)
+    best_hours = _break_even(best) if best is not None else None
+    if best_hours is not None and (threshold is None or best_hours <= threshold):
+        return option_label(best), best_hours
+    return option_label(analysis.data_local_option), best_hours
+
+
+class Event:
+    def __init__(self, id: int, type: str, data: Dict[str, Any]):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self) -> str:
+        """Server-Sent Events wire format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class EventBroker:
+    """
+    Fan-out of saved-job events to Server-Sent Events subscribers.
+
+    Events are published from the watcher's threads and handed to each
+    subscriber's asyncio queue on its event loop. The last `history` events are
+    kept so a reconnecting client (Last-Event-ID) misses nothing. A subscriber
+    that falls `queue_size` events behind is disconnected instead of buffered
+    without bound; its client reconnects and replays from history.
+    """
+
+    def __init__(self, history: int = 1000, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+
+    def publish(self, type: str, data: Dict[str, Any]) -> Event:
+        with self._lock:
+            event = Event(self._next_id, type, data)
+            self._next_id += 1
+            self._history.append(event)
+            for queue, loop in self._subscribers.items():
+                loop.call_soon_threadsafe(self._offer, queue, event)
+        return event
+
+    def _offer(self, queue: asyncio.Queue, event: Event) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)  # Disconnect: the client resumes from history
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        """Register a subscriber on the running event loop, replaying events after last_event_id"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size + 1)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event.id > last_event_id:
+                        self._offer(queue, event)
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    async def stream(
+        self,
+        last_event_id: Optional[int] = None,
+        job_id: Optional[str] = None,
+        keepalive: float = 15.0,
+    ) -> AsyncIterator[str]:
+        """SSE body: events (optionally for one job), with comment pings so proxies keep the stream open"""
+        queue = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                if job_id is None or event.data.get("job_id") == job_id:
+                    yield event.encode()
+        finally:
+            self.unsubscribe(queue)
+
+
+class SavedJobWatcher:
+    """
+    Keeps saved jobs' results current as prices change.
+
+    A background thread polls the Cost Engine's /changes feed for price keys
+    changed since the last poll and recomputes only the jobs whose dependencies
+    (the reverse index in JobRegistry) include one of them. Everything is
+    recomputed at startup, when the engine reports a reset, and when the price
+    version moved without any key changes (keyspace notifications disabled).
+    Jobs whose last recompute failed are retried on every poll.
+
+    Each recompute compares the new recommendation and best break-even with the
+    stored ones and publishes recommendation_changed / break_even_crossed events.
+    """
+
+    def __init__(
+        self,
+        registry: JobRegistry,
+        client,
+        analyze: Analyzer,
+        broker: EventBroker,
+        poll_interval: float,
+        workers: int = 4,
+    ):
+        self.registry = registry
+        self.client = client
+        self.analyze = analyze
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.seq: Optional[int] = None
+        self.price_version: Optional[str] = None
+        self.last_error: Optional[str] = None
+        # Striped locks: a job is never recomputed by two threads at once, so
+        # transitions are always judged against the latest stored result
+        self._job_locks = [threading.Lock() for _ in range(64)]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, registry: JobRegistry, client, analyze: Analyzer, broker: EventBroker) -> "SavedJobWatcher":
+        return cls(
+            registry, client, analyze, broker,
+            poll_interval=float(os.getenv("SAVED_JOBS_POLL_SECONDS", "5")),
+            workers=int(os.getenv("SAVED_JOBS_WORKERS", "4")),
+        )
+
+    def register(self, request: SavedJobRequest) -> SavedJob:
+        """Save a job and compute its first result (a failure is stored and retried later)"""
+        job_id = self.registry.add(request.job, request.break_even_threshold_hours)
+        self.recompute([job_id])
+        return self.registry.get(job_id)
+
+    def recompute(self, job_ids: Iterable[str]) -> int:
+        """Recompute the given jobs; returns how many were attempted"""
+        job_ids = list(job_ids)
+        if len(job_ids) <= 1 or self.workers <= 1:
+            for job_id in job_ids:
+                self._recompute_one(job_id)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(job_ids))) as pool:
+                list(pool.map(self._recompute_one, job_ids))
+        return len(job_ids)
+
+    def _recompute_one(self, job_id: str) -> None:
+        with self._job_locks[hash(job_id) % len(self._job_locks)]:
+            saved = self.registry.get(job_id)
+            if saved is None:
+                return  # Deleted since it was selected
+            try:
+                analysis, price_version, dependencies = self.analyze(saved.job)
+            except Exception as e:
+                self.registry.set_error(job_id, str(e))
+                if saved.error != str(e):
+                    self.broker.publish("recompute_failed", {
+                        "job_id": job_id, "job_name": saved.job.job_name, "error": str(e),
+                    })
+                return
+            recommendation, best_hours = recommend(analysis, saved.break_even_threshold_hours)
+            if self.registry.set_result(job_id, analysis, recommendation, best_hours, price_version, dependencies):
+                self._publish_transitions(saved, recommendation, best_hours, price_version)
+
+    def _publish_transitions(
+        self, saved: SavedJob, recommendation: str, best_hours: Optional[float], price_version: Optional[str]
+    ) -> None:
+        if saved.computed_at is None:
+            return  # First result: nothing to compare against
+        base = {"job_id": saved.id, "job_name": saved.job.job_name, "price_version": price_version}
+        if recommendation != saved.recommendation:
+            self.broker.publish("recommendation_changed", {
+                **base,
+                "previous": saved.recommendation,
+                "current": recommendation,
+                "best_break_even_hours": best_hours,
+            })
+        threshold = saved.break_even_threshold_hours
+        if threshold is not None:
+            was_below = saved.best_break_even_hours is not None and saved.best_break_even_hours <= threshold
+            is_below = best_hours is not None and best_hours <= threshold
+            if was_below != is_below:
+                self.broker.publish("break_even_crossed", {
+                    **base,
+                    "threshold_hours": threshold,
+                    "previous": saved.best_break_even_hours,
+                    "current": best_hours,
+                    "direction": "below" if is_below else "above",
+                })
+
+    def affected_jobs(self, changes: Dict[str, Any]) -> Set[str]:
+        """Jobs to recompute for one /changes answer"""
+        if changes.get("reset"):
+            return set(self.registry.all_ids())
+        keys = changes.get("keys") or []
+        if not keys and changes.get("version") != self.price_version:
+            return set(self.registry.all_ids())
+        return self.registry.jobs_for_keys(keys) | set(self.registry.failed_ids())
+
+    def poll(self) -> int:
+        """One watcher step; returns how many jobs were recomputed"""
+        if self.seq is None:
+            # Read the position first: changes during the full recompute are picked up next poll
+            changes = self.client.changes()
+            affected: Iterable[str] = self.registry.all_ids()
+        else:
+            changes = self.client.changes(since=self.seq)
+            affected = self.affected_jobs(changes)
+        recomputed = self.recompute(affected)
+        self.seq, self.price_version = changes["seq"], changes.get("version")
+        return recomputed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            self._stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="saved-job-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Who the work is for and how urgent it is. The CLI tags its requests interactive;
+# untagged requests (scripts, older clients) are scheduled as batch work.
+TENANT_HEADER = "X-Tenant-Id"
+PRIORITY_HEADER = "X-Priority"
+QUEUE_WAIT_HEADER = "X-Queue-Wait-Ms"
+DEFAULT_TENANT = "default"
+DEFAULT_PRIORITY = "batch"
+DEFAULT_WEIGHTS = {"interactive": 4.0, "batch": 1.0}
+
+# Tenant ids come from a header; bound what one can cost us in metrics
+MAX_TENANT_LENGTH = 64
+MAX_TRACKED_TENANTS = 256
+OTHER_TENANTS = "_other"
+# Upper bounds (ms) of the queue-wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class QueueFull(Exception):
+    """The tenant already has as many requests waiting as it may queue"""
+
+
+class QueueTimeout(Exception):
+    """The request's deadline passed while it was waiting for a slot"""
+
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    """Priority class weights from "interactive=4,batch=1"; DEFAULT_WEIGHTS when unset"""
+    if not value:
+        return dict(DEFAULT_WEIGHTS)
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight)
+    if any(weight <= 0 for weight in weights.values()):
+        raise ValueError(f"Scheduler weights must be positive: {value}")
+    return weights
+
+
+def tenant_id(header: Optional[str]) -> str:
+    tenant = (header or "").strip()[:MAX_TENANT_LENGTH]
+    return tenant or DEFAULT_TENANT
+
+
+class QueueWaitStats:
+    """Queue waits of one tenant and priority class: count, sum, max and a histogram"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(WAIT_BUCKETS_MS)
+        self.rejected = 0
+        self.timed_out = 0
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Bucket upper bound at or above the p-th percentile (capped at the max seen)"""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(WAIT_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 3)
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total_ms / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(self.max_ms),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(WAIT_BUCKETS_MS, self.buckets)
+            },
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class FairScheduler:
+    """
+    Weighted fair queueing of analysis requests in front of the Cost Engine.
+
+    At most `slots` requests run at once, and at most `tenant_limit` of them for
+    any one tenant. Waiting requests are queued per (tenant, priority class) flow
+    and dispatched by start-time fair queueing: each request's start tag is
+    max(virtual time, its flow's last finish tag), its finish tag adds
+    1/weight, and the smallest start tag whose tenant is under its cap runs
+    next. A busy tenant therefore cannot starve another, and interactive work
+    gets `weights["interactive"] / weights["batch"]` times the share of batch work.
+
+    Requests wait on the event loop, not in a worker thread, so queued batch work
+    does not hold the threadpool the running requests need. All methods must be
+    called from that event loop.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        tenant_limit: int,
+        weights: Optional[Dict[str, float]] = None,
+        max_queued: int = 100,
+    ):
+        self.slots = slots
+        self.tenant_limit = tenant_limit
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.max_queued = max_queued
+        self._virtual_time = 0.0
+        self._finish: Dict[Tuple[str, str], float] = {}
+        self._waiting: List[Tuple[float, int, str, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._running: Dict[str, int] = {}
+        self._queued: Dict[str, int] = {}
+        self._stats: Dict[Tuple[str, str], QueueWaitStats] = {}
+
+    @classmethod
+    def from_env(cls, default_slots: int) -> "FairScheduler":
+        slots = int(os.getenv("SCHEDULER_SLOTS", str(default_slots)))
+        return cls(
+            slots=slots,
+            tenant_limit=int(os.getenv("SCHEDULER_TENANT_LIMIT", str(max(1, slots // 2)))),
+            weights=parse_weights(os.getenv("SCHEDULER_WEIGHTS")),
+            max_queued=int(os.getenv("SCHEDULER_MAX_QUEUED", "100")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.slots > 0
+
+    async def acquire(self, tenant: str, priority: str, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a slot; returns the queue wait in seconds. Raises QueueFull when
+        the tenant has max_queued requests waiting already, and QueueTimeout when
+        no slot came up within `timeout` seconds. The caller must release() after.
+        """
+        stats = self._stats_for(tenant, priority)
+        if self._queued.get(tenant, 0) >= self.max_queued:
+            stats.rejected += 1
+            raise QueueFull(f"Tenant {tenant} already has {self.max_queued} requests queued")
+
+        flow = (tenant, priority)
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        self._finish[flow] = start + 1.0 / self.weights[priority]
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (start, next(self._seq), tenant, priority, future))
+        self._queued[tenant] = self._queued.get(tenant, 0) + 1
+        enqueued = time.monotonic()
+        self._dispatch()
+
+        try:
+            if not future.done():
+                if timeout is not None and timeout <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended: hand the slot on
+                self.release(tenant)
+            else:
+                future.cancel()
+                self._dequeued(tenant)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            stats.timed_out += 1
+            raise QueueTimeout(f"No analysis slot for tenant {tenant} before the request deadline")
+
+        waited = time.monotonic() - enqueued
+        stats.record(waited * 1000)
+        return waited
+
+    def release(self, tenant: str) -> None:
+        self._running[tenant] -= 1
+        if not self._running[tenant]:
+            del self._running[tenant]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Start waiting requests, in start-tag order, while slots are free"""
+        blocked = []
+        while self._waiting and sum(self._running.values()) < self.slots:
+            entry = heapq.heappop(self._waiting)
+            start, _, tenant, _, future = entry
+            if future.cancelled():
+                continue
+            if self._running.get(tenant, 0) >= self.tenant_limit:
+                blocked.append(entry)
+                continue
+            self._virtual_time = max(self._virtual_time, start)
+            self._running[tenant] = self._running.get(tenant, 0) + 1
+            self._dequeued(tenant)
+            future.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._waiting, entry)
+        if len(self._finish) > MAX_TRACKED_TENANTS:
+            # A flow whose finish tag is behind virtual time would start at virtual time anyway
+            self._finish = {flow: tag for flow, tag in self._finish.items() if tag > self._virtual_time}
+
+    def _dequeued(self, tenant: str) -> None:
+        self._queued[tenant] -= 1
+        if not self._queued[tenant]:
+            del self._queued[tenant]
+
+    def _stats_for(self, tenant: str, priority: str) -> QueueWaitStats:
+        key = (tenant, priority)
+        if key not in self._stats and len(self._stats) >= MAX_TRACKED_TENANTS:
+            key = (OTHER_TENANTS, priority)
+        return self._stats.setdefault(key, QueueWaitStats())
+
+    def status(self) -> Dict[str, Any]:
+        """Configuration, current load and per-tenant queue-wait statistics"""
+        tenants: Dict[str, Dict[str, Any]] = {}
+        for (tenant, priority), stats in sorted(self._stats.items()):
+            tenants.setdefault(tenant, {"running": 0, "queued": 0, "wait": {}})["wait"][priority] = stats.to_dict()
+        for tenant, running in self._running.items():
+            tenants.setdefault(tenant, {"running": 0, "queued": 0, "wait": {}})["running"] = running
+        for tenant, queued in self._queued.items():
+            tenants.setdefault(tenant, {"running": 0, "queued": 0, "wait": {}})["queued"] = queued
+        return {
+            "slots": self.slots,
+            "tenant_limit": self.tenant_limit,
+            "weights": self.weights,
+            "max_queued": self.max_queued,
+            "running": sum(self._running.values()),
+            "queued": sum(self._queued.values()),
+            "tenants": tenants,
+        }
@@ -1,20 +1,162 @@
 import httpx
-from typing import Optional
+from typing import Any, Dict, Optional
+from columnar import COLUMNAR_MEDIA_TYPE, decode_analysis
 from models import JobRequest
+from response_cache import ResponseCache, cache_key
+from tracing import tracer
 import json
 
+# Our remaining time budget in milliseconds; the API forwards what is left of it
+# to the Cost Engine, which answers with a partial analysis rather than overrunning it
+REQUEST_DEADLINE_HEADER = "X-Request-Deadline-Ms"
+# The API schedules analysis work fairly across tenants, ahead of batch work for
+# requests tagged interactive
+TENANT_HEADER = "X-Tenant-Id"
+PRIORITY_HEADER = "X-Priority"
+
+# In the CLI daemon (daemon.py), APIClients borrow pooled httpx.Clients (one per
+# timeout) that outlive each command, so repeated runs reuse open connections
+_shared_clients: Optional[Dict[float, httpx.Client]] = None
+
+
+def share_connections() -> None:
+    """Keep HTTP connections open across APIClients for the rest of the process"""
+    global _shared_clients
+    if _shared_clients is None:
+        _shared_clients = {}
+
+
+def close_shared_connections() -> None:
+    global _shared_clients
+    for client in (_shared_clients or {}).values():
+        client.close()
+    _shared_clients = None
+
 
 class APIClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        profile_token: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        max_stale: Optional[float] = None,
+        columnar: bool = True,
+        timeout: float = 60.0,
+        tenant: Optional[str] = None,
+        priority: str = "interactive",
+    ):
         self.base_url = base_url
-        self.client = httpx.Client(timeout=60.0)
+        self.timeout = timeout
+        if _shared_clients is not None:
+            if timeout not in _shared_clients:
+                _shared_clients[timeout] = httpx.Client(timeout=timeout)
+            self.client = _shared_clients[timeout]
+        else:
+            self.client = httpx.Client(timeout=timeout)
+        # When set, analyze() asks the API to profile the request (X-Profile header)
+        self.profile_token = profile_token
+        self.last_profile_id: Optional[str] = None
+        # Cached analyses are revalidated with If-None-Match; entries younger than
+        # max_stale seconds are served without contacting the API at all
+        self.cache = cache
+        self.max_stale = max_stale
+        # "hit" (served from cache), "revalidated" (304), "miss" or None without a cache
+        self.last_cache_status: Optional[str] = None
+        self.last_cache_age: Optional[float] = None
+        # Ask for dictionary-encoded option columns; APIs that do not offer them answer in plain JSON
+        self.columnar = columnar
+        self.tenant = tenant
+        self.priority = priority
+
+    def _scheduling_headers(self) -> Dict[str, str]:
+        headers = {PRIORITY_HEADER: self.priority}
+        if self.tenant:
+            headers[TENANT_HEADER] = self.tenant
+        return headers
 
     def analyze(self, request: JobRequest) -> dict:
-        """Send analysis request to Backend API"""
+        """
+        Send analysis request to Backend API.
+
+        With columnar responses, remote_options is a lazy sequence of read-only
+        mappings (columnar.ColumnarOptions) rather than a list of dicts.
+        """
         url = f"{self.base_url}/api/v1/analyze"
+        body = request.model_dump()
+
+        key = cached = None
+        if self.cache is not None:
+            key = cache_key(self.base_url, body)
+            cached = self.cache.get(key)
+            self.last_cache_status = "miss"
+            if cached is not None and self.max_stale is not None and cached.age <= self.max_stale:
+                self.last_cache_status, self.last_cache_age = "hit", cached.age
+                return decode_analysis(cached.body)
         
         try:
-            response = self.client.post(url, json=request.model_dump())
+            headers = tracer.inject({
+                REQUEST_DEADLINE_HEADER: str(int(self.timeout * 1000)),
+                **self._scheduling_headers(),
+            })
+            if self.columnar:
+                headers["Accept"] = f"{COLUMNAR_MEDIA_TYPE}, application/json;q=0.9"
+            if self.profile_token:
+                headers["X-Profile"] = self.profile_token
+            if cached is not None:
+                headers["If-None-Match"] = cached.etag
+            with tracer.span("api.analyze", url=url):
+                response = self.client.post(url, json=body, headers=headers)
+                tracer.collect(response.headers)
+                self.last_profile_id = response.headers.get("X-Profile-Id")
+                if response.status_code == 304 and cached is not None:
+                    self.cache.refresh(key, cached)
+                    self.last_cache_status, self.last_cache_age = "revalidated", 0.0
+                    return decode_analysis(cached.body)
+                response.raise_for_status()
+                result = response.json()
+                # Partial results come without an ETag, so they are never cached
+                if self.cache is not None and response.headers.get("ETag"):
+                    self.cache.put(key, response.headers["ETag"], result)
+                return decode_analysis(result)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 422:
+                error_detail = e.response.json()
+                raise Exception(f"Validation error: {error_detail}")
+            if e.response.status_code == 504:
+                raise Exception(f"No result within {self.timeout:g}s: {e.response.text}")
+            raise Exception(f"API returned error {e.response.status_code}: {e.response.text}")
+        except httpx.TimeoutException as e:
+            raise Exception(f"API did not answer within {self.timeout:g}s")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to API at {self.base_url}. Is the server running?")
+        except Exception as e:
+            raise Exception(f"Unexpected error: {str(e)}")
+
+    def portfolio(self, columns: dict) -> dict:
+        """Send a columnar portfolio of jobs to the Backend API"""
+        url = f"{self.base_url}/api/v1/portfolio"
+
+        try:
+            # Large portfolios fan out to many engine calls; allow longer than a single analysis
+            response = self.client.post(url, json=columns, headers=self._scheduling_headers(), timeout=300.0)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 422:
+                error_detail = e.response.json()
+                raise Exception(f"Validation error: {error_detail}")
+            raise Exception(f"API returned error {e.response.status_code}: {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to API at {self.base_url}. Is the server running?")
+        except Exception as e:
+            raise Exception(f"Unexpected error: {str(e)}")
+
+    def placement(self, request: dict) -> dict:
+        """Placement matrix: the cheapest plan from every candidate storage location, per GPU shape"""
+        url = f"{self.base_url}/api/v1/placement"
+
+        try:
+            response = self.client.post(url, json=request, headers=self._scheduling_headers())
             response.raise_for_status()
             return response.json()
         except httpx.HTTPStatusError as e:
@@ -27,7 +169,41 @@ class APIClient:
         except Exception as e:
             raise Exception(f"Unexpected error: {str(e)}")
 
+    def catalog(self, kind: str, cursor: Optional[str] = None, limit: int = 100, **filters: Optional[str]) -> Dict[str, Any]:
+        """
+        One page of the price catalog (gpu-maps, compute or egress), filtered by
+        provider, region and/or gpu_type: {"kind", "items", "next_cursor"}
+        """
+        url = f"{self.base_url}/api/v1/catalog/{kind}"
+        params = {name: value for name, value in filters.items() if value is not None}
+        params["limit"] = limit
+        if cursor is not None:
+            params["cursor"] = cursor
+
+        try:
+            response = self.client.get(url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"API returned error {e.response.status_code}: {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to API at {self.base_url}. Is the server running?")
+
+    def get_profile(self, profile_id: str) -> str:
+        """Download a request profile recorded by the API"""
+        url = f"{self.base_url}/api/v1/profiles/{profile_id}"
+
+        try:
+            response = self.client.get(url, headers={"X-Profile": self.profile_token or ""})
+            response.raise_for_status()
+            return response.text
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"API returned error {e.response.status_code}: {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Failed to connect to API at {self.base_url}. Is the server running?")
+
     def close(self):
-        """Close the HTTP client"""
-        self.client.close()
+        """Close the HTTP client (shared clients stay open for the next command)"""
+        if _shared_clients is None or self.client not in _shared_clients.values():
+            self.client.close()
 
@@ -0,0 +1,97 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Optional
+
+# Media type of the API's dictionary-encoded option columns (api/columnar.py)
+COLUMNAR_MEDIA_TYPE = "application/vnd.finops.columnar+json"
+
+DICTIONARY_COLUMNS = ("provider", "region", "instance_type", "interruption_risk")
+ADVISORY_PLACEHOLDER = "{}"
+
+
+class OptionRow(Mapping):
+    """
+    One option of a columnar response, read-only and decoded field by field.
+
+    Sorting and filtering only touch the fields they use; dictionary lookups
+    and advisory template expansion happen when a field is actually read, so
+    rows that are never displayed are never expanded.
+    """
+
+    __slots__ = ("_options", "_index")
+
+    def __init__(self, options: "ColumnarOptions", index: int):
+        self._options = options
+        self._index = index
+
+    def __getitem__(self, name: str) -> Any:
+        return self._options.value(name, self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._options.fields)
+
+    def __len__(self) -> int:
+        return len(self._options.fields)
+
+    def __repr__(self) -> str:
+        return f"OptionRow({dict(self)!r})"
+
+
+class ColumnarOptions(Sequence):
+    """Sequence view over the remote_options columns of a columnar analysis"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.length: int = payload["length"]
+        self.columns: Dict[str, Optional[List[Any]]] = payload["columns"]
+        self.dictionaries: Dict[str, List[Any]] = payload.get("dictionaries", {})
+        self.fields = [name for name in self.columns if name != "advisory_args"]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [OptionRow(self, i) for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("option index out of range")
+        return OptionRow(self, index)
+
+    def value(self, name: str, index: int) -> Any:
+        if name not in self.columns or name == "advisory_args":
+            raise KeyError(name)
+        column = self.columns[name]
+        if column is None:
+            return None
+        value = column[index]
+        if value is None:
+            return None
+        if name in DICTIONARY_COLUMNS:
+            return self.dictionaries[name][value]
+        if name == "egress_route":
+            locations = self.dictionaries["egress_route"]
+            return [locations[code] for code in value]
+        if name == "advisory_message":
+            return expand_template(self.dictionaries["advisory_message"][value], self.columns["advisory_args"][index])
+        return value
+
+
+def expand_template(template: str, args: List[str]) -> str:
+    parts = template.split(ADVISORY_PLACEHOLDER)
+    if len(parts) != len(args) + 1:
+        return template
+    pieces = [parts[0]]
+    for arg, part in zip(args, parts[1:]):
+        pieces += [arg, part]
+    return "".join(pieces)
+
+
+def is_columnar(body: Dict[str, Any]) -> bool:
+    return isinstance(body.get("remote_options"), dict) and "columns" in body["remote_options"]
+
+
+def decode_analysis(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Analysis with columnar remote options wrapped for lazy row access; plain responses pass through"""
+    if not is_columnar(body):
+        return body
+    return {**body, "remote_options": ColumnarOptions(body["remote_options"])}
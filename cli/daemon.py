@@ -0,0 +1,241 @@
+"""
+Background daemon that keeps the CLI warm between invocations.
+
+Started by launcher.py on first use (FINOPS_DAEMON=1). It imports the CLI once,
+shares pooled HTTP connections and an in-memory response cache across commands,
+and runs each forwarded command against the same Typer app, with stdout and
+stderr streamed back to the launcher as frames. Commands run one at a time, in
+the caller's working directory and environment. The daemon exits after
+FINOPS_DAEMON_IDLE seconds without a command, and asks launchers to start a
+fresh one when the CLI's code or start-up settings (tracing, proxies) changed.
+"""
+
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from rich.console import Console
+
+import formatter
+import main as cli
+from api_client import close_shared_connections, share_connections
+from launcher import (
+    DEFAULT_IDLE_SECONDS,
+    FORWARDED_ENV,
+    PROG_NAME,
+    code_version,
+    connect,
+    send_frame,
+    socket_path,
+    startup_env,
+)
+from response_cache import share_entries
+
+# Output is sent in frames of at most this many characters, or on flush
+FRAME_CHARS = 64 * 1024
+
+
+class FrameStream(io.TextIOBase):
+    """A text stream that sends what is written to the launcher as {channel: text} frames"""
+
+    def __init__(self, wire, channel: str, isatty: bool):
+        self.wire = wire
+        self.channel = channel
+        self._isatty = isatty
+        self._buffer = []
+        self._size = 0
+        self.closed_by_peer = False
+
+    @property
+    def encoding(self) -> str:
+        return "utf-8"
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")  # Click probes for this
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= FRAME_CHARS:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer, self._size = [], 0
+        if self.closed_by_peer:
+            return
+        try:
+            send_frame(self.wire, {self.channel: text})
+        except OSError:
+            self.closed_by_peer = True  # The launcher went away (Ctrl-C); finish the command quietly
+
+
+class Daemon:
+    def __init__(self, path: Path, idle_seconds: float):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.version = code_version()
+        self.environ = dict(os.environ)
+        self.startup_env = startup_env(self.environ)
+        self.started_at = time.time()
+        self.commands = 0
+
+    def serve(self) -> None:
+        server = self._bind()
+        if server is None:
+            return
+        share_connections()
+        share_entries()
+        server.settimeout(self.idle_seconds)
+        try:
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    return
+                conn.settimeout(None)
+                try:
+                    with conn, conn.makefile("rwb") as wire:
+                        if not self._handle(conn, wire):
+                            return
+                except OSError:
+                    pass  # The launcher went away before the last frame was flushed
+        finally:
+            self._unlink()
+            server.close()
+            close_shared_connections()
+
+    def _bind(self) -> Optional[socket.socket]:
+        """Listen on the socket path, unless another daemon already does"""
+        if connect(self.path) is not None:
+            return None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Bind to a private name, then move it into place: a stale socket is
+        # replaced atomically and only this user can connect
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            server.bind(str(tmp))
+        finally:
+            os.umask(umask)
+        server.listen(16)
+        os.replace(tmp, self.path)
+        self.inode = self.path.stat().st_ino
+        return server
+
+    def _unlink(self) -> None:
+        """Remove the socket path, unless another daemon has taken it over since"""
+        try:
+            if self.path.stat().st_ino == self.inode:
+                self.path.unlink()
+        except OSError:
+            pass
+
+    def _handle(self, conn: socket.socket, wire) -> bool:
+        """Serve one connection; False once the daemon should exit"""
+        if not _same_user(conn):
+            return True
+        try:
+            line = wire.readline()
+            request = json.loads(line) if line else None
+        except (OSError, ValueError):
+            return True
+        if not isinstance(request, dict):
+            return True
+
+        try:
+            if request.get("control") == "ping":
+                send_frame(wire, self.status())
+            elif request.get("control") == "stop":
+                self._unlink()
+                send_frame(wire, {"stopping": True, **self.status()})
+                return False
+            elif request.get("version") != self.version or startup_env(request.get("env", {})) != self.startup_env:
+                # Launchers must not find this daemon again before they start the next one
+                self._unlink()
+                send_frame(wire, {"restart": True})
+                return False
+            else:
+                send_frame(wire, {"exit": self.run(request, wire)})
+        except OSError:
+            pass  # The launcher went away
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "socket": str(self.path),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "commands": self.commands,
+            "idle_seconds": self.idle_seconds,
+        }
+
+    def run(self, request: Dict[str, Any], wire) -> int:
+        """Run one command as if it had been invoked in the launcher's process"""
+        self.commands += 1
+        os.environ.clear()
+        os.environ.update({
+            key: value for key, value in self.environ.items()
+            if not key.startswith("FINOPS_") and key not in FORWARDED_ENV
+        })
+        os.environ.update(request.get("env", {}))
+
+        stdout, stderr = sys.stdout, sys.stderr
+        out = FrameStream(wire, "out", bool(request.get("stdout_isatty")))
+        err = FrameStream(wire, "err", bool(request.get("stderr_isatty")))
+        sys.stdout, sys.stderr = out, err
+        # Consoles detect colors and width when created: make them for this caller
+        formatter.console, formatter.error_console = Console(), Console(stderr=True)
+        code = 0
+        try:
+            os.chdir(request.get("cwd") or "/")
+            cli.app(args=list(request.get("argv", [])), prog_name=PROG_NAME)
+        except SystemExit as e:
+            if isinstance(e.code, int) or e.code is None:
+                code = e.code or 0
+            else:
+                err.write(f"{e.code}\n")
+                code = 1
+        except KeyboardInterrupt:
+            code = 130
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+            out.flush()
+            err.flush()
+        return code
+
+
+def _same_user(conn: socket.socket) -> bool:
+    """The socket is only accessible to this user; check the peer too where the OS tells us"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    _, uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return uid == os.getuid()
+
+
+def main() -> None:
+    idle_seconds = float(os.getenv("FINOPS_DAEMON_IDLE", str(DEFAULT_IDLE_SECONDS)))
+    Daemon(socket_path(), idle_seconds).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,443 @@
-from typing import Dict, Any
+import csv
+import heapq
+import json
+import sys
+from typing import Any, Callable, Dict, IO, Iterable, List, Optional
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
+from rich.tree import Tree
 
 console = Console()
+# Errors go to stderr so they never corrupt piped json/ndjson/csv output
+error_console = Console(stderr=True)
 
+# Output formats accepted by `--format`. Everything except "table" bypasses Rich
+# and streams plain text to stdout so it can be piped into other tools.
+OUTPUT_FORMATS = ("table", "json", "ndjson", "csv")
 
-def format_analysis_response(response: Dict[str, Any], job_name: str) -> None:
+# Columns emitted by the CSV and NDJSON writers, in order
+OPTION_FIELDS = [
+    "role",
+    "provider",
+    "region",
+    "instance_type",
+    "node_count",
+    "compute_cost_per_hour",
+    "one_time_egress_cost",
+    "break_even_hours",
+    "is_spot_instance",
+    "interruption_risk",
+    "egress_route",
+    "expected_cost",
+    "p90_cost",
+    "expected_interruptions",
+    "risk_adjusted_break_even_hours",
+    "advisory_message",
+]
+
+RISK_COLORS = {
+    "LOW": "green",
+    "MEDIUM": "yellow",
+    "HIGH": "red",
+}
+
+
+def _break_even_key(option: Dict[str, Any]) -> float:
+    # Options that never break even sort after every option that does
+    break_even = option.get("break_even_hours")
+    return float("inf") if break_even is None else break_even
+
+
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    "break-even": _break_even_key,
+    "hourly-cost": lambda option: option.get("compute_cost_per_hour", 0),
+    "egress": lambda option: option.get("one_time_egress_cost", 0),
+    # Only meaningful when the job has a risk block; otherwise every option ties
+    "expected-cost": lambda option: option.get("expected_cost") or 0,
+}
+
+
+def select_options(
+    options: List[Dict[str, Any]],
+    sort_by: Optional[str] = None,
+    top: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Sort remote options by one of SORT_KEYS and keep at most `top` of them"""
+    if sort_by is not None and sort_by not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort_by}' (expected one of: {', '.join(SORT_KEYS)})")
+
+    if sort_by is None:
+        return options if top is None else options[:top]
+
+    key = SORT_KEYS[sort_by]
+    if top is not None and top < len(options):
+        # Partial selection is O(n log k) instead of sorting every option
+        return heapq.nsmallest(top, options, key=key)
+    return sorted(options, key=key)
+
+
+def format_analysis_response(
+    response: Dict[str, Any],
+    job_name: str,
+    sort_by: Optional[str] = None,
+    top: Optional[int] = None,
+) -> None:
     """Format and display the analysis response in a human-readable format"""
-    
+
     console.print(f"\n[bold cyan]Analyzing cost profile for '{job_name}'...[/bold cyan]\n")
-    
+
     # Extract data from response
     data_local = response.get("data_local_option", {})
     remote_options = response.get("remote_options", [])
-    
+
     # Display data-local option
     console.print("[bold]Based on your data location, the \"Data-Local\" option is:[/bold]")
     console.print(f"  Provider: {data_local.get('provider', 'N/A')} ({data_local.get('region', 'N/A')})")
-    console.print(f"  Est. Compute Cost: ${data_local.get('compute_cost_per_hour', 0):.2f}/hr\n")
-    
-    # Display remote options
-    if remote_options:
-        console.print("[bold][Remote Options][/bold]\n")
-        
-        for option in remote_options:
-            provider = option.get("provider", "N/A")
-            region = option.get("region", "N/A")
-            instance_type = option.get("instance_type", "")
-            compute_cost = option.get("compute_cost_per_hour", 0)
-            egress_cost = option.get("one_time_egress_cost", 0)
-            break_even = option.get("break_even_hours")
-            advisory = option.get("advisory_message", "")
-            is_spot = option.get("is_spot_instance", False)
-            interruption_risk = option.get("interruption_risk")
-            
-            # Build provider/region string
-            provider_str = f"{provider} ({region})"
-            if is_spot:
-                provider_str += " [yellow](SPOT INSTANCE)[/yellow]"
-            
-            console.print(f"  Provider: {provider_str}")
-            
-            # Instance type
-            if instance_type:
-                console.print(f"  Instance Type: {instance_type}")
-            
-            # Compute cost
-            cost_str = f"${compute_cost:.2f}/hr"
-            if is_spot:
-                cost_str += " [yellow](Volatile)[/yellow]"
-            console.print(f"  Est. Compute Cost: {cost_str}")
-            
-            # Interruption risk for spot instances
-            if is_spot and interruption_risk:
-                risk_color = {
-                    "LOW": "green",
-                    "MEDIUM": "yellow",
-                    "HIGH": "red"
-                }.get(interruption_risk, "white")
-                console.print(f"  Interruption Risk: [{risk_color}]{interruption_risk}[/{risk_color}]")
-            
-            # Egress cost
-            if egress_cost > 0:
-                console.print(f"  One-Time Egress: ${egress_cost:,.2f}")
-            
-            # Break-even
-            if break_even is not None:
-                console.print(f"  BREAK-EVEN: {break_even:.1f} hours")
-            
-            # Advisory
-            console.print(f"  > ADVISORY: {advisory}\n")
-    else:
+    console.print(f"  Est. Compute Cost: ${data_local.get('compute_cost_per_hour', 0):.2f}/hr")
+    if data_local.get("expected_cost") is not None:
+        console.print(f"  Est. Total Cost: ${data_local['expected_cost']:,.2f}")
+    console.print()
+
+    if not remote_options:
         console.print("[yellow]No remote options available.[/yellow]\n")
+        return
+
+    selected = select_options(remote_options, sort_by=sort_by, top=top)
+    # Risk columns are only present when the job asked for a spot interruption simulation
+    show_risk = any(option.get("expected_cost") is not None for option in selected)
+
+    # Build every row first and render the table with a single print call
+    table = Table(title="Remote Options", title_justify="left", show_lines=False)
+    table.add_column("Provider (Region)")
+    table.add_column("Instance Type")
+    table.add_column("Compute Cost", justify="right")
+    table.add_column("Risk")
+    table.add_column("One-Time Egress", justify="right")
+    table.add_column("Break-Even", justify="right")
+    if show_risk:
+        table.add_column("Expected Cost", justify="right")
+        table.add_column("P90 Cost", justify="right")
+        table.add_column("Risk-Adj. Break-Even", justify="right")
+    table.add_column("Advisory")
+
+    for option in selected:
+        is_spot = option.get("is_spot_instance", False)
+        interruption_risk = option.get("interruption_risk")
+        egress_cost = option.get("one_time_egress_cost", 0)
+        break_even = option.get("break_even_hours")
+
+        provider_str = f"{option.get('provider', 'N/A')} ({option.get('region', 'N/A')})"
+        if is_spot:
+            provider_str += " [yellow](SPOT)[/yellow]"
+        route = option.get("egress_route") or []
+        if len(route) > 2:
+            # Staged transfer: name the intermediate locations
+            provider_str += f"\n[dim]via {', '.join(route[1:-1])}[/dim]"
+
+        cost_str = f"${option.get('compute_cost_per_hour', 0):.2f}/hr"
+        if is_spot:
+            cost_str += " [yellow](Volatile)[/yellow]"
+
+        risk_str = ""
+        if is_spot and interruption_risk:
+            risk_color = RISK_COLORS.get(interruption_risk, "white")
+            risk_str = f"[{risk_color}]{interruption_risk}[/{risk_color}]"
+
+        cells = [
+            provider_str,
+            option.get("instance_type", "") or "",
+            cost_str,
+            risk_str,
+            f"${egress_cost:,.2f}" if egress_cost > 0 else "-",
+            f"{break_even:.1f} h" if break_even is not None else "-",
+        ]
+        if show_risk:
+            risk_break_even = option.get("risk_adjusted_break_even_hours")
+            cells += [
+                f"${option.get('expected_cost') or 0:,.2f}",
+                f"${option.get('p90_cost') or 0:,.2f}",
+                f"{risk_break_even:.1f} h" if risk_break_even is not None else "-",
+            ]
+        cells.append(option.get("advisory_message", ""))
+        table.add_row(*cells)
+
+    console.print(table)
+
+    hidden = len(remote_options) - len(selected)
+    if hidden > 0:
+        console.print(f"[dim]{hidden} more option(s) not shown (use --top to change).[/dim]")
+    console.print()
+
+
+def _iter_rows(response: Dict[str, Any], remote_options: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    data_local = response.get("data_local_option")
+    if data_local:
+        yield {"role": "data-local", **data_local}
+    for option in remote_options:
+        yield {"role": "remote", **option}
+
+
+def _csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    route = row.get("egress_route")
+    if route:
+        return {**row, "egress_route": " > ".join(route)}
+    return row
+
+
+def write_analysis_response(
+    response: Dict[str, Any],
+    output_format: str,
+    sort_by: Optional[str] = None,
+    top: Optional[int] = None,
+    stream: Optional[IO[str]] = None,
+) -> None:
+    """Write the analysis response as json, ndjson or csv without going through Rich"""
+    stream = stream or sys.stdout
+    remote_options = select_options(response.get("remote_options", []), sort_by=sort_by, top=top)
+
+    if output_format == "json":
+        # Columnar responses hold read-only row views; expand the selected rows only
+        json.dump({**response, "remote_options": [dict(option) for option in remote_options]}, stream, indent=2)
+        stream.write("\n")
+    elif output_format == "ndjson":
+        for row in _iter_rows(response, remote_options):
+            stream.write(json.dumps(row))
+            stream.write("\n")
+    elif output_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=OPTION_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for row in _iter_rows(response, remote_options):
+            writer.writerow(_csv_row(row))
+    else:
+        raise ValueError(f"Unknown output format '{output_format}' (expected one of: {', '.join(OUTPUT_FORMATS)})")
+    stream.flush()
+
+
+# Columns of each catalog kind, as (field, header)
+CATALOG_COLUMNS: Dict[str, List[tuple]] = {
+    "gpu-maps": [("gpu_type", "GPU"), ("gpu_count", "Count"), ("instances", "Instances")],
+    "compute": [
+        ("provider", "Provider"), ("region", "Region"), ("instance_type", "Instance Type"),
+        ("gpu_count", "GPUs"), ("gpu_memory_gb", "GPU Memory"), ("interconnect", "Interconnect"),
+        ("cost_per_hour", "Cost/hr"),
+    ],
+    "egress": [
+        ("provider", "Provider"), ("service", "Service"), ("region", "Region"),
+        ("destination", "Destination"), ("cost_per_gb", "Cost/GB"),
+    ],
+}
+
+
+def _catalog_cell(field: str, value: Any) -> str:
+    if value is None:
+        return "-"
+    if field == "instances":
+        return ", ".join(value)
+    if field == "cost_per_hour":
+        return f"${value:,.2f}"
+    if field == "cost_per_gb":
+        return f"${value:,.4f}"
+    if field == "gpu_memory_gb":
+        return f"{value} GB"
+    return str(value)
+
+
+def format_catalog_page(kind: str, items: List[Dict[str, Any]]) -> None:
+    """Display one page of catalog entries as a table"""
+    table = Table(show_lines=False)
+    columns = CATALOG_COLUMNS[kind]
+    for field, header in columns:
+        table.add_column(header, justify="right" if field.startswith("cost") else "left")
+    for item in items:
+        table.add_row(*(_catalog_cell(field, item.get(field)) for field, _ in columns))
+    console.print(table)
+
+
+def format_catalog_cursor(next_cursor: Optional[str], written: int) -> None:
+    """Tell the user how to fetch the next page (on stderr, next to the result)"""
+    if next_cursor:
+        # Selective filters can leave a page empty before the listing ends
+        error_console.print(f"[dim]More entries may follow: --cursor {next_cursor} (or --all)[/dim]")
+    elif not written:
+        error_console.print("[yellow]No matching catalog entries.[/yellow]")
+
+
+def format_portfolio_summary(response: Dict[str, Any], output_path: str) -> None:
+    """Display aggregate totals for a portfolio analysis"""
+    totals = response.get("totals", {})
+    errors = response.get("errors", {})
+
+    console.print(f"\n[bold cyan]Portfolio analysis written to {output_path}[/bold cyan]\n")
+
+    table = Table(show_header=False, box=None, padding=(0, 2))
+    table.add_column(style="bold")
+    table.add_column(justify="right")
+    table.add_row("Jobs analyzed", f"{totals.get('jobs', 0):,}")
+    table.add_row("Jobs moved off data-local", f"{totals.get('jobs_moved', 0):,}")
+    table.add_row("Jobs that could not be priced", f"{totals.get('jobs_failed', 0):,}")
+    table.add_row("Total one-time egress", f"${totals.get('total_egress_cost', 0):,.2f}")
+    if totals.get("savings") is not None:
+        table.add_row("All data-local cost", f"${totals['local_cost']:,.2f}")
+        table.add_row("Recommended cost", f"${totals['recommended_cost']:,.2f}")
+        table.add_row("[green]Total savings[/green]", f"[green]${totals['savings']:,.2f}[/green]")
+    console.print(table)
+
+    for group, error in errors.items():
+        console.print(f"[yellow]  {group}: {error}[/yellow]")
+    console.print()
+
+
+def _placement_cell(cell: Optional[Dict[str, Any]], instances: List[Dict[str, Any]], cheapest: bool) -> str:
+    if cell is None:
+        return "[dim]unreachable[/dim]"
+    best = instances[cell["best"]]
+    label = f"{best['provider']} ({best['region']})\n{best['instance_type']}"
+    cost = f"${best['cost_per_hour']:,.2f}/hr"
+    if cell.get("total_cost") is not None:
+        cost += f", ${cell['total_cost']:,.2f} total"
+    if cell.get("local") == cell["best"]:
+        detail = "[green]data-local[/green]"
+    elif cell.get("break_even_hours") is not None:
+        detail = f"egress ${cell['one_time_egress_cost']:,.2f}, beats local after {cell['break_even_hours']:.1f} h"
+    else:
+        detail = f"egress ${cell['one_time_egress_cost']:,.2f}"
+    text = f"{label}\n{cost}\n{detail}"
+    return f"[bold green]{text}[/bold green]" if cheapest else text
+
+
+def format_placement(response: Dict[str, Any]) -> None:
+    """
+    Display a placement matrix: one row per storage location, one column per GPU
+    shape; the best location for each shape is highlighted
+    """
+    shapes = response.get("shapes", [])
+    instances = response.get("instances", [])
+    cells = response.get("cells", [])
+
+    def rank(cell: Optional[Dict[str, Any]]) -> float:
+        if cell is None:
+            return float("inf")
+        if cell.get("total_cost") is not None:
+            return cell["total_cost"]
+        return instances[cell["best"]]["cost_per_hour"]
+
+    cheapest = [
+        min(range(len(cells)), key=lambda i: rank(cells[i][j])) if cells else None
+        for j in range(len(shapes))
+    ]
+
+    table = Table(title="Data Placement", show_lines=True)
+    table.add_column("Storage Location", style="cyan")
+    for shape in shapes:
+        table.add_column(f"{shape['gpu_type']} x{shape['gpu_count']}")
+    for i, location in enumerate(response.get("locations", [])):
+        table.add_row(location, *(
+            _placement_cell(cells[i][j], instances, cheapest[j] == i and cells[i][j] is not None)
+            for j in range(len(shapes))
+        ))
+    console.print(table)
+    console.print()
+
+
+# Machine-readable formats of `finops-analyze placement` (besides the table)
+PLACEMENT_OUTPUT_FORMATS = ["json"]
+
+
+def write_placement(response: Dict[str, Any], output_format: str, stream: Optional[IO[str]] = None) -> None:
+    """Write a placement matrix as json without going through Rich"""
+    stream = stream or sys.stdout
+    if output_format == "json":
+        json.dump(response, stream, indent=2)
+        stream.write("\n")
+    else:
+        raise ValueError(
+            f"Unknown output format '{output_format}' (expected one of: {', '.join(PLACEMENT_OUTPUT_FORMATS)})"
+        )
+    stream.flush()
+
+
+def format_trace(spans: List[Dict[str, Any]]) -> None:
+    """Display spans from the CLI, API and Cost Engine as a timing tree (on stderr, next to the result)"""
+    if not spans:
+        error_console.print("[yellow]No spans recorded[/yellow]")
+        return
+
+    ids = {span["span_id"] for span in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        # Spans whose parent was not returned (e.g. a trimmed header) hang off the root
+        parent = span.get("parent_id") if span.get("parent_id") in ids else None
+        children.setdefault(parent, []).append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda span: span["start_ns"])
+    trace_start = min(span["start_ns"] for span in spans)
+
+    def label(span: Dict[str, Any]) -> Text:
+        duration_ms = (span["end_ns"] - span["start_ns"]) / 1e6
+        offset_ms = (span["start_ns"] - trace_start) / 1e6
+        text = Text()
+        text.append(span["name"], style="bold red" if span.get("error") else "bold")
+        text.append(f" [{span['service']}]", style="cyan")
+        text.append(f" {duration_ms:.2f} ms", style="green")
+        text.append(f" (+{offset_ms:.2f} ms)", style="dim")
+        if span.get("error"):
+            text.append(f" {span['error']}", style="red")
+        return text
+
+    def add(node: Tree, span: Dict[str, Any]) -> None:
+        branch = node.add(label(span))
+        for child in children.get(span["span_id"], []):
+            add(branch, child)
+
+    tree = Tree(f"[bold cyan]Trace {spans[0]['trace_id']}[/bold cyan]")
+    for root in children.get(None, []):
+        add(tree, root)
+    error_console.print()
+    error_console.print(tree)
+
+
+def format_profile_files(paths: List[str]) -> None:
+    """List the profile reports written for this run (on stderr, next to the result)"""
+    if not paths:
+        return
+    error_console.print("\n[bold cyan]Profile written to:[/bold cyan]")
+    for path in paths:
+        error_console.print(f"  {path}")
+
+
+def format_cache_status(status: Optional[str], age: Optional[float]) -> None:
+    """Note on stderr when a result came from the local cache rather than a fresh analysis"""
+    if status == "hit":
+        error_console.print(f"[dim]Cached result from {age:.0f}s ago (not revalidated, --max-stale)[/dim]")
+    elif status == "revalidated":
+        error_console.print("[dim]Cached result, confirmed current by the API[/dim]")
+
+
+def format_daemon_status(status: Optional[Dict[str, Any]]) -> None:
+    """Show whether the CLI daemon is running and how busy it has been"""
+    if status is None:
+        console.print("[dim]CLI daemon is not running[/dim]")
+        return
+    state = "stopping" if status.get("stopping") else "running"
+    console.print(
+        f"CLI daemon {state} (pid {status['pid']}, {status['socket']}): "
+        f"{status['commands']} command(s) in {status['uptime_seconds']:.0f}s, "
+        f"exits after {status['idle_seconds']:.0f}s idle"
+    )
+
+
+def format_partial_notice(response: Dict[str, Any]) -> None:
+    """Warn on stderr when the request deadline cut the analysis short"""
+    if response.get("partial"):
+        skipped = response.get("options_skipped") or 0
+        error_console.print(
+            f"[yellow]Partial result:[/yellow] the deadline was reached before {skipped} candidate "
+            "option(s) could be priced; retry with a longer --timeout for the full comparison"
+        )
 
 
 def format_error(error: str) -> None:
     """Format and display an error message"""
-    console.print(f"[bold red]Error:[/bold red] {error}")
-
+    error_console.print(f"[bold red]Error:[/bold red] {error}")
@@ -0,0 +1,200 @@
+"""
+Thin finops-analyze entry point that can hand commands to a warm daemon.
+
+With FINOPS_DAEMON=1, each invocation forwards its arguments, working directory
+and FINOPS_* environment over a Unix socket to daemon.py, which keeps the CLI's
+modules imported, its HTTP connections open and recent responses in memory.
+The daemon is started on first use and exits once idle for FINOPS_DAEMON_IDLE
+seconds. Without it (or when it cannot be reached) the command runs in-process
+as before. This module only imports the standard library, so forwarding a
+command costs little more than the interpreter's own startup.
+
+Frames are newline-delimited JSON objects. A command is sent as
+{"argv", "cwd", "env", "stdout_isatty", "stderr_isatty", "version"}; the daemon
+answers with {"out": text} and {"err": text} frames followed by {"exit": code},
+or {"restart": true} when it was started from other code or settings.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROG_NAME = "finops-analyze"
+CLI_DIR = Path(__file__).resolve().parent
+DEFAULT_IDLE_SECONDS = 600
+START_TIMEOUT_SECONDS = 5.0
+
+# Besides FINOPS_*, the environment a command sees in the daemon
+FORWARDED_ENV = (
+    "COLUMNS", "LINES", "TERM", "COLORTERM", "NO_COLOR", "FORCE_COLOR", "XDG_CACHE_HOME", "LOCALAPPDATA",
+    "HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "NO_PROXY", "SSL_CERT_FILE", "SSL_CERT_DIR",
+)
+
+
+def daemon_enabled() -> bool:
+    return hasattr(socket, "AF_UNIX") and os.getenv("FINOPS_DAEMON", "").lower() in ("1", "true", "yes", "on")
+
+
+def socket_path() -> Path:
+    """FINOPS_DAEMON_SOCKET, else a per-user runtime or cache directory"""
+    if os.getenv("FINOPS_DAEMON_SOCKET"):
+        return Path(os.environ["FINOPS_DAEMON_SOCKET"])
+    if os.getenv("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / "finops-cli.sock"
+    from response_cache import default_cache_dir
+    return default_cache_dir() / "daemon.sock"
+
+
+def code_version() -> str:
+    """Identifies the interpreter and CLI sources a daemon was started with"""
+    newest = max((path.stat().st_mtime_ns for path in CLI_DIR.glob("*.py")), default=0)
+    return f"{sys.executable}:{newest}"
+
+
+def forwarded_env(environ=os.environ) -> Dict[str, str]:
+    env = {
+        key: value for key, value in environ.items()
+        if (key.startswith("FINOPS_") and not key.startswith("FINOPS_DAEMON")) or key in FORWARDED_ENV
+    }
+    if "COLUMNS" not in env and sys.stdout.isatty():
+        try:
+            env["COLUMNS"] = str(os.get_terminal_size(sys.stdout.fileno()).columns)
+        except OSError:
+            pass
+    return env
+
+
+def startup_env(env: Dict[str, str]) -> Dict[str, str]:
+    """The forwarded settings a daemon only reads when it starts (tracing, proxies)"""
+    return {
+        key: value for key, value in env.items()
+        if key.startswith("FINOPS_TRACE_") or key.endswith("_PROXY") or key.startswith("SSL_CERT_")
+    }
+
+
+def send_frame(stream, frame: Dict[str, Any]) -> None:
+    stream.write(json.dumps(frame).encode() + b"\n")
+    stream.flush()
+
+
+def connect(path: Path, timeout: Optional[float] = None) -> Optional[socket.socket]:
+    """Connect to a daemon's socket, if one is listening and owned by this user"""
+    try:
+        if hasattr(os, "getuid") and path.stat().st_uid != os.getuid():
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except (OSError, AttributeError):
+        return None
+    try:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def start_daemon(path: Path) -> Optional[socket.socket]:
+    """Start a daemon in the background and wait for it to accept connections"""
+    import subprocess
+
+    process = subprocess.Popen(
+        [sys.executable, str(CLI_DIR / "daemon.py")],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, "FINOPS_DAEMON_SOCKET": str(path)},
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        sock = connect(path)
+        if sock is not None:
+            return sock
+        if process.poll() not in (None, 0):
+            return None  # It failed to start; exit status 0 means another daemon won the race
+        time.sleep(0.02)
+    return None
+
+
+def control(action: str, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Send "ping" or "stop" to a running daemon; None when none is running"""
+    sock = connect(path or socket_path(), timeout=START_TIMEOUT_SECONDS)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        try:
+            send_frame(stream, {"control": action})
+            line = stream.readline()
+        except OSError:
+            return None
+    return json.loads(line) if line else None
+
+
+def run_in_daemon(argv: List[str]) -> Optional[int]:
+    """Run a command in the daemon and relay its output; None when it could not be run there"""
+    path = socket_path()
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": forwarded_env(),
+        "stdout_isatty": sys.stdout.isatty(),
+        "stderr_isatty": sys.stderr.isatty(),
+        "version": code_version(),
+    }
+    for _ in range(2):  # Once more after the daemon asks to be replaced
+        sock = connect(path) or start_daemon(path)
+        if sock is None:
+            return None
+        relayed = False
+        with sock, sock.makefile("rwb") as stream:
+            try:
+                send_frame(stream, request)
+                for line in stream:
+                    frame = json.loads(line)
+                    if "out" in frame:
+                        sys.stdout.write(frame["out"])
+                        sys.stdout.flush()
+                        relayed = True
+                    elif "err" in frame:
+                        sys.stderr.write(frame["err"])
+                        sys.stderr.flush()
+                        relayed = True
+                    elif "exit" in frame:
+                        return frame["exit"]
+                    elif frame.get("restart"):
+                        break
+            except KeyboardInterrupt:
+                return 130
+            except BrokenPipeError:
+                # Our own output was closed (| head): stop like an in-process run would,
+                # without a second error when Python flushes stdout on exit
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return 1
+            except (OSError, ValueError):
+                pass
+        if relayed:
+            # Output was already written: running the command again would repeat it
+            sys.stderr.write("Error: lost the connection to the CLI daemon\n")
+            return 1
+        # The daemon is gone (restart, idle or crash); its socket was removed first
+    return None
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    # Managing the daemon always happens here, never inside the daemon itself
+    if daemon_enabled() and argv[:1] != ["daemon"]:
+        code = run_in_daemon(argv)
+        if code is not None:
+            sys.exit(code)
+
+    from main import app
+
+    app(args=argv, prog_name=PROG_NAME)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,407 @@
 import typer
 import yaml
+import json
 import os
+import sys
 from pathlib import Path
-from typing import Optional
-from models import JobRequest
+from typing import List, Optional
+from typer.core import TyperGroup
+from models import JobCompute, JobConstraints, JobRequest
 from api_client import APIClient
-from formatter import format_analysis_response, format_error
+import launcher
+from formatter import (
+    CATALOG_COLUMNS,
+    OUTPUT_FORMATS,
+    PLACEMENT_OUTPUT_FORMATS,
+    SORT_KEYS,
+    format_analysis_response,
+    format_cache_status,
+    format_catalog_cursor,
+    format_catalog_page,
+    format_daemon_status,
+    format_error,
+    format_partial_notice,
+    format_placement,
+    format_profile_files,
+    format_portfolio_summary,
+    format_trace,
+    write_analysis_response,
+    write_placement,
+)
+from portfolio_io import load_portfolio, write_portfolio
+from profiling import ProfileFiles, profile_run
+from response_cache import ResponseCache
+from tracing import tracer
 
-app = typer.Typer(help="FinOps Orchestrator CLI - Analyze cloud compute costs")
+
+class DefaultCommandGroup(TyperGroup):
+    """Runs `analyze` when no command is named, so `finops-analyze -f job.yaml` keeps working"""
+
+    default_command = "analyze"
+
+    def parse_args(self, ctx, args):
+        own_options = {opt for param in self.get_params(ctx) for opt in param.opts + param.secondary_opts}
+        if args and args[0].startswith("-") and args[0] not in own_options:
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(cls=DefaultCommandGroup, help="FinOps Orchestrator CLI - Analyze cloud compute costs")
+
+
+def load_job(file: Path) -> JobRequest:
+    """Parse and validate a job.yaml file, exiting with an error message on failure"""
+    # Validate file exists
+    if not file.exists():
+        format_error(f"File not found: {file}")
+        raise typer.Exit(1)
+    
+    # Parse YAML
+    with tracer.span("parse_yaml", file=str(file)):
+        try:
+            with open(file, 'r') as f:
+                yaml_data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            format_error(f"Invalid YAML file: {e}")
+            raise typer.Exit(1)
+        except Exception as e:
+            format_error(f"Failed to read file: {e}")
+            raise typer.Exit(1)
+    
+    with tracer.span("validate_job"):
+        # Validate required keys
+        required_keys = {
+            "job_name": "job_name",
+            "data.location": ("data", "location"),
+            "data.size_gb": ("data", "size_gb"),
+            "compute.gpu_type": ("compute", "gpu_type"),
+            "compute.gpu_count": ("compute", "gpu_count"),
+        }
+        
+        missing_keys = []
+        for key_name, key_path in required_keys.items():
+            if isinstance(key_path, tuple):
+                current = yaml_data
+                for part in key_path:
+                    if not isinstance(current, dict) or part not in current:
+                        missing_keys.append(key_name)
+                        break
+                    current = current[part]
+            elif key_path not in yaml_data:
+                missing_keys.append(key_name)
+        
+        if missing_keys:
+            format_error(f"Missing required keys: {', '.join(missing_keys)}")
+            raise typer.Exit(1)
+        
+        # Create JobRequest
+        try:
+            return JobRequest(**yaml_data)
+        except Exception as e:
+            format_error(f"Invalid job configuration: {e}")
+            raise typer.Exit(1)
 
 
 @app.command()
 def analyze(
     file: Path = typer.Option(..., "--file", "-f", help="Path to job.yaml file"),
     api_url: Optional[str] = typer.Option(None, "--api-url", help="Backend API URL (default: http://localhost:8000)"),
+    output_format: str = typer.Option("table", "--format", "-o", help=f"Output format: {', '.join(OUTPUT_FORMATS)}"),
+    sort_by: Optional[str] = typer.Option(None, "--sort", help=f"Sort remote options by: {', '.join(SORT_KEYS)}"),
+    top: Optional[int] = typer.Option(None, "--top", min=1, help="Show only the first N remote options"),
+    show_trace: bool = typer.Option(False, "--trace", help="Trace this request end to end and print a timing breakdown (API spans need FINOPS_TRACE_DEBUG_TOKEN)"),
+    profile: bool = typer.Option(False, "--profile", help="Write a cProfile report and allocation summary for this run"),
+    profile_dir: Path = typer.Option(Path("."), "--profile-dir", envvar="FINOPS_PROFILE_DIR", help="Directory for --profile reports"),
+    max_stale: Optional[float] = typer.Option(None, "--max-stale", min=0, help="Reuse a cached result up to this many seconds old without asking the API"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Neither read nor update the local response cache"),
+    timeout: float = typer.Option(60.0, "--timeout", min=0.1, help="Seconds to wait; near the deadline the API returns a partial result"),
 ):
     """
     Analyze cost profile for a job defined in job.yaml.
+
+    Results are cached on disk (FINOPS_CACHE_DIR, default the user cache
+    directory) and revalidated with the API on the next run, which only
+    re-downloads them if the job or the prices changed.
+
+    With --profile, the run is profiled locally; if FINOPS_API_PROFILE_TOKEN is
+    set, the API is asked to profile its side of the request as well.
     
     Example:
-        finops-analyze -f job.yaml
+        finops-analyze analyze -f job.yaml
+        finops-analyze -f job.yaml   (analyze is the default command)
+    """
+    # Validate output options
+    if output_format not in OUTPUT_FORMATS:
+        format_error(f"Unknown output format '{output_format}' (expected one of: {', '.join(OUTPUT_FORMATS)})")
+        raise typer.Exit(1)
+    if sort_by is not None and sort_by not in SORT_KEYS:
+        format_error(f"Unknown sort key '{sort_by}' (expected one of: {', '.join(SORT_KEYS)})")
+        raise typer.Exit(1)
+
+    cache = None if no_cache else ResponseCache.from_env()
+    if not profile:
+        run_analysis(
+            file, api_url, output_format, sort_by, top, show_trace,
+            cache=cache, max_stale=max_stale, timeout=timeout,
+        )
+        return
+
+    profile_files = None
+    try:
+        with profile_run(profile_dir, "analyze") as profile_files:
+            run_analysis(
+                file, api_url, output_format, sort_by, top, show_trace,
+                profile_token=os.getenv("FINOPS_API_PROFILE_TOKEN"),
+                profile_files=profile_files,
+                cache=cache,
+                timeout=timeout,
+            )
+    finally:
+        if profile_files is not None:
+            format_profile_files([str(path) for path in profile_files.paths])
+
+
+def push_down_selection(job_request: JobRequest, sort_by: Optional[str], top: Optional[int]) -> JobRequest:
+    """
+    Ask the API for the same --sort/--top selection, so options that would not be
+    shown are neither priced nor sent. A job file that already sets sort_by or top_k
+    keeps its own; the local selection is applied to the result either way.
+    """
+    constraints = job_request.constraints or JobConstraints()
+    if top is None or constraints.sort_by is not None or constraints.top_k is not None:
+        return job_request
+    if sort_by == "expected-cost" and job_request.risk is None:
+        return job_request  # Every option ties without a risk block; the API would reject it
+    constraints = constraints.model_copy(update={"sort_by": sort_by, "top_k": top})
+    return job_request.model_copy(update={"constraints": constraints})
+
+
+def run_analysis(
+    file: Path,
+    api_url: Optional[str],
+    output_format: str,
+    sort_by: Optional[str],
+    top: Optional[int],
+    show_trace: bool,
+    profile_token: Optional[str] = None,
+    profile_files: Optional[ProfileFiles] = None,
+    cache: Optional[ResponseCache] = None,
+    max_stale: Optional[float] = None,
+    timeout: float = 60.0,
+) -> None:
+    """Load a job, send it to the API and render the result"""
+    trace = tracer.start_trace(debug=show_trace, force=show_trace)
+    try:
+        with tracer.span("cli.analyze"):
+            job_request = push_down_selection(load_job(file), sort_by, top)
+            
+            # Get API URL
+            base_url = api_url or os.getenv("FINOPS_API_URL", "http://localhost:8000")
+            
+            # Send request to API
+            # A traced or profiled run is about the request itself, so it always reaches the API
+            if show_trace or profile_token:
+                max_stale = None
+            client = APIClient(
+                base_url=base_url, profile_token=profile_token, cache=cache, max_stale=max_stale, timeout=timeout,
+                tenant=os.getenv("FINOPS_TENANT"),
+            )
+            try:
+                response = client.analyze(job_request)
+                format_cache_status(client.last_cache_status, client.last_cache_age)
+                format_partial_notice(response)
+                with tracer.span("render", format=output_format):
+                    if output_format == "table":
+                        format_analysis_response(response, job_request.job_name, sort_by=sort_by, top=top)
+                    else:
+                        write_analysis_response(response, output_format, sort_by=sort_by, top=top)
+                if client.last_profile_id and profile_files is not None:
+                    # The API profiled its side of the request too; keep both reports together
+                    profile_files.add(
+                        f"analyze-api-{client.last_profile_id}.txt",
+                        client.get_profile(client.last_profile_id),
+                    )
+            except Exception as e:
+                format_error(str(e))
+                raise typer.Exit(1)
+            finally:
+                client.close()
+    finally:
+        tracer.finish(trace)
+        tracer.shutdown()
+        if show_trace and trace is not None:
+            format_trace(trace.all_spans())
+
+
+@app.command()
+def portfolio(
+    file: Path = typer.Option(..., "--file", "-f", help="Path to a CSV or Parquet file of jobs"),
+    output: Path = typer.Option(..., "--output", "-o", help="Result file (.csv or .parquet)"),
+    api_url: Optional[str] = typer.Option(None, "--api-url", help="Backend API URL (default: http://localhost:8000)"),
+):
+    """
+    Analyze a whole portfolio of jobs at once.
+
+    The input needs job_name, location, size_gb, gpu_type and gpu_count columns;
+    gpu_memory_gb, interconnect and duration_hours are optional. Supplying
+    duration_hours enables per-job and total savings.
+
+    Example:
+        finops-analyze portfolio -f q3-jobs.csv -o q3-recommendations.parquet
     """
-    # Validate file exists
     if not file.exists():
         format_error(f"File not found: {file}")
         raise typer.Exit(1)
-    
-    # Parse YAML
+
     try:
-        with open(file, 'r') as f:
-            yaml_data = yaml.safe_load(f)
-    except yaml.YAMLError as e:
-        format_error(f"Invalid YAML file: {e}")
+        columns = load_portfolio(file)
+    except Exception as e:
+        format_error(f"Invalid portfolio file: {e}")
         raise typer.Exit(1)
+
+    base_url = api_url or os.getenv("FINOPS_API_URL", "http://localhost:8000")
+
+    # A portfolio fans out to many analyses; let the API queue it behind interactive work
+    client = APIClient(base_url=base_url, tenant=os.getenv("FINOPS_TENANT"), priority="batch")
+    try:
+        response = client.portfolio(columns)
+        write_portfolio(response["columns"], output)
+        format_portfolio_summary(response, str(output))
     except Exception as e:
-        format_error(f"Failed to read file: {e}")
+        format_error(str(e))
         raise typer.Exit(1)
-    
-    # Validate required keys
-    required_keys = {
-        "job_name": "job_name",
-        "data.location": ("data", "location"),
-        "data.size_gb": ("data", "size_gb"),
-        "compute.gpu_type": ("compute", "gpu_type"),
-        "compute.gpu_count": ("compute", "gpu_count"),
-    }
-    
-    missing_keys = []
-    for key_name, key_path in required_keys.items():
-        if isinstance(key_path, tuple):
-            current = yaml_data
-            for part in key_path:
-                if not isinstance(current, dict) or part not in current:
-                    missing_keys.append(key_name)
-                    break
-                current = current[part]
-        elif key_path not in yaml_data:
-            missing_keys.append(key_name)
-    
-    if missing_keys:
-        format_error(f"Missing required keys: {', '.join(missing_keys)}")
+    finally:
+        client.close()
+
+
+def parse_shape(value: str) -> JobCompute:
+    """A GPU shape from "H100x8" (GPU type, then the GPU count)"""
+    gpu_type, _, count = value.rpartition("x")
+    try:
+        if not gpu_type:
+            raise ValueError(value)
+        return JobCompute(gpu_type=gpu_type, gpu_count=int(count))
+    except ValueError:
+        raise typer.BadParameter(f"expected GPU_TYPExCOUNT (e.g. H100x8), got '{value}'")
+
+
+@app.command()
+def placement(
+    file: Optional[Path] = typer.Option(None, "--file", "-f", help="Job YAML whose data size and GPU shape to use"),
+    size_gb: Optional[float] = typer.Option(None, "--size-gb", min=0, help="Dataset size in GB (default: the job's)"),
+    shapes: Optional[List[str]] = typer.Option(None, "--shape", help="GPU shape as TYPExCOUNT, e.g. H100x8 (repeatable)"),
+    locations: Optional[List[str]] = typer.Option(
+        None, "--location", help="Candidate storage location provider:service:region (repeatable; default: all)"
+    ),
+    duration_hours: Optional[float] = typer.Option(
+        None, "--duration-hours", min=0, help="Rank plans by total cost over this runtime instead of hourly cost"
+    ),
+    output_format: str = typer.Option("table", "--format", "-o", help="Output format: table or json"),
+    api_url: Optional[str] = typer.Option(None, "--api-url", help="Backend API URL (default: http://localhost:8000)"),
+):
+    """
+    Decide where to store a dataset before buying storage.
+
+    For every candidate storage location and GPU shape, shows the cheapest
+    compute plan from there and when it beats running next to the data.
+
+    Example:
+        finops-analyze placement --size-gb 10000 --shape H100x8 --shape A100x8
+        finops-analyze placement -f examples/job.yaml --duration-hours 500
+    """
+    if output_format != "table" and output_format not in PLACEMENT_OUTPUT_FORMATS:
+        format_error(
+            f"Unknown output format '{output_format}' (expected one of: table, {', '.join(PLACEMENT_OUTPUT_FORMATS)})"
+        )
         raise typer.Exit(1)
-    
-    # Create JobRequest
+
+    compute = [parse_shape(shape) for shape in shapes or []]
+    if file is not None:
+        job_request = load_job(file)
+        compute.insert(0, job_request.compute)
+        size_gb = size_gb or job_request.data.size_gb
+    if not compute or not size_gb:
+        format_error("Give --file, or --size-gb and at least one --shape")
+        raise typer.Exit(1)
+
+    request = {
+        "size_gb": size_gb,
+        "shapes": [shape.model_dump(exclude_none=True) for shape in compute],
+        "locations": locations or None,
+        "duration_hours": duration_hours,
+    }
+    base_url = api_url or os.getenv("FINOPS_API_URL", "http://localhost:8000")
+    client = APIClient(base_url=base_url, tenant=os.getenv("FINOPS_TENANT"))
     try:
-        job_request = JobRequest(**yaml_data)
+        response = client.placement(request)
     except Exception as e:
-        format_error(f"Invalid job configuration: {e}")
+        format_error(str(e))
         raise typer.Exit(1)
-    
-    # Get API URL
+    finally:
+        client.close()
+
+    if output_format == "table":
+        format_placement(response)
+    else:
+        write_placement(response, output_format)
+
+
+@app.command()
+def catalog(
+    kind: str = typer.Argument(..., help="What to list: gpu-maps, compute or egress"),
+    provider: Optional[str] = typer.Option(None, "--provider", help="Only entries of this provider (egress: source provider)"),
+    region: Optional[str] = typer.Option(None, "--region", help="Only entries in this region (egress: source region)"),
+    gpu_type: Optional[str] = typer.Option(None, "--gpu-type", help="Only this GPU type (gpu-maps and compute)"),
+    limit: int = typer.Option(100, "--limit", min=1, max=1000, help="Entries per page"),
+    cursor: Optional[str] = typer.Option(None, "--cursor", help="Continue from the cursor a previous page printed"),
+    all_pages: bool = typer.Option(False, "--all", help="Follow cursors to the end of the listing"),
+    output_format: str = typer.Option("table", "--format", "-o", help="Output format: table, json or ndjson"),
+    api_url: Optional[str] = typer.Option(None, "--api-url", help="Backend API URL (default: http://localhost:8000)"),
+):
+    """
+    Browse the GPU shapes, instance prices and egress routes the API knows about.
+
+    Listings are paginated; with --all every page is fetched in turn and written
+    as it arrives, so memory stays bounded however large the catalog is.
+
+    Example:
+        finops-analyze catalog compute --gpu-type H100 --provider aws --all -o ndjson
+    """
+    if kind not in CATALOG_COLUMNS:
+        format_error(f"Unknown catalog kind '{kind}' (expected one of: {', '.join(CATALOG_COLUMNS)})")
+        raise typer.Exit(1)
+    if output_format not in ("table", "json", "ndjson"):
+        format_error(f"Unknown output format '{output_format}' (expected one of: table, json, ndjson)")
+        raise typer.Exit(1)
+
     base_url = api_url or os.getenv("FINOPS_API_URL", "http://localhost:8000")
-    
-    # Send request to API
     client = APIClient(base_url=base_url)
     try:
-        response = client.analyze(job_request)
-        format_analysis_response(response, job_request.job_name)
+        written = 0
+        # json output is a single array, streamed page by page
+        if output_format == "json":
+            sys.stdout.write("[")
+        while True:
+            page = client.catalog(kind, cursor=cursor, limit=limit, provider=provider, region=region, gpu_type=gpu_type)
+            items = page.get("items", [])
+            if output_format == "table":
+                if items:
+                    format_catalog_page(kind, items)
+            else:
+                for i, item in enumerate(items):
+                    if output_format == "json":
+                        sys.stdout.write(",\n  " if written + i else "\n  ")
+                    sys.stdout.write(json.dumps(item))
+                    if output_format == "ndjson":
+                        sys.stdout.write("\n")
+                sys.stdout.flush()
+            written += len(items)
+            cursor = page.get("next_cursor")
+            if not cursor or not all_pages:
+                break
+        if output_format == "json":
+            sys.stdout.write("\n]\n" if written else "]\n")
+        format_catalog_cursor(cursor, written)
     except Exception as e:
         format_error(str(e))
         raise typer.Exit(1)
@@ -84,6 +409,37 @@ def analyze(
         client.close()
 
 
+@app.command()
+def daemon(
+    action: str = typer.Argument("status", help="status, start or stop"),
+):
+    """
+    Manage the background daemon that keeps the CLI warm between runs.
+
+    With FINOPS_DAEMON=1, commands are handed to a daemon that has the CLI
+    already imported and its API connections open; it starts on first use and
+    exits after FINOPS_DAEMON_IDLE seconds (default 600) without a command.
+
+    Example:
+        finops-analyze daemon stop
+    """
+    if action == "status":
+        format_daemon_status(launcher.control("ping"))
+    elif action == "start":
+        path = launcher.socket_path()
+        sock = launcher.connect(path) or launcher.start_daemon(path)
+        if sock is None:
+            format_error(f"Failed to start the CLI daemon on {path}")
+            raise typer.Exit(1)
+        sock.close()
+        format_daemon_status(launcher.control("ping"))
+    elif action == "stop":
+        format_daemon_status(launcher.control("stop"))
+    else:
+        format_error(f"Unknown daemon action '{action}' (expected one of: status, start, stop)")
+        raise typer.Exit(1)
+
+
 if __name__ == "__main__":
     app()
 
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -12,6 +12,8 @@ class JobCompute(BaseModel):
     gpu_count: int = Field(..., gt=0)
     gpu_memory_gb: Optional[int] = Field(None, gt=0)
     interconnect: Optional[str] = None
+    max_nodes: Optional[int] = Field(None, ge=1, le=256)
+    mixed_shapes: bool = False
 
 
 class JobOutput(BaseModel):
@@ -19,9 +21,30 @@ class JobOutput(BaseModel):
     path: str
 
 
+class JobRisk(BaseModel):
+    duration_hours: float = Field(..., gt=0)
+    checkpoint_interval_hours: float = Field(..., gt=0)
+    restart_overhead_hours: float = Field(0.0, ge=0)
+    trials: int = Field(100_000, gt=0, le=1_000_000)
+    seed: Optional[int] = None
+
+
+class JobConstraints(BaseModel):
+    providers: Optional[List[str]] = None
+    exclude_providers: Optional[List[str]] = None
+    max_break_even_hours: Optional[float] = Field(None, ge=0)
+    max_cost_per_hour: Optional[float] = Field(None, gt=0)
+    recommended_only: bool = False
+    spot: Optional[bool] = None
+    sort_by: Optional[Literal["break-even", "hourly-cost", "egress", "expected-cost"]] = None
+    top_k: Optional[int] = Field(None, gt=0)
+
+
 class JobRequest(BaseModel):
     job_name: str
     data: JobData
     compute: JobCompute
     output: Optional[JobOutput] = None
+    risk: Optional[JobRisk] = None
+    constraints: Optional[JobConstraints] = None
 
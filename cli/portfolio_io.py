@@ -0,0 +1,98 @@
+import csv
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Column name -> parser for a single CSV cell. Required columns must be present
+# in the input file; optional ones may be missing or left blank per row.
+REQUIRED_COLUMNS: Dict[str, Callable[[str], Any]] = {
+    "job_name": str,
+    "location": str,
+    "size_gb": float,
+    "gpu_type": str,
+    "gpu_count": int,
+}
+OPTIONAL_COLUMNS: Dict[str, Callable[[str], Any]] = {
+    "gpu_memory_gb": int,
+    "interconnect": str,
+    "duration_hours": float,
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet support requires pyarrow (pip install 'finops-cli[parquet]')")
+    return pa, pq
+
+
+def _load_csv(path: Path) -> Dict[str, List[Any]]:
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise Exception(f"Portfolio file is empty: {path}")
+        raw: Dict[str, List[str]] = {name.strip(): [] for name in header}
+        names = list(raw)
+        for line_number, row in enumerate(reader, start=2):
+            if len(row) != len(names):
+                raise Exception(f"Line {line_number}: expected {len(names)} fields, got {len(row)}")
+            for name, value in zip(names, row):
+                raw[name].append(value)
+
+    columns: Dict[str, List[Any]] = {}
+    for name, parse in {**REQUIRED_COLUMNS, **OPTIONAL_COLUMNS}.items():
+        if name not in raw:
+            continue
+        optional = name in OPTIONAL_COLUMNS
+        try:
+            columns[name] = [
+                None if optional and value.strip() == "" else parse(value.strip())
+                for value in raw[name]
+            ]
+        except ValueError as e:
+            raise Exception(f"Invalid value in column '{name}': {e}")
+    return columns
+
+
+def _load_parquet(path: Path) -> Dict[str, List[Any]]:
+    _, pq = _require_pyarrow()
+    wanted = [*REQUIRED_COLUMNS, *OPTIONAL_COLUMNS]
+    table = pq.read_table(path)
+    return {name: table.column(name).to_pylist() for name in wanted if name in table.column_names}
+
+
+def load_portfolio(path: Path) -> Dict[str, List[Any]]:
+    """Load a portfolio of jobs from CSV or Parquet as a dict of columns"""
+    if path.suffix.lower() == ".parquet":
+        columns = _load_parquet(path)
+    else:
+        columns = _load_csv(path)
+
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise Exception(f"Missing required columns: {', '.join(missing)}")
+
+    # Optional columns that are blank for every row are dropped entirely
+    for name in OPTIONAL_COLUMNS:
+        if name in columns and all(value is None for value in columns[name]):
+            del columns[name]
+    if "duration_hours" in columns and None in columns["duration_hours"]:
+        raise Exception("Column 'duration_hours' must be set for every row or left out entirely")
+    return columns
+
+
+def write_portfolio(columns: Dict[str, List[Any]], path: Path) -> None:
+    """Write result columns to CSV or Parquet, chosen by file extension"""
+    if path.suffix.lower() == ".parquet":
+        pa, pq = _require_pyarrow()
+        pq.write_table(pa.table(columns), path)
+        return
+
+    names = list(columns)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name] for name in names)))
+
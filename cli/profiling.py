@@ -0,0 +1,86 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+
+def allocation_summary(snapshot: tracemalloc.Snapshot, peak_bytes: int, limit: int = 15) -> str:
+    """Summarize live allocations made while tracing, grouped by source line"""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    stats = snapshot.statistics("lineno")
+    lines = [
+        f"Peak traced memory: {peak_bytes / 1024:.1f} KiB",
+        f"Still allocated at end: {sum(stat.size for stat in stats) / 1024:.1f} KiB in {sum(stat.count for stat in stats)} blocks",
+        "",
+        f"Top {limit} allocation sites:",
+    ]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>7} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+class ProfileFiles:
+    """Reports written for a profiled run"""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.paths: List[Path] = []
+
+    def add(self, name: str, content: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / name
+        path.write_text(content)
+        self.paths.append(path)
+        return path
+
+
+@contextmanager
+def profile_run(output_dir: Path, name: str, limit: int = 30) -> Iterator[ProfileFiles]:
+    """
+    Profile the enclosed block with cProfile and tracemalloc.
+
+    Writes <name>-<timestamp>.txt (top functions by cumulative time plus the
+    allocation summary) and <name>-<timestamp>.prof (raw pstats, for snakeviz or
+    `python -m pstats`) to output_dir. Files are written even if the block fails.
+    """
+    files = ProfileFiles(output_dir)
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profile = cProfile.Profile()
+    started = time.perf_counter()
+    profile.enable()
+    try:
+        yield files
+    finally:
+        profile.disable()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        stem = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+        buffer = io.StringIO()
+        pstats.Stats(profile, stream=buffer).sort_stats("cumulative").print_stats(limit)
+        files.add(f"{stem}.txt", "\n".join([
+            f"Profile of {name}",
+            f"Wall time: {elapsed * 1000:.1f} ms",
+            "",
+            buffer.getvalue().strip(),
+            "",
+            allocation_summary(snapshot, peak),
+            "",
+        ]))
+        stats_path = output_dir / f"{stem}.prof"
+        profile.dump_stats(str(stats_path))
+        files.paths.append(stats_path)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Set by the CLI daemon (daemon.py): from_env() then hands every command the same
+# cache, whose recent entries stay in memory between commands
+_shared_cache: Optional["ResponseCache"] = None
+
+
+def share_entries(max_entries: int = 256) -> None:
+    """Keep up to max_entries recent responses in memory for the rest of the process"""
+    global _shared_cache
+    _shared_cache = ResponseCache.from_env()
+    _shared_cache.max_entries = max_entries
+
+
+def default_cache_dir() -> Path:
+    """Per-user cache directory: FINOPS_CACHE_DIR, else the platform's user cache dir"""
+    if os.getenv("FINOPS_CACHE_DIR"):
+        return Path(os.environ["FINOPS_CACHE_DIR"])
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "finops"
+    if sys.platform == "win32":
+        return Path(os.getenv("LOCALAPPDATA", Path.home() / "AppData" / "Local")) / "finops" / "cache"
+    return Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "finops"
+
+
+def cache_key(base_url: str, job: Dict[str, Any]) -> str:
+    """Cache key for an analysis: the API plus the job without its name, canonicalized"""
+    job = {key: value for key, value in job.items() if key != "job_name"}
+    canonical = json.dumps([base_url.rstrip("/"), job], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class CachedResponse:
+    def __init__(self, etag: str, stored_at: float, body: Dict[str, Any]):
+        self.etag = etag
+        self.stored_at = stored_at
+        self.body = body
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.stored_at)
+
+
+class ResponseCache:
+    """
+    Size-bounded on-disk cache of analysis responses and their ETags.
+
+    One JSON file per entry. Reads touch the file, so eviction (oldest mtime
+    first, once the directory exceeds max_bytes) drops the least recently used
+    entries. Writes go through a temporary file and a rename, so concurrent CLI
+    runs never see a partial entry. Unreadable entries count as misses.
+
+    With max_entries, the most recently used entries are also kept in memory and
+    served without reading their file; writes still go to disk.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = 0):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        if _shared_cache is not None and _shared_cache.directory == default_cache_dir():
+            return _shared_cache
+        return cls(max_bytes=int(float(os.getenv("FINOPS_CACHE_MAX_MB", "50")) * 1024 * 1024))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+            os.utime(path)
+            cached = CachedResponse(entry["etag"], entry["stored_at"], entry["body"])
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, cached)
+        return cached
+
+    def put(self, key: str, etag: str, body: Dict[str, Any]) -> None:
+        self._write(key, CachedResponse(etag, time.time(), body))
+        self._evict()
+
+    def refresh(self, key: str, entry: CachedResponse) -> None:
+        """Record a successful revalidation: the entry counts as fresh again"""
+        entry.stored_at = time.time()
+        self._write(key, entry)
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _write(self, key: str, entry: CachedResponse) -> None:
+        self._remember(key, entry)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"etag": entry.etag, "stored_at": entry.stored_at, "body": entry.body}, f)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            pass  # A read-only or full cache directory only costs us the cache
+
+    def _evict(self) -> None:
+        try:
+            files = [(path.stat(), path) for path in self.directory.glob("*.json")]
+        except OSError:
+            return
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= stat.st_size
+            except OSError:
+                pass
@@ -0,0 +1,306 @@
+import hmac
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+TRACEPARENT_HEADER = "traceparent"
+# Set by a caller that wants this hop's spans returned in TRACE_SPANS_HEADER (CLI --trace);
+# its value must match the receiver's TRACE_DEBUG_TOKEN
+TRACE_DEBUG_HEADER = "X-Trace-Debug"
+TRACE_SPANS_HEADER = "X-Trace-Spans"
+# Upper bound for the debug header so it stays well inside client header limits
+MAX_TRACE_HEADER_BYTES = 64 * 1024
+
+
+def parse_traceparent(header: Optional[str]):
+    """Parse a W3C traceparent header into (trace_id, parent_id, sampled)"""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None, None, False
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None, None, False
+    return parts[1], parts[2], bool(flags & 0x01)
+
+
+class Trace:
+    """Spans of one request (or CLI invocation) in this process"""
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], debug: bool = False):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.debug = debug
+        self.spans: List[Dict[str, Any]] = []
+        # Spans returned by downstream services; shown to debug callers, never re-exported
+        self.remote_spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def add_remote(self, spans: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.remote_spans.extend(spans)
+
+    def all_spans(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.spans + self.remote_spans
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, service: str, parent_id: Optional[str]):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.start_ns = time.time_ns()
+        self.attributes: Dict[str, str] = {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = str(value)
+
+    def set_error(self, error: BaseException) -> None:
+        self.error = str(error)
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        record = {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start_ns": self.start_ns,
+            "end_ns": end_ns or time.time_ns(),
+        }
+        if self.attributes:
+            record["attributes"] = self.attributes
+        if self.error:
+            record["error"] = self.error
+        self.trace.add(record)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("finops_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("finops_span", default=None)
+
+
+class FileExporter:
+    """Append spans to a local file as newline-delimited JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with self._lock, open(self.path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+
+    def flush(self, timeout: float = 0) -> None:
+        pass
+
+
+class OTLPExporter:
+    """Post spans as OTLP/JSON to <endpoint>/v1/traces from a background thread"""
+
+    def __init__(self, endpoint: str, service: str):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service = service
+        self._queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=256)
+        self._client = httpx.Client(timeout=5.0)
+        threading.Thread(target=self._run, name="otlp-exporter", daemon=True).start()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass  # Tracing must never slow down or fail a request
+
+    def flush(self, timeout: float = 2.0) -> None:
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                self._client.post(self.url, json=otlp_payload(self.service, spans))
+            except httpx.HTTPError:
+                pass
+            finally:
+                self._queue.task_done()
+
+
+def otlp_payload(service: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert spans to the OTLP/JSON ExportTraceServiceRequest shape"""
+    def string_value(key: str, value: str) -> Dict[str, Any]:
+        return {"key": key, "value": {"stringValue": value}}
+
+    otlp_spans = []
+    for span in spans:
+        status = {"code": 2, "message": span["error"]} if span.get("error") else {"code": 1}
+        otlp_spans.append({
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "parentSpanId": span.get("parent_id") or "",
+            "name": span["name"],
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(span["end_ns"]),
+            "attributes": [string_value(k, v) for k, v in span.get("attributes", {}).items()],
+            "status": status,
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [string_value("service.name", service)]},
+            "scopeSpans": [{"scope": {"name": "finops"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+class Tracer:
+    """
+    Minimal W3C trace-context tracer.
+
+    Sampling is decided where a trace starts (FINOPS_TRACE_SAMPLE_RATE, 0-1, or
+    forced by --trace) and then follows the sampled flag of the incoming
+    traceparent. Spans of sampled traces go to FINOPS_TRACE_FILE and/or
+    FINOPS_TRACE_OTLP_ENDPOINT. The API only returns its spans to --trace when
+    FINOPS_TRACE_DEBUG_TOKEN matches its TRACE_DEBUG_TOKEN. The API and engine use
+    the same variables without the FINOPS_ prefix.
+    """
+
+    def __init__(
+        self, service: str, sample_rate: float = 0.0, exporters: Optional[list] = None, debug_token: Optional[str] = None,
+    ):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.exporters = exporters or []
+        self.debug_token = debug_token
+
+    @classmethod
+    def from_env(cls, service: str, prefix: str = "") -> "Tracer":
+        exporters: list = []
+        if os.getenv(f"{prefix}TRACE_FILE"):
+            exporters.append(FileExporter(os.environ[f"{prefix}TRACE_FILE"]))
+        if os.getenv(f"{prefix}TRACE_OTLP_ENDPOINT"):
+            exporters.append(OTLPExporter(os.environ[f"{prefix}TRACE_OTLP_ENDPOINT"], service))
+        try:
+            sample_rate = float(os.getenv(f"{prefix}TRACE_SAMPLE_RATE", "0"))
+        except ValueError:
+            sample_rate = 0.0
+        return cls(service, sample_rate, exporters, debug_token=os.getenv(f"{prefix}TRACE_DEBUG_TOKEN") or None)
+
+    def debug_authorized(self, header: Optional[str]) -> bool:
+        """Whether a caller's X-Trace-Debug header may see this process's spans"""
+        return (
+            self.debug_token is not None and header is not None
+            and hmac.compare_digest(header.encode(), self.debug_token.encode())
+        )
+
+    def start_trace(self, traceparent: Optional[str] = None, debug: bool = False, force: bool = False) -> Optional[Trace]:
+        """Continue the caller's trace or start a new one; returns None when not sampled"""
+        trace_id, parent_id, sampled = parse_traceparent(traceparent)
+        if trace_id is None:
+            trace_id = secrets.token_hex(16)
+            sampled = force or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        if not sampled:
+            _current_trace.set(None)
+            return None
+        trace = Trace(trace_id, parent_id, debug=debug)
+        _current_trace.set(trace)
+        _current_span.set(None)
+        return trace
+
+    def start_span(self, name: str, **attributes: Any) -> Optional[Span]:
+        trace = _current_trace.get()
+        if trace is None:
+            return None
+        parent = _current_span.get()
+        span = Span(trace, name, self.service, parent.span_id if parent else trace.parent_id)
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Record a child of the current span; yields None when the trace is not sampled"""
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def record_elapsed(self, name: str, **attributes: Any) -> None:
+        """Record a span covering the current span's start until now (e.g. work FastAPI did before the handler)"""
+        parent = _current_span.get()
+        span = self.start_span(name, **attributes)
+        if span is None or parent is None:
+            return
+        span.start_ns = parent.start_ns
+        span.end()
+
+    def inject(self, headers: Dict[str, str]) -> Dict[str, str]:
+        """Add traceparent (and the debug flag) for an outgoing call"""
+        trace = _current_trace.get()
+        if trace is None:
+            return headers
+        span = _current_span.get()
+        parent_id = span.span_id if span else (trace.parent_id or secrets.token_hex(8))
+        headers[TRACEPARENT_HEADER] = f"00-{trace.trace_id}-{parent_id}-01"
+        if trace.debug:
+            headers[TRACE_DEBUG_HEADER] = self.debug_token or "1"
+        return headers
+
+    def collect(self, response_headers) -> None:
+        """Keep spans a downstream service returned for a debug trace"""
+        trace = _current_trace.get()
+        raw = response_headers.get(TRACE_SPANS_HEADER)
+        if trace is None or not trace.debug or not raw:
+            return
+        try:
+            trace.add_remote(json.loads(raw))
+        except ValueError:
+            pass
+
+    def finish(self, trace: Optional[Trace]) -> Optional[str]:
+        """Export a finished trace; returns the X-Trace-Spans header value for debug callers"""
+        if trace is None:
+            return None
+        for exporter in self.exporters:
+            exporter.export(list(trace.spans))
+        if not trace.debug:
+            return None
+        encoded = json.dumps(trace.all_spans(), separators=(",", ":"))
+        return encoded if len(encoded) <= MAX_TRACE_HEADER_BYTES else None
+
+    def current_trace(self) -> Optional[Trace]:
+        return _current_trace.get()
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        for exporter in self.exporters:
+            exporter.flush(timeout)
+
+
+tracer = Tracer.from_env("cli", prefix="FINOPS_")
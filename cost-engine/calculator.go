@@ -1,17 +1,19 @@
 package main
 
 import (
+	"context"
 	"fmt"
 	"math"
 )
 
 // Calculator performs break-even calculations
 type Calculator struct {
-	redis *RedisClient
+	redis  *RedisClient
+	egress *EgressRouter
 }
 
-func NewCalculator(redis *RedisClient) *Calculator {
-	return &Calculator{redis: redis}
+func NewCalculator(redis *RedisClient, egress *EgressRouter) *Calculator {
+	return &Calculator{redis: redis, egress: egress}
 }
 
 // CalculateBreakEven calculates break-even hours for a remote option
@@ -40,12 +42,15 @@ func (c *Calculator) CalculateBreakEven(localCost, remoteCost, egressCost float6
 	return &breakEvenHours, advisory
 }
 
-// AnalyzeOption analyzes a single remote option
+// AnalyzeOption analyzes a single remote option. admitPrice, if set, is asked once
+// the hourly cost is known; a rejected option is omitted before its egress is priced.
 func (c *Calculator) AnalyzeOption(
+	ctx context.Context,
 	instanceKey string,
 	sourceProvider, sourceService, sourceRegion string,
 	localCostPerHour float64,
 	dataSizeGB float64,
+	admitPrice func(costPerHour float64) bool,
 ) (*AnalysisOption, error) {
 	provider, region, instanceType, err := ParseInstanceKey(instanceKey)
 	if err != nil {
@@ -53,7 +58,7 @@ func (c *Calculator) AnalyzeOption(
 	}
 
 	// Get compute price
-	computePrice, err := c.redis.GetComputePrice(provider, region, instanceType)
+	computePrice, err := c.redis.GetComputePrice(ctx, provider, region, instanceType)
 	if err != nil {
 		return nil, fmt.Errorf("failed to get compute price: %w", err)
 	}
@@ -62,20 +67,59 @@ func (c *Calculator) AnalyzeOption(
 		return nil, nil // Silently omit
 	}
 
-	remoteCostPerHour := computePrice.CostPerHour
+	option, err := c.analyzeRemote(ctx, provider, region, computePrice.CostPerHour,
+		sourceProvider, sourceService, sourceRegion, localCostPerHour, dataSizeGB, admitPrice)
+	if option != nil {
+		option.InstanceType = instanceType
+	}
+	return option, err
+}
+
+// AnalyzeComposition analyzes a multi-node remote option, priced at the hourly
+// cost of all its nodes. The data is moved to the composition's region once.
+func (c *Calculator) AnalyzeComposition(
+	ctx context.Context,
+	composition Composition,
+	sourceProvider, sourceService, sourceRegion string,
+	localCostPerHour float64,
+	dataSizeGB float64,
+	admitPrice func(costPerHour float64) bool,
+) (*AnalysisOption, error) {
+	option, err := c.analyzeRemote(ctx, composition.Provider, composition.Region, composition.CostPerHour(),
+		sourceProvider, sourceService, sourceRegion, localCostPerHour, dataSizeGB, admitPrice)
+	if option != nil {
+		option.InstanceType = composition.InstanceType()
+		option.NodeCount = composition.NodeCount()
+		option.Nodes = composition.Nodes
+	}
+	return option, err
+}
+
+// analyzeRemote prices the egress to a remote option whose hourly cost is known
+// and computes its break-even
+func (c *Calculator) analyzeRemote(
+	ctx context.Context,
+	provider, region string,
+	remoteCostPerHour float64,
+	sourceProvider, sourceService, sourceRegion string,
+	localCostPerHour float64,
+	dataSizeGB float64,
+	admitPrice func(costPerHour float64) bool,
+) (*AnalysisOption, error) {
+	if admitPrice != nil && !admitPrice(remoteCostPerHour) {
+		return nil, nil
+	}
 
-	// Get egress price
-	egressKey := BuildEgressKey(sourceProvider, sourceService, sourceRegion, provider, region)
-	egressPrice, err := c.redis.GetEgressPrice(egressKey)
+	// Get cheapest egress route (direct or staged through intermediate regions)
+	egressRoute, err := c.egress.Route(ctx, sourceProvider, sourceService, sourceRegion, provider, region)
 	if err != nil {
 		return nil, fmt.Errorf("failed to get egress price: %w", err)
 	}
-	if egressPrice == nil {
-		c.redis.LogMissingKey("egress", egressKey)
+	if egressRoute == nil {
 		return nil, nil // Silently omit
 	}
 
-	oneTimeEgressCost := egressPrice.CostPerGB * dataSizeGB
+	oneTimeEgressCost := egressRoute.CostPerGB * dataSizeGB
 
 	// Calculate break-even
 	breakEvenHours, advisory := c.CalculateBreakEven(localCostPerHour, remoteCostPerHour, oneTimeEgressCost)
@@ -83,15 +127,14 @@ func (c *Calculator) AnalyzeOption(
 	option := &AnalysisOption{
 		Provider:          provider,
 		Region:            region,
-		InstanceType:      instanceType,
 		ComputeCostPerHour: remoteCostPerHour,
 		OneTimeEgressCost:  oneTimeEgressCost,
 		BreakEvenHours:    breakEvenHours,
 		AdvisoryMessage:   advisory,
 		IsSpotInstance:    false,
 		InterruptionRisk:   nil,
+		EgressRoute:       egressRoute.Hops,
 	}
 
 	return option, nil
 }
-
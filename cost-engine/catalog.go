@@ -0,0 +1,586 @@
+package main
+
+import (
+	"bufio"
+	"context"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"log"
+	"net/http"
+	"net/url"
+	"sort"
+	"strconv"
+	"strings"
+
+	"github.com/redis/go-redis/v9"
+)
+
+// Kinds of catalog entries served under /catalog/{kind}
+const (
+	catalogGPUMaps = "gpu-maps"
+	catalogCompute = "compute"
+	catalogEgress  = "egress"
+)
+
+const (
+	defaultCatalogLimit = 100
+	maxCatalogLimit     = 1000
+	// SCAN calls per page at most, so selective filters over a large keyspace
+	// return a short (even empty) page with a cursor instead of taking long
+	maxCatalogScans = 64
+)
+
+var (
+	errUnknownCatalogKind = errors.New("unknown catalog kind (expected gpu-maps, compute or egress)")
+	errInvalidCursor      = errors.New("invalid cursor for this query")
+)
+
+// CatalogQuery is one page request. Cursor is opaque to callers: "" starts from the
+// beginning, "s<n>" resumes a SCAN at cursor n and "g<scan>:<sscan>:<map key>"
+// resumes a walk of the GPU maps (see computeByGPUType).
+type CatalogQuery struct {
+	Kind     string
+	Provider string
+	Region   string
+	GPUType  string
+	Cursor   string
+	Limit    int
+}
+
+// ParseCatalogQuery validates the path kind and query parameters of a catalog request
+func ParseCatalogQuery(kind string, values url.Values) (CatalogQuery, error) {
+	query := CatalogQuery{
+		Kind:     kind,
+		Provider: values.Get("provider"),
+		Region:   values.Get("region"),
+		GPUType:  values.Get("gpu_type"),
+		Cursor:   values.Get("cursor"),
+		Limit:    defaultCatalogLimit,
+	}
+	switch kind {
+	case catalogGPUMaps, catalogCompute:
+	case catalogEgress:
+		if query.GPUType != "" {
+			return query, fmt.Errorf("gpu_type does not apply to egress prices")
+		}
+	default:
+		return query, errUnknownCatalogKind
+	}
+	if limit := values.Get("limit"); limit != "" {
+		n, err := strconv.Atoi(limit)
+		if err != nil || n < 1 || n > maxCatalogLimit {
+			return query, fmt.Errorf("limit must be between 1 and %d", maxCatalogLimit)
+		}
+		query.Limit = n
+	}
+	if query.Cursor != "" {
+		var err error
+		if query.Kind == catalogCompute && query.GPUType != "" {
+			_, err = parseGPUTypeCursor(query.Cursor)
+		} else if query.Cursor[0] != 's' {
+			err = errInvalidCursor
+		} else {
+			_, err = strconv.ParseUint(query.Cursor[1:], 10, 64)
+		}
+		if err != nil {
+			return query, errInvalidCursor
+		}
+	}
+	return query, nil
+}
+
+// CatalogGPUMap is a gpu_map:{type}:{count} set: the instances offering a GPU shape
+type CatalogGPUMap struct {
+	Key       string   `json:"key"`
+	GPUType   string   `json:"gpu_type"`
+	GPUCount  int      `json:"gpu_count"`
+	Instances []string `json:"instances"`
+}
+
+// CatalogCompute is a compute:{provider}:{region}:{instance_type} price
+type CatalogCompute struct {
+	Key          string  `json:"key"`
+	Provider     string  `json:"provider"`
+	Region       string  `json:"region"`
+	InstanceType string  `json:"instance_type"`
+	GPUType      string  `json:"gpu_type,omitempty"` // Only known when filtering by GPU type
+	CostPerHour  float64 `json:"cost_per_hour"`
+	GPUCount     int     `json:"gpu_count"`
+	GPUMemoryGB  *int    `json:"gpu_memory_gb,omitempty"`
+	Interconnect *string `json:"interconnect,omitempty"`
+}
+
+// CatalogEgress is an egress price from a source location; Destination is
+// "INTERNET" or the "{provider}:{region}" of an intra-cloud destination
+type CatalogEgress struct {
+	Key         string  `json:"key"`
+	Provider    string  `json:"provider"`
+	Service     string  `json:"service"`
+	Region      string  `json:"region"`
+	Destination string  `json:"destination"`
+	CostPerGB   float64 `json:"cost_per_gb"`
+}
+
+// catalogStore is the subset of Redis the catalog reads
+type catalogStore interface {
+	Scan(ctx context.Context, cursor uint64, match string, count int64) ([]string, uint64, error)
+	MGet(ctx context.Context, keys ...string) ([]interface{}, error)
+	SMembers(ctx context.Context, keys []string) ([][]string, error)
+	SScan(ctx context.Context, key string, cursor uint64, match string, count int64) ([]string, uint64, error)
+}
+
+type redisCatalogStore struct {
+	client *redis.Client
+}
+
+func (s redisCatalogStore) Scan(ctx context.Context, cursor uint64, match string, count int64) ([]string, uint64, error) {
+	return s.client.Scan(ctx, cursor, match, count).Result()
+}
+
+func (s redisCatalogStore) MGet(ctx context.Context, keys ...string) ([]interface{}, error) {
+	return s.client.MGet(ctx, keys...).Result()
+}
+
+func (s redisCatalogStore) SScan(ctx context.Context, key string, cursor uint64, match string, count int64) ([]string, uint64, error) {
+	return s.client.SScan(ctx, key, cursor, match, count).Result()
+}
+
+// SMembers reads several sets in one round trip
+func (s redisCatalogStore) SMembers(ctx context.Context, keys []string) ([][]string, error) {
+	pipe := s.client.Pipeline()
+	cmds := make([]*redis.StringSliceCmd, len(keys))
+	for i, key := range keys {
+		cmds[i] = pipe.SMembers(ctx, key)
+	}
+	if _, err := pipe.Exec(ctx); err != nil && err != redis.Nil {
+		return nil, err
+	}
+	members := make([][]string, len(keys))
+	for i, cmd := range cmds {
+		members[i] = cmd.Val()
+	}
+	return members, nil
+}
+
+// Catalog serves the price catalog page by page. Pages come from incremental SCAN
+// (never KEYS), so browsing a large catalog does not block Redis, and are streamed
+// to the caller as they are read. SCAN may return a key twice across pages while
+// Redis resizes its tables; callers that need uniqueness should deduplicate on key.
+// A page holds about Limit entries: SCAN batches are never split, so it can hold
+// somewhat more, or fewer (even none) when filters are selective; only a null
+// next_cursor means the listing is complete.
+type Catalog struct {
+	store catalogStore
+}
+
+func NewCatalog(store catalogStore) *Catalog {
+	return &Catalog{store: store}
+}
+
+// ServeHTTP handles GET /catalog/{kind}?provider=&region=&gpu_type=&cursor=&limit=
+func (c *Catalog) ServeHTTP(w http.ResponseWriter, r *http.Request) {
+	if r.Method != http.MethodGet {
+		http.Error(w, "Method not allowed", http.StatusMethodNotAllowed)
+		return
+	}
+	query, err := ParseCatalogQuery(strings.TrimPrefix(r.URL.Path, "/catalog/"), r.URL.Query())
+	if errors.Is(err, errUnknownCatalogKind) {
+		http.Error(w, err.Error(), http.StatusNotFound)
+		return
+	}
+	if err != nil {
+		http.Error(w, err.Error(), http.StatusBadRequest)
+		return
+	}
+
+	page := &catalogPageWriter{w: w, kind: query.Kind}
+	next, err := c.Page(r.Context(), query, page.Item)
+	if err != nil && !page.started {
+		http.Error(w, fmt.Sprintf("Catalog unavailable: %v", err), http.StatusServiceUnavailable)
+		return
+	}
+	if err != nil {
+		// The page ends early; next resumes where it stopped
+		log.Printf("WARNING: Catalog page for %s cut short: %v", query.Kind, err)
+	}
+	page.Finish(next)
+}
+
+// Page reads one page of query, passing each entry to emit, and returns the cursor
+// of the next page ("" after the last one). On error, the returned cursor resumes
+// without losing entries, though some already emitted may come again.
+func (c *Catalog) Page(ctx context.Context, query CatalogQuery, emit func(interface{}) error) (string, error) {
+	if query.Kind == catalogCompute && query.GPUType != "" {
+		return c.computeByGPUType(ctx, query, emit)
+	}
+	var pattern string
+	switch query.Kind {
+	case catalogGPUMaps:
+		pattern = "gpu_map:" + globOrAny(query.GPUType) + ":*"
+	case catalogCompute:
+		pattern = "compute:" + globOrAny(query.Provider) + ":" + globOrAny(query.Region) + ":*"
+	case catalogEgress:
+		pattern = "egress:" + globOrAny(query.Provider) + ":*"
+	default:
+		return "", errUnknownCatalogKind
+	}
+
+	var cursor uint64
+	if query.Cursor != "" {
+		cursor, _ = strconv.ParseUint(query.Cursor[1:], 10, 64)
+	}
+	emitted := 0
+	for scans := 1; ; scans++ {
+		keys, next, err := c.store.Scan(ctx, cursor, pattern, int64(query.Limit))
+		if err != nil {
+			return scanCursor(cursor), err
+		}
+		n, err := c.emitBatch(ctx, query, keys, emit)
+		if err != nil {
+			return scanCursor(cursor), err
+		}
+		emitted += n
+		cursor = next
+		if cursor == 0 {
+			return "", nil
+		}
+		if emitted >= query.Limit || scans >= maxCatalogScans {
+			return scanCursor(cursor), nil
+		}
+	}
+}
+
+func scanCursor(cursor uint64) string {
+	return "s" + strconv.FormatUint(cursor, 10)
+}
+
+// emitBatch reads the values of one SCAN batch and emits the entries that match
+// the filters exactly (glob patterns can match across ':' separators)
+func (c *Catalog) emitBatch(ctx context.Context, query CatalogQuery, keys []string, emit func(interface{}) error) (int, error) {
+	if len(keys) == 0 {
+		return 0, nil
+	}
+	sort.Strings(keys)
+	emitted := 0
+	switch query.Kind {
+	case catalogGPUMaps:
+		members, err := c.store.SMembers(ctx, keys)
+		if err != nil {
+			return 0, err
+		}
+		for i, key := range keys {
+			entry, ok := gpuMapEntry(key, members[i], query)
+			if !ok {
+				continue
+			}
+			if err := emit(entry); err != nil {
+				return emitted, err
+			}
+			emitted++
+		}
+	case catalogCompute, catalogEgress:
+		values, err := c.store.MGet(ctx, keys...)
+		if err != nil {
+			return 0, err
+		}
+		for i, key := range keys {
+			raw, ok := values[i].(string)
+			if !ok {
+				continue // Deleted between SCAN and MGET
+			}
+			var entry interface{}
+			if query.Kind == catalogCompute {
+				entry, ok = computeEntry(key, raw, query)
+			} else {
+				entry, ok = egressEntry(key, raw, query)
+			}
+			if !ok {
+				continue
+			}
+			if err := emit(entry); err != nil {
+				return emitted, err
+			}
+			emitted++
+		}
+	}
+	return emitted, nil
+}
+
+// gpuTypeCursor is a position in the GPU maps of one GPU type: the SSCAN cursor
+// within mapKey, a map from the SCAN batch at cursor scan. An empty mapKey stands
+// for the first map of that batch.
+type gpuTypeCursor struct {
+	scan   uint64
+	set    uint64
+	mapKey string
+}
+
+func parseGPUTypeCursor(cursor string) (gpuTypeCursor, error) {
+	if cursor == "" {
+		return gpuTypeCursor{}, nil
+	}
+	parts := strings.SplitN(cursor[1:], ":", 3)
+	if cursor[0] != 'g' || len(parts) != 3 {
+		return gpuTypeCursor{}, errInvalidCursor
+	}
+	scan, err := strconv.ParseUint(parts[0], 10, 64)
+	if err != nil {
+		return gpuTypeCursor{}, errInvalidCursor
+	}
+	set, err := strconv.ParseUint(parts[1], 10, 64)
+	if err != nil {
+		return gpuTypeCursor{}, errInvalidCursor
+	}
+	return gpuTypeCursor{scan: scan, set: set, mapKey: parts[2]}, nil
+}
+
+func (p gpuTypeCursor) String() string {
+	return "g" + strconv.FormatUint(p.scan, 10) + ":" + strconv.FormatUint(p.set, 10) + ":" + p.mapKey
+}
+
+// computeByGPUType walks the GPU maps of one GPU type, which index its instances;
+// compute keys alone do not say which GPU they carry. Maps are found with SCAN and
+// read with SSCAN from the cursor, so a page costs a bounded number of round trips
+// and holds about Limit instances however many the GPU type has. As with SCAN, an
+// instance may come twice across pages.
+func (c *Catalog) computeByGPUType(ctx context.Context, query CatalogQuery, emit func(interface{}) error) (string, error) {
+	pos, _ := parseGPUTypeCursor(query.Cursor)
+	match := globOrAny(query.Provider) + ":" + globOrAny(query.Region) + ":*"
+	emitted := 0
+	for calls := 1; ; calls++ {
+		resume := pos
+		var done bool
+		var err error
+		if pos.mapKey == "" {
+			pos, done, err = c.nextGPUMap(ctx, query.GPUType, pos.scan, "")
+		} else {
+			var instances []string
+			instances, pos.set, err = c.store.SScan(ctx, pos.mapKey, pos.set, match, int64(query.Limit-emitted))
+			if err != nil {
+				return resume.String(), err
+			}
+			n, err := c.emitInstances(ctx, query, instances, emit)
+			if err != nil {
+				return resume.String(), err
+			}
+			emitted += n
+			if pos.set == 0 {
+				pos, done, err = c.nextGPUMap(ctx, query.GPUType, pos.scan, pos.mapKey)
+			}
+		}
+		if err != nil {
+			return resume.String(), err
+		}
+		if done {
+			return "", nil
+		}
+		if emitted >= query.Limit || calls >= maxCatalogScans {
+			return pos.String(), nil
+		}
+	}
+}
+
+// nextGPUMap returns the first map of gpuType after the key after in the SCAN batch
+// at cursor scan, or the start of the next batch when it has none; done is set
+// once the SCAN is complete
+func (c *Catalog) nextGPUMap(ctx context.Context, gpuType string, scan uint64, after string) (gpuTypeCursor, bool, error) {
+	keys, next, err := c.store.Scan(ctx, scan, "gpu_map:"+globEscape(gpuType)+":*", scanBatchSize)
+	if err != nil {
+		return gpuTypeCursor{}, false, err
+	}
+	sort.Strings(keys)
+	for _, key := range keys {
+		if mapType, _, ok := parseGPUMapKey(key); ok && mapType == gpuType && key > after {
+			return gpuTypeCursor{scan: scan, mapKey: key}, false, nil
+		}
+	}
+	return gpuTypeCursor{scan: next}, next == 0, nil
+}
+
+// emitInstances reads the compute prices of one SSCAN batch of a GPU map
+func (c *Catalog) emitInstances(ctx context.Context, query CatalogQuery, instances []string, emit func(interface{}) error) (int, error) {
+	if len(instances) == 0 {
+		return 0, nil
+	}
+	sort.Strings(instances)
+	keys := make([]string, len(instances))
+	for i, instance := range instances {
+		keys[i] = "compute:" + instance
+	}
+	values, err := c.store.MGet(ctx, keys...)
+	if err != nil {
+		return 0, err
+	}
+	emitted := 0
+	for i, key := range keys {
+		raw, ok := values[i].(string)
+		if !ok {
+			continue // Listed in the map but not priced
+		}
+		entry, ok := computeEntry(key, raw, query)
+		if !ok {
+			continue
+		}
+		entry.GPUType = query.GPUType
+		if err := emit(entry); err != nil {
+			return emitted, err
+		}
+		emitted++
+	}
+	return emitted, nil
+}
+
+func parseGPUMapKey(key string) (gpuType string, gpuCount int, ok bool) {
+	parts := strings.Split(key, ":")
+	if len(parts) != 3 || parts[0] != "gpu_map" {
+		return "", 0, false
+	}
+	count, err := strconv.Atoi(parts[2])
+	if err != nil {
+		return "", 0, false
+	}
+	return parts[1], count, true
+}
+
+func gpuMapEntry(key string, members []string, query CatalogQuery) (CatalogGPUMap, bool) {
+	gpuType, gpuCount, ok := parseGPUMapKey(key)
+	if !ok || (query.GPUType != "" && gpuType != query.GPUType) {
+		return CatalogGPUMap{}, false
+	}
+	instances := make([]string, 0, len(members))
+	for _, instance := range members {
+		if matchesInstance(instance, query) {
+			instances = append(instances, instance)
+		}
+	}
+	// Provider and region filters narrow the instances; maps left empty are skipped
+	if len(instances) == 0 && (query.Provider != "" || query.Region != "") {
+		return CatalogGPUMap{}, false
+	}
+	sort.Strings(instances)
+	return CatalogGPUMap{Key: key, GPUType: gpuType, GPUCount: gpuCount, Instances: instances}, true
+}
+
+func matchesInstance(instanceKey string, query CatalogQuery) bool {
+	provider, region, _, err := ParseInstanceKey(instanceKey)
+	return err == nil && (query.Provider == "" || provider == query.Provider) &&
+		(query.Region == "" || region == query.Region)
+}
+
+func computeEntry(key, raw string, query CatalogQuery) (CatalogCompute, bool) {
+	instanceKey := strings.TrimPrefix(key, "compute:")
+	provider, region, instanceType, err := ParseInstanceKey(instanceKey)
+	if err != nil || !matchesInstance(instanceKey, query) {
+		return CatalogCompute{}, false
+	}
+	var price ComputePrice
+	if err := json.Unmarshal([]byte(raw), &price); err != nil {
+		log.Printf("WARNING: Failed to unmarshal compute price %s: %v", key, err)
+		return CatalogCompute{}, false
+	}
+	return CatalogCompute{
+		Key:          key,
+		Provider:     provider,
+		Region:       region,
+		InstanceType: instanceType,
+		CostPerHour:  price.CostPerHour,
+		GPUCount:     price.GPUCount,
+		GPUMemoryGB:  price.GPUMemoryGB,
+		Interconnect: price.Interconnect,
+	}, true
+}
+
+func egressEntry(key, raw string, query CatalogQuery) (CatalogEgress, bool) {
+	parts := strings.Split(key, ":")
+	var destination string
+	switch {
+	case len(parts) == 5 && parts[4] == "INTERNET":
+		destination = "INTERNET"
+	case len(parts) == 6:
+		destination = parts[4] + ":" + parts[5]
+	default:
+		return CatalogEgress{}, false
+	}
+	if (query.Provider != "" && parts[1] != query.Provider) || (query.Region != "" && parts[3] != query.Region) {
+		return CatalogEgress{}, false
+	}
+	var price EgressPrice
+	if err := json.Unmarshal([]byte(raw), &price); err != nil {
+		log.Printf("WARNING: Failed to unmarshal egress price %s: %v", key, err)
+		return CatalogEgress{}, false
+	}
+	return CatalogEgress{
+		Key:         key,
+		Provider:    parts[1],
+		Service:     parts[2],
+		Region:      parts[3],
+		Destination: destination,
+		CostPerGB:   price.CostPerGB,
+	}, true
+}
+
+// globOrAny turns a filter value into a SCAN MATCH segment
+func globOrAny(value string) string {
+	if value == "" {
+		return "*"
+	}
+	return globEscape(value)
+}
+
+// globEscape escapes the glob metacharacters of a literal for SCAN MATCH
+func globEscape(value string) string {
+	var b strings.Builder
+	for _, r := range value {
+		if strings.ContainsRune(`*?[]\`, r) {
+			b.WriteByte('\\')
+		}
+		b.WriteRune(r)
+	}
+	return b.String()
+}
+
+// catalogPageWriter streams a page as {"kind", "items": [...], "next_cursor"},
+// writing each entry as soon as it is read
+type catalogPageWriter struct {
+	w       http.ResponseWriter
+	buf     *bufio.Writer
+	kind    string
+	started bool
+}
+
+func (p *catalogPageWriter) start() {
+	p.started = true
+	p.w.Header().Set("Content-Type", "application/json")
+	p.buf = bufio.NewWriter(p.w)
+	kind, _ := json.Marshal(p.kind)
+	fmt.Fprintf(p.buf, `{"kind":%s,"items":[`, kind)
+}
+
+// Item writes one entry
+func (p *catalogPageWriter) Item(entry interface{}) error {
+	encoded, err := json.Marshal(entry)
+	if err != nil {
+		return err
+	}
+	if !p.started {
+		p.start()
+	} else {
+		p.buf.WriteByte(',')
+	}
+	_, err = p.buf.Write(encoded)
+	return err
+}
+
+// Finish closes the items and writes the cursor of the next page (null after the last)
+func (p *catalogPageWriter) Finish(next string) {
+	if !p.started {
+		p.start()
+	}
+	cursor := []byte("null")
+	if next != "" {
+		cursor, _ = json.Marshal(next)
+	}
+	fmt.Fprintf(p.buf, `],"next_cursor":%s}`+"\n", cursor)
+	p.buf.Flush()
+}
@@ -0,0 +1,262 @@
+package main
+
+import (
+	"context"
+	"encoding/json"
+	"net/http/httptest"
+	"net/url"
+	"path"
+	"sort"
+	"strconv"
+	"testing"
+)
+
+// memoryCatalog is a catalogStore whose SCAN walks sorted keys, count at a time
+type memoryCatalog struct {
+	values map[string]string
+	sets   map[string][]string
+	scans  int
+}
+
+func (m *memoryCatalog) Scan(_ context.Context, cursor uint64, match string, count int64) ([]string, uint64, error) {
+	m.scans++
+	keys := make([]string, 0, len(m.values)+len(m.sets))
+	for key := range m.values {
+		keys = append(keys, key)
+	}
+	for key := range m.sets {
+		keys = append(keys, key)
+	}
+	sort.Strings(keys)
+	end := int(cursor) + int(count)
+	if end >= len(keys) {
+		end = len(keys)
+	}
+	batch := make([]string, 0)
+	for _, key := range keys[cursor:end] {
+		if ok, _ := path.Match(match, key); ok {
+			batch = append(batch, key)
+		}
+	}
+	if end == len(keys) {
+		return batch, 0, nil
+	}
+	return batch, uint64(end), nil
+}
+
+func (m *memoryCatalog) MGet(_ context.Context, keys ...string) ([]interface{}, error) {
+	values := make([]interface{}, len(keys))
+	for i, key := range keys {
+		if value, ok := m.values[key]; ok {
+			values[i] = value
+		}
+	}
+	return values, nil
+}
+
+func (m *memoryCatalog) SMembers(_ context.Context, keys []string) ([][]string, error) {
+	members := make([][]string, len(keys))
+	for i, key := range keys {
+		members[i] = m.sets[key]
+	}
+	return members, nil
+}
+
+// SScan walks a set's sorted members, count at a time
+func (m *memoryCatalog) SScan(_ context.Context, key string, cursor uint64, match string, count int64) ([]string, uint64, error) {
+	m.scans++
+	members := append([]string(nil), m.sets[key]...)
+	sort.Strings(members)
+	end := int(cursor) + int(count)
+	if end >= len(members) {
+		end = len(members)
+	}
+	batch := make([]string, 0)
+	for _, member := range members[cursor:end] {
+		if ok, _ := path.Match(match, member); ok {
+			batch = append(batch, member)
+		}
+	}
+	if end == len(members) {
+		return batch, 0, nil
+	}
+	return batch, uint64(end), nil
+}
+
+func testCatalog() *memoryCatalog {
+	store := &memoryCatalog{values: map[string]string{}, sets: map[string][]string{}}
+	for i := 0; i < 40; i++ {
+		provider := []string{"aws", "gcp"}[i%2]
+		instance := provider + ":region-" + strconv.Itoa(i%4) + ":type-" + strconv.Itoa(i)
+		store.values["compute:"+instance] = `{"cost_per_hour": ` + strconv.Itoa(10+i) + `, "gpu_count": 8}`
+		gpuType := []string{"H100", "A100"}[i%3%2]
+		store.sets["gpu_map:"+gpuType+":8"] = append(store.sets["gpu_map:"+gpuType+":8"], instance)
+	}
+	store.values["egress:aws:s3:region-0:INTERNET"] = `{"cost_per_gb": 0.09}`
+	store.values["egress:aws:s3:region-0:aws:region-1"] = `{"cost_per_gb": 0.02}`
+	store.values["egress:gcp:gcs:region-1:INTERNET"] = `{"cost_per_gb": 0.12}`
+	return store
+}
+
+// listAll follows cursors to the end, returning the keys of every entry
+func listAll(t *testing.T, catalog *Catalog, query CatalogQuery) []string {
+	t.Helper()
+	var keys []string
+	for pages := 0; ; pages++ {
+		if pages > 100 {
+			t.Fatal("pagination does not terminate")
+		}
+		next, err := catalog.Page(context.Background(), query, func(entry interface{}) error {
+			encoded, _ := json.Marshal(entry)
+			var decoded struct{ Key string }
+			json.Unmarshal(encoded, &decoded)
+			keys = append(keys, decoded.Key)
+			return nil
+		})
+		if err != nil {
+			t.Fatal(err)
+		}
+		if next == "" {
+			return keys
+		}
+		query.Cursor = next
+	}
+}
+
+func TestCatalog_PaginatesComputeWithFilters(t *testing.T) {
+	catalog := NewCatalog(testCatalog())
+	all := listAll(t, catalog, CatalogQuery{Kind: catalogCompute, Limit: 7})
+	if len(all) != 40 {
+		t.Fatalf("expected 40 compute prices, got %d", len(all))
+	}
+	aws := listAll(t, catalog, CatalogQuery{Kind: catalogCompute, Provider: "aws", Region: "region-2", Limit: 3})
+	if len(aws) != 10 {
+		t.Fatalf("expected 10 aws prices in region-2, got %d: %v", len(aws), aws)
+	}
+	for _, key := range aws {
+		if provider, region, _, _ := ParseInstanceKey(key[len("compute:"):]); provider != "aws" || region != "region-2" {
+			t.Errorf("filter let %s through", key)
+		}
+	}
+}
+
+func TestCatalog_ComputeByGPUTypeUsesTheGPUMaps(t *testing.T) {
+	store := testCatalog()
+	catalog := NewCatalog(store)
+	h100 := listAll(t, catalog, CatalogQuery{Kind: catalogCompute, GPUType: "H100", Limit: 5})
+	if len(h100) != len(store.sets["gpu_map:H100:8"]) {
+		t.Fatalf("expected every H100 instance, got %d", len(h100))
+	}
+	for _, key := range h100 {
+		if !containsString(store.sets["gpu_map:H100:8"], key[len("compute:"):]) {
+			t.Errorf("%s is not an H100 instance", key)
+		}
+	}
+	gcp := listAll(t, catalog, CatalogQuery{Kind: catalogCompute, GPUType: "A100", Provider: "gcp", Limit: 100})
+	for _, key := range gcp {
+		if key[:len("compute:gcp:")] != "compute:gcp:" {
+			t.Errorf("filter let %s through", key)
+		}
+	}
+}
+
+func TestCatalog_ComputeByGPUTypeReadsOnePageOfTheMap(t *testing.T) {
+	store := testCatalog()
+	for i := 0; i < 1000; i++ {
+		instance := "aws:region-9:big-" + strconv.Itoa(i)
+		store.values["compute:"+instance] = `{"cost_per_hour": 1, "gpu_count": 1}`
+		store.sets["gpu_map:H100:1"] = append(store.sets["gpu_map:H100:1"], instance)
+	}
+	catalog := NewCatalog(store)
+	query := CatalogQuery{Kind: catalogCompute, GPUType: "H100", Limit: 10}
+	emitted := 0
+	next, err := catalog.Page(context.Background(), query, func(interface{}) error { emitted++; return nil })
+	if err != nil || next == "" || emitted != 10 {
+		t.Fatalf("expected a page of 10 with a cursor, got %d, %q (%v)", emitted, next, err)
+	}
+	// Resuming reads on from the cursor rather than re-reading the map
+	store.scans = 0
+	emitted = 0
+	query.Cursor = next
+	if _, err := catalog.Page(context.Background(), query, func(interface{}) error { emitted++; return nil }); err != nil || emitted != 10 || store.scans > 2 {
+		t.Errorf("expected the next 10 in at most 2 round trips, got %d in %d (%v)", emitted, store.scans, err)
+	}
+	all := listAll(t, catalog, CatalogQuery{Kind: catalogCompute, GPUType: "H100", Limit: 100})
+	if len(all) != len(store.sets["gpu_map:H100:1"])+len(store.sets["gpu_map:H100:8"]) {
+		t.Errorf("expected every H100 instance across both maps, got %d", len(all))
+	}
+}
+
+func TestCatalog_GPUMapsAndEgress(t *testing.T) {
+	catalog := NewCatalog(testCatalog())
+	maps := listAll(t, catalog, CatalogQuery{Kind: catalogGPUMaps, Limit: 1})
+	if len(maps) != 2 {
+		t.Fatalf("expected 2 GPU maps, got %v", maps)
+	}
+	egress := listAll(t, catalog, CatalogQuery{Kind: catalogEgress, Provider: "aws", Limit: 10})
+	if len(egress) != 2 {
+		t.Fatalf("expected 2 aws egress prices, got %v", egress)
+	}
+}
+
+func TestCatalog_SelectiveFilterBoundsScansPerPage(t *testing.T) {
+	store := testCatalog()
+	for i := 0; i < 100; i++ {
+		store.values["compute:aws:filler:type-"+strconv.Itoa(i)] = `{"cost_per_hour": 1}`
+	}
+	catalog := NewCatalog(store)
+	next, err := catalog.Page(context.Background(), CatalogQuery{Kind: catalogCompute, Provider: "azure", Limit: 1},
+		func(interface{}) error { return nil })
+	if err != nil || next == "" || store.scans != maxCatalogScans {
+		t.Errorf("expected a short page after %d scans with a cursor, got %q after %d (%v)", maxCatalogScans, next, store.scans, err)
+	}
+}
+
+func TestParseCatalogQuery(t *testing.T) {
+	for kind, values := range map[string]url.Values{
+		"prices":       {},
+		catalogEgress:  {"gpu_type": {"H100"}},
+		catalogCompute: {"limit": {"5000"}},
+		catalogGPUMaps: {"cursor": {"k:aws:x:y"}},
+	} {
+		if _, err := ParseCatalogQuery(kind, values); err == nil {
+			t.Errorf("expected %s %v to be rejected", kind, values)
+		}
+	}
+	if _, err := ParseCatalogQuery(catalogCompute, url.Values{"gpu_type": {"H100"}, "cursor": {"s12"}}); err == nil {
+		t.Error("expected a SCAN cursor to be rejected for a GPU type walk")
+	}
+	query, err := ParseCatalogQuery(catalogCompute, url.Values{"gpu_type": {"H100"}, "cursor": {"g12:3:gpu_map:H100:8"}, "limit": {"10"}})
+	if err != nil || query.Limit != 10 {
+		t.Errorf("unexpected %+v, %v", query, err)
+	}
+	if globEscape("H100*[x]") != `H100\*\[x\]` {
+		t.Errorf("glob metacharacters must be escaped, got %s", globEscape("H100*[x]"))
+	}
+}
+
+func TestCatalog_ServeHTTPStreamsAPage(t *testing.T) {
+	catalog := NewCatalog(testCatalog())
+	recorder := httptest.NewRecorder()
+	catalog.ServeHTTP(recorder, httptest.NewRequest("GET", "/catalog/egress?provider=gcp", nil))
+	var page struct {
+		Kind       string          `json:"kind"`
+		Items      []CatalogEgress `json:"items"`
+		NextCursor *string         `json:"next_cursor"`
+	}
+	if err := json.Unmarshal(recorder.Body.Bytes(), &page); err != nil {
+		t.Fatalf("invalid page %q: %v", recorder.Body.String(), err)
+	}
+	if page.Kind != catalogEgress || len(page.Items) != 1 || page.NextCursor != nil {
+		t.Errorf("unexpected page %+v", page)
+	}
+	if page.Items[0].Destination != "INTERNET" || page.Items[0].CostPerGB != 0.12 {
+		t.Errorf("unexpected entry %+v", page.Items[0])
+	}
+
+	recorder = httptest.NewRecorder()
+	catalog.ServeHTTP(recorder, httptest.NewRequest("GET", "/catalog/prices", nil))
+	if recorder.Code != 404 {
+		t.Errorf("expected 404 for an unknown kind, got %d", recorder.Code)
+	}
+}
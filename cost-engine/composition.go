@@ -0,0 +1,363 @@
+package main
+
+import (
+	"context"
+	"fmt"
+	"log"
+	"math"
+	"sort"
+	"strings"
+)
+
+// A job asking for more GPUs than any single instance has (16 or 64 H100s) can
+// run on several nodes of the same GPU type in one provider and region. The
+// resolver searches such compositions: N identical nodes of every matching
+// instance type and, when the job allows mixed shapes, the cheapest mix of
+// instance types per provider and region.
+
+const (
+	// defaultMaxNodes bounds compositions for jobs that do not set max_nodes
+	defaultMaxNodes = 64
+	// maxNodesLimit is the largest max_nodes a request may ask for
+	maxNodesLimit = 256
+)
+
+// CompositionNode is Count nodes of one instance type within a composition
+type CompositionNode struct {
+	InstanceType string  `json:"instance_type"`
+	GPUCount     int     `json:"gpu_count"` // Per node
+	Count        int     `json:"count"`
+	CostPerHour  float64 `json:"cost_per_hour"` // Per node
+}
+
+// Composition is a set of nodes in one provider and region running one job
+type Composition struct {
+	Provider string
+	Region   string
+	Nodes    []CompositionNode
+}
+
+func (c Composition) NodeCount() int {
+	n := 0
+	for _, node := range c.Nodes {
+		n += node.Count
+	}
+	return n
+}
+
+func (c Composition) GPUCount() int {
+	n := 0
+	for _, node := range c.Nodes {
+		n += node.Count * node.GPUCount
+	}
+	return n
+}
+
+// CostPerHour is the hourly cost of all nodes together
+func (c Composition) CostPerHour() float64 {
+	total := 0.0
+	for _, node := range c.Nodes {
+		total += float64(node.Count) * node.CostPerHour
+	}
+	return total
+}
+
+// InstanceType labels the composition, e.g. "2x p5.48xlarge" or
+// "1x p5.48xlarge + 2x p4d.24xlarge"
+func (c Composition) InstanceType() string {
+	parts := make([]string, len(c.Nodes))
+	for i, node := range c.Nodes {
+		parts[i] = fmt.Sprintf("%dx %s", node.Count, node.InstanceType)
+	}
+	return strings.Join(parts, " + ")
+}
+
+// InstanceKey is a key of the composition's provider and region, for the
+// constraints that only look at those
+func (c Composition) InstanceKey() string {
+	return fmt.Sprintf("%s:%s:%s", c.Provider, c.Region, c.Nodes[0].InstanceType)
+}
+
+// nodeCandidate is a priced instance that compositions may use as a node
+type nodeCandidate struct {
+	provider     string
+	region       string
+	instanceType string
+	gpus         int
+	costPerHour  float64
+	// Nodes of one job share a fabric and a memory size
+	gpuMemoryGB  int
+	interconnect string
+}
+
+func (n nodeCandidate) node(count int) CompositionNode {
+	return CompositionNode{InstanceType: n.instanceType, GPUCount: n.gpus, Count: count, CostPerHour: n.costPerHour}
+}
+
+// compositionBound is how many nodes compositions for compute may use, and
+// whether they are searched when single instances with the requested GPU count exist
+func compositionBound(compute JobCompute) (maxNodes int, always bool) {
+	if compute.MaxNodes != nil {
+		return *compute.MaxNodes, true
+	}
+	return defaultMaxNodes, false
+}
+
+// ResolveCompositions finds compositions of gpuType nodes with at least
+// compute.GPUCount GPUs in total and at most maxNodes nodes, each node matching
+// the job's memory and interconnect filters. Instances with exactly GPUCount
+// GPUs are left to ResolveInstances. Compositions are returned cheapest first.
+func (h *HardwareMapResolver) ResolveCompositions(ctx context.Context, compute JobCompute, maxNodes int) ([]Composition, error) {
+	ctx, span := StartSpan(ctx, "resolve_compositions")
+	defer span.End()
+
+	shapes, err := h.redis.GetGPUShapes(ctx, compute.GPUType)
+	if err != nil {
+		return nil, fmt.Errorf("failed to resolve GPU shapes: %w", err)
+	}
+
+	// Shapes too small to reach GPUCount within maxNodes nodes, even next to the
+	// largest shape, can never be part of a composition
+	largest := 0
+	if len(shapes) > 0 {
+		largest = shapes[len(shapes)-1]
+	}
+	if largest*maxNodes < compute.GPUCount {
+		return []Composition{}, nil
+	}
+
+	candidates := make([]nodeCandidate, 0)
+	for _, gpus := range shapes {
+		if gpus == compute.GPUCount {
+			continue
+		}
+		if !compute.MixedShapes && ceilDiv(compute.GPUCount, gpus) > maxNodes {
+			continue
+		}
+		if compute.MixedShapes && gpus+largest*(maxNodes-1) < compute.GPUCount {
+			continue
+		}
+		instanceKeys, err := h.ResolveInstances(ctx, compute.GPUType, gpus, compute.GPUMemoryGB, compute.Interconnect)
+		if err != nil {
+			return nil, err
+		}
+		for _, key := range instanceKeys {
+			candidate, ok := h.nodeCandidate(ctx, key, gpus)
+			if ok {
+				candidates = append(candidates, candidate)
+			}
+		}
+	}
+	if ctx.Err() != nil {
+		return nil, ctx.Err()
+	}
+
+	compositions := composeHomogeneous(candidates, compute.GPUCount, maxNodes)
+	if compute.MixedShapes {
+		compositions = append(compositions, composeMixed(candidates, compute.GPUCount, maxNodes)...)
+	}
+	sort.SliceStable(compositions, func(i, j int) bool {
+		return compositions[i].CostPerHour() < compositions[j].CostPerHour()
+	})
+	span.SetAttribute("compositions", fmt.Sprintf("%d", len(compositions)))
+	return compositions, nil
+}
+
+// nodeCandidate prices one instance of a gpus-GPU shape; ok is false when it cannot be priced
+func (h *HardwareMapResolver) nodeCandidate(ctx context.Context, instanceKey string, gpus int) (nodeCandidate, bool) {
+	provider, region, instanceType, err := ParseInstanceKey(instanceKey)
+	if err != nil {
+		log.Printf("WARNING: Failed to parse instance key %s: %v", instanceKey, err)
+		return nodeCandidate{}, false
+	}
+	price, err := h.redis.GetComputePrice(ctx, provider, region, instanceType)
+	if err != nil {
+		log.Printf("WARNING: Failed to get compute price for %s: %v", instanceKey, err)
+		return nodeCandidate{}, false
+	}
+	if price == nil {
+		h.redis.LogMissingKey("compute", fmt.Sprintf("compute:%s:%s:%s", provider, region, instanceType))
+		return nodeCandidate{}, false
+	}
+	candidate := nodeCandidate{
+		provider:     provider,
+		region:       region,
+		instanceType: instanceType,
+		gpus:         gpus,
+		costPerHour:  price.CostPerHour,
+	}
+	if price.GPUMemoryGB != nil {
+		candidate.gpuMemoryGB = *price.GPUMemoryGB
+	}
+	if price.Interconnect != nil {
+		candidate.interconnect = *price.Interconnect
+	}
+	return candidate, true
+}
+
+// composeHomogeneous makes, for every candidate, the composition of the fewest
+// identical nodes with gpuCount GPUs, unless that takes more than maxNodes nodes
+func composeHomogeneous(candidates []nodeCandidate, gpuCount, maxNodes int) []Composition {
+	compositions := make([]Composition, 0, len(candidates))
+	for _, candidate := range candidates {
+		count := ceilDiv(gpuCount, candidate.gpus)
+		if count > maxNodes {
+			continue
+		}
+		compositions = append(compositions, Composition{
+			Provider: candidate.provider,
+			Region:   candidate.region,
+			Nodes:    []CompositionNode{candidate.node(count)},
+		})
+	}
+	return compositions
+}
+
+// composeMixed returns, for every provider and region (and node memory and
+// interconnect), the cheapest composition of gpuCount GPUs in at most maxNodes
+// nodes, when it mixes instance types and beats every homogeneous composition
+// there.
+//
+// Only the cheapest instance of each shape is kept, and shapes for which a larger
+// shape costs no more are dropped. What remains is a covering knapsack solved
+// by dynamic programming over (nodes used, GPUs covered so far, capped at
+// gpuCount), pruning every state that already costs as much as the best full
+// composition found.
+func composeMixed(candidates []nodeCandidate, gpuCount, maxNodes int) []Composition {
+	groups := make(map[string][]nodeCandidate)
+	order := make([]string, 0)
+	for _, candidate := range candidates {
+		key := fmt.Sprintf("%s|%s|%d|%s", candidate.provider, candidate.region, candidate.gpuMemoryGB, candidate.interconnect)
+		if _, ok := groups[key]; !ok {
+			order = append(order, key)
+		}
+		groups[key] = append(groups[key], candidate)
+	}
+
+	compositions := make([]Composition, 0)
+	for _, key := range order {
+		group := groups[key]
+		shapes := cheapestShapes(group)
+		if len(shapes) < 2 {
+			continue
+		}
+		nodes, cost := coverGPUs(shapes, gpuCount, maxNodes)
+		if nodes == nil || len(nodes) < 2 {
+			continue
+		}
+		homogeneous := math.Inf(1)
+		for _, c := range composeHomogeneous(group, gpuCount, maxNodes) {
+			homogeneous = math.Min(homogeneous, c.CostPerHour())
+		}
+		if cost >= homogeneous {
+			continue
+		}
+		compositions = append(compositions, Composition{Provider: group[0].provider, Region: group[0].region, Nodes: nodes})
+	}
+	return compositions
+}
+
+// cheapestShapes keeps the cheapest candidate of each GPU count, then drops the
+// ones a larger shape dominates (as many or more GPUs for no more per hour).
+// The result is ordered by GPU count.
+func cheapestShapes(group []nodeCandidate) []nodeCandidate {
+	cheapest := make(map[int]nodeCandidate)
+	for _, candidate := range group {
+		if best, ok := cheapest[candidate.gpus]; !ok || candidate.costPerHour < best.costPerHour {
+			cheapest[candidate.gpus] = candidate
+		}
+	}
+	shapes := make([]nodeCandidate, 0, len(cheapest))
+	for _, candidate := range cheapest {
+		shapes = append(shapes, candidate)
+	}
+	sort.Slice(shapes, func(i, j int) bool { return shapes[i].gpus < shapes[j].gpus })
+
+	kept := make([]nodeCandidate, 0, len(shapes))
+	minLargerCost := math.Inf(1)
+	for i := len(shapes) - 1; i >= 0; i-- {
+		if shapes[i].costPerHour < minLargerCost {
+			kept = append(kept, shapes[i])
+			minLargerCost = shapes[i].costPerHour
+		}
+	}
+	for i, j := 0, len(kept)-1; i < j; i, j = i+1, j-1 {
+		kept[i], kept[j] = kept[j], kept[i]
+	}
+	return kept
+}
+
+// coverGPUs finds the cheapest multiset of shapes with at least gpuCount GPUs and
+// at most maxNodes nodes, preferring fewer nodes between equal costs. It returns
+// nil when there is none.
+func coverGPUs(shapes []nodeCandidate, gpuCount, maxNodes int) ([]CompositionNode, float64) {
+	type state struct {
+		cost  float64
+		shape int // Shape of the last node added; -1 for unreachable
+		from  int // GPUs covered before it
+	}
+	unreachable := state{cost: math.Inf(1), shape: -1}
+	newLayer := func() []state {
+		layer := make([]state, gpuCount+1)
+		for g := range layer {
+			layer[g] = unreachable
+		}
+		return layer
+	}
+
+	// layers[k][g]: cheapest way to cover g GPUs (g == gpuCount: at least) with k nodes
+	layers := [][]state{newLayer()}
+	layers[0][0] = state{cost: 0, shape: -1}
+	best, bestNodes := math.Inf(1), -1
+	for k := 0; k < maxNodes; k++ {
+		current, next := layers[k], newLayer()
+		reachable := false
+		for g := 0; g < gpuCount; g++ {
+			if math.IsInf(current[g].cost, 1) {
+				continue
+			}
+			for i, shape := range shapes {
+				cost := current[g].cost + shape.costPerHour
+				if cost >= best {
+					continue // Prices are positive: extending it can only cost more
+				}
+				covered := g + shape.gpus
+				if covered > gpuCount {
+					covered = gpuCount
+				}
+				if cost < next[covered].cost {
+					next[covered] = state{cost: cost, shape: i, from: g}
+					reachable = true
+				}
+			}
+		}
+		layers = append(layers, next)
+		if next[gpuCount].cost < best {
+			best, bestNodes = next[gpuCount].cost, k+1
+		}
+		if !reachable {
+			break
+		}
+	}
+	if bestNodes < 0 {
+		return nil, 0
+	}
+
+	counts := make([]int, len(shapes))
+	for k, g := bestNodes, gpuCount; k > 0; k-- {
+		s := layers[k][g]
+		counts[s.shape]++
+		g = s.from
+	}
+	nodes := make([]CompositionNode, 0, len(shapes))
+	for i := len(shapes) - 1; i >= 0; i-- {
+		if counts[i] > 0 {
+			nodes = append(nodes, shapes[i].node(counts[i]))
+		}
+	}
+	return nodes, best
+}
+
+func ceilDiv(a, b int) int {
+	return (a + b - 1) / b
+}
@@ -0,0 +1,124 @@
+package main
+
+import (
+	"math"
+	"testing"
+)
+
+func candidate(provider, region, instanceType string, gpus int, costPerHour float64) nodeCandidate {
+	return nodeCandidate{provider: provider, region: region, instanceType: instanceType, gpus: gpus, costPerHour: costPerHour}
+}
+
+func TestComposition_Totals(t *testing.T) {
+	c := Composition{Provider: "aws", Region: "us-east-1", Nodes: []CompositionNode{
+		{InstanceType: "p5.48xlarge", GPUCount: 8, Count: 2, CostPerHour: 98.32},
+		{InstanceType: "p5.4xlarge", GPUCount: 1, Count: 1, CostPerHour: 12},
+	}}
+	if c.NodeCount() != 3 || c.GPUCount() != 17 {
+		t.Errorf("expected 3 nodes and 17 GPUs, got %d and %d", c.NodeCount(), c.GPUCount())
+	}
+	if math.Abs(c.CostPerHour()-208.64) > 1e-9 {
+		t.Errorf("expected 208.64/hr, got %v", c.CostPerHour())
+	}
+	if got := c.InstanceType(); got != "2x p5.48xlarge + 1x p5.4xlarge" {
+		t.Errorf("unexpected label %q", got)
+	}
+}
+
+func TestComposeHomogeneous_FewestNodesWithinBound(t *testing.T) {
+	candidates := []nodeCandidate{
+		candidate("aws", "us-east-1", "p5.48xlarge", 8, 98.32),
+		candidate("gcp", "us-central1", "a3-highgpu-2g", 2, 22),
+	}
+	compositions := composeHomogeneous(candidates, 16, 4)
+	if len(compositions) != 1 {
+		t.Fatalf("expected only the 8-GPU nodes to fit in 4 nodes, got %+v", compositions)
+	}
+	if c := compositions[0]; c.NodeCount() != 2 || c.Provider != "aws" || c.CostPerHour() != 2*98.32 {
+		t.Errorf("unexpected composition %+v", c)
+	}
+
+	// Rounds up: 20 GPUs of 8-GPU nodes take 3 nodes
+	if c := composeHomogeneous(candidates[:1], 20, 4)[0]; c.NodeCount() != 3 {
+		t.Errorf("expected 3 nodes, got %d", c.NodeCount())
+	}
+}
+
+func TestCheapestShapes_DropsDominatedShapes(t *testing.T) {
+	shapes := cheapestShapes([]nodeCandidate{
+		candidate("aws", "us-east-1", "a", 2, 30),
+		candidate("aws", "us-east-1", "b", 4, 25), // Dominates a
+		candidate("aws", "us-east-1", "c", 4, 40),
+		candidate("aws", "us-east-1", "d", 8, 60),
+		candidate("aws", "us-east-1", "e", 1, 10),
+	})
+	var types []string
+	for _, s := range shapes {
+		types = append(types, s.instanceType)
+	}
+	if len(types) != 3 || types[0] != "e" || types[1] != "b" || types[2] != "d" {
+		t.Errorf("expected [e b d], got %v", types)
+	}
+}
+
+func TestCoverGPUs_CheapestMix(t *testing.T) {
+	shapes := []nodeCandidate{
+		candidate("aws", "us-east-1", "small", 2, 10),
+		candidate("aws", "us-east-1", "large", 8, 32),
+	}
+	// 10 GPUs: 1 large + 1 small (42) beats 2 large (64) and 5 small (50)
+	nodes, cost := coverGPUs(shapes, 10, 8)
+	if cost != 42 || len(nodes) != 2 || nodes[0].InstanceType != "large" || nodes[1].Count != 1 {
+		t.Errorf("unexpected cover %+v at %v", nodes, cost)
+	}
+
+	// The node bound rules out cheaper covers with more nodes
+	cheapSmall := []nodeCandidate{candidate("aws", "us-east-1", "small", 2, 5), shapes[1]}
+	if _, cost := coverGPUs(cheapSmall, 10, 8); cost != 25 {
+		t.Errorf("expected 5 small nodes at 25, got %v", cost)
+	}
+	if nodes, cost := coverGPUs(cheapSmall, 10, 2); cost != 37 || len(nodes) != 2 {
+		t.Errorf("expected 1 large + 1 small at 37 within 2 nodes, got %+v at %v", nodes, cost)
+	}
+	if nodes, _ := coverGPUs(cheapSmall, 20, 2); nodes != nil {
+		t.Errorf("expected no cover of 20 GPUs in 2 nodes, got %+v", nodes)
+	}
+}
+
+func TestComposeMixed_OnlyWhenCheaperThanHomogeneous(t *testing.T) {
+	candidates := []nodeCandidate{
+		candidate("aws", "us-east-1", "p5.48xlarge", 8, 32),
+		candidate("aws", "us-east-1", "p5.12xlarge", 2, 10),
+		// Alone in its region: nothing to mix
+		candidate("aws", "us-west-2", "p5.48xlarge", 8, 30),
+	}
+	mixed := composeMixed(candidates, 10, 8)
+	if len(mixed) != 1 || mixed[0].Region != "us-east-1" || mixed[0].CostPerHour() != 42 {
+		t.Fatalf("unexpected mixed compositions %+v", mixed)
+	}
+
+	// 16 GPUs: 2x p5.48xlarge is already the cheapest, so no mix is reported
+	if mixed := composeMixed(candidates, 16, 8); len(mixed) != 0 {
+		t.Errorf("expected no mixed composition, got %+v", mixed)
+	}
+}
+
+func TestComposeMixed_KeepsMemoryAndInterconnectApart(t *testing.T) {
+	large := candidate("aws", "us-east-1", "p4de.24xlarge", 8, 32)
+	large.gpuMemoryGB = 80
+	small := candidate("aws", "us-east-1", "p4d.small", 2, 10)
+	small.gpuMemoryGB = 40
+	if mixed := composeMixed([]nodeCandidate{large, small}, 10, 8); len(mixed) != 0 {
+		t.Errorf("nodes with different GPU memory must not be mixed, got %+v", mixed)
+	}
+}
+
+func TestCompositionBound(t *testing.T) {
+	if n, always := compositionBound(JobCompute{}); n != defaultMaxNodes || always {
+		t.Errorf("unexpected default bound %d, %v", n, always)
+	}
+	four := 4
+	if n, always := compositionBound(JobCompute{MaxNodes: &four}); n != 4 || !always {
+		t.Errorf("unexpected bound %d, %v", n, always)
+	}
+}
@@ -0,0 +1,201 @@
+package main
+
+import (
+	"container/heap"
+	"fmt"
+	"math"
+	"sort"
+)
+
+// constraintSortKeys are the orders the engine can return remote options in; the
+// names match the CLI's --sort keys. Options that never break even sort last.
+var constraintSortKeys = map[string]func(AnalysisOption) float64{
+	"break-even": func(option AnalysisOption) float64 {
+		if option.BreakEvenHours == nil {
+			return math.Inf(1)
+		}
+		return *option.BreakEvenHours
+	},
+	"hourly-cost": func(option AnalysisOption) float64 { return option.ComputeCostPerHour },
+	"egress":      func(option AnalysisOption) float64 { return option.OneTimeEgressCost },
+}
+
+// Validate rejects constraints the engine cannot apply. A nil receiver means no
+// constraints, here and in the methods below.
+func (c *JobConstraints) Validate() error {
+	if c == nil {
+		return nil
+	}
+	if _, ok := constraintSortKeys[c.SortBy]; c.SortBy != "" && !ok {
+		return fmt.Errorf("unknown sort_by %q (expected break-even, hourly-cost or egress)", c.SortBy)
+	}
+	if c.TopK < 0 {
+		return fmt.Errorf("top_k must not be negative")
+	}
+	if c.MaxBreakEvenHours != nil && *c.MaxBreakEvenHours < 0 {
+		return fmt.Errorf("max_break_even_hours must not be negative")
+	}
+	if c.MaxCostPerHour != nil && *c.MaxCostPerHour <= 0 {
+		return fmt.Errorf("max_cost_per_hour must be positive")
+	}
+	return nil
+}
+
+// AllowsInstance applies the provider allow- and deny-lists to an instance key,
+// before any of its prices are looked up
+func (c *JobConstraints) AllowsInstance(instanceKey string) bool {
+	if c == nil || (len(c.Providers) == 0 && len(c.ExcludeProviders) == 0) {
+		return true
+	}
+	provider, _, _, err := ParseInstanceKey(instanceKey)
+	if err != nil {
+		return false
+	}
+	if len(c.Providers) > 0 && !containsString(c.Providers, provider) {
+		return false
+	}
+	return !containsString(c.ExcludeProviders, provider)
+}
+
+func (c *JobConstraints) WantsOnDemand() bool { return c == nil || c.Spot == nil || !*c.Spot }
+
+func (c *JobConstraints) WantsSpot() bool { return c == nil || c.Spot == nil || *c.Spot }
+
+// AdmitsPrice is checked as soon as an option's hourly cost is known, before its
+// egress route is priced. An option no cheaper per hour than the data-local one
+// never breaks even, whatever its egress costs.
+func (c *JobConstraints) AdmitsPrice(remoteCostPerHour, localCostPerHour float64) bool {
+	if c == nil {
+		return true
+	}
+	if c.MaxCostPerHour != nil && remoteCostPerHour > *c.MaxCostPerHour {
+		return false
+	}
+	if (c.RecommendedOnly || c.MaxBreakEvenHours != nil) && remoteCostPerHour >= localCostPerHour {
+		return false
+	}
+	return true
+}
+
+// Admits checks a fully evaluated option
+func (c *JobConstraints) Admits(option *AnalysisOption) bool {
+	if c == nil {
+		return true
+	}
+	if c.MaxCostPerHour != nil && option.ComputeCostPerHour > *c.MaxCostPerHour {
+		return false
+	}
+	if c.RecommendedOnly && option.BreakEvenHours == nil {
+		return false
+	}
+	if c.MaxBreakEvenHours != nil && (option.BreakEvenHours == nil || *option.BreakEvenHours > *c.MaxBreakEvenHours) {
+		return false
+	}
+	return true
+}
+
+func containsString(values []string, value string) bool {
+	for _, v := range values {
+		if v == value {
+			return true
+		}
+	}
+	return false
+}
+
+// OptionSelector collects the remote options of an analysis in the order and
+// number the constraints ask for. With a top-k, only the best k seen so far are
+// kept (a bounded max-heap), so candidates that cannot place are dropped early.
+// Ties keep evaluation order, like the CLI's sort.
+type OptionSelector struct {
+	key          func(AnalysisOption) float64
+	byHourlyCost bool
+	limit        int
+	kept         selectedOptions
+	seq          int
+}
+
+type selectedOption struct {
+	option AnalysisOption
+	value  float64
+	seq    int
+}
+
+// selectedOptions is a max-heap: the worst kept option is at the root
+type selectedOptions []selectedOption
+
+func (s selectedOptions) Len() int { return len(s) }
+func (s selectedOptions) Less(i, j int) bool {
+	if s[i].value != s[j].value {
+		return s[i].value > s[j].value
+	}
+	return s[i].seq > s[j].seq
+}
+func (s selectedOptions) Swap(i, j int)       { s[i], s[j] = s[j], s[i] }
+func (s *selectedOptions) Push(x interface{}) { *s = append(*s, x.(selectedOption)) }
+func (s *selectedOptions) Pop() interface{} {
+	old := *s
+	last := old[len(old)-1]
+	*s = old[:len(old)-1]
+	return last
+}
+
+func NewOptionSelector(c *JobConstraints) *OptionSelector {
+	selector := &OptionSelector{}
+	if c != nil {
+		selector.key = constraintSortKeys[c.SortBy]
+		selector.byHourlyCost = c.SortBy == "hourly-cost"
+		selector.limit = c.TopK
+	}
+	return selector
+}
+
+// Add offers an evaluated option
+func (s *OptionSelector) Add(option AnalysisOption) {
+	s.seq++
+	if s.key == nil {
+		if s.limit == 0 || len(s.kept) < s.limit {
+			s.kept = append(s.kept, selectedOption{option: option, seq: s.seq})
+		}
+		return
+	}
+	entry := selectedOption{option: option, value: s.key(option), seq: s.seq}
+	switch {
+	case s.limit == 0:
+		s.kept = append(s.kept, entry)
+	case len(s.kept) < s.limit:
+		heap.Push(&s.kept, entry)
+	case entry.value < s.kept[0].value:
+		// A later option only displaces the worst kept one when strictly better
+		s.kept[0] = entry
+		heap.Fix(&s.kept, 0)
+	}
+}
+
+// Full reports that no further option can be kept: without a sort key, the first
+// top-k options are the answer and the rest need not be evaluated
+func (s *OptionSelector) Full() bool {
+	return s.key == nil && s.limit > 0 && len(s.kept) >= s.limit
+}
+
+// CannotPlace reports whether an option costing costPerHour an hour would be
+// dropped anyway, so its egress route need not be priced. Only an hourly-cost
+// top-k knows this before the option is evaluated.
+func (s *OptionSelector) CannotPlace(costPerHour float64) bool {
+	if s.Full() {
+		return true
+	}
+	return s.byHourlyCost && s.limit > 0 && len(s.kept) >= s.limit && costPerHour >= s.kept[0].value
+}
+
+// Options returns the kept options in their final order
+func (s *OptionSelector) Options() []AnalysisOption {
+	if s.key != nil {
+		sort.Slice(s.kept, func(i, j int) bool { return s.kept.Less(j, i) })
+	}
+	options := make([]AnalysisOption, len(s.kept))
+	for i, entry := range s.kept {
+		options[i] = entry.option
+	}
+	return options
+}
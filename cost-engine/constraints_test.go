@@ -0,0 +1,123 @@
+package main
+
+import (
+	"testing"
+)
+
+func breakEven(hours float64) *float64 { return &hours }
+
+func TestConstraints_NilAllowsEverything(t *testing.T) {
+	var c *JobConstraints
+	if err := c.Validate(); err != nil {
+		t.Fatal(err)
+	}
+	if !c.AllowsInstance("gcp:us-central1:a3-highgpu-8g") || !c.WantsOnDemand() || !c.WantsSpot() ||
+		!c.AdmitsPrice(200, 100) || !c.Admits(&AnalysisOption{}) {
+		t.Error("nil constraints must not filter anything")
+	}
+}
+
+func TestConstraints_Validate(t *testing.T) {
+	negative := -1.0
+	for _, c := range []*JobConstraints{
+		{SortBy: "expected-cost"},
+		{TopK: -1},
+		{MaxBreakEvenHours: &negative},
+		{MaxCostPerHour: &negative},
+	} {
+		if c.Validate() == nil {
+			t.Errorf("expected %+v to be rejected", *c)
+		}
+	}
+	if err := (&JobConstraints{SortBy: "hourly-cost", TopK: 3}).Validate(); err != nil {
+		t.Error(err)
+	}
+}
+
+func TestConstraints_ProvidersAndSpot(t *testing.T) {
+	spotOnly := true
+	c := &JobConstraints{Providers: []string{"aws", "gcp"}, ExcludeProviders: []string{"gcp"}, Spot: &spotOnly}
+	if !c.AllowsInstance("aws:us-east-1:p5.48xlarge") {
+		t.Error("aws is allowed")
+	}
+	if c.AllowsInstance("gcp:us-central1:a3-highgpu-8g") || c.AllowsInstance("azure:eastus:ND96isr_H100_v5") {
+		t.Error("gcp is excluded and azure is not on the allow-list")
+	}
+	if c.WantsOnDemand() || !c.WantsSpot() {
+		t.Error("spot=true wants spot options only")
+	}
+}
+
+func TestConstraints_PriceAndOptionFilters(t *testing.T) {
+	maxCost, maxBreakEven := 90.0, 24.0
+	c := &JobConstraints{MaxCostPerHour: &maxCost, MaxBreakEvenHours: &maxBreakEven}
+	if c.AdmitsPrice(95, 100) {
+		t.Error("above max_cost_per_hour")
+	}
+	if c.AdmitsPrice(80, 80) {
+		t.Error("no cheaper than data-local never breaks even")
+	}
+	if !c.AdmitsPrice(80, 100) {
+		t.Error("cheaper and under the cap")
+	}
+	if c.Admits(&AnalysisOption{ComputeCostPerHour: 80, BreakEvenHours: breakEven(30)}) {
+		t.Error("break-even above max_break_even_hours")
+	}
+	if !c.Admits(&AnalysisOption{ComputeCostPerHour: 80, BreakEvenHours: breakEven(24)}) {
+		t.Error("break-even at the limit is admitted")
+	}
+	if (&JobConstraints{RecommendedOnly: true}).Admits(&AnalysisOption{ComputeCostPerHour: 80}) {
+		t.Error("recommended_only drops options that never break even")
+	}
+}
+
+func TestOptionSelector_TopKByBreakEven(t *testing.T) {
+	selector := NewOptionSelector(&JobConstraints{SortBy: "break-even", TopK: 3})
+	for i, hours := range []*float64{nil, breakEven(9), breakEven(3), breakEven(9), breakEven(1), breakEven(5)} {
+		selector.Add(AnalysisOption{Region: string(rune('a' + i)), BreakEvenHours: hours})
+	}
+	options := selector.Options()
+	got := ""
+	for _, option := range options {
+		got += option.Region
+	}
+	if got != "ecf" {
+		t.Errorf("expected regions e, c, f (1h, 3h, 5h), got %q", got)
+	}
+}
+
+func TestOptionSelector_TiesKeepEvaluationOrder(t *testing.T) {
+	selector := NewOptionSelector(&JobConstraints{SortBy: "egress", TopK: 2})
+	for _, region := range []string{"a", "b", "c"} {
+		selector.Add(AnalysisOption{Region: region, OneTimeEgressCost: 10})
+	}
+	if options := selector.Options(); options[0].Region != "a" || options[1].Region != "b" {
+		t.Errorf("expected the first two tied options, got %v and %v", options[0].Region, options[1].Region)
+	}
+}
+
+func TestOptionSelector_PrunesBeforeEvaluation(t *testing.T) {
+	selector := NewOptionSelector(&JobConstraints{SortBy: "hourly-cost", TopK: 2})
+	selector.Add(AnalysisOption{ComputeCostPerHour: 50})
+	if selector.CannotPlace(100) {
+		t.Error("top-k is not full yet")
+	}
+	selector.Add(AnalysisOption{ComputeCostPerHour: 70})
+	if !selector.CannotPlace(70) || selector.CannotPlace(60) {
+		t.Error("with the top-2 full, only options cheaper than 70/h can place")
+	}
+
+	unsorted := NewOptionSelector(&JobConstraints{TopK: 1})
+	unsorted.Add(AnalysisOption{Region: "first"})
+	if !unsorted.Full() || !unsorted.CannotPlace(1) {
+		t.Error("an unsorted top-1 is complete after the first option")
+	}
+	unsorted.Add(AnalysisOption{Region: "second"})
+	if options := unsorted.Options(); len(options) != 1 || options[0].Region != "first" {
+		t.Errorf("unexpected options %+v", options)
+	}
+
+	if options := NewOptionSelector(nil).Options(); options == nil {
+		t.Error("no options must still encode as an empty list")
+	}
+}
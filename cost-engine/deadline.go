@@ -0,0 +1,59 @@
+package main
+
+import (
+	"context"
+	"net/http"
+	"strconv"
+	"time"
+)
+
+// requestDeadlineHeader carries the caller's remaining time budget in milliseconds.
+// It is relative rather than an absolute timestamp so clock skew between hosts
+// does not matter; each hop forwards what is left of it.
+const requestDeadlineHeader = "X-Request-Deadline-Ms"
+
+// Part of the budget kept back to encode and send what was computed when the
+// deadline cuts an analysis short
+const (
+	minDeadlineReserve = 5 * time.Millisecond
+	maxDeadlineReserve = 250 * time.Millisecond
+)
+
+// requestBudget returns the remaining budget the caller sent, if any
+func requestBudget(r *http.Request) (time.Duration, bool) {
+	value := r.Header.Get(requestDeadlineHeader)
+	if value == "" {
+		return 0, false
+	}
+	ms, err := strconv.ParseInt(value, 10, 64)
+	if err != nil {
+		return 0, false
+	}
+	return time.Duration(ms) * time.Millisecond, true
+}
+
+// workBudget is how long the analysis may keep looking up prices: a tenth of the
+// budget (within bounds) is reserved for returning a partial result in time
+func workBudget(budget time.Duration) time.Duration {
+	reserve := budget / 10
+	if reserve < minDeadlineReserve {
+		reserve = minDeadlineReserve
+	} else if reserve > maxDeadlineReserve {
+		reserve = maxDeadlineReserve
+	}
+	return budget - reserve
+}
+
+// withRequestDeadline bounds ctx by the caller's budget, if it sent one. The
+// request context is already cancelled when the caller disconnects.
+func withRequestDeadline(ctx context.Context, r *http.Request) (context.Context, context.CancelFunc, bool) {
+	budget, ok := requestBudget(r)
+	if !ok {
+		return ctx, func() {}, true
+	}
+	if budget <= 0 {
+		return ctx, func() {}, false
+	}
+	ctx, cancel := context.WithTimeout(ctx, workBudget(budget))
+	return ctx, cancel, true
+}
@@ -0,0 +1,62 @@
+package main
+
+import (
+	"context"
+	"net/http/httptest"
+	"testing"
+	"time"
+)
+
+func TestRequestBudget_ParsesRemainingMilliseconds(t *testing.T) {
+	r := httptest.NewRequest("POST", "/analyze", nil)
+	if _, ok := requestBudget(r); ok {
+		t.Fatal("expected no budget without the header")
+	}
+	r.Header.Set(requestDeadlineHeader, "1500")
+	budget, ok := requestBudget(r)
+	if !ok || budget != 1500*time.Millisecond {
+		t.Fatalf("expected 1.5s budget, got %v (%v)", budget, ok)
+	}
+	r.Header.Set(requestDeadlineHeader, "soon")
+	if _, ok := requestBudget(r); ok {
+		t.Fatal("expected malformed header to be ignored")
+	}
+}
+
+func TestWorkBudget_ReservesTimeForPartialResponse(t *testing.T) {
+	cases := map[time.Duration]time.Duration{
+		20 * time.Millisecond: 15 * time.Millisecond,    // minimum reserve
+		time.Second:           900 * time.Millisecond,   // a tenth
+		30 * time.Second:      29750 * time.Millisecond, // maximum reserve
+	}
+	for budget, want := range cases {
+		if got := workBudget(budget); got != want {
+			t.Errorf("workBudget(%v) = %v, want %v", budget, got, want)
+		}
+	}
+}
+
+func TestWithRequestDeadline(t *testing.T) {
+	r := httptest.NewRequest("POST", "/analyze", nil)
+	ctx, cancel, ok := withRequestDeadline(context.Background(), r)
+	defer cancel()
+	if _, has := ctx.Deadline(); has || !ok {
+		t.Fatal("expected no deadline without the header")
+	}
+
+	r.Header.Set(requestDeadlineHeader, "1000")
+	ctx, cancel, ok = withRequestDeadline(context.Background(), r)
+	defer cancel()
+	deadline, has := ctx.Deadline()
+	if !ok || !has {
+		t.Fatal("expected a deadline from the header")
+	}
+	if remaining := time.Until(deadline); remaining > 900*time.Millisecond || remaining < 800*time.Millisecond {
+		t.Errorf("expected about 900ms of work budget, got %v", remaining)
+	}
+
+	r.Header.Set(requestDeadlineHeader, "0")
+	if _, _, ok := withRequestDeadline(context.Background(), r); ok {
+		t.Error("expected an exhausted budget to be rejected")
+	}
+}
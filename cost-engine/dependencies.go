@@ -0,0 +1,50 @@
+package main
+
+import (
+	"context"
+	"sort"
+	"sync"
+)
+
+// recordDependenciesHeader asks /analyze to list the price keys the analysis read
+const recordDependenciesHeader = "X-Record-Dependencies"
+
+type dependencyKey struct{}
+
+// DependencyRecorder collects the Redis keys an analysis depends on, so callers
+// that store results (the API's saved jobs) know which price changes affect them
+type DependencyRecorder struct {
+	mu   sync.Mutex
+	keys map[string]struct{}
+}
+
+// WithDependencyRecorder returns a context whose price lookups are recorded
+func WithDependencyRecorder(ctx context.Context) (context.Context, *DependencyRecorder) {
+	recorder := &DependencyRecorder{keys: make(map[string]struct{})}
+	return context.WithValue(ctx, dependencyKey{}, recorder), recorder
+}
+
+// recordDependency notes keys read on behalf of the request in ctx, if it is recording
+func recordDependency(ctx context.Context, keys ...string) {
+	recorder, ok := ctx.Value(dependencyKey{}).(*DependencyRecorder)
+	if !ok {
+		return
+	}
+	recorder.mu.Lock()
+	defer recorder.mu.Unlock()
+	for _, key := range keys {
+		recorder.keys[key] = struct{}{}
+	}
+}
+
+// Keys returns the recorded keys in sorted order
+func (d *DependencyRecorder) Keys() []string {
+	d.mu.Lock()
+	defer d.mu.Unlock()
+	keys := make([]string, 0, len(d.keys))
+	for key := range d.keys {
+		keys = append(keys, key)
+	}
+	sort.Strings(keys)
+	return keys
+}
@@ -0,0 +1,409 @@
+package main
+
+import (
+	"container/heap"
+	"context"
+	"fmt"
+	"log"
+	"math"
+	"sort"
+	"strings"
+	"sync/atomic"
+	"time"
+)
+
+// EgressRoute is the cheapest way to move data from a storage location to a compute region
+type EgressRoute struct {
+	CostPerGB float64
+	// Hops lists the storage locations the data passes through (provider:service:region),
+	// starting at the source and ending with the compute region (provider:region)
+	Hops []string
+}
+
+type egressNodeKind int
+
+const (
+	storageNode egressNodeKind = iota // provider:service:region, can hold staged data
+	computeNode                       // provider:region, final destination
+	ingressNode                       // internet ingress into a provider, free to enter its regions
+)
+
+type egressEdge struct {
+	to   int
+	cost float64
+	// stagedOnly marks the free hop from a storage location to compute in the same region.
+	// It only applies to data staged there; at the source itself the direct egress key rules
+	// (see BuildEgressKey) stay authoritative.
+	stagedOnly bool
+}
+
+// EgressGraph holds egress prices as a weighted graph with cheapest routes precomputed
+// from every storage location, so per-request lookups are a table read.
+type EgressGraph struct {
+	labels  []string
+	kinds   []egressNodeKind
+	storage map[string]int // provider:service:region -> node
+	compute map[string]int // provider:region -> node
+	adj     [][]egressEdge
+
+	// Per storage source: cheapest cost per GB to every node, and the predecessor on that path
+	dist map[int][]float64
+	prev map[int][]int32
+}
+
+// NewEgressGraph builds the graph from egress prices keyed by their Redis key
+// (egress:provider:service:region:INTERNET or egress:provider:service:region:dest_provider:dest_region)
+// and the compute regions (provider:region) instances can run in, then precomputes all routes.
+func NewEgressGraph(prices map[string]float64, computeRegions []string) *EgressGraph {
+	g := &EgressGraph{
+		storage: make(map[string]int),
+		compute: make(map[string]int),
+		dist:    make(map[int][]float64),
+		prev:    make(map[int][]int32),
+	}
+
+	type intraPrice struct {
+		source, destProvider, destRegion string
+		cost                             float64
+	}
+	internet := make(map[string]float64)
+	intra := make([]intraPrice, 0)
+
+	// Sorted input keeps node numbering, and therefore tie-breaking, deterministic
+	keys := make([]string, 0, len(prices))
+	for key := range prices {
+		keys = append(keys, key)
+	}
+	sort.Strings(keys)
+	for _, key := range keys {
+		parts := strings.Split(strings.TrimPrefix(key, "egress:"), ":")
+		switch {
+		case len(parts) == 4 && parts[3] == "INTERNET":
+			source := strings.Join(parts[:3], ":")
+			g.addNode(source, storageNode)
+			internet[source] = prices[key]
+		case len(parts) == 5:
+			source := strings.Join(parts[:3], ":")
+			g.addNode(source, storageNode)
+			intra = append(intra, intraPrice{source, parts[3], parts[4], prices[key]})
+		default:
+			log.Printf("WARNING: Ignoring malformed egress key %s", key)
+		}
+	}
+	regions := append([]string(nil), computeRegions...)
+	sort.Strings(regions)
+	for _, region := range regions {
+		g.addNode(region, computeNode)
+	}
+	for _, p := range intra {
+		g.addNode(p.destProvider+":"+p.destRegion, computeNode)
+	}
+
+	// One ingress hub per provider, reachable from other providers' storage over INTERNET
+	hubs := make(map[string]int)
+	for _, label := range g.labels {
+		hubs[providerOf(label)] = -1
+	}
+	providers := make([]string, 0, len(hubs))
+	for provider := range hubs {
+		providers = append(providers, provider)
+	}
+	sort.Strings(providers)
+	for _, provider := range providers {
+		hubs[provider] = g.addNode("INTERNET->"+provider, ingressNode)
+	}
+
+	for node, label := range g.labels {
+		switch g.kinds[node] {
+		case storageNode:
+			provider, _, region := splitStorage(label)
+			// Staged data can run on compute in the same region for free
+			if dest, ok := g.compute[provider+":"+region]; ok {
+				g.adj[node] = append(g.adj[node], egressEdge{to: dest, cost: 0, stagedOnly: true})
+			}
+			if cost, ok := internet[label]; ok {
+				for _, other := range providers {
+					if other != provider {
+						g.adj[node] = append(g.adj[node], egressEdge{to: hubs[other], cost: cost})
+					}
+				}
+			}
+			g.adj[hubs[provider]] = append(g.adj[hubs[provider]], egressEdge{to: node, cost: 0})
+		case computeNode:
+			hub := hubs[providerOf(label)]
+			g.adj[hub] = append(g.adj[hub], egressEdge{to: node, cost: 0})
+		}
+	}
+	for _, p := range intra {
+		node := g.storage[p.source]
+		g.adj[node] = append(g.adj[node], egressEdge{to: g.compute[p.destProvider+":"+p.destRegion], cost: p.cost})
+		// A staging copy lands in the same storage service in the destination region
+		_, service, _ := splitStorage(p.source)
+		if staged, ok := g.storage[p.destProvider+":"+service+":"+p.destRegion]; ok && staged != node {
+			g.adj[node] = append(g.adj[node], egressEdge{to: staged, cost: p.cost})
+		}
+	}
+
+	for _, source := range g.storage {
+		g.dist[source], g.prev[source] = g.shortestPaths(source)
+	}
+	return g
+}
+
+func (g *EgressGraph) addNode(label string, kind egressNodeKind) int {
+	var index map[string]int
+	switch kind {
+	case storageNode:
+		index = g.storage
+	case computeNode:
+		index = g.compute
+	}
+	if node, ok := index[label]; ok {
+		return node
+	}
+	node := len(g.labels)
+	g.labels = append(g.labels, label)
+	g.kinds = append(g.kinds, kind)
+	g.adj = append(g.adj, nil)
+	if index != nil {
+		index[label] = node
+	}
+	return node
+}
+
+// shortestPaths runs Dijkstra from a storage source over the sparse egress graph.
+// Equal-cost paths are broken toward fewer hops, so a direct transfer wins over a
+// staged one that costs the same.
+func (g *EgressGraph) shortestPaths(source int) ([]float64, []int32) {
+	dist := make([]float64, len(g.labels))
+	prev := make([]int32, len(g.labels))
+	hops := make([]int, len(g.labels))
+	for i := range dist {
+		dist[i] = math.Inf(1)
+		prev[i] = -1
+	}
+	dist[source] = 0
+
+	queue := &nodeQueue{{node: source, dist: 0}}
+	for queue.Len() > 0 {
+		item := heap.Pop(queue).(nodeDist)
+		if item.dist > dist[item.node] {
+			continue
+		}
+		for _, edge := range g.adj[item.node] {
+			if edge.stagedOnly && item.node == source {
+				continue
+			}
+			d := item.dist + edge.cost
+			h := hops[item.node]
+			if g.kinds[edge.to] != ingressNode {
+				h++
+			}
+			if d < dist[edge.to] || (d == dist[edge.to] && h < hops[edge.to]) {
+				dist[edge.to] = d
+				hops[edge.to] = h
+				prev[edge.to] = int32(item.node)
+				heap.Push(queue, nodeDist{node: edge.to, dist: d})
+			}
+		}
+	}
+	return dist, prev
+}
+
+// Route returns the cheapest route from a storage location to a compute region, or nil if none exists
+func (g *EgressGraph) Route(sourceProvider, sourceService, sourceRegion, destProvider, destRegion string) *EgressRoute {
+	// Data never leaves and re-enters its own region; like BuildEgressKey, there is no route there
+	if sourceProvider == destProvider && sourceRegion == destRegion {
+		return nil
+	}
+	source, ok := g.storage[sourceProvider+":"+sourceService+":"+sourceRegion]
+	if !ok {
+		return nil
+	}
+	dest, ok := g.compute[destProvider+":"+destRegion]
+	if !ok {
+		return nil
+	}
+	dist := g.dist[source]
+	if math.IsInf(dist[dest], 1) {
+		return nil
+	}
+
+	prev := g.prev[source]
+	hops := make([]string, 0, 4)
+	for node := int32(dest); node != -1; node = prev[node] {
+		if g.kinds[node] != ingressNode {
+			hops = append(hops, g.labels[node])
+		}
+	}
+	for i, j := 0, len(hops)-1; i < j; i, j = i+1, j-1 {
+		hops[i], hops[j] = hops[j], hops[i]
+	}
+	return &EgressRoute{CostPerGB: dist[dest], Hops: hops}
+}
+
+// PriceKeys returns the egress price keys the route's hops are priced by. A route
+// also depends on prices it does not use (a cheaper path may appear), so this is
+// the minimum set whose changes alter its cost.
+func (r *EgressRoute) PriceKeys() []string {
+	keys := make([]string, 0, len(r.Hops))
+	for i := 0; i+1 < len(r.Hops); i++ {
+		from, to := strings.Split(r.Hops[i], ":"), strings.Split(r.Hops[i+1], ":")
+		if len(from) != 3 {
+			continue // Only storage locations send data onwards
+		}
+		// Compute hops are provider:region, staged copies provider:service:region
+		destProvider, destRegion := to[0], to[len(to)-1]
+		if destProvider == from[0] && destRegion == from[2] {
+			continue // Staged data runs in its own region for free
+		}
+		keys = append(keys, BuildEgressKey(from[0], from[1], from[2], destProvider, destRegion))
+	}
+	return keys
+}
+
+// Size returns the number of storage locations and compute regions in the graph
+func (g *EgressGraph) Size() (storage, compute int) {
+	return len(g.storage), len(g.compute)
+}
+
+// StorageLocations lists the graph's storage locations (provider:service:region), sorted
+func (g *EgressGraph) StorageLocations() []string {
+	locations := make([]string, 0, len(g.storage))
+	for label := range g.storage {
+		locations = append(locations, label)
+	}
+	sort.Strings(locations)
+	return locations
+}
+
+func providerOf(label string) string {
+	if i := strings.IndexByte(label, ':'); i >= 0 {
+		return label[:i]
+	}
+	return label
+}
+
+func splitStorage(label string) (provider, service, region string) {
+	parts := strings.SplitN(label, ":", 3)
+	if len(parts) != 3 {
+		return label, "", ""
+	}
+	return parts[0], parts[1], parts[2]
+}
+
+type nodeDist struct {
+	node int
+	dist float64
+}
+
+type nodeQueue []nodeDist
+
+func (q nodeQueue) Len() int            { return len(q) }
+func (q nodeQueue) Less(i, j int) bool  { return q[i].dist < q[j].dist }
+func (q nodeQueue) Swap(i, j int)       { q[i], q[j] = q[j], q[i] }
+func (q *nodeQueue) Push(x interface{}) { *q = append(*q, x.(nodeDist)) }
+func (q *nodeQueue) Pop() interface{} {
+	old := *q
+	item := old[len(old)-1]
+	*q = old[:len(old)-1]
+	return item
+}
+
+// EgressRouter serves egress routes from the latest precomputed graph and rebuilds it when prices reload
+type EgressRouter struct {
+	redis *RedisClient
+	graph atomic.Pointer[EgressGraph]
+}
+
+func NewEgressRouter(redis *RedisClient) *EgressRouter {
+	return &EgressRouter{redis: redis}
+}
+
+// Reload rebuilds the egress graph from Redis and swaps it in atomically
+func (e *EgressRouter) Reload() error {
+	started := time.Now()
+
+	egressKeys, err := e.redis.ScanKeys("egress:*")
+	if err != nil {
+		return fmt.Errorf("failed to list egress prices: %w", err)
+	}
+	prices, err := e.redis.GetEgressPrices(egressKeys)
+	if err != nil {
+		return err
+	}
+
+	computeKeys, err := e.redis.ScanKeys("compute:*")
+	if err != nil {
+		return fmt.Errorf("failed to list compute prices: %w", err)
+	}
+	regions := make([]string, 0, len(computeKeys))
+	seen := make(map[string]bool)
+	for _, key := range computeKeys {
+		provider, region, _, err := ParseInstanceKey(strings.TrimPrefix(key, "compute:"))
+		if err != nil || seen[provider+":"+region] {
+			continue
+		}
+		seen[provider+":"+region] = true
+		regions = append(regions, provider+":"+region)
+	}
+
+	graph := NewEgressGraph(prices, regions)
+	e.graph.Store(graph)
+
+	storage, compute := graph.Size()
+	log.Printf("Egress graph loaded: %d storage locations, %d compute regions in %v", storage, compute, time.Since(started))
+	return nil
+}
+
+// RunRefresh reloads the graph on a fixed interval; it never returns
+func (e *EgressRouter) RunRefresh(interval time.Duration) {
+	ticker := time.NewTicker(interval)
+	defer ticker.Stop()
+	for range ticker.C {
+		if err := e.Reload(); err != nil {
+			log.Printf("WARNING: Egress graph refresh failed, keeping previous graph: %v", err)
+		}
+	}
+}
+
+// StorageLocations lists the storage locations of the latest graph; none before the first load
+func (e *EgressRouter) StorageLocations() []string {
+	if graph := e.graph.Load(); graph != nil {
+		return graph.StorageLocations()
+	}
+	return []string{}
+}
+
+// Route returns the cheapest egress route, or nil if the destination is unreachable.
+// Before the first successful load it falls back to the direct egress key.
+func (e *EgressRouter) Route(ctx context.Context, sourceProvider, sourceService, sourceRegion, destProvider, destRegion string) (*EgressRoute, error) {
+	ctx, span := StartSpan(ctx, "egress.route")
+	span.SetAttribute("egress.destination", destProvider+":"+destRegion)
+	defer span.End()
+
+	if graph := e.graph.Load(); graph != nil {
+		route := graph.Route(sourceProvider, sourceService, sourceRegion, destProvider, destRegion)
+		if route != nil {
+			recordDependency(ctx, route.PriceKeys()...)
+		}
+		return route, nil
+	}
+
+	egressKey := BuildEgressKey(sourceProvider, sourceService, sourceRegion, destProvider, destRegion)
+	egressPrice, err := e.redis.GetEgressPrice(ctx, egressKey)
+	if err != nil {
+		return nil, err
+	}
+	if egressPrice == nil {
+		e.redis.LogMissingKey("egress", egressKey)
+		return nil, nil
+	}
+	return &EgressRoute{
+		CostPerGB: egressPrice.CostPerGB,
+		Hops: []string{
+			sourceProvider + ":" + sourceService + ":" + sourceRegion,
+			destProvider + ":" + destRegion,
+		},
+	}, nil
+}
@@ -0,0 +1,158 @@
+package main
+
+import (
+	"context"
+	"fmt"
+	"math"
+	"reflect"
+	"testing"
+)
+
+var sampleEgressPrices = map[string]float64{
+	"egress:aws:s3:us-east-1:INTERNET":      0.09,
+	"egress:aws:ec2:us-east-1:INTERNET":     0.10,
+	"egress:aws:s3:us-east-1:aws:us-west-2": 0.02,
+	"egress:aws:s3:us-west-2:INTERNET":      0.09,
+	"egress:gcp:gcs:us-central1:INTERNET":   0.12,
+	"egress:coreweave:storage:lva:INTERNET": 0.05,
+}
+
+var sampleComputeRegions = []string{"aws:us-east-1", "aws:us-west-2", "gcp:us-central1", "coreweave:lva"}
+
+func TestEgressGraph_DirectRoutesMatchEgressKeys(t *testing.T) {
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+
+	tests := []struct {
+		destProvider, destRegion string
+		costPerGB                float64
+	}{
+		{"aws", "us-west-2", 0.02},
+		{"gcp", "us-central1", 0.09},
+		{"coreweave", "lva", 0.09},
+	}
+	for _, tt := range tests {
+		route := g.Route("aws", "s3", "us-east-1", tt.destProvider, tt.destRegion)
+		if route == nil {
+			t.Fatalf("Expected a route to %s:%s", tt.destProvider, tt.destRegion)
+		}
+		if math.Abs(route.CostPerGB-tt.costPerGB) > 1e-9 {
+			t.Errorf("%s:%s: expected %.2f/GB, got %.2f/GB", tt.destProvider, tt.destRegion, tt.costPerGB, route.CostPerGB)
+		}
+		if len(route.Hops) != 2 {
+			t.Errorf("%s:%s: expected a direct route, got %v", tt.destProvider, tt.destRegion, route.Hops)
+		}
+	}
+}
+
+func TestEgressGraph_NoRouteToSourceRegion(t *testing.T) {
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+
+	// BuildEgressKey has no key for same-region transfers, and round trips through other clouds don't count
+	if route := g.Route("aws", "s3", "us-east-1", "aws", "us-east-1"); route != nil {
+		t.Errorf("Expected no route to the source region, got %+v", route)
+	}
+}
+
+func TestEgressGraph_StagedRouteIsCheaper(t *testing.T) {
+	prices := map[string]float64{
+		"egress:gcp:gcs:us-central1:INTERNET":         0.12,
+		"egress:gcp:gcs:us-central1:gcp:europe-west4": 0.01,
+		"egress:gcp:gcs:europe-west4:INTERNET":        0.05,
+	}
+	g := NewEgressGraph(prices, []string{"gcp:us-central1", "gcp:europe-west4", "coreweave:lva"})
+
+	route := g.Route("gcp", "gcs", "us-central1", "coreweave", "lva")
+	if route == nil {
+		t.Fatal("Expected a route to coreweave:lva")
+	}
+	if math.Abs(route.CostPerGB-0.06) > 1e-9 {
+		t.Errorf("Expected staged cost 0.06/GB, got %v", route.CostPerGB)
+	}
+	want := []string{"gcp:gcs:us-central1", "gcp:gcs:europe-west4", "coreweave:lva"}
+	if !reflect.DeepEqual(route.Hops, want) {
+		t.Errorf("Expected hops %v, got %v", want, route.Hops)
+	}
+}
+
+func TestEgressGraph_UnknownLocations(t *testing.T) {
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+
+	if route := g.Route("azure", "blob", "eastus", "aws", "us-west-2"); route != nil {
+		t.Errorf("Expected no route from an unknown source, got %+v", route)
+	}
+	if route := g.Route("aws", "s3", "us-east-1", "lambda", "us-tx-1"); route != nil {
+		t.Errorf("Expected no route to an unknown region, got %+v", route)
+	}
+}
+
+func TestEgressRouter_RecordsRoutePriceKeys(t *testing.T) {
+	router := NewEgressRouter(nil)
+	router.graph.Store(NewEgressGraph(sampleEgressPrices, sampleComputeRegions))
+
+	ctx, recorder := WithDependencyRecorder(context.Background())
+	if _, err := router.Route(ctx, "aws", "s3", "us-east-1", "aws", "us-west-2"); err != nil {
+		t.Fatal(err)
+	}
+	if _, err := router.Route(ctx, "aws", "s3", "us-east-1", "gcp", "us-central1"); err != nil {
+		t.Fatal(err)
+	}
+	want := []string{"egress:aws:s3:us-east-1:INTERNET", "egress:aws:s3:us-east-1:aws:us-west-2"}
+	if keys := recorder.Keys(); !reflect.DeepEqual(keys, want) {
+		t.Errorf("Expected %v, got %v", want, keys)
+	}
+
+	// A staged route is priced by every transfer, but not the free last hop
+	route := &EgressRoute{Hops: []string{"aws:s3:us-east-1", "aws:s3:us-west-2", "aws:us-west-2"}}
+	if keys := route.PriceKeys(); !reflect.DeepEqual(keys, []string{"egress:aws:s3:us-east-1:aws:us-west-2"}) {
+		t.Errorf("Unexpected staged route keys %v", keys)
+	}
+}
+
+// syntheticEgress mirrors scripts/generate-catalog.py: regions spread round-robin over
+// providers, an INTERNET price per storage location and a price to every other
+// region of the same provider
+func syntheticEgress(providers, regions int) (map[string]float64, []string) {
+	prices := make(map[string]float64)
+	computeRegions := make([]string, 0, regions)
+	for i := 0; i < regions; i++ {
+		computeRegions = append(computeRegions, fmt.Sprintf("cloud%d:region-%d", i%providers, i/providers+1))
+	}
+	for i := range computeRegions {
+		source := fmt.Sprintf("egress:cloud%d:storage:region-%d", i%providers, i/providers+1)
+		prices[source+":INTERNET"] = 0.05 + float64(i%7)*0.01
+		for j, dest := range computeRegions {
+			if j != i && j%providers == i%providers {
+				prices[source+":"+dest] = 0.01 + float64((i+j)%5)*0.005
+			}
+		}
+	}
+	return prices, computeRegions
+}
+
+// BenchmarkNewEgressGraph measures the full rebuild the engine does at startup and on
+// every refresh; routes are precomputed from every storage location, so cost grows
+// faster than the number of regions
+func BenchmarkNewEgressGraph(b *testing.B) {
+	for _, regions := range []int{8, 32, 128, 512} {
+		prices, computeRegions := syntheticEgress(4, regions)
+		b.Run(fmt.Sprintf("regions=%d", regions), func(b *testing.B) {
+			b.ReportAllocs()
+			for i := 0; i < b.N; i++ {
+				NewEgressGraph(prices, computeRegions)
+			}
+		})
+	}
+}
+
+func BenchmarkEgressGraphRoute(b *testing.B) {
+	for _, regions := range []int{8, 512} {
+		prices, computeRegions := syntheticEgress(4, regions)
+		g := NewEgressGraph(prices, computeRegions)
+		b.Run(fmt.Sprintf("regions=%d", regions), func(b *testing.B) {
+			b.ReportAllocs()
+			for i := 0; i < b.N; i++ {
+				g.Route("cloud0", "storage", "region-1", "cloud1", fmt.Sprintf("region-%d", i%(regions/4)+1))
+			}
+		})
+	}
+}
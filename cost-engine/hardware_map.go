@@ -1,6 +1,7 @@
 package main
 
 import (
+	"context"
 	"fmt"
 	"log"
 )
@@ -15,9 +16,23 @@ func NewHardwareMapResolver(redis *RedisClient) *HardwareMapResolver {
 }
 
 // ResolveInstances resolves instance types for a given GPU type and count, with optional filtering
-func (h *HardwareMapResolver) ResolveInstances(gpuType string, gpuCount int, gpuMemoryGB *int, interconnect *string) ([]string, error) {
+func (h *HardwareMapResolver) ResolveInstances(ctx context.Context, gpuType string, gpuCount int, gpuMemoryGB *int, interconnect *string) ([]string, error) {
+	ctx, span := StartSpan(ctx, "resolve_instances")
+	defer span.End()
+
+	// Filtered queries are answered by intersecting the loader's attribute index sets
+	if gpuMemoryGB != nil || interconnect != nil {
+		instanceKeys, indexed, err := h.redis.GetFilteredGPUMap(ctx, gpuType, gpuCount, gpuMemoryGB, interconnect)
+		if err != nil {
+			return nil, fmt.Errorf("failed to resolve GPU map: %w", err)
+		}
+		if indexed {
+			return instanceKeys, nil
+		}
+	}
+
 	// Get pre-filtered list from Redis (already filtered by GPU count)
-	instanceKeys, err := h.redis.GetGPUMap(gpuType, gpuCount)
+	instanceKeys, err := h.redis.GetGPUMap(ctx, gpuType, gpuCount)
 	if err != nil {
 		return nil, fmt.Errorf("failed to resolve GPU map: %w", err)
 	}
@@ -31,7 +46,12 @@ func (h *HardwareMapResolver) ResolveInstances(gpuType string, gpuCount int, gpu
 		return instanceKeys, nil
 	}
 
-	// Filter by optional attributes
+	// No indexes for this shape (data loaded by an older loader): check each instance's metadata
+	return h.filterByAttributes(ctx, instanceKeys, gpuMemoryGB, interconnect), nil
+}
+
+// filterByAttributes keeps the instances whose compute price metadata matches the optional filters
+func (h *HardwareMapResolver) filterByAttributes(ctx context.Context, instanceKeys []string, gpuMemoryGB *int, interconnect *string) []string {
 	filtered := make([]string, 0)
 	for _, key := range instanceKeys {
 		provider, region, instanceType, err := ParseInstanceKey(key)
@@ -41,7 +61,7 @@ func (h *HardwareMapResolver) ResolveInstances(gpuType string, gpuCount int, gpu
 		}
 
 		// Fetch compute price to check metadata
-		computePrice, err := h.redis.GetComputePrice(provider, region, instanceType)
+		computePrice, err := h.redis.GetComputePrice(ctx, provider, region, instanceType)
 		if err != nil {
 			log.Printf("WARNING: Failed to get compute price for %s: %v", key, err)
 			continue
@@ -68,7 +88,7 @@ func (h *HardwareMapResolver) ResolveInstances(gpuType string, gpuCount int, gpu
 		filtered = append(filtered, key)
 	}
 
-	return filtered, nil
+	return filtered
 }
 
 // FindDataLocalInstance finds the data-local instance from the hardware map
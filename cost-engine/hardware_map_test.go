@@ -0,0 +1,22 @@
+package main
+
+import "testing"
+
+func TestGPUMapIndexKeys(t *testing.T) {
+	tests := []struct {
+		name string
+		got  string
+		want string
+	}{
+		{"gpu map", BuildGPUMapKey("H100", 8), "gpu_map:H100:8"},
+		{"memory index", BuildGPUMemoryIndexKey("H100", 8, 80), "gpu_idx:H100:8:mem:80"},
+		{"interconnect index", BuildInterconnectIndexKey("A100", 8, "infiniband"), "gpu_idx:A100:8:interconnect:infiniband"},
+	}
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			if tt.got != tt.want {
+				t.Errorf("got %s, want %s", tt.got, tt.want)
+			}
+		})
+	}
+}
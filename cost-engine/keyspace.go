@@ -0,0 +1,145 @@
+package main
+
+import (
+	"context"
+	"fmt"
+	"log"
+	"strings"
+	"sync"
+	"time"
+
+	"github.com/redis/go-redis/v9"
+)
+
+// priceKeyPrefixes are the keys whose changes are watched
+var priceKeyPrefixes = []string{"compute:", "egress:", "gpu_map:", "gpu_idx:"}
+
+// KeyspaceListener is told about changed price keys. Flush means changes may
+// have been missed (the notification stream was interrupted), so anything
+// derived from prices must be treated as stale.
+type KeyspaceListener interface {
+	Invalidate(key string)
+	Flush()
+}
+
+// WatchKeyspace reports changes to price keys to the listeners as Redis
+// publishes them. It enables keyspace notifications if it can (managed Redis may
+// refuse CONFIG SET; they must then be enabled on the server, or listeners rely
+// on prices:version and periodic resyncs). It never returns.
+func WatchKeyspace(client *redis.Client, listeners ...KeyspaceListener) {
+	ctx := context.Background()
+	// K: keyspace channel, g: DEL/RENAME/EXPIRE, $: strings, s: sets, x/e: expired/evicted
+	if err := client.ConfigSet(ctx, "notify-keyspace-events", "Kg$sxe").Err(); err != nil {
+		log.Printf("WARNING: Could not enable Redis keyspace notifications (%v); relying on %s and periodic resync", err, priceVersionKey)
+	}
+
+	flush := func() {
+		for _, listener := range listeners {
+			listener.Flush()
+		}
+	}
+
+	prefix := fmt.Sprintf("__keyspace@%d__:", client.Options().DB)
+	patterns := make([]string, 0, len(priceKeyPrefixes))
+	for _, keyPrefix := range priceKeyPrefixes {
+		patterns = append(patterns, prefix+keyPrefix+"*")
+	}
+	pubsub := client.PSubscribe(ctx, patterns...)
+	defer pubsub.Close()
+
+	for {
+		msg, err := pubsub.Receive(ctx)
+		if err != nil {
+			// go-redis reconnects on the next Receive; events may have been missed meanwhile
+			log.Printf("WARNING: Keyspace notification stream interrupted: %v", err)
+			flush()
+			time.Sleep(time.Second)
+			continue
+		}
+		switch m := msg.(type) {
+		case *redis.Subscription:
+			// (Re)subscribed: anything seen before may have changed unseen
+			flush()
+		case *redis.Message:
+			key := strings.TrimPrefix(m.Channel, prefix)
+			for _, listener := range listeners {
+				listener.Invalidate(key)
+			}
+		}
+	}
+}
+
+type changeEntry struct {
+	seq uint64
+	key string // "" marks a flush: changes may have been missed
+}
+
+// ChangeLog keeps the most recent price key changes with sequence numbers, so
+// pollers (the API's saved-job watcher) can ask what changed since they last looked
+type ChangeLog struct {
+	mu       sync.Mutex
+	capacity int
+	entries  []changeEntry // oldest first
+	seq      uint64        // sequence number of the newest entry
+}
+
+func NewChangeLog(capacity int) *ChangeLog {
+	return &ChangeLog{capacity: capacity}
+}
+
+// Invalidate records a changed key
+func (l *ChangeLog) Invalidate(key string) {
+	l.append(key)
+}
+
+// Flush records that changes may have been missed
+func (l *ChangeLog) Flush() {
+	l.append("")
+}
+
+func (l *ChangeLog) append(key string) {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	l.seq++
+	l.entries = append(l.entries, changeEntry{seq: l.seq, key: key})
+	if len(l.entries) > l.capacity {
+		// Drop the oldest quarter at once rather than shifting on every append
+		l.entries = append([]changeEntry(nil), l.entries[len(l.entries)-l.capacity*3/4:]...)
+	}
+}
+
+// Since returns the distinct keys changed after sequence number since, and the
+// newest sequence number. reset is true when the caller cannot know what changed:
+// a flush happened, entries it has not seen were dropped, or since is from before
+// an engine restart.
+func (l *ChangeLog) Since(since uint64) (keys []string, seq uint64, reset bool) {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	if since > l.seq {
+		return nil, l.seq, true
+	}
+	if len(l.entries) > 0 && since+1 < l.entries[0].seq {
+		return nil, l.seq, true
+	}
+	seen := make(map[string]bool)
+	for _, entry := range l.entries {
+		if entry.seq <= since {
+			continue
+		}
+		if entry.key == "" {
+			return nil, l.seq, true
+		}
+		if !seen[entry.key] {
+			seen[entry.key] = true
+			keys = append(keys, entry.key)
+		}
+	}
+	return keys, l.seq, false
+}
+
+// Seq returns the newest sequence number
+func (l *ChangeLog) Seq() uint64 {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	return l.seq
+}
@@ -0,0 +1,55 @@
+package main
+
+import (
+	"reflect"
+	"testing"
+)
+
+func TestChangeLog_SinceReturnsDistinctKeys(t *testing.T) {
+	log := NewChangeLog(100)
+	log.Invalidate("compute:aws:us-east-1:p5.48xlarge")
+	seq := log.Seq()
+	log.Invalidate("egress:aws:s3:us-east-1:INTERNET")
+	log.Invalidate("gpu_map:H100:8")
+	log.Invalidate("egress:aws:s3:us-east-1:INTERNET")
+
+	keys, latest, reset := log.Since(seq)
+	if reset {
+		t.Fatal("Expected an incremental answer")
+	}
+	if want := []string{"egress:aws:s3:us-east-1:INTERNET", "gpu_map:H100:8"}; !reflect.DeepEqual(keys, want) {
+		t.Errorf("Expected %v, got %v", want, keys)
+	}
+	if latest != 4 {
+		t.Errorf("Expected sequence 4, got %d", latest)
+	}
+	if keys, _, reset := log.Since(latest); reset || len(keys) != 0 {
+		t.Errorf("Expected nothing new, got %v (reset %v)", keys, reset)
+	}
+}
+
+func TestChangeLog_ResetsWhenChangesMayBeMissing(t *testing.T) {
+	log := NewChangeLog(8)
+	log.Invalidate("compute:a")
+	log.Flush()
+	log.Invalidate("compute:b")
+	if _, _, reset := log.Since(0); !reset {
+		t.Error("A flush after the caller's sequence number must reset")
+	}
+	if keys, _, reset := log.Since(2); reset || !reflect.DeepEqual(keys, []string{"compute:b"}) {
+		t.Errorf("Changes after the flush are incremental, got %v (reset %v)", keys, reset)
+	}
+	if _, _, reset := log.Since(100); !reset {
+		t.Error("A sequence number from before an engine restart must reset")
+	}
+
+	for i := 0; i < 20; i++ {
+		log.Invalidate("compute:c")
+	}
+	if _, _, reset := log.Since(3); !reset {
+		t.Error("Dropped entries the caller has not seen must reset")
+	}
+	if keys, _, reset := log.Since(log.Seq() - 1); reset || !reflect.DeepEqual(keys, []string{"compute:c"}) {
+		t.Errorf("Recent entries are kept, got %v (reset %v)", keys, reset)
+	}
+}
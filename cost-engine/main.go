@@ -1,13 +1,21 @@
 package main
 
 import (
+	"context"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"log"
+	"net"
 	"net/http"
 	"os"
+	"strconv"
+	"time"
 )
 
+// priceVersionHeader carries prices:version as read before an analysis
+const priceVersionHeader = "X-Price-Version"
+
 func main() {
 	redisAddr := os.Getenv("REDIS_ADDR")
 	if redisAddr == "" {
@@ -20,9 +28,32 @@ func main() {
 	}
 	defer redisClient.Close()
 
+	// Price key changes feed the cache and a change log the API polls to recompute saved jobs
+	changeLog := NewChangeLog(intFromEnv("CHANGE_LOG_SIZE", 10000))
+	keyspaceListeners := []KeyspaceListener{changeLog}
+
+	var priceCache *PriceCache
+	if size := intFromEnv("PRICE_CACHE_SIZE", 10000); size > 0 {
+		priceCache = NewPriceCache(size)
+		redisClient.EnableCache(
+			priceCache,
+			durationFromEnv("PRICE_CACHE_VERSION_POLL", 10*time.Second),
+			durationFromEnv("PRICE_CACHE_RESYNC", 10*time.Minute),
+		)
+		keyspaceListeners = append(keyspaceListeners, priceCache)
+	}
+	go redisClient.WatchKeyspace(keyspaceListeners...)
+
+	egressRouter := NewEgressRouter(redisClient)
+	if err := egressRouter.Reload(); err != nil {
+		log.Printf("WARNING: Failed to build egress graph, using direct egress keys: %v", err)
+	}
+	go egressRouter.RunRefresh(durationFromEnv("EGRESS_GRAPH_REFRESH", 5*time.Minute))
+
 	hardwareMapResolver := NewHardwareMapResolver(redisClient)
-	calculator := NewCalculator(redisClient)
+	calculator := NewCalculator(redisClient, egressRouter)
 	spotClient := NewSpotClient()
+	tracer := NewTracerFromEnv("cost-engine")
 
 	http.HandleFunc("/analyze", func(w http.ResponseWriter, r *http.Request) {
 		if r.Method != http.MethodPost {
@@ -30,30 +61,227 @@ func main() {
 			return
 		}
 
+		ctx, span := tracer.StartRequest(r, "POST /analyze")
+		// fail ends the request span and exports the trace before writing the error
+		fail := func(message string, status int, err error) {
+			span.SetError(err)
+			span.End()
+			tracer.FinishRequest(ctx, w, r)
+			http.Error(w, message, status)
+		}
+
 		var req JobRequest
-		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
-			http.Error(w, fmt.Sprintf("Invalid request: %v", err), http.StatusBadRequest)
+		_, decodeSpan := StartSpan(ctx, "decode_request")
+		err := json.NewDecoder(r.Body).Decode(&req)
+		decodeSpan.SetError(err)
+		decodeSpan.End()
+		if err != nil {
+			fail(fmt.Sprintf("Invalid request: %v", err), http.StatusBadRequest, err)
 			return
 		}
+		span.SetAttribute("job.name", req.JobName)
 
 		// Validate required fields
-		if req.JobName == "" || req.Data.Location == "" || req.Data.SizeGB <= 0 ||
-			req.Compute.GPUType == "" || req.Compute.GPUCount <= 0 {
-			http.Error(w, "Missing required fields", http.StatusBadRequest)
+		_, validateSpan := StartSpan(ctx, "validate_request")
+		valid := !(req.JobName == "" || req.Data.Location == "" || req.Data.SizeGB <= 0 ||
+			req.Compute.GPUType == "" || req.Compute.GPUCount <= 0)
+		validateSpan.End()
+		if !valid {
+			fail("Missing required fields", http.StatusBadRequest, fmt.Errorf("missing required fields"))
+			return
+		}
+		if err := req.Constraints.Validate(); err != nil {
+			fail(fmt.Sprintf("Invalid constraints: %v", err), http.StatusBadRequest, err)
+			return
+		}
+		if n := req.Compute.MaxNodes; n != nil && (*n < 1 || *n > maxNodesLimit) {
+			err := fmt.Errorf("max_nodes must be between 1 and %d", maxNodesLimit)
+			fail(fmt.Sprintf("Invalid compute: %v", err), http.StatusBadRequest, err)
 			return
 		}
 
-		response, err := analyzeJob(req, hardwareMapResolver, calculator, spotClient)
+		// Stop looking up prices before the caller gives up, leaving time to return
+		// whatever was computed by then
+		ctx, cancelDeadline, ok := withRequestDeadline(ctx, r)
+		defer cancelDeadline()
+		if !ok {
+			fail("Request deadline already passed", http.StatusGatewayTimeout, context.DeadlineExceeded)
+			return
+		}
+
+		// Read before analyzing: if prices change mid-request, the response carries the
+		// older version and the next revalidation fetches a fresh one
+		priceVersion, err := redisClient.PriceVersion(ctx)
+		if err != nil {
+			log.Printf("WARNING: %v", err)
+		}
+
+		var dependencies *DependencyRecorder
+		if r.Header.Get(recordDependenciesHeader) != "" {
+			ctx, dependencies = WithDependencyRecorder(ctx)
+		}
+
+		response, err := analyzeJob(ctx, req, hardwareMapResolver, calculator, spotClient)
+		if err != nil && ctx.Err() != nil {
+			fail(fmt.Sprintf("Deadline exceeded before any option was priced: %v", err), http.StatusGatewayTimeout, err)
+			return
+		}
+		if err != nil {
+			fail(fmt.Sprintf("Analysis failed: %v", err), http.StatusInternalServerError, err)
+			return
+		}
+		if response.Partial {
+			span.SetAttribute("analysis.options_skipped", strconv.Itoa(response.OptionsSkipped))
+		}
+		if dependencies != nil {
+			response.Dependencies = dependencies.Keys()
+		}
+
+		_, encodeSpan := StartSpan(ctx, "encode_response")
+		body, err := json.Marshal(response)
+		encodeSpan.End()
+		if err != nil {
+			fail(fmt.Sprintf("Failed to encode response: %v", err), http.StatusInternalServerError, err)
+			return
+		}
+
+		span.End()
+		tracer.FinishRequest(ctx, w, r)
+		w.Header().Set("Content-Type", "application/json")
+		if priceVersion != "" {
+			w.Header().Set(priceVersionHeader, priceVersion)
+		}
+		w.Write(append(body, '\n'))
+	})
+
+	// Cheapest plan from every candidate storage location, for choosing where to put data
+	placer := NewPlacer(hardwareMapResolver, calculator)
+	http.HandleFunc("/placement", func(w http.ResponseWriter, r *http.Request) {
+		if r.Method != http.MethodPost {
+			http.Error(w, "Method not allowed", http.StatusMethodNotAllowed)
+			return
+		}
+
+		ctx, span := tracer.StartRequest(r, "POST /placement")
+		fail := func(message string, status int, err error) {
+			span.SetError(err)
+			span.End()
+			tracer.FinishRequest(ctx, w, r)
+			http.Error(w, message, status)
+		}
+
+		var req PlacementRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			fail(fmt.Sprintf("Invalid request: %v", err), http.StatusBadRequest, err)
+			return
+		}
+		if err := req.Validate(); err != nil {
+			fail(fmt.Sprintf("Invalid request: %v", err), http.StatusBadRequest, err)
+			return
+		}
+
+		ctx, cancelDeadline, ok := withRequestDeadline(ctx, r)
+		defer cancelDeadline()
+		if !ok {
+			fail("Request deadline already passed", http.StatusGatewayTimeout, context.DeadlineExceeded)
+			return
+		}
+
+		priceVersion, err := redisClient.PriceVersion(ctx)
+		if err != nil {
+			log.Printf("WARNING: %v", err)
+		}
+
+		response, err := placer.Place(ctx, req)
+		if err != nil && ctx.Err() != nil {
+			fail(fmt.Sprintf("Deadline exceeded before the placement matrix was complete: %v", err), http.StatusGatewayTimeout, err)
+			return
+		}
+		if errors.Is(err, errPlacementTooLarge) {
+			fail(fmt.Sprintf("Invalid request: %v", err), http.StatusBadRequest, err)
+			return
+		}
+		if err != nil {
+			fail(fmt.Sprintf("Placement failed: %v", err), http.StatusInternalServerError, err)
+			return
+		}
+
+		body, err := json.Marshal(response)
+		if err != nil {
+			fail(fmt.Sprintf("Failed to encode response: %v", err), http.StatusInternalServerError, err)
+			return
+		}
+		span.End()
+		tracer.FinishRequest(ctx, w, r)
+		w.Header().Set("Content-Type", "application/json")
+		if priceVersion != "" {
+			w.Header().Set(priceVersionHeader, priceVersion)
+		}
+		w.Write(append(body, '\n'))
+	})
+
+	// Paginated listing of GPU maps, compute prices and egress prices
+	http.Handle("/catalog/", NewCatalog(redisCatalogStore{redisClient.client}))
+
+	// Price keys changed since a sequence number, for callers that keep results derived
+	// from prices. Without ?since only the current sequence number is returned.
+	http.HandleFunc("/changes", func(w http.ResponseWriter, r *http.Request) {
+		result := map[string]interface{}{"keys": []string{}, "reset": false}
+		if since := r.URL.Query().Get("since"); since != "" {
+			sinceSeq, err := strconv.ParseUint(since, 10, 64)
+			if err != nil {
+				http.Error(w, "since must be a sequence number", http.StatusBadRequest)
+				return
+			}
+			keys, seq, reset := changeLog.Since(sinceSeq)
+			if keys != nil {
+				result["keys"] = keys
+			}
+			result["seq"], result["reset"] = seq, reset
+		} else {
+			result["seq"] = changeLog.Seq()
+		}
+		ctx, cancel := context.WithTimeout(r.Context(), 2*time.Second)
+		defer cancel()
+		if version, err := redisClient.PriceVersion(ctx); err == nil {
+			result["version"] = version
+		}
+		w.Header().Set("Content-Type", "application/json")
+		json.NewEncoder(w).Encode(result)
+	})
+
+	// Current price snapshot version, so callers can revalidate cached analyses
+	// without running them again
+	http.HandleFunc("/price-version", func(w http.ResponseWriter, r *http.Request) {
+		ctx, cancel := context.WithTimeout(r.Context(), 2*time.Second)
+		defer cancel()
+		version, err := redisClient.PriceVersion(ctx)
 		if err != nil {
-			http.Error(w, fmt.Sprintf("Analysis failed: %v", err), http.StatusInternalServerError)
+			http.Error(w, err.Error(), http.StatusServiceUnavailable)
 			return
 		}
+		w.Header().Set("Content-Type", "application/json")
+		json.NewEncoder(w).Encode(map[string]string{"version": version})
+	})
 
+	// Cheap liveness check, also used by the API to pre-open pooled connections
+	http.HandleFunc("/health", func(w http.ResponseWriter, r *http.Request) {
+		ctx, cancel := context.WithTimeout(r.Context(), 2*time.Second)
+		defer cancel()
 		w.Header().Set("Content-Type", "application/json")
-		if err := json.NewEncoder(w).Encode(response); err != nil {
-			http.Error(w, fmt.Sprintf("Failed to encode response: %v", err), http.StatusInternalServerError)
+		if err := redisClient.Ping(ctx); err != nil {
+			w.WriteHeader(http.StatusServiceUnavailable)
+			json.NewEncoder(w).Encode(map[string]string{"status": "unhealthy", "error": err.Error()})
 			return
 		}
+		json.NewEncoder(w).Encode(map[string]string{"status": "healthy"})
+	})
+
+	http.HandleFunc("/metrics", func(w http.ResponseWriter, r *http.Request) {
+		w.Header().Set("Content-Type", "text/plain; version=0.0.4")
+		if priceCache != nil {
+			priceCache.WriteMetrics(w)
+		}
 	})
 
 	port := os.Getenv("PORT")
@@ -61,20 +289,87 @@ func main() {
 		port = "8080"
 	}
 
+	// Optional Unix domain socket for a co-located API (COST_ENGINE_URL=unix://...);
+	// TCP keeps serving for health checks and remote callers
+	if socketPath := os.Getenv("UNIX_SOCKET"); socketPath != "" {
+		listener, err := listenUnix(socketPath)
+		if err != nil {
+			log.Fatalf("Failed to listen on %s: %v", socketPath, err)
+		}
+		log.Printf("Cost Engine listening on unix:%s", socketPath)
+		go func() {
+			if err := http.Serve(listener, nil); err != nil {
+				log.Fatalf("Unix socket server failed: %v", err)
+			}
+		}()
+	}
+
 	log.Printf("Cost Engine listening on :%s", port)
 	if err := http.ListenAndServe(":"+port, nil); err != nil {
 		log.Fatalf("Server failed: %v", err)
 	}
 }
 
+// durationFromEnv parses a Go duration (e.g. "5m") from the environment, falling back to a default
+func durationFromEnv(name string, fallback time.Duration) time.Duration {
+	value := os.Getenv(name)
+	if value == "" {
+		return fallback
+	}
+	d, err := time.ParseDuration(value)
+	if err != nil || d <= 0 {
+		log.Printf("WARNING: Invalid %s=%q, using %v", name, value, fallback)
+		return fallback
+	}
+	return d
+}
+
+// listenUnix listens on a Unix domain socket, replacing a socket file left by a
+// previous run, and lets any local user connect (access is governed by the directory)
+func listenUnix(path string) (net.Listener, error) {
+	if info, err := os.Stat(path); err == nil && info.Mode()&os.ModeSocket != 0 {
+		if err := os.Remove(path); err != nil {
+			return nil, fmt.Errorf("failed to remove stale socket: %w", err)
+		}
+	}
+	listener, err := net.Listen("unix", path)
+	if err != nil {
+		return nil, err
+	}
+	if err := os.Chmod(path, 0o666); err != nil {
+		listener.Close()
+		return nil, fmt.Errorf("failed to set socket permissions: %w", err)
+	}
+	return listener, nil
+}
+
+// intFromEnv parses an integer from the environment, falling back to a default
+func intFromEnv(name string, fallback int) int {
+	value := os.Getenv(name)
+	if value == "" {
+		return fallback
+	}
+	n, err := strconv.Atoi(value)
+	if err != nil || n < 0 {
+		log.Printf("WARNING: Invalid %s=%q, using %d", name, value, fallback)
+		return fallback
+	}
+	return n
+}
+
 func analyzeJob(
+	ctx context.Context,
 	req JobRequest,
 	hardwareMapResolver *HardwareMapResolver,
 	calculator *Calculator,
 	spotClient *SpotClient,
 ) (*AnalysisResponse, error) {
+	ctx, span := StartSpan(ctx, "analyze_job")
+	defer span.End()
+
 	// Step 1: Resolve hardware map
 	instanceKeys, err := hardwareMapResolver.ResolveInstances(
+		ctx,
 		req.Compute.GPUType,
 		req.Compute.GPUCount,
 		req.Compute.GPUMemoryGB,
@@ -84,14 +379,18 @@ func analyzeJob(
 		return nil, fmt.Errorf("failed to resolve hardware map: %w", err)
 	}
 
-	if len(instanceKeys) == 0 {
-		return nil, fmt.Errorf("no instances found for GPU type %s with count %d", req.Compute.GPUType, req.Compute.GPUCount)
+	// Step 1b: Multi-node compositions, when no single instance has enough GPUs
+	// or the job says how many nodes it may span
+	compositions := []Composition{}
+	if maxNodes, always := compositionBound(req.Compute); always || len(instanceKeys) == 0 {
+		compositions, err = hardwareMapResolver.ResolveCompositions(ctx, req.Compute, maxNodes)
+		if err != nil {
+			return nil, fmt.Errorf("failed to resolve compositions: %w", err)
+		}
 	}
 
-	// Step 2: Find data-local option
-	dataLocalKey, err := hardwareMapResolver.FindDataLocalInstance(req.Data.Location, instanceKeys)
-	if err != nil {
-		return nil, fmt.Errorf("failed to find data-local instance: %w", err)
+	if len(instanceKeys) == 0 && len(compositions) == 0 {
+		return nil, fmt.Errorf("no instances found for GPU type %s with count %d", req.Compute.GPUType, req.Compute.GPUCount)
 	}
 
 	sourceProvider, sourceService, sourceRegion, err := ParseLocation(req.Data.Location)
@@ -99,78 +398,197 @@ func analyzeJob(
 		return nil, fmt.Errorf("invalid data location: %w", err)
 	}
 
-	dataLocalProvider, dataLocalRegion, dataLocalInstanceType, err := ParseInstanceKey(dataLocalKey)
+	// Step 2: Find data-local option: a single instance if there is one, else the
+	// cheapest composition in the data's region
+	dataLocalComposition := -1
+	dataLocalKey, err := hardwareMapResolver.FindDataLocalInstance(req.Data.Location, instanceKeys)
 	if err != nil {
-		return nil, fmt.Errorf("invalid data-local instance key: %w", err)
+		for i, composition := range compositions {
+			if composition.Provider == sourceProvider && composition.Region == sourceRegion {
+				dataLocalComposition = i
+				break
+			}
+		}
+		if dataLocalComposition < 0 {
+			return nil, fmt.Errorf("failed to find data-local instance: %w", err)
+		}
 	}
 
-	// Get data-local compute price
-	dataLocalPrice, err := calculator.redis.GetComputePrice(dataLocalProvider, dataLocalRegion, dataLocalInstanceType)
-	if err != nil || dataLocalPrice == nil {
-		return nil, fmt.Errorf("failed to get data-local compute price")
-	}
+	var dataLocalOption AnalysisOption
+	if dataLocalComposition >= 0 {
+		composition := compositions[dataLocalComposition]
+		dataLocalOption = AnalysisOption{
+			Provider:           composition.Provider,
+			Region:             composition.Region,
+			InstanceType:       composition.InstanceType(),
+			ComputeCostPerHour: composition.CostPerHour(),
+			AdvisoryMessage:    "This is your data-local option.",
+			NodeCount:          composition.NodeCount(),
+			Nodes:              composition.Nodes,
+		}
+	} else {
+		dataLocalProvider, dataLocalRegion, dataLocalInstanceType, err := ParseInstanceKey(dataLocalKey)
+		if err != nil {
+			return nil, fmt.Errorf("invalid data-local instance key: %w", err)
+		}
 
-	localCostPerHour := dataLocalPrice.CostPerHour
+		// Get data-local compute price
+		dataLocalPrice, err := calculator.redis.GetComputePrice(ctx, dataLocalProvider, dataLocalRegion, dataLocalInstanceType)
+		if err != nil || dataLocalPrice == nil {
+			return nil, fmt.Errorf("failed to get data-local compute price")
+		}
 
-	// Build data-local option
-	dataLocalOption := AnalysisOption{
-		Provider:          dataLocalProvider,
-		Region:            dataLocalRegion,
-		InstanceType:      dataLocalInstanceType,
-		ComputeCostPerHour: localCostPerHour,
-		OneTimeEgressCost:  0, // No egress for data-local
-		BreakEvenHours:    nil,
-		AdvisoryMessage:   "This is your data-local option.",
-		IsSpotInstance:    false,
-		InterruptionRisk:   nil,
+		// Build data-local option
+		dataLocalOption = AnalysisOption{
+			Provider:          dataLocalProvider,
+			Region:            dataLocalRegion,
+			InstanceType:      dataLocalInstanceType,
+			ComputeCostPerHour: dataLocalPrice.CostPerHour,
+			OneTimeEgressCost:  0, // No egress for data-local
+			BreakEvenHours:    nil,
+			AdvisoryMessage:   "This is your data-local option.",
+			IsSpotInstance:    false,
+			InterruptionRisk:   nil,
+		}
 	}
+	localCostPerHour := dataLocalOption.ComputeCostPerHour
 
-	// Step 3: Analyze remote options
-	remoteOptions := make([]AnalysisOption, 0)
+	// Constraints: providers and spot/on-demand are filtered before any price lookup,
+	// hourly costs as soon as they are known (before egress is priced) and the rest
+	// once an option is evaluated. The selector keeps only the requested top-k.
+	constraints := req.Constraints
+	onDemandKeys := make([]string, 0, len(instanceKeys))
+	spotKeys := make([]string, 0)
 	for _, instanceKey := range instanceKeys {
-		// Skip data-local option
-		if instanceKey == dataLocalKey {
+		if !constraints.AllowsInstance(instanceKey) {
 			continue
 		}
+		if instanceKey != dataLocalKey && constraints.WantsOnDemand() {
+			onDemandKeys = append(onDemandKeys, instanceKey)
+		}
+		// Spot instances are only analyzed for AWS entries
+		if provider, _, _, err := ParseInstanceKey(instanceKey); err == nil && provider == "aws" && constraints.WantsSpot() {
+			spotKeys = append(spotKeys, instanceKey)
+		}
+	}
+	// Compositions are analyzed on demand only
+	remoteCompositions := make([]Composition, 0, len(compositions))
+	for i, composition := range compositions {
+		if i != dataLocalComposition && constraints.WantsOnDemand() && constraints.AllowsInstance(composition.InstanceKey()) {
+			remoteCompositions = append(remoteCompositions, composition)
+		}
+	}
+	selector := NewOptionSelector(constraints)
+	admitPrice := func(costPerHour float64) bool {
+		return constraints.AdmitsPrice(costPerHour, localCostPerHour) && !selector.CannotPlace(costPerHour)
+	}
+
+	// Past the deadline, the options priced so far are returned marked partial;
+	// skipped counts the candidates (on-demand and spot) that were not priced
+	response := &AnalysisResponse{DataLocalOption: dataLocalOption}
+	skipped := func(remaining int) {
+		response.Partial = true
+		response.OptionsSkipped += remaining
+	}
+
+	// Step 3: Analyze remote options
+	for i, instanceKey := range onDemandKeys {
+		if selector.Full() {
+			break
+		}
+		if ctx.Err() != nil {
+			skipped(len(onDemandKeys) - i)
+			break
+		}
 
 		option, err := calculator.AnalyzeOption(
+			ctx,
 			instanceKey,
 			sourceProvider,
 			sourceService,
 			sourceRegion,
 			localCostPerHour,
 			req.Data.SizeGB,
+			admitPrice,
 		)
+		if (err != nil || option == nil) && ctx.Err() != nil {
+			skipped(len(onDemandKeys) - i)
+			break
+		}
 		if err != nil {
 			log.Printf("WARNING: Failed to analyze option %s: %v", instanceKey, err)
 			continue
 		}
 		if option == nil {
-			// Silently omitted (missing Redis keys)
+			// Silently omitted (missing Redis keys, or ruled out by its hourly cost)
 			continue
 		}
 
-		remoteOptions = append(remoteOptions, *option)
+		if constraints.Admits(option) {
+			selector.Add(*option)
+		}
 	}
 
-	// Step 4: Analyze AWS spot instances (only for AWS entries)
-	for _, instanceKey := range instanceKeys {
-		provider, _, _, err := ParseInstanceKey(instanceKey)
-		if err != nil || provider != "aws" {
+	// Step 3b: Analyze multi-node compositions
+	for i, composition := range remoteCompositions {
+		if selector.Full() {
+			break
+		}
+		if ctx.Err() != nil {
+			skipped(len(remoteCompositions) - i)
+			break
+		}
+
+		option, err := calculator.AnalyzeComposition(
+			ctx,
+			composition,
+			sourceProvider,
+			sourceService,
+			sourceRegion,
+			localCostPerHour,
+			req.Data.SizeGB,
+			admitPrice,
+		)
+		if (err != nil || option == nil) && ctx.Err() != nil {
+			skipped(len(remoteCompositions) - i)
+			break
+		}
+		if err != nil {
+			log.Printf("WARNING: Failed to analyze composition %s in %s:%s: %v",
+				composition.InstanceType(), composition.Provider, composition.Region, err)
 			continue
 		}
+		if option != nil && constraints.Admits(option) {
+			selector.Add(*option)
+		}
+	}
+
+	// Step 4: Analyze AWS spot instances
+	for i, instanceKey := range spotKeys {
+		if selector.Full() {
+			break
+		}
+		if ctx.Err() != nil {
+			skipped(len(spotKeys) - i)
+			break
+		}
 
 		// Get on-demand price for fallback
-		_, onDemandRegion, onDemandInstanceType, err := ParseInstanceKey(instanceKey)
+		provider, onDemandRegion, onDemandInstanceType, err := ParseInstanceKey(instanceKey)
 		if err != nil {
 			continue
 		}
-		onDemandPrice, err := calculator.redis.GetComputePrice(provider, onDemandRegion, onDemandInstanceType)
+		onDemandPrice, err := calculator.redis.GetComputePrice(ctx, provider, onDemandRegion, onDemandInstanceType)
+		if err != nil && ctx.Err() != nil {
+			skipped(len(spotKeys) - i)
+			break
+		}
 		if err != nil || onDemandPrice == nil {
 			continue
 		}
 
 		spotOption, err := spotClient.AnalyzeSpotOption(
+			ctx,
 			instanceKey,
 			sourceProvider,
 			sourceService,
@@ -180,18 +598,26 @@ func analyzeJob(
 			onDemandPrice.CostPerHour,
 			calculator,
 		)
+		if (err != nil || spotOption == nil) && ctx.Err() != nil {
+			skipped(len(spotKeys) - i)
+			break
+		}
 		if err != nil {
 			log.Printf("WARNING: Failed to analyze spot option %s: %v", instanceKey, err)
 			continue
 		}
-		if spotOption != nil {
-			remoteOptions = append(remoteOptions, *spotOption)
+		if spotOption != nil && constraints.Admits(spotOption) {
+			selector.Add(*spotOption)
 		}
 	}
 
-	return &AnalysisResponse{
-		DataLocalOption: dataLocalOption,
-		RemoteOptions:   remoteOptions,
-	}, nil
+	remoteOptions := selector.Options()
+	if response.Partial {
+		span.SetAttribute("analysis.partial", "true")
+		log.Printf("WARNING: Deadline reached for %s, returning %d options and skipping %d",
+			req.JobName, len(remoteOptions), response.OptionsSkipped)
+	}
+	response.RemoteOptions = remoteOptions
+	return response, nil
 }
 
@@ -0,0 +1,50 @@
+package main
+
+import (
+	"context"
+	"io"
+	"net"
+	"net/http"
+	"os"
+	"path/filepath"
+	"testing"
+)
+
+func TestListenUnix_ServesHTTPAndReplacesStaleSocket(t *testing.T) {
+	path := filepath.Join(t.TempDir(), "engine.sock")
+
+	// A socket file left behind by a previous run must not block startup
+	stale, err := net.Listen("unix", path)
+	if err != nil {
+		t.Fatal(err)
+	}
+	stale.(*net.UnixListener).SetUnlinkOnClose(false)
+	stale.Close()
+	if _, err := os.Stat(path); err != nil {
+		t.Fatalf("expected stale socket file: %v", err)
+	}
+
+	listener, err := listenUnix(path)
+	if err != nil {
+		t.Fatalf("listenUnix: %v", err)
+	}
+	defer listener.Close()
+	go http.Serve(listener, http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		io.WriteString(w, "ok")
+	}))
+
+	client := &http.Client{Transport: &http.Transport{
+		DialContext: func(ctx context.Context, _, _ string) (net.Conn, error) {
+			return (&net.Dialer{}).DialContext(ctx, "unix", path)
+		},
+	}}
+	resp, err := client.Get("http://cost-engine/health")
+	if err != nil {
+		t.Fatalf("request over unix socket failed: %v", err)
+	}
+	defer resp.Body.Close()
+	body, _ := io.ReadAll(resp.Body)
+	if string(body) != "ok" {
+		t.Errorf("unexpected body %q", body)
+	}
+}
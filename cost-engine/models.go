@@ -12,6 +12,10 @@ type JobCompute struct {
 	GPUCount      int     `json:"gpu_count"`        // Required: e.g., 8
 	GPUMemoryGB   *int    `json:"gpu_memory_gb"`    // Optional: e.g., 80
 	Interconnect  *string `json:"interconnect"`     // Optional: e.g., "infiniband"
+	// Optional: nodes a job may span (see composition.go). When unset, multi-node
+	// compositions are only searched if no single instance has GPUCount GPUs.
+	MaxNodes    *int `json:"max_nodes,omitempty"`
+	MixedShapes bool `json:"mixed_shapes,omitempty"` // Also combine different instance types
 }
 
 // JobOutput represents output location (for MVP 3, ignored in MVP 1)
@@ -26,6 +30,21 @@ type JobRequest struct {
 	Data    JobData     `json:"data"`
 	Compute JobCompute  `json:"compute"`
 	Output  *JobOutput  `json:"output,omitempty"` // Optional, ignored in MVP 1
+	// Optional: narrows, orders and truncates the remote options (see constraints.go)
+	Constraints *JobConstraints `json:"constraints,omitempty"`
+}
+
+// JobConstraints describe which remote options the caller wants back. The data-local
+// option is always returned, since it is what every remote option is measured against.
+type JobConstraints struct {
+	Providers         []string `json:"providers,omitempty"`         // Allow-list; empty allows every provider
+	ExcludeProviders  []string `json:"exclude_providers,omitempty"` // Deny-list, applied after the allow-list
+	MaxBreakEvenHours *float64 `json:"max_break_even_hours,omitempty"`
+	MaxCostPerHour    *float64 `json:"max_cost_per_hour,omitempty"`
+	RecommendedOnly   bool     `json:"recommended_only,omitempty"` // Drop options that never break even
+	Spot              *bool    `json:"spot,omitempty"`             // nil: both; true: spot only; false: on-demand only
+	SortBy            string   `json:"sort_by,omitempty"`          // "break-even", "hourly-cost" or "egress"
+	TopK              int      `json:"top_k,omitempty"`            // Keep the first TopK options (after sorting)
 }
 
 // AnalysisOption represents a single compute option analysis
@@ -39,12 +58,22 @@ type AnalysisOption struct {
 	AdvisoryMessage   string   `json:"advisory_message"`
 	IsSpotInstance    bool     `json:"is_spot_instance"`
 	InterruptionRisk   *string  `json:"interruption_risk,omitempty"` // "LOW", "MEDIUM", "HIGH", or nil
+	EgressRoute       []string `json:"egress_route,omitempty"`       // Locations the data passes through, ending at the compute region
+	// Multi-node options only: ComputeCostPerHour is then the total over Nodes
+	NodeCount int               `json:"node_count,omitempty"`
+	Nodes     []CompositionNode `json:"nodes,omitempty"`
 }
 
 // AnalysisResponse represents the complete analysis result
 type AnalysisResponse struct {
 	DataLocalOption AnalysisOption   `json:"data_local_option"`
 	RemoteOptions   []AnalysisOption `json:"remote_options"`
+	// Price keys the analysis read; only listed when the request asks for them
+	Dependencies []string `json:"dependencies,omitempty"`
+	// Set when the request deadline cut the analysis short: RemoteOptions holds
+	// what was priced in time and OptionsSkipped counts the candidates left out
+	Partial        bool `json:"partial,omitempty"`
+	OptionsSkipped int  `json:"options_skipped,omitempty"`
 }
 
 // ComputePrice represents a compute price entry from Redis
@@ -0,0 +1,295 @@
+package main
+
+import (
+	"context"
+	"errors"
+	"fmt"
+	"sort"
+)
+
+// Placement answers the opposite question of /analyze: not "where should this job
+// run, given where its data is" but "where should the data be stored". For every
+// candidate storage location and GPU shape it finds the cheapest plan: the
+// data-local instance, or a remote one reached over the cheapest egress route.
+
+// maxPlacementCells bounds locations x shapes in one request
+const maxPlacementCells = 10000
+
+var errPlacementTooLarge = errors.New("placement matrix too large")
+
+// PlacementRequest lists the GPU shapes a dataset will be used with
+type PlacementRequest struct {
+	SizeGB float64      `json:"size_gb"`
+	Shapes []JobCompute `json:"shapes"`
+	// Candidate storage locations (provider:service:region); empty: every storage
+	// location egress prices are known for
+	Locations []string `json:"locations,omitempty"`
+	// Optional: rank plans by total cost over this many hours, egress included,
+	// instead of by hourly cost
+	DurationHours *float64 `json:"duration_hours,omitempty"`
+}
+
+// Validate checks the request before any price is read
+func (r *PlacementRequest) Validate() error {
+	if r.SizeGB <= 0 {
+		return fmt.Errorf("size_gb must be positive")
+	}
+	if len(r.Shapes) == 0 {
+		return fmt.Errorf("at least one shape is required")
+	}
+	for _, shape := range r.Shapes {
+		if shape.GPUType == "" || shape.GPUCount <= 0 {
+			return fmt.Errorf("every shape needs a gpu_type and a positive gpu_count")
+		}
+		if n := shape.MaxNodes; n != nil && (*n < 1 || *n > maxNodesLimit) {
+			return fmt.Errorf("max_nodes must be between 1 and %d", maxNodesLimit)
+		}
+	}
+	for _, location := range r.Locations {
+		if _, _, _, err := ParseLocation(location); err != nil {
+			return err
+		}
+	}
+	if r.DurationHours != nil && *r.DurationHours <= 0 {
+		return fmt.Errorf("duration_hours must be positive")
+	}
+	return nil
+}
+
+// PlacementInstance is a priced compute plan the matrix cells refer to by index
+type PlacementInstance struct {
+	Provider     string  `json:"provider"`
+	Region       string  `json:"region"`
+	InstanceType string  `json:"instance_type"`
+	CostPerHour  float64 `json:"cost_per_hour"`
+	NodeCount    int     `json:"node_count,omitempty"` // Multi-node compositions only
+}
+
+// PlacementCell is the cheapest plan for one storage location and shape
+type PlacementCell struct {
+	Local             *int     `json:"local"` // Index into Instances; nil without an instance in the location's region
+	Best              int      `json:"best"`  // Index into Instances
+	OneTimeEgressCost float64  `json:"one_time_egress_cost"`
+	BreakEvenHours    *float64 `json:"break_even_hours,omitempty"` // When Best is remote and beats Local
+	TotalCost         *float64 `json:"total_cost,omitempty"`       // With duration_hours
+}
+
+// PlacementResponse is a locations x shapes matrix. Cells[i][j] is nil when no
+// plan for Shapes[j] can be reached from Locations[i].
+type PlacementResponse struct {
+	Locations []string            `json:"locations"`
+	Shapes    []JobCompute        `json:"shapes"`
+	Instances []PlacementInstance `json:"instances"`
+	Cells     [][]*PlacementCell  `json:"cells"`
+}
+
+// placementPlan is an instance (or composition) priced for one shape
+type placementPlan struct {
+	index       int // Into PlacementResponse.Instances
+	provider    string
+	region      string
+	costPerHour float64
+}
+
+// Placer computes placement matrices
+type Placer struct {
+	hardwareMap *HardwareMapResolver
+	calculator  *Calculator
+}
+
+func NewPlacer(hardwareMap *HardwareMapResolver, calculator *Calculator) *Placer {
+	return &Placer{hardwareMap: hardwareMap, calculator: calculator}
+}
+
+// Place fills the matrix in one pass: each shape's instances are resolved and
+// priced once, each (location, compute region) route is looked up once, and
+// every location then scans a shape's plans cheapest first, stopping as soon as
+// no remaining plan can beat the best one found.
+func (p *Placer) Place(ctx context.Context, req PlacementRequest) (*PlacementResponse, error) {
+	ctx, span := StartSpan(ctx, "place")
+	defer span.End()
+
+	locations := req.Locations
+	if len(locations) == 0 {
+		locations = p.calculator.egress.StorageLocations()
+	}
+	if len(locations)*len(req.Shapes) > maxPlacementCells {
+		return nil, fmt.Errorf("%w: %d locations x %d shapes is more than %d cells",
+			errPlacementTooLarge, len(locations), len(req.Shapes), maxPlacementCells)
+	}
+	span.SetAttribute("placement.cells", fmt.Sprintf("%d", len(locations)*len(req.Shapes)))
+
+	response := &PlacementResponse{
+		Locations: locations,
+		Shapes:    req.Shapes,
+		Instances: make([]PlacementInstance, 0),
+		Cells:     make([][]*PlacementCell, len(locations)),
+	}
+	instanceIndex := make(map[string]int)
+	plans := make([][]placementPlan, len(req.Shapes))
+	for j, shape := range req.Shapes {
+		shapePlans, err := p.plans(ctx, shape, response, instanceIndex)
+		if err != nil {
+			return nil, err
+		}
+		plans[j] = shapePlans
+	}
+
+	type routeKey struct{ location, destination string }
+	routes := make(map[routeKey]*EgressRoute)
+	route := func(location, provider, region string) (*EgressRoute, error) {
+		key := routeKey{location, provider + ":" + region}
+		if r, ok := routes[key]; ok {
+			return r, nil
+		}
+		sourceProvider, sourceService, sourceRegion, _ := ParseLocation(location)
+		r, err := p.calculator.egress.Route(ctx, sourceProvider, sourceService, sourceRegion, provider, region)
+		if err != nil {
+			return nil, err
+		}
+		routes[key] = r
+		return r, nil
+	}
+
+	for i, location := range locations {
+		if ctx.Err() != nil {
+			return nil, ctx.Err()
+		}
+		sourceProvider, _, sourceRegion, _ := ParseLocation(location)
+		response.Cells[i] = make([]*PlacementCell, len(req.Shapes))
+		for j := range req.Shapes {
+			cell, err := p.cell(plans[j], sourceProvider, sourceRegion, req, func(provider, region string) (*EgressRoute, error) {
+				return route(location, provider, region)
+			})
+			if err != nil {
+				return nil, err
+			}
+			response.Cells[i][j] = cell
+		}
+	}
+	return response, nil
+}
+
+// plans resolves and prices a shape's instances (or, without any, its
+// multi-node compositions), cheapest first
+func (p *Placer) plans(ctx context.Context, shape JobCompute, response *PlacementResponse, instanceIndex map[string]int) ([]placementPlan, error) {
+	add := func(instance PlacementInstance) placementPlan {
+		key := fmt.Sprintf("%s:%s:%s", instance.Provider, instance.Region, instance.InstanceType)
+		index, ok := instanceIndex[key]
+		if !ok {
+			index = len(response.Instances)
+			instanceIndex[key] = index
+			response.Instances = append(response.Instances, instance)
+		}
+		return placementPlan{index: index, provider: instance.Provider, region: instance.Region, costPerHour: instance.CostPerHour}
+	}
+
+	instanceKeys, err := p.hardwareMap.ResolveInstances(ctx, shape.GPUType, shape.GPUCount, shape.GPUMemoryGB, shape.Interconnect)
+	if err != nil {
+		return nil, fmt.Errorf("failed to resolve hardware map: %w", err)
+	}
+	plans := make([]placementPlan, 0, len(instanceKeys))
+	for _, key := range instanceKeys {
+		provider, region, instanceType, err := ParseInstanceKey(key)
+		if err != nil {
+			continue
+		}
+		price, err := p.calculator.redis.GetComputePrice(ctx, provider, region, instanceType)
+		if err != nil {
+			return nil, fmt.Errorf("failed to get compute price: %w", err)
+		}
+		if price == nil {
+			p.calculator.redis.LogMissingKey("compute", "compute:"+key)
+			continue
+		}
+		plans = append(plans, add(PlacementInstance{
+			Provider: provider, Region: region, InstanceType: instanceType, CostPerHour: price.CostPerHour,
+		}))
+	}
+
+	if maxNodes, always := compositionBound(shape); always || len(plans) == 0 {
+		compositions, err := p.hardwareMap.ResolveCompositions(ctx, shape, maxNodes)
+		if err != nil {
+			return nil, fmt.Errorf("failed to resolve compositions: %w", err)
+		}
+		for _, composition := range compositions {
+			plans = append(plans, add(PlacementInstance{
+				Provider:     composition.Provider,
+				Region:       composition.Region,
+				InstanceType: composition.InstanceType(),
+				CostPerHour:  composition.CostPerHour(),
+				NodeCount:    composition.NodeCount(),
+			}))
+		}
+	}
+
+	sort.SliceStable(plans, func(a, b int) bool { return plans[a].costPerHour < plans[b].costPerHour })
+	return plans, nil
+}
+
+// cell picks the cheapest of a shape's plans (ordered cheapest first) from one
+// storage location; nil when none is reachable
+func (p *Placer) cell(
+	plans []placementPlan,
+	sourceProvider, sourceRegion string,
+	req PlacementRequest,
+	route func(provider, region string) (*EgressRoute, error),
+) (*PlacementCell, error) {
+	var local, best *placementPlan
+	bestEgress := 0.0
+	bestScore := 0.0
+	score := func(plan *placementPlan, egress float64) float64 {
+		if req.DurationHours == nil {
+			return plan.costPerHour
+		}
+		return plan.costPerHour**req.DurationHours + egress
+	}
+
+	for k := range plans {
+		plan := &plans[k]
+		isLocal := plan.provider == sourceProvider && plan.region == sourceRegion
+		if local == nil && isLocal {
+			local = plan
+		}
+		// Plans are ordered by hourly cost and egress is never negative: nothing
+		// further can beat the best plan once its compute alone does not (the
+		// local plan still wins a tie, since it needs no transfer)
+		if compute := score(plan, 0); best != nil && (compute > bestScore || (compute == bestScore && !isLocal)) {
+			if local != nil {
+				break
+			}
+			continue // Keep looking for the local plan, for break-even
+		}
+
+		egress := 0.0
+		if !isLocal {
+			r, err := route(plan.provider, plan.region)
+			if err != nil {
+				return nil, err
+			}
+			if r == nil {
+				continue // Unreachable from this location
+			}
+			egress = r.CostPerGB * req.SizeGB
+		}
+		if s := score(plan, egress); best == nil || s < bestScore || (s == bestScore && isLocal) {
+			best, bestEgress, bestScore = plan, egress, s
+		}
+	}
+	if best == nil {
+		return nil, nil
+	}
+
+	cell := &PlacementCell{Best: best.index, OneTimeEgressCost: bestEgress}
+	if local != nil {
+		cell.Local = &local.index
+		if best != local {
+			cell.BreakEvenHours, _ = p.calculator.CalculateBreakEven(local.costPerHour, best.costPerHour, bestEgress)
+		}
+	}
+	if req.DurationHours != nil {
+		total := bestScore
+		cell.TotalCost = &total
+	}
+	return cell, nil
+}
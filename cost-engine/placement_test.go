@@ -0,0 +1,102 @@
+package main
+
+import (
+	"math"
+	"reflect"
+	"testing"
+)
+
+// placementRoutes serves routes from the sample egress graph
+func placementRoutes(g *EgressGraph, location string) func(provider, region string) (*EgressRoute, error) {
+	sourceProvider, sourceService, sourceRegion, _ := ParseLocation(location)
+	return func(provider, region string) (*EgressRoute, error) {
+		return g.Route(sourceProvider, sourceService, sourceRegion, provider, region), nil
+	}
+}
+
+// Cheapest first, as Placer.plans returns them
+var samplePlans = []placementPlan{
+	{index: 0, provider: "coreweave", region: "lva", costPerHour: 40},
+	{index: 1, provider: "gcp", region: "us-central1", costPerHour: 80},
+	{index: 2, provider: "aws", region: "us-east-1", costPerHour: 98},
+}
+
+func TestPlacementCell_CheapestHourlyWithBreakEven(t *testing.T) {
+	p := &Placer{calculator: &Calculator{}}
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+	req := PlacementRequest{SizeGB: 1000}
+
+	cell, err := p.cell(samplePlans, "aws", "us-east-1", req, placementRoutes(g, "aws:s3:us-east-1"))
+	if err != nil || cell == nil {
+		t.Fatalf("expected a cell, got %v, %v", cell, err)
+	}
+	if cell.Best != 0 || cell.Local == nil || *cell.Local != 2 {
+		t.Errorf("expected coreweave best and aws local, got %+v", cell)
+	}
+	// 0.09/GB to coreweave, saving 58/hr
+	if math.Abs(cell.OneTimeEgressCost-90) > 1e-9 || cell.BreakEvenHours == nil || *cell.BreakEvenHours != 1.6 {
+		t.Errorf("unexpected egress or break-even in %+v", cell)
+	}
+	if cell.TotalCost != nil {
+		t.Error("total cost is only reported with duration_hours")
+	}
+}
+
+func TestPlacementCell_DurationFavoursLocalForShortJobs(t *testing.T) {
+	p := &Placer{calculator: &Calculator{}}
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+	short := 1.0
+	req := PlacementRequest{SizeGB: 1000, DurationHours: &short}
+
+	// One hour: 98 locally beats 40 + 90 egress at coreweave and 80 + 90 at gcp
+	cell, _ := p.cell(samplePlans, "aws", "us-east-1", req, placementRoutes(g, "aws:s3:us-east-1"))
+	if cell.Best != 2 || cell.OneTimeEgressCost != 0 || cell.BreakEvenHours != nil || *cell.TotalCost != 98 {
+		t.Errorf("expected the local plan, got %+v", cell)
+	}
+}
+
+func TestPlacementCell_NoLocalOrUnreachable(t *testing.T) {
+	p := &Placer{calculator: &Calculator{}}
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+	req := PlacementRequest{SizeGB: 10}
+
+	// Data in us-west-2: no local plan, coreweave over the internet
+	cell, _ := p.cell(samplePlans, "aws", "us-west-2", req, placementRoutes(g, "aws:s3:us-west-2"))
+	if cell.Best != 0 || cell.Local != nil || cell.BreakEvenHours != nil {
+		t.Errorf("unexpected cell %+v", cell)
+	}
+
+	// Unknown location: nothing reachable
+	if cell, _ := p.cell(samplePlans, "azure", "eastus", req, placementRoutes(g, "azure:blob:eastus")); cell != nil {
+		t.Errorf("expected no plan, got %+v", cell)
+	}
+}
+
+func TestEgressGraph_StorageLocations(t *testing.T) {
+	g := NewEgressGraph(sampleEgressPrices, sampleComputeRegions)
+	expected := []string{
+		"aws:ec2:us-east-1", "aws:s3:us-east-1", "aws:s3:us-west-2", "coreweave:storage:lva", "gcp:gcs:us-central1",
+	}
+	if got := g.StorageLocations(); !reflect.DeepEqual(got, expected) {
+		t.Errorf("expected %v, got %v", expected, got)
+	}
+}
+
+func TestPlacementRequest_Validate(t *testing.T) {
+	zero := 0.0
+	for _, req := range []PlacementRequest{
+		{SizeGB: 0, Shapes: []JobCompute{{GPUType: "H100", GPUCount: 8}}},
+		{SizeGB: 10},
+		{SizeGB: 10, Shapes: []JobCompute{{GPUType: "H100"}}},
+		{SizeGB: 10, Shapes: []JobCompute{{GPUType: "H100", GPUCount: 8}}, Locations: []string{"us-east-1"}},
+		{SizeGB: 10, Shapes: []JobCompute{{GPUType: "H100", GPUCount: 8}}, DurationHours: &zero},
+	} {
+		if req.Validate() == nil {
+			t.Errorf("expected %+v to be rejected", req)
+		}
+	}
+	ok := PlacementRequest{SizeGB: 10, Shapes: []JobCompute{{GPUType: "H100", GPUCount: 8}}, Locations: []string{"aws:s3:us-east-1"}}
+	if err := ok.Validate(); err != nil {
+		t.Error(err)
+	}
+}
@@ -0,0 +1,226 @@
+package main
+
+import (
+	"container/list"
+	"context"
+	"fmt"
+	"io"
+	"log"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"time"
+
+	"github.com/redis/go-redis/v9"
+)
+
+// priceVersionKey is incremented by loaders after they change prices; a change
+// flushes the cache even when keyspace notifications are unavailable
+const priceVersionKey = "prices:version"
+
+// Filtered GPU map results are cached under sinterCachePrefix; they depend on
+// every gpu_map/gpu_idx set
+const sinterCachePrefix = "sinter:"
+
+// The GPU counts a GPU type has maps for are cached under gpuShapesCachePrefix
+// followed by the type; they change when one of its gpu_map sets does
+const gpuShapesCachePrefix = "gpu_shapes:"
+
+// cacheKinds are the entry types hit rates are reported for
+var cacheKinds = []string{"compute", "egress", "gpu_map"}
+
+type cacheEntry struct {
+	key   string
+	value interface{} // nil caches a missing key
+}
+
+type cacheCounters struct {
+	hits   atomic.Uint64
+	misses atomic.Uint64
+}
+
+// PriceCache is a bounded LRU of decoded price entries (ComputePrice, EgressPrice,
+// GPU map members) keyed by their Redis key. Cached values are shared between
+// requests and must not be modified.
+//
+// Entries are invalidated by Redis keyspace notifications, by changes to
+// prices:version, and by a periodic full flush as a safety net for missed events.
+type PriceCache struct {
+	mu       sync.Mutex
+	capacity int
+	order    *list.List // front = most recently used
+	entries  map[string]*list.Element
+
+	// generation changes on every invalidation. A value read from Redis is only
+	// stored if no invalidation happened while it was being fetched.
+	generation atomic.Uint64
+
+	counters  map[string]*cacheCounters
+	evictions atomic.Uint64
+	flushes   atomic.Uint64
+}
+
+func NewPriceCache(capacity int) *PriceCache {
+	counters := make(map[string]*cacheCounters, len(cacheKinds))
+	for _, kind := range cacheKinds {
+		counters[kind] = &cacheCounters{}
+	}
+	return &PriceCache{
+		capacity: capacity,
+		order:    list.New(),
+		entries:  make(map[string]*list.Element),
+		counters: counters,
+	}
+}
+
+// Get returns a cached value and whether it was present, counting a hit or miss for kind
+func (c *PriceCache) Get(kind, key string) (interface{}, bool) {
+	c.mu.Lock()
+	element, ok := c.entries[key]
+	var value interface{}
+	if ok {
+		c.order.MoveToFront(element)
+		value = element.Value.(*cacheEntry).value
+	}
+	c.mu.Unlock()
+
+	if counters := c.counters[kind]; counters != nil {
+		if ok {
+			counters.hits.Add(1)
+		} else {
+			counters.misses.Add(1)
+		}
+	}
+	return value, ok
+}
+
+// Generation returns a token to pass to Put for a value about to be fetched
+func (c *PriceCache) Generation() uint64 {
+	return c.generation.Load()
+}
+
+// Put stores a value fetched after Generation returned generation, unless the cache
+// was invalidated in the meantime (the value may already be stale)
+func (c *PriceCache) Put(key string, value interface{}, generation uint64) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if c.generation.Load() != generation {
+		return
+	}
+	if element, ok := c.entries[key]; ok {
+		element.Value.(*cacheEntry).value = value
+		c.order.MoveToFront(element)
+		return
+	}
+	c.entries[key] = c.order.PushFront(&cacheEntry{key: key, value: value})
+	for c.order.Len() > c.capacity {
+		oldest := c.order.Back()
+		c.order.Remove(oldest)
+		delete(c.entries, oldest.Value.(*cacheEntry).key)
+		c.evictions.Add(1)
+	}
+}
+
+// Invalidate drops the entry for a changed Redis key; GPU map changes also drop
+// every cached filtered query, since any of them may include the changed set,
+// and the GPU type's cached shapes
+func (c *PriceCache) Invalidate(key string) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.generation.Add(1)
+	c.remove(key)
+	if shape := strings.TrimPrefix(key, "gpu_map:"); shape != key {
+		if i := strings.LastIndex(shape, ":"); i > 0 {
+			c.remove(gpuShapesCachePrefix + shape[:i])
+		}
+	}
+	if strings.HasPrefix(key, "gpu_map:") || strings.HasPrefix(key, "gpu_idx:") {
+		for cached := range c.entries {
+			if strings.HasPrefix(cached, sinterCachePrefix) {
+				c.remove(cached)
+			}
+		}
+	}
+}
+
+// Flush drops every entry
+func (c *PriceCache) Flush() {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.generation.Add(1)
+	c.order.Init()
+	c.entries = make(map[string]*list.Element)
+	c.flushes.Add(1)
+}
+
+func (c *PriceCache) remove(key string) {
+	if element, ok := c.entries[key]; ok {
+		c.order.Remove(element)
+		delete(c.entries, key)
+	}
+}
+
+// Len returns the number of cached entries
+func (c *PriceCache) Len() int {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	return c.order.Len()
+}
+
+// WriteMetrics writes hit/miss counters and the hit rate per kind in Prometheus text format
+func (c *PriceCache) WriteMetrics(w io.Writer) {
+	fmt.Fprintln(w, "# HELP price_cache_requests_total Price cache lookups by kind and result")
+	fmt.Fprintln(w, "# TYPE price_cache_requests_total counter")
+	for _, kind := range cacheKinds {
+		counters := c.counters[kind]
+		fmt.Fprintf(w, "price_cache_requests_total{kind=%q,result=\"hit\"} %d\n", kind, counters.hits.Load())
+		fmt.Fprintf(w, "price_cache_requests_total{kind=%q,result=\"miss\"} %d\n", kind, counters.misses.Load())
+	}
+	fmt.Fprintln(w, "# HELP price_cache_hit_ratio Share of lookups served from the cache since startup")
+	fmt.Fprintln(w, "# TYPE price_cache_hit_ratio gauge")
+	for _, kind := range cacheKinds {
+		counters := c.counters[kind]
+		hits, misses := counters.hits.Load(), counters.misses.Load()
+		ratio := 0.0
+		if hits+misses > 0 {
+			ratio = float64(hits) / float64(hits+misses)
+		}
+		fmt.Fprintf(w, "price_cache_hit_ratio{kind=%q} %g\n", kind, ratio)
+	}
+	fmt.Fprintln(w, "# TYPE price_cache_entries gauge")
+	fmt.Fprintf(w, "price_cache_entries %d\n", c.Len())
+	fmt.Fprintln(w, "# TYPE price_cache_evictions_total counter")
+	fmt.Fprintf(w, "price_cache_evictions_total %d\n", c.evictions.Load())
+	fmt.Fprintln(w, "# TYPE price_cache_flushes_total counter")
+	fmt.Fprintf(w, "price_cache_flushes_total %d\n", c.flushes.Load())
+}
+
+// RunResync flushes the cache whenever prices:version changes (checked every
+// pollInterval) and unconditionally every resyncInterval. It never returns.
+func (c *PriceCache) RunResync(client *redis.Client, pollInterval, resyncInterval time.Duration) {
+	ctx := context.Background()
+	readVersion := func() string {
+		version, err := client.Get(ctx, priceVersionKey).Result()
+		if err != nil && err != redis.Nil {
+			log.Printf("WARNING: Failed to read %s: %v", priceVersionKey, err)
+		}
+		return version
+	}
+
+	version := readVersion()
+	poll := time.NewTicker(pollInterval)
+	defer poll.Stop()
+	resync := time.NewTicker(resyncInterval)
+	defer resync.Stop()
+	for {
+		select {
+		case <-poll.C:
+			if current := readVersion(); current != version {
+				version = current
+				c.Flush()
+			}
+		case <-resync.C:
+			c.Flush()
+		}
+	}
+}
@@ -0,0 +1,92 @@
+package main
+
+import (
+	"bytes"
+	"strings"
+	"testing"
+)
+
+func TestPriceCache_HitMissAndEviction(t *testing.T) {
+	cache := NewPriceCache(2)
+	gen := cache.Generation()
+	cache.Put("compute:aws:us-east-1:a", &ComputePrice{CostPerHour: 1}, gen)
+	cache.Put("compute:aws:us-east-1:b", (*ComputePrice)(nil), gen)
+
+	if value, ok := cache.Get("compute", "compute:aws:us-east-1:a"); !ok || value.(*ComputePrice).CostPerHour != 1 {
+		t.Fatalf("expected cached price, got %v %v", value, ok)
+	}
+	// Missing keys are cached too
+	if value, ok := cache.Get("compute", "compute:aws:us-east-1:b"); !ok || value.(*ComputePrice) != nil {
+		t.Fatalf("expected cached miss, got %v %v", value, ok)
+	}
+
+	// "b" was read after "a", so "a" is least recently used and adding "c" evicts it
+	cache.Put("compute:aws:us-east-1:c", &ComputePrice{CostPerHour: 3}, gen)
+	if _, ok := cache.Get("compute", "compute:aws:us-east-1:a"); ok {
+		t.Error("least recently used entry should have been evicted")
+	}
+	if cache.Len() != 2 {
+		t.Errorf("expected 2 entries, got %d", cache.Len())
+	}
+}
+
+func TestPriceCache_InvalidationDropsStaleFetches(t *testing.T) {
+	cache := NewPriceCache(10)
+	gen := cache.Generation()
+	cache.Invalidate("egress:aws:s3:us-east-1:INTERNET")
+	// A value fetched before the invalidation must not be stored
+	cache.Put("egress:aws:s3:us-east-1:INTERNET", &EgressPrice{CostPerGB: 0.09}, gen)
+	if _, ok := cache.Get("egress", "egress:aws:s3:us-east-1:INTERNET"); ok {
+		t.Error("stale fetch was cached after invalidation")
+	}
+}
+
+func TestPriceCache_GPUMapChangeDropsFilteredQueries(t *testing.T) {
+	cache := NewPriceCache(10)
+	gen := cache.Generation()
+	filtered := sinterCachePrefix + "gpu_map:H100:8|gpu_idx:H100:8:mem:80"
+	cache.Put(filtered, filteredGPUMap{keys: []string{"aws:us-east-1:p5.48xlarge"}, indexed: true}, gen)
+	cache.Put("compute:aws:us-east-1:p5.48xlarge", &ComputePrice{}, gen)
+
+	cache.Invalidate("gpu_idx:H100:8:interconnect:infiniband")
+	if _, ok := cache.Get("gpu_map", filtered); ok {
+		t.Error("filtered GPU map query should be dropped when an index set changes")
+	}
+	if _, ok := cache.Get("compute", "compute:aws:us-east-1:p5.48xlarge"); !ok {
+		t.Error("unrelated entries should survive")
+	}
+}
+
+func TestPriceCache_GPUMapChangeDropsItsTypesShapes(t *testing.T) {
+	cache := NewPriceCache(10)
+	gen := cache.Generation()
+	cache.Put(gpuShapesCachePrefix+"H100", []int{1, 8}, gen)
+	cache.Put(gpuShapesCachePrefix+"A100", []int{8}, gen)
+
+	cache.Invalidate("gpu_map:H100:16")
+	if _, ok := cache.Get("gpu_map", gpuShapesCachePrefix+"H100"); ok {
+		t.Error("H100 shapes should be dropped when an H100 GPU map changes")
+	}
+	if _, ok := cache.Get("gpu_map", gpuShapesCachePrefix+"A100"); !ok {
+		t.Error("other GPU types' shapes should survive")
+	}
+}
+
+func TestPriceCache_Metrics(t *testing.T) {
+	cache := NewPriceCache(10)
+	cache.Put("egress:x", &EgressPrice{}, cache.Generation())
+	cache.Get("egress", "egress:x")
+	cache.Get("egress", "egress:y")
+
+	var buf bytes.Buffer
+	cache.WriteMetrics(&buf)
+	for _, want := range []string{
+		`price_cache_requests_total{kind="egress",result="hit"} 1`,
+		`price_cache_requests_total{kind="egress",result="miss"} 1`,
+		`price_cache_hit_ratio{kind="egress"} 0.5`,
+	} {
+		if !strings.Contains(buf.String(), want) {
+			t.Errorf("metrics missing %q:\n%s", want, buf.String())
+		}
+	}
+}
@@ -5,13 +5,27 @@ import (
 	"encoding/json"
 	"fmt"
 	"log"
+	"sort"
+	"strconv"
+	"strings"
+	"time"
 
 	"github.com/redis/go-redis/v9"
 )
 
+// scanBatchSize is the COUNT hint for SCAN and the batch size for MGET
+const scanBatchSize = 500
+
+// gpuIndexedShapesKey lists the "{gpu_type}:{gpu_count}" shapes whose secondary
+// index sets (see BuildGPUMemoryIndexKey, BuildInterconnectIndexKey) are maintained
+// by the loader. Shapes missing here are filtered by reading compute prices instead.
+const gpuIndexedShapesKey = "gpu_idx:indexed"
+
 type RedisClient struct {
 	client *redis.Client
 	ctx    context.Context
+	// cache holds decoded price entries; nil disables caching (see EnableCache)
+	cache *PriceCache
 }
 
 func NewRedisClient(addr string) (*RedisClient, error) {
@@ -38,27 +52,189 @@ func (r *RedisClient) Close() error {
 	return r.client.Close()
 }
 
+// EnableCache serves GetGPUMap, GetFilteredGPUMap, GetComputePrice and GetEgressPrice
+// from cache, kept consistent through prices:version (polled every pollInterval)
+// and a full flush every resyncInterval. Pass the cache to WatchKeyspace as well
+// for per-key invalidation.
+func (r *RedisClient) EnableCache(cache *PriceCache, pollInterval, resyncInterval time.Duration) {
+	r.cache = cache
+	go cache.RunResync(r.client, pollInterval, resyncInterval)
+}
+
+// WatchKeyspace reports changes to price keys to the listeners; it never returns
+func (r *RedisClient) WatchKeyspace(listeners ...KeyspaceListener) {
+	WatchKeyspace(r.client, listeners...)
+}
+
+func (r *RedisClient) cacheGet(kind, key string) (interface{}, bool) {
+	if r.cache == nil {
+		return nil, false
+	}
+	return r.cache.Get(kind, key)
+}
+
+func (r *RedisClient) cacheGeneration() uint64 {
+	if r.cache == nil {
+		return 0
+	}
+	return r.cache.Generation()
+}
+
+func (r *RedisClient) cachePut(key string, value interface{}, generation uint64) {
+	if r.cache != nil {
+		r.cache.Put(key, value, generation)
+	}
+}
+
+// Ping checks that Redis is reachable
+func (r *RedisClient) Ping(ctx context.Context) error {
+	return r.client.Ping(ctx).Err()
+}
+
+// PriceVersion returns the prices:version counter loaders bump after changing prices
+// ("0" before any loader has run). Responses tagged with it go stale when it changes.
+func (r *RedisClient) PriceVersion(ctx context.Context) (string, error) {
+	version, err := r.client.Get(ctx, priceVersionKey).Result()
+	if err == redis.Nil {
+		return "0", nil
+	}
+	if err != nil {
+		return "", fmt.Errorf("failed to read %s: %w", priceVersionKey, err)
+	}
+	return version, nil
+}
+
 // GetGPUMap retrieves the list of instance types for a given GPU type and count
-func (r *RedisClient) GetGPUMap(gpuType string, gpuCount int) ([]string, error) {
-	key := fmt.Sprintf("gpu_map:%s:%d", gpuType, gpuCount)
-	result, err := r.client.SMembers(r.ctx, key).Result()
+func (r *RedisClient) GetGPUMap(ctx context.Context, gpuType string, gpuCount int) ([]string, error) {
+	key := BuildGPUMapKey(gpuType, gpuCount)
+	recordDependency(ctx, key)
+	if cached, ok := r.cacheGet("gpu_map", key); ok {
+		// Callers own the returned slice; the cached one is shared
+		return append([]string(nil), cached.([]string)...), nil
+	}
+	generation := r.cacheGeneration()
+
+	ctx, span := StartSpan(ctx, "redis.smembers")
+	span.SetAttribute("redis.key", key)
+	defer span.End()
+
+	result, err := r.client.SMembers(ctx, key).Result()
 	if err != nil {
 		if err == redis.Nil {
 			return []string{}, nil // Empty set, not an error
 		}
+		span.SetError(err)
 		return nil, fmt.Errorf("failed to get GPU map for %s:%d: %w", gpuType, gpuCount, err)
 	}
+	r.cachePut(key, append([]string(nil), result...), generation)
 	return result, nil
 }
 
+// GetFilteredGPUMap answers a filtered GPU map query with a single SINTER of the
+// shape's map and the requested attribute index sets. indexed is false when the
+// loader has not built indexes for this shape; the caller must then filter itself.
+func (r *RedisClient) GetFilteredGPUMap(ctx context.Context, gpuType string, gpuCount int, gpuMemoryGB *int, interconnect *string) (keys []string, indexed bool, err error) {
+	setKeys := []string{BuildGPUMapKey(gpuType, gpuCount)}
+	if gpuMemoryGB != nil {
+		setKeys = append(setKeys, BuildGPUMemoryIndexKey(gpuType, gpuCount, *gpuMemoryGB))
+	}
+	if interconnect != nil {
+		setKeys = append(setKeys, BuildInterconnectIndexKey(gpuType, gpuCount, *interconnect))
+	}
+	recordDependency(ctx, setKeys...)
+	recordDependency(ctx, gpuIndexedShapesKey)
+	cacheKey := sinterCachePrefix + strings.Join(setKeys, "|")
+	if cached, ok := r.cacheGet("gpu_map", cacheKey); ok {
+		result := cached.(filteredGPUMap)
+		return append([]string(nil), result.keys...), result.indexed, nil
+	}
+	generation := r.cacheGeneration()
+
+	ctx, span := StartSpan(ctx, "redis.sinter")
+	span.SetAttribute("redis.keys", strings.Join(setKeys, " "))
+	defer span.End()
+
+	// Both commands go out in one round trip
+	pipe := r.client.Pipeline()
+	isIndexed := pipe.SIsMember(ctx, gpuIndexedShapesKey, fmt.Sprintf("%s:%d", gpuType, gpuCount))
+	members := pipe.SInter(ctx, setKeys...)
+	if _, err := pipe.Exec(ctx); err != nil && err != redis.Nil {
+		span.SetError(err)
+		return nil, false, fmt.Errorf("failed to query GPU map indexes for %s:%d: %w", gpuType, gpuCount, err)
+	}
+	if !isIndexed.Val() {
+		span.SetAttribute("redis.indexed", "false")
+		r.cachePut(cacheKey, filteredGPUMap{}, generation)
+		return nil, false, nil
+	}
+	r.cachePut(cacheKey, filteredGPUMap{keys: append([]string(nil), members.Val()...), indexed: true}, generation)
+	return members.Val(), true, nil
+}
+
+// GetGPUShapes lists the GPU counts that have a gpu_map set for gpuType, in
+// ascending order
+func (r *RedisClient) GetGPUShapes(ctx context.Context, gpuType string) ([]int, error) {
+	cacheKey := gpuShapesCachePrefix + gpuType
+	if cached, ok := r.cacheGet("gpu_map", cacheKey); ok {
+		return append([]int(nil), cached.([]int)...), nil
+	}
+	generation := r.cacheGeneration()
+
+	prefix := fmt.Sprintf("gpu_map:%s:", gpuType)
+	ctx, span := StartSpan(ctx, "redis.scan")
+	span.SetAttribute("redis.pattern", prefix+"*")
+	defer span.End()
+
+	shapes := make([]int, 0)
+	var cursor uint64
+	for {
+		batch, next, err := r.client.Scan(ctx, cursor, prefix+"*", scanBatchSize).Result()
+		if err != nil {
+			span.SetError(err)
+			return nil, fmt.Errorf("failed to list GPU shapes for %s: %w", gpuType, err)
+		}
+		for _, key := range batch {
+			// A GPU type containing ':' would also match; keep exact integer suffixes
+			if count, err := strconv.Atoi(strings.TrimPrefix(key, prefix)); err == nil && count > 0 {
+				shapes = append(shapes, count)
+			}
+		}
+		cursor = next
+		if cursor == 0 {
+			break
+		}
+	}
+	sort.Ints(shapes)
+	r.cachePut(cacheKey, append([]int(nil), shapes...), generation)
+	return shapes, nil
+}
+
+type filteredGPUMap struct {
+	keys    []string
+	indexed bool
+}
+
 // GetComputePrice retrieves compute price for a specific instance
-func (r *RedisClient) GetComputePrice(provider, region, instanceType string) (*ComputePrice, error) {
+func (r *RedisClient) GetComputePrice(ctx context.Context, provider, region, instanceType string) (*ComputePrice, error) {
 	key := fmt.Sprintf("compute:%s:%s:%s", provider, region, instanceType)
-	val, err := r.client.Get(r.ctx, key).Result()
+	recordDependency(ctx, key)
+	if cached, ok := r.cacheGet("compute", key); ok {
+		return cached.(*ComputePrice), nil
+	}
+	generation := r.cacheGeneration()
+
+	ctx, span := StartSpan(ctx, "redis.get")
+	span.SetAttribute("redis.key", key)
+	defer span.End()
+
+	val, err := r.client.Get(ctx, key).Result()
 	if err != nil {
 		if err == redis.Nil {
+			span.SetAttribute("redis.miss", "true")
+			r.cachePut(key, (*ComputePrice)(nil), generation)
 			return nil, nil // Key doesn't exist
 		}
+		span.SetError(err)
 		return nil, fmt.Errorf("failed to get compute price for %s:%s:%s: %w", provider, region, instanceType, err)
 	}
 
@@ -67,16 +243,30 @@ func (r *RedisClient) GetComputePrice(provider, region, instanceType string) (*C
 		return nil, fmt.Errorf("failed to unmarshal compute price: %w", err)
 	}
 
+	r.cachePut(key, &price, generation)
 	return &price, nil
 }
 
 // GetEgressPrice retrieves egress price
-func (r *RedisClient) GetEgressPrice(key string) (*EgressPrice, error) {
-	val, err := r.client.Get(r.ctx, key).Result()
+func (r *RedisClient) GetEgressPrice(ctx context.Context, key string) (*EgressPrice, error) {
+	recordDependency(ctx, key)
+	if cached, ok := r.cacheGet("egress", key); ok {
+		return cached.(*EgressPrice), nil
+	}
+	generation := r.cacheGeneration()
+
+	ctx, span := StartSpan(ctx, "redis.get")
+	span.SetAttribute("redis.key", key)
+	defer span.End()
+
+	val, err := r.client.Get(ctx, key).Result()
 	if err != nil {
 		if err == redis.Nil {
+			span.SetAttribute("redis.miss", "true")
+			r.cachePut(key, (*EgressPrice)(nil), generation)
 			return nil, nil // Key doesn't exist
 		}
+		span.SetError(err)
 		return nil, fmt.Errorf("failed to get egress price for %s: %w", key, err)
 	}
 
@@ -85,9 +275,71 @@ func (r *RedisClient) GetEgressPrice(key string) (*EgressPrice, error) {
 		return nil, fmt.Errorf("failed to unmarshal egress price: %w", err)
 	}
 
+	r.cachePut(key, &price, generation)
 	return &price, nil
 }
 
+// ScanKeys lists keys matching a pattern with incremental SCAN so large keyspaces never block Redis
+func (r *RedisClient) ScanKeys(pattern string) ([]string, error) {
+	keys := make([]string, 0)
+	var cursor uint64
+	for {
+		batch, next, err := r.client.Scan(r.ctx, cursor, pattern, scanBatchSize).Result()
+		if err != nil {
+			return nil, fmt.Errorf("failed to scan keys matching %s: %w", pattern, err)
+		}
+		keys = append(keys, batch...)
+		cursor = next
+		if cursor == 0 {
+			return keys, nil
+		}
+	}
+}
+
+// GetEgressPrices retrieves many egress prices with batched MGET calls, keyed by egress key.
+// Missing or malformed entries are logged and skipped.
+func (r *RedisClient) GetEgressPrices(keys []string) (map[string]float64, error) {
+	prices := make(map[string]float64, len(keys))
+	for start := 0; start < len(keys); start += scanBatchSize {
+		end := start + scanBatchSize
+		if end > len(keys) {
+			end = len(keys)
+		}
+		values, err := r.client.MGet(r.ctx, keys[start:end]...).Result()
+		if err != nil {
+			return nil, fmt.Errorf("failed to get egress prices: %w", err)
+		}
+		for i, value := range values {
+			raw, ok := value.(string)
+			if !ok {
+				continue // Deleted between SCAN and MGET
+			}
+			var price EgressPrice
+			if err := json.Unmarshal([]byte(raw), &price); err != nil {
+				log.Printf("WARNING: Failed to unmarshal egress price %s: %v", keys[start+i], err)
+				continue
+			}
+			prices[keys[start+i]] = price.CostPerGB
+		}
+	}
+	return prices, nil
+}
+
+// BuildGPUMapKey builds the key of the set of instances offering a GPU shape
+func BuildGPUMapKey(gpuType string, gpuCount int) string {
+	return fmt.Sprintf("gpu_map:%s:%d", gpuType, gpuCount)
+}
+
+// BuildGPUMemoryIndexKey builds the key of the subset of a GPU map with the given GPU memory
+func BuildGPUMemoryIndexKey(gpuType string, gpuCount int, gpuMemoryGB int) string {
+	return fmt.Sprintf("gpu_idx:%s:%d:mem:%d", gpuType, gpuCount, gpuMemoryGB)
+}
+
+// BuildInterconnectIndexKey builds the key of the subset of a GPU map with the given interconnect
+func BuildInterconnectIndexKey(gpuType string, gpuCount int, interconnect string) string {
+	return fmt.Sprintf("gpu_idx:%s:%d:interconnect:%s", gpuType, gpuCount, interconnect)
+}
+
 // BuildEgressKey constructs the egress key based on source and destination
 func BuildEgressKey(sourceProvider, sourceService, sourceRegion, destProvider, destRegion string) string {
 	if sourceProvider == destProvider {
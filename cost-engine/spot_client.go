@@ -1,6 +1,7 @@
 package main
 
 import (
+	"context"
 	"encoding/json"
 	"fmt"
 	"io"
@@ -17,6 +18,8 @@ type SpotClient struct {
 func NewSpotClient() *SpotClient {
 	return &SpotClient{
 		httpClient: &http.Client{
+			// Upper bound only: requests carry the analysis context, so the
+			// caller's request deadline cuts them shorter
 			Timeout: 10 * time.Second,
 		},
 	}
@@ -37,7 +40,12 @@ type SpotAdvisorResponse struct {
 }
 
 // GetSpotPrice gets the current spot price for an instance type in a region
-func (s *SpotClient) GetSpotPrice(instanceType, region string) (*float64, error) {
+func (s *SpotClient) GetSpotPrice(ctx context.Context, instanceType, region string) (*float64, error) {
+	_, span := StartSpan(ctx, "spot.price")
+	span.SetAttribute("spot.instance_type", instanceType)
+	span.SetAttribute("spot.region", region)
+	defer span.End()
+
 	// For MVP 1, we'll use a mock/simplified approach
 	// In production, this would call: https://ec2.amazonaws.com/?Action=DescribeSpotPriceHistory
 	
@@ -51,7 +59,12 @@ func (s *SpotClient) GetSpotPrice(instanceType, region string) (*float64, error)
 }
 
 // GetInterruptionRate gets the interruption rate for an instance type
-func (s *SpotClient) GetInterruptionRate(instanceType, region string) (*float64, error) {
+func (s *SpotClient) GetInterruptionRate(ctx context.Context, instanceType, region string) (*float64, error) {
+	_, span := StartSpan(ctx, "spot.interruption_rate")
+	span.SetAttribute("spot.instance_type", instanceType)
+	span.SetAttribute("spot.region", region)
+	defer span.End()
+
 	// Mock implementation - actual would query Spot Instance Advisor API
 	log.Printf("INFO: Interruption rate query for %s in %s (mock implementation)", instanceType, region)
 	
@@ -71,6 +84,7 @@ func MapInterruptionRateToRisk(rate float64) string {
 
 // AnalyzeSpotOption analyzes a spot instance option with graceful degradation
 func (s *SpotClient) AnalyzeSpotOption(
+	ctx context.Context,
 	instanceKey string,
 	sourceProvider, sourceService, sourceRegion string,
 	localCostPerHour float64,
@@ -89,7 +103,7 @@ func (s *SpotClient) AnalyzeSpotOption(
 	}
 
 	// Try to get spot price
-	spotPrice, err := s.GetSpotPrice(instanceType, region)
+	spotPrice, err := s.GetSpotPrice(ctx, instanceType, region)
 	if err != nil {
 		// Graceful degradation: fall back to on-demand
 		log.Printf("WARNING: Spot price unavailable for %s, using on-demand price", instanceKey)
@@ -97,21 +111,20 @@ func (s *SpotClient) AnalyzeSpotOption(
 	}
 
 	// Try to get interruption rate
-	interruptionRate, err := s.GetInterruptionRate(instanceType, region)
+	interruptionRate, err := s.GetInterruptionRate(ctx, instanceType, region)
 	var interruptionRisk *string
 	if err == nil && interruptionRate != nil {
 		risk := MapInterruptionRateToRisk(*interruptionRate)
 		interruptionRisk = &risk
 	}
 
-	// Get egress price
-	egressKey := BuildEgressKey(sourceProvider, sourceService, sourceRegion, provider, region)
-	egressPrice, err := calculator.redis.GetEgressPrice(egressKey)
-	if err != nil || egressPrice == nil {
+	// Get cheapest egress route
+	egressRoute, err := calculator.egress.Route(ctx, sourceProvider, sourceService, sourceRegion, provider, region)
+	if err != nil || egressRoute == nil {
 		return nil, nil // Silently omit
 	}
 
-	oneTimeEgressCost := egressPrice.CostPerGB * dataSizeGB
+	oneTimeEgressCost := egressRoute.CostPerGB * dataSizeGB
 
 	// Calculate break-even
 	breakEvenHours, advisory := calculator.CalculateBreakEven(localCostPerHour, *spotPrice, oneTimeEgressCost)
@@ -131,6 +144,7 @@ func (s *SpotClient) AnalyzeSpotOption(
 		AdvisoryMessage:   advisory,
 		IsSpotInstance:    true,
 		InterruptionRisk:   interruptionRisk,
+		EgressRoute:       egressRoute.Hops,
 	}
 
 	return option, nil
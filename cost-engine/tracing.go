@@ -0,0 +1,346 @@
+package main
+
+import (
+	"bytes"
+	"context"
+	"crypto/rand"
+	"crypto/subtle"
+	"encoding/hex"
+	"encoding/json"
+	"fmt"
+	"log"
+	"math/big"
+	"net/http"
+	"os"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+)
+
+const (
+	traceparentHeader = "traceparent"
+	// Set by a caller that wants this hop's spans returned in traceSpansHeader (CLI --trace);
+	// its value must match TRACE_DEBUG_TOKEN
+	traceDebugHeader = "X-Trace-Debug"
+	traceSpansHeader = "X-Trace-Spans"
+	// Upper bound for the debug header so it stays well inside client header limits
+	maxTraceHeaderBytes = 64 * 1024
+)
+
+// SpanRecord is a finished span, shared as JSON by the CLI, API and engine
+type SpanRecord struct {
+	TraceID    string            `json:"trace_id"`
+	SpanID     string            `json:"span_id"`
+	ParentID   string            `json:"parent_id,omitempty"`
+	Name       string            `json:"name"`
+	Service    string            `json:"service"`
+	StartNs    int64             `json:"start_ns"`
+	EndNs      int64             `json:"end_ns"`
+	Attributes map[string]string `json:"attributes,omitempty"`
+	Error      string            `json:"error,omitempty"`
+}
+
+// SpanExporter ships finished spans somewhere (file, collector)
+type SpanExporter interface {
+	Export(spans []SpanRecord)
+}
+
+// Tracer starts request traces and exports their spans
+type Tracer struct {
+	service    string
+	sampleRate float64
+	exporter   SpanExporter
+	// Spans name Redis keys, routes and timings: they are only returned to
+	// callers presenting this token, and never when it is empty
+	debugToken string
+}
+
+// NewTracerFromEnv configures sampling (TRACE_SAMPLE_RATE, 0-1), export
+// (TRACE_FILE and/or TRACE_OTLP_ENDPOINT) and debug span access
+// (TRACE_DEBUG_TOKEN) from the environment
+func NewTracerFromEnv(service string) *Tracer {
+	sampleRate := 0.0
+	if value := os.Getenv("TRACE_SAMPLE_RATE"); value != "" {
+		if rate, err := strconv.ParseFloat(value, 64); err == nil {
+			sampleRate = rate
+		} else {
+			log.Printf("WARNING: Invalid TRACE_SAMPLE_RATE=%q, tracing only sampled callers", value)
+		}
+	}
+
+	exporters := multiExporter{}
+	if path := os.Getenv("TRACE_FILE"); path != "" {
+		exporters = append(exporters, &FileExporter{path: path})
+	}
+	if endpoint := os.Getenv("TRACE_OTLP_ENDPOINT"); endpoint != "" {
+		exporters = append(exporters, NewOTLPExporter(endpoint, service))
+	}
+	return &Tracer{service: service, sampleRate: sampleRate, exporter: exporters, debugToken: os.Getenv("TRACE_DEBUG_TOKEN")}
+}
+
+// debugAuthorized reports whether a caller's X-Trace-Debug header may see this request's spans
+func (t *Tracer) debugAuthorized(header string) bool {
+	return t.debugToken != "" && subtle.ConstantTimeCompare([]byte(header), []byte(t.debugToken)) == 1
+}
+
+// trace collects the spans of one request in this process
+type trace struct {
+	tracer  *Tracer
+	traceID string
+	mu      sync.Mutex
+	spans   []SpanRecord
+}
+
+type traceKey struct{}
+type spanKey struct{}
+
+// Span is an in-progress span. A nil *Span is valid and records nothing, so
+// unsampled requests pay only for the context lookup.
+type Span struct {
+	trace  *trace
+	record SpanRecord
+	start  time.Time
+}
+
+// StartRequest continues the caller's trace from the traceparent header, or starts
+// a new one subject to the sample rate, and opens the server span for this request
+func (t *Tracer) StartRequest(r *http.Request, name string) (context.Context, *Span) {
+	ctx := r.Context()
+	traceID, parentID, sampled := parseTraceparent(r.Header.Get(traceparentHeader))
+	if traceID == "" {
+		traceID = randomHex(16)
+		sampled = t.sampleRate > 0 && randomFloat() < t.sampleRate
+	}
+	if !sampled {
+		return ctx, nil
+	}
+
+	tr := &trace{tracer: t, traceID: traceID}
+	ctx = context.WithValue(ctx, traceKey{}, tr)
+	span := &Span{
+		trace: tr,
+		record: SpanRecord{
+			TraceID:  traceID,
+			SpanID:   randomHex(8),
+			ParentID: parentID,
+			Name:     name,
+			Service:  t.service,
+		},
+		start: time.Now(),
+	}
+	return context.WithValue(ctx, spanKey{}, span), span
+}
+
+// FinishRequest exports the request's spans and, when the caller asked for them
+// with the debug token, returns them in the X-Trace-Spans response header. Call
+// before writing the body.
+func (t *Tracer) FinishRequest(ctx context.Context, w http.ResponseWriter, r *http.Request) {
+	tr, _ := ctx.Value(traceKey{}).(*trace)
+	if tr == nil {
+		return
+	}
+	tr.mu.Lock()
+	spans := append([]SpanRecord(nil), tr.spans...)
+	tr.mu.Unlock()
+
+	if t.exporter != nil {
+		t.exporter.Export(spans)
+	}
+	if t.debugAuthorized(r.Header.Get(traceDebugHeader)) {
+		if encoded, err := json.Marshal(spans); err == nil && len(encoded) <= maxTraceHeaderBytes {
+			w.Header().Set(traceSpansHeader, string(encoded))
+		}
+	}
+}
+
+// StartSpan opens a child of the current span; it returns a nil span when the request is not traced
+func StartSpan(ctx context.Context, name string) (context.Context, *Span) {
+	parent, _ := ctx.Value(spanKey{}).(*Span)
+	if parent == nil {
+		return ctx, nil
+	}
+	span := &Span{
+		trace: parent.trace,
+		record: SpanRecord{
+			TraceID:  parent.record.TraceID,
+			SpanID:   randomHex(8),
+			ParentID: parent.record.SpanID,
+			Name:     name,
+			Service:  parent.record.Service,
+		},
+		start: time.Now(),
+	}
+	return context.WithValue(ctx, spanKey{}, span), span
+}
+
+// SetAttribute records a string attribute on the span
+func (s *Span) SetAttribute(key, value string) {
+	if s == nil {
+		return
+	}
+	if s.record.Attributes == nil {
+		s.record.Attributes = make(map[string]string)
+	}
+	s.record.Attributes[key] = value
+}
+
+// SetError marks the span as failed
+func (s *Span) SetError(err error) {
+	if s == nil || err == nil {
+		return
+	}
+	s.record.Error = err.Error()
+}
+
+// End finishes the span and hands it to the request's trace
+func (s *Span) End() {
+	if s == nil {
+		return
+	}
+	s.record.StartNs = s.start.UnixNano()
+	s.record.EndNs = time.Now().UnixNano()
+	s.trace.mu.Lock()
+	s.trace.spans = append(s.trace.spans, s.record)
+	s.trace.mu.Unlock()
+}
+
+// parseTraceparent reads a W3C traceparent header: 00-<trace-id>-<parent-id>-<flags>
+func parseTraceparent(header string) (traceID, parentID string, sampled bool) {
+	parts := strings.Split(strings.TrimSpace(header), "-")
+	if len(parts) != 4 || len(parts[1]) != 32 || len(parts[2]) != 16 || len(parts[3]) != 2 {
+		return "", "", false
+	}
+	if _, err := hex.DecodeString(parts[1] + parts[2]); err != nil {
+		return "", "", false
+	}
+	flags, err := strconv.ParseUint(parts[3], 16, 8)
+	if err != nil {
+		return "", "", false
+	}
+	return parts[1], parts[2], flags&0x01 == 1
+}
+
+func randomHex(n int) string {
+	b := make([]byte, n)
+	if _, err := rand.Read(b); err != nil {
+		return strings.Repeat("0", 2*n)
+	}
+	return hex.EncodeToString(b)
+}
+
+func randomFloat() float64 {
+	n, err := rand.Int(rand.Reader, big.NewInt(1<<53))
+	if err != nil {
+		return 1
+	}
+	return float64(n.Int64()) / (1 << 53)
+}
+
+type multiExporter []SpanExporter
+
+func (m multiExporter) Export(spans []SpanRecord) {
+	for _, exporter := range m {
+		exporter.Export(spans)
+	}
+}
+
+// FileExporter appends spans to a local file as newline-delimited JSON
+type FileExporter struct {
+	path string
+	mu   sync.Mutex
+}
+
+func (f *FileExporter) Export(spans []SpanRecord) {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	file, err := os.OpenFile(f.path, os.O_APPEND|os.O_CREATE|os.O_WRONLY, 0o644)
+	if err != nil {
+		log.Printf("WARNING: Failed to open trace file %s: %v", f.path, err)
+		return
+	}
+	defer file.Close()
+	encoder := json.NewEncoder(file)
+	for _, span := range spans {
+		if err := encoder.Encode(span); err != nil {
+			log.Printf("WARNING: Failed to write span: %v", err)
+			return
+		}
+	}
+}
+
+// OTLPExporter posts spans as OTLP/JSON to <endpoint>/v1/traces from a background goroutine
+type OTLPExporter struct {
+	url        string
+	service    string
+	httpClient *http.Client
+	queue      chan []SpanRecord
+}
+
+func NewOTLPExporter(endpoint, service string) *OTLPExporter {
+	e := &OTLPExporter{
+		url:        strings.TrimRight(endpoint, "/") + "/v1/traces",
+		service:    service,
+		httpClient: &http.Client{Timeout: 5 * time.Second},
+		queue:      make(chan []SpanRecord, 256),
+	}
+	go e.run()
+	return e
+}
+
+func (e *OTLPExporter) Export(spans []SpanRecord) {
+	select {
+	case e.queue <- spans:
+	default:
+		log.Printf("WARNING: Trace export queue full, dropping %d spans", len(spans))
+	}
+}
+
+func (e *OTLPExporter) run() {
+	for spans := range e.queue {
+		body, err := json.Marshal(otlpPayload(e.service, spans))
+		if err != nil {
+			continue
+		}
+		resp, err := e.httpClient.Post(e.url, "application/json", bytes.NewReader(body))
+		if err != nil {
+			log.Printf("WARNING: Failed to export spans to %s: %v", e.url, err)
+			continue
+		}
+		resp.Body.Close()
+	}
+}
+
+// otlpPayload converts spans to the OTLP/JSON ExportTraceServiceRequest shape
+func otlpPayload(service string, spans []SpanRecord) map[string]interface{} {
+	stringValue := func(key, value string) map[string]interface{} {
+		return map[string]interface{}{"key": key, "value": map[string]string{"stringValue": value}}
+	}
+	otlpSpans := make([]map[string]interface{}, 0, len(spans))
+	for _, span := range spans {
+		attributes := make([]map[string]interface{}, 0, len(span.Attributes))
+		for key, value := range span.Attributes {
+			attributes = append(attributes, stringValue(key, value))
+		}
+		status := map[string]interface{}{"code": 1}
+		if span.Error != "" {
+			status = map[string]interface{}{"code": 2, "message": span.Error}
+		}
+		otlpSpans = append(otlpSpans, map[string]interface{}{
+			"traceId":           span.TraceID,
+			"spanId":            span.SpanID,
+			"parentSpanId":      span.ParentID,
+			"name":              span.Name,
+			"startTimeUnixNano": fmt.Sprint(span.StartNs),
+			"endTimeUnixNano":   fmt.Sprint(span.EndNs),
+			"attributes":        attributes,
+			"status":            status,
+		})
+	}
+	return map[string]interface{}{
+		"resourceSpans": []map[string]interface{}{{
+			"resource":   map[string]interface{}{"attributes": []map[string]interface{}{stringValue("service.name", service)}},
+			"scopeSpans": []map[string]interface{}{{"scope": map[string]string{"name": "finops"}, "spans": otlpSpans}},
+		}},
+	}
+}
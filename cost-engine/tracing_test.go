@@ -0,0 +1,94 @@
+package main
+
+import (
+	"encoding/json"
+	"net/http/httptest"
+	"testing"
+)
+
+func TestParseTraceparent(t *testing.T) {
+	tests := []struct {
+		header   string
+		traceID  string
+		parentID string
+		sampled  bool
+	}{
+		{"00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01", "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", true},
+		{"00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00", "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", false},
+		{"garbage", "", "", false},
+		{"00-zzf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01", "", "", false},
+	}
+	for _, tt := range tests {
+		traceID, parentID, sampled := parseTraceparent(tt.header)
+		if traceID != tt.traceID || parentID != tt.parentID || sampled != tt.sampled {
+			t.Errorf("parseTraceparent(%q) = %q, %q, %v", tt.header, traceID, parentID, sampled)
+		}
+	}
+}
+
+func TestTracer_ReturnsSpansToDebugCaller(t *testing.T) {
+	tracer := &Tracer{service: "cost-engine", debugToken: "s3cret"}
+	r := httptest.NewRequest("POST", "/analyze", nil)
+	r.Header.Set(traceparentHeader, "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+	r.Header.Set(traceDebugHeader, "s3cret")
+	w := httptest.NewRecorder()
+
+	ctx, root := tracer.StartRequest(r, "POST /analyze")
+	_, child := StartSpan(ctx, "redis.get")
+	child.SetAttribute("redis.key", "compute:aws:us-east-1:p5.48xlarge")
+	child.End()
+	root.End()
+	tracer.FinishRequest(ctx, w, r)
+
+	var spans []SpanRecord
+	if err := json.Unmarshal([]byte(w.Header().Get(traceSpansHeader)), &spans); err != nil {
+		t.Fatalf("Expected spans in %s header: %v", traceSpansHeader, err)
+	}
+	if len(spans) != 2 {
+		t.Fatalf("Expected 2 spans, got %d", len(spans))
+	}
+	if spans[0].ParentID != spans[1].SpanID || spans[1].ParentID != "00f067aa0ba902b7" {
+		t.Errorf("Unexpected span parentage: %+v", spans)
+	}
+}
+
+func TestTracer_WithholdsSpansWithoutDebugToken(t *testing.T) {
+	tests := []struct {
+		name       string
+		debugToken string
+		header     string
+	}{
+		{"wrong token", "s3cret", "1"},
+		{"missing header", "s3cret", ""},
+		{"no token configured", "", "1"},
+	}
+	for _, tt := range tests {
+		tracer := &Tracer{service: "cost-engine", debugToken: tt.debugToken}
+		r := httptest.NewRequest("POST", "/analyze", nil)
+		r.Header.Set(traceparentHeader, "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+		if tt.header != "" {
+			r.Header.Set(traceDebugHeader, tt.header)
+		}
+		w := httptest.NewRecorder()
+
+		ctx, root := tracer.StartRequest(r, "POST /analyze")
+		root.End()
+		tracer.FinishRequest(ctx, w, r)
+		if got := w.Header().Get(traceSpansHeader); got != "" {
+			t.Errorf("%s: expected no %s header, got %s", tt.name, traceSpansHeader, got)
+		}
+	}
+}
+
+func TestTracer_UnsampledRequestRecordsNothing(t *testing.T) {
+	tracer := &Tracer{service: "cost-engine", sampleRate: 0}
+	r := httptest.NewRequest("POST", "/analyze", nil)
+
+	ctx, root := tracer.StartRequest(r, "POST /analyze")
+	if root != nil {
+		t.Fatal("Expected no span for an unsampled request")
+	}
+	_, child := StartSpan(ctx, "redis.get")
+	child.SetAttribute("redis.key", "x") // nil spans must be safe to use
+	child.End()
+}
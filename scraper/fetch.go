@@ -0,0 +1,129 @@
+package main
+
+import (
+	"context"
+	"fmt"
+	"io"
+	"net/http"
+	"sync"
+	"time"
+)
+
+// RateLimiter spaces requests to one provider at least interval apart
+type RateLimiter struct {
+	mu       sync.Mutex
+	interval time.Duration
+	next     time.Time
+}
+
+func NewRateLimiter(perSecond float64) *RateLimiter {
+	limiter := &RateLimiter{}
+	if perSecond > 0 {
+		limiter.interval = time.Duration(float64(time.Second) / perSecond)
+	}
+	return limiter
+}
+
+// Wait blocks until the caller may send its request, or ctx is done
+func (l *RateLimiter) Wait(ctx context.Context) error {
+	l.mu.Lock()
+	now := time.Now()
+	slot := l.next
+	if slot.Before(now) {
+		slot = now
+	}
+	l.next = slot.Add(l.interval)
+	l.mu.Unlock()
+
+	delay := time.Until(slot)
+	if delay <= 0 {
+		return ctx.Err()
+	}
+	timer := time.NewTimer(delay)
+	defer timer.Stop()
+	select {
+	case <-timer.C:
+		return nil
+	case <-ctx.Done():
+		return ctx.Err()
+	}
+}
+
+// Validators are what a page's last successful fetch returned, for conditional
+// GETs. Next is the page's next-page link, so a 304 can still follow pagination.
+type Validators struct {
+	ETag         string `json:"etag,omitempty"`
+	LastModified string `json:"last_modified,omitempty"`
+	Next         string `json:"next,omitempty"`
+}
+
+// FetchResult is one fetched page: Body is nil when the page is unchanged (304)
+type FetchResult struct {
+	Body       io.ReadCloser
+	Validators Validators
+}
+
+// Fetcher issues conditional GETs under per-provider rate limits
+type Fetcher struct {
+	client   *http.Client
+	mu       sync.Mutex
+	limiters map[string]*RateLimiter
+}
+
+func NewFetcher(client *http.Client, providers []ProviderConfig) *Fetcher {
+	limiters := make(map[string]*RateLimiter, len(providers))
+	for _, provider := range providers {
+		limiters[provider.Name] = NewRateLimiter(provider.RatePerSecond)
+	}
+	return &Fetcher{client: client, limiters: limiters}
+}
+
+func (f *Fetcher) limiter(provider string) *RateLimiter {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	limiter, ok := f.limiters[provider]
+	if !ok {
+		limiter = NewRateLimiter(0)
+		f.limiters[provider] = limiter
+	}
+	return limiter
+}
+
+// Fetch GETs url for provider, sending the previous validators so unchanged
+// pages come back as 304 without a body
+func (f *Fetcher) Fetch(ctx context.Context, provider, url string, previous Validators) (*FetchResult, error) {
+	if err := f.limiter(provider).Wait(ctx); err != nil {
+		return nil, err
+	}
+	req, err := http.NewRequestWithContext(ctx, http.MethodGet, url, nil)
+	if err != nil {
+		return nil, err
+	}
+	if previous.ETag != "" {
+		req.Header.Set("If-None-Match", previous.ETag)
+	}
+	if previous.LastModified != "" {
+		req.Header.Set("If-Modified-Since", previous.LastModified)
+	}
+
+	// The transport asks for gzip itself and decompresses transparently
+	resp, err := f.client.Do(req)
+	if err != nil {
+		return nil, err
+	}
+	switch {
+	case resp.StatusCode == http.StatusNotModified:
+		resp.Body.Close()
+		return &FetchResult{Validators: previous}, nil
+	case resp.StatusCode != http.StatusOK:
+		resp.Body.Close()
+		return nil, fmt.Errorf("GET %s: %s", url, resp.Status)
+	}
+	return &FetchResult{
+		Body: resp.Body,
+		Validators: Validators{
+			ETag:         resp.Header.Get("ETag"),
+			LastModified: resp.Header.Get("Last-Modified"),
+		},
+	}, nil
+}
@@ -2,12 +2,20 @@ package main
 
 import (
 	"context"
+	"encoding/json"
 	"fmt"
 	"log"
 
 	"github.com/redis/go-redis/v9"
 )
 
+// priceVersionKey is incremented with every price change so Cost Engine price
+// caches flush even when Redis keyspace notifications are disabled
+const priceVersionKey = "prices:version"
+
+// validatorsKey is a hash of page URL -> JSON Validators from the last scrape
+const validatorsKey = "scraper:validators"
+
 // HardwareMapBuilder builds and updates GPU map Redis SETs
 type HardwareMapBuilder struct {
 	redis *redis.Client
@@ -33,21 +41,12 @@ func NewHardwareMapBuilder(redisAddr string) (*HardwareMapBuilder, error) {
 	}, nil
 }
 
-// AddInstanceToGPUMap adds an instance to the appropriate GPU map
-func (h *HardwareMapBuilder) AddInstanceToGPUMap(gpuType string, gpuCount int, instanceKey string) error {
-	mapKey := fmt.Sprintf("gpu_map:%s:%d", gpuType, gpuCount)
-	err := h.redis.SAdd(h.ctx, mapKey, instanceKey).Err()
-	if err != nil {
-		return fmt.Errorf("failed to add instance to GPU map: %w", err)
-	}
-	log.Printf("Added %s to %s", instanceKey, mapKey)
-	return nil
-}
-
 // SetComputePrice sets the compute price for an instance
 func (h *HardwareMapBuilder) SetComputePrice(key string, priceJSON string) error {
-	err := h.redis.Set(h.ctx, key, priceJSON, 0).Err()
-	if err != nil {
+	pipe := h.redis.TxPipeline()
+	pipe.Set(h.ctx, key, priceJSON, 0)
+	pipe.Incr(h.ctx, priceVersionKey)
+	if _, err := pipe.Exec(h.ctx); err != nil {
 		return fmt.Errorf("failed to set compute price: %w", err)
 	}
 	log.Printf("Set compute price for %s", key)
@@ -56,14 +55,99 @@ func (h *HardwareMapBuilder) SetComputePrice(key string, priceJSON string) error
 
 // SetEgressPrice sets the egress price
 func (h *HardwareMapBuilder) SetEgressPrice(key string, priceJSON string) error {
-	err := h.redis.Set(h.ctx, key, priceJSON, 0).Err()
-	if err != nil {
+	pipe := h.redis.TxPipeline()
+	pipe.Set(h.ctx, key, priceJSON, 0)
+	pipe.Incr(h.ctx, priceVersionKey)
+	if _, err := pipe.Exec(h.ctx); err != nil {
 		return fmt.Errorf("failed to set egress price: %w", err)
 	}
 	log.Printf("Set egress price for %s", key)
 	return nil
 }
 
+// Values implements CatalogStore with one MGET
+func (h *HardwareMapBuilder) Values(ctx context.Context, keys []string) ([]*string, error) {
+	results, err := h.redis.MGet(ctx, keys...).Result()
+	if err != nil {
+		return nil, err
+	}
+	values := make([]*string, len(results))
+	for i, result := range results {
+		if value, ok := result.(string); ok {
+			values[i] = &value
+		}
+	}
+	return values, nil
+}
+
+// SetMembers implements CatalogStore
+func (h *HardwareMapBuilder) SetMembers(ctx context.Context, key string) ([]string, error) {
+	return h.redis.SMembers(ctx, key).Result()
+}
+
+// Apply implements CatalogStore: every update of the batch, its GPU map and
+// index memberships and one prices:version bump go out in a single pipelined
+// MULTI/EXEC, so the Cost Engine sees a batch all at once or not at all.
+//
+// Shapes only stay in gpu_idx:indexed while every member has its attributes
+// indexed; an instance without memory or interconnect takes its shape out, and
+// the engine falls back to scanning that shape.
+func (h *HardwareMapBuilder) Apply(ctx context.Context, updates []PriceUpdate) error {
+	pipe := h.redis.TxPipeline()
+	for _, update := range updates {
+		record := update.Record
+		pipe.Set(ctx, record.Key(), update.Value, 0)
+		if record.Kind != KindCompute {
+			continue
+		}
+		instance := record.InstanceKey()
+		pipe.SAdd(ctx, record.GPUMapKey(), instance)
+		for _, key := range update.StaleIndexKeys {
+			pipe.SRem(ctx, key, instance)
+		}
+		for _, key := range record.IndexKeys() {
+			pipe.SAdd(ctx, key, instance)
+		}
+		if record.GPUMemoryGB == nil || record.Interconnect == nil {
+			pipe.SRem(ctx, "gpu_idx:indexed", fmt.Sprintf("%s:%d", record.GPUType, record.GPUCount))
+		}
+	}
+	pipe.Incr(ctx, priceVersionKey)
+	if _, err := pipe.Exec(ctx); err != nil {
+		return fmt.Errorf("failed to apply %d price updates: %w", len(updates), err)
+	}
+	return nil
+}
+
+// LoadValidators implements CatalogStore
+func (h *HardwareMapBuilder) LoadValidators(ctx context.Context) (map[string]Validators, error) {
+	fields, err := h.redis.HGetAll(ctx, validatorsKey).Result()
+	if err != nil {
+		return nil, err
+	}
+	validators := make(map[string]Validators, len(fields))
+	for url, encoded := range fields {
+		var v Validators
+		if json.Unmarshal([]byte(encoded), &v) == nil {
+			validators[url] = v
+		}
+	}
+	return validators, nil
+}
+
+// SaveValidators implements CatalogStore
+func (h *HardwareMapBuilder) SaveValidators(ctx context.Context, validators map[string]Validators) error {
+	values := make([]interface{}, 0, 2*len(validators))
+	for url, v := range validators {
+		encoded, err := json.Marshal(v)
+		if err != nil {
+			return err
+		}
+		values = append(values, url, string(encoded))
+	}
+	return h.redis.HSet(ctx, validatorsKey, values...).Err()
+}
+
 func (h *HardwareMapBuilder) Close() error {
 	return h.redis.Close()
 }
@@ -1,8 +1,15 @@
 package main
 
 import (
+	"context"
+	"errors"
+	"io/fs"
 	"log"
+	"net/http"
 	"os"
+	"os/signal"
+	"strconv"
+	"syscall"
 	"time"
 )
 
@@ -11,6 +18,14 @@ func main() {
 	if redisAddr == "" {
 		redisAddr = "redis:6379"
 	}
+	configPath := os.Getenv("SCRAPER_CONFIG")
+	config, err := loadConfigFromEnv(configPath)
+	if err != nil {
+		log.Fatalf("Failed to load scraper config: %v", err)
+	}
+	if configPath == "" {
+		configPath = defaultConfigPath
+	}
 
 	builder, err := NewHardwareMapBuilder(redisAddr)
 	if err != nil {
@@ -18,27 +33,76 @@ func main() {
 	}
 	defer builder.Close()
 
-	log.Println("Price Scraper started")
-	log.Println("NOTE: This is a placeholder implementation for MVP 1")
-	log.Println("Full scraper implementation will be added in future iterations")
+	client := &http.Client{Timeout: durationFromEnv("SCRAPE_HTTP_TIMEOUT", 5*time.Minute)}
+	pipeline := NewPipeline(config, NewFetcher(client, config.Providers), builder)
+	pipeline.Force = boolFromEnv("SCRAPE_FORCE")
 
-	// For MVP 1, this is a placeholder
-	// In production, this would:
-	// 1. Query provider APIs for pricing
-	// 2. Parse HTML/JSON responses
-	// 3. Update Redis with fresh pricing data
-	// 4. Handle monitoring and alerting
+	ctx, stop := signal.NotifyContext(context.Background(), os.Interrupt, syscall.SIGTERM)
+	defer stop()
 
-	// Run on a schedule (for MVP 1, just log)
-	ticker := time.NewTicker(24 * time.Hour)
-	defer ticker.Stop()
+	log.Printf("Price Scraper started: %d providers from %s", len(config.Providers), configPath)
 
+	// SCRAPE_ONCE runs a single scrape and exits (non-zero if the catalog could not be updated)
+	if boolFromEnv("SCRAPE_ONCE") {
+		if err := scrape(ctx, pipeline); err != nil {
+			builder.Close()
+			log.Fatalf("Scrape failed: %v", err)
+		}
+		return
+	}
+
+	interval := durationFromEnv("SCRAPE_INTERVAL", time.Hour)
+	ticker := time.NewTicker(interval)
+	defer ticker.Stop()
 	for {
+		if err := scrape(ctx, pipeline); err != nil {
+			log.Printf("WARNING: scrape failed: %v", err)
+		}
 		select {
 		case <-ticker.C:
-			log.Println("Scheduled scrape triggered (placeholder)")
-			// TODO: Implement actual scraping logic
+		case <-ctx.Done():
+			log.Println("Price Scraper stopped")
+			return
 		}
 	}
 }
 
+// defaultConfigPath is read when SCRAPER_CONFIG is not set
+const defaultConfigPath = "sources.json"
+
+// loadConfigFromEnv loads SCRAPER_CONFIG. Without it, a missing sources.json is
+// not an error: the scraper starts with no providers (and writes nothing)
+// until one is configured; see sources.example.json.
+func loadConfigFromEnv(configPath string) (*Config, error) {
+	if configPath != "" {
+		return LoadConfig(configPath)
+	}
+	config, err := LoadConfig(defaultConfigPath)
+	if errors.Is(err, fs.ErrNotExist) {
+		log.Printf("WARNING: no %s and SCRAPER_CONFIG is not set: scraping no providers", defaultConfigPath)
+		config = &Config{}
+		return config, config.validate()
+	}
+	return config, err
+}
+
+func scrape(ctx context.Context, pipeline *Pipeline) error {
+	stats, err := pipeline.Run(ctx)
+	log.Printf("Scrape: %s", stats)
+	return err
+}
+
+func durationFromEnv(name string, fallback time.Duration) time.Duration {
+	if value := os.Getenv(name); value != "" {
+		if parsed, err := time.ParseDuration(value); err == nil {
+			return parsed
+		}
+		log.Printf("WARNING: invalid %s=%q, using %s", name, value, fallback)
+	}
+	return fallback
+}
+
+func boolFromEnv(name string) bool {
+	value, _ := strconv.ParseBool(os.Getenv(name))
+	return value
+}
@@ -0,0 +1,156 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"io"
+	"strings"
+)
+
+// Parser streams the records of one fetched page to emit, without holding the
+// page in memory. It returns the URL of the next page, if the source is paginated.
+type Parser func(body io.Reader, emit func(PriceRecord) error) (next string, err error)
+
+// parsers are the page formats a provider source can declare
+var parsers = map[string]Parser{
+	"feed":         parseFeed,
+	"azure-retail": parseAzureRetail,
+}
+
+// parseFeed reads a normalized price feed: a stream of JSON PriceRecord objects
+// (NDJSON or concatenated), as published by providers we mirror or by internal
+// price lists. The provider comes from the source's configuration.
+func parseFeed(body io.Reader, emit func(PriceRecord) error) (string, error) {
+	decoder := json.NewDecoder(body)
+	for {
+		var record PriceRecord
+		if err := decoder.Decode(&record); err == io.EOF {
+			return "", nil
+		} else if err != nil {
+			return "", fmt.Errorf("invalid feed record: %w", err)
+		}
+		if err := emit(record); err != nil {
+			return "", err
+		}
+	}
+}
+
+// azureGPUShape describes the GPUs of an Azure VM size; the Retail Prices API
+// only lists prices, not hardware
+type azureGPUShape struct {
+	gpuType      string
+	gpuCount     int
+	gpuMemoryGB  int
+	interconnect string
+}
+
+var azureGPUShapes = map[string]azureGPUShape{
+	"Standard_ND96isr_H100_v5":   {"H100", 8, 80, "infiniband"},
+	"Standard_ND96isr_H200_v5":   {"H200", 8, 141, "infiniband"},
+	"Standard_NC40ads_H100_v5":   {"H100", 1, 94, "ethernet"},
+	"Standard_NC80adis_H100_v5":  {"H100", 2, 94, "ethernet"},
+	"Standard_ND96asr_v4":        {"A100", 8, 40, "infiniband"},
+	"Standard_ND96amsr_A100_v4":  {"A100", 8, 80, "infiniband"},
+	"Standard_NC24ads_A100_v4":   {"A100", 1, 80, "ethernet"},
+	"Standard_NC48ads_A100_v4":   {"A100", 2, 80, "ethernet"},
+	"Standard_NC96ads_A100_v4":   {"A100", 4, 80, "ethernet"},
+	"Standard_ND96isr_MI300X_v5": {"MI300X", 8, 192, "infiniband"},
+}
+
+// azureRetailItem is the subset of an Azure Retail Prices API item we use
+type azureRetailItem struct {
+	ArmRegionName string  `json:"armRegionName"`
+	ArmSkuName    string  `json:"armSkuName"`
+	SkuName       string  `json:"skuName"`
+	ProductName   string  `json:"productName"`
+	ServiceName   string  `json:"serviceName"`
+	RetailPrice   float64 `json:"retailPrice"`
+	UnitOfMeasure string  `json:"unitOfMeasure"`
+	Type          string  `json:"type"`
+}
+
+// parseAzureRetail streams the Items array of an Azure Retail Prices API page
+// (https://prices.azure.com/api/retail/prices) and follows NextPageLink.
+// Only on-demand Linux prices of known GPU VM sizes become compute records.
+func parseAzureRetail(body io.Reader, emit func(PriceRecord) error) (string, error) {
+	decoder := json.NewDecoder(body)
+	if err := expectDelim(decoder, '{'); err != nil {
+		return "", err
+	}
+	next := ""
+	for decoder.More() {
+		token, err := decoder.Token()
+		if err != nil {
+			return "", err
+		}
+		switch token {
+		case "Items":
+			if err := expectDelim(decoder, '['); err != nil {
+				return "", err
+			}
+			for decoder.More() {
+				var item azureRetailItem
+				if err := decoder.Decode(&item); err != nil {
+					return "", fmt.Errorf("invalid Azure price item: %w", err)
+				}
+				record, ok := azureComputeRecord(item)
+				if !ok {
+					continue
+				}
+				if err := emit(record); err != nil {
+					return "", err
+				}
+			}
+			if err := expectDelim(decoder, ']'); err != nil {
+				return "", err
+			}
+		case "NextPageLink":
+			var link *string
+			if err := decoder.Decode(&link); err != nil {
+				return "", err
+			}
+			if link != nil {
+				next = *link
+			}
+		default:
+			var skip json.RawMessage
+			if err := decoder.Decode(&skip); err != nil {
+				return "", err
+			}
+		}
+	}
+	return next, expectDelim(decoder, '}')
+}
+
+func azureComputeRecord(item azureRetailItem) (PriceRecord, bool) {
+	shape, known := azureGPUShapes[item.ArmSkuName]
+	if !known || item.Type != "Consumption" || item.UnitOfMeasure != "1 Hour" ||
+		(item.ServiceName != "" && item.ServiceName != "Virtual Machines") ||
+		strings.Contains(item.SkuName, "Spot") || strings.Contains(item.SkuName, "Low Priority") ||
+		strings.HasSuffix(item.ProductName, "Windows") {
+		return PriceRecord{}, false
+	}
+	price := item.RetailPrice
+	memory, interconnect := shape.gpuMemoryGB, shape.interconnect
+	return PriceRecord{
+		Kind:         KindCompute,
+		Region:       item.ArmRegionName,
+		InstanceType: strings.TrimPrefix(item.ArmSkuName, "Standard_"),
+		GPUType:      shape.gpuType,
+		GPUCount:     shape.gpuCount,
+		GPUMemoryGB:  &memory,
+		Interconnect: &interconnect,
+		CostPerHour:  &price,
+	}, true
+}
+
+func expectDelim(decoder *json.Decoder, want json.Delim) error {
+	token, err := decoder.Token()
+	if err != nil {
+		return err
+	}
+	if delim, ok := token.(json.Delim); !ok || delim != want {
+		return fmt.Errorf("expected %q, got %v", want, token)
+	}
+	return nil
+}
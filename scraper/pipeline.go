@@ -0,0 +1,493 @@
+package main
+
+import (
+	"context"
+	"encoding/json"
+	"fmt"
+	"io"
+	"log"
+	"net/url"
+	"os"
+	"reflect"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// Config is the scraper configuration file (SCRAPER_CONFIG)
+type Config struct {
+	// Concurrency is how many pages are fetched and parsed at once, across providers
+	Concurrency int `json:"concurrency"`
+	// DiffBatch is how many parsed records are compared with the catalog per MGET
+	DiffBatch int `json:"diff_batch"`
+	// WriteBatch is how many changed keys go into one pipelined transaction
+	WriteBatch int              `json:"write_batch"`
+	Providers  []ProviderConfig `json:"providers"`
+}
+
+// ProviderConfig is one provider's sources and politeness limit
+type ProviderConfig struct {
+	Name          string   `json:"name"`
+	Format        string   `json:"format"`
+	RatePerSecond float64  `json:"rate_per_second"`
+	URLs          []string `json:"urls"`
+}
+
+// LoadConfig reads and validates a configuration file, applying defaults
+func LoadConfig(path string) (*Config, error) {
+	data, err := os.ReadFile(path)
+	if err != nil {
+		return nil, fmt.Errorf("failed to read scraper config: %w", err)
+	}
+	var config Config
+	if err := json.Unmarshal(data, &config); err != nil {
+		return nil, fmt.Errorf("invalid scraper config %s: %w", path, err)
+	}
+	return &config, config.validate()
+}
+
+func (c *Config) validate() error {
+	if c.Concurrency <= 0 {
+		c.Concurrency = 4
+	}
+	if c.DiffBatch <= 0 {
+		c.DiffBatch = 500
+	}
+	if c.WriteBatch <= 0 {
+		c.WriteBatch = 1000
+	}
+	for _, provider := range c.Providers {
+		if provider.Name == "" {
+			return fmt.Errorf("provider without a name in scraper config")
+		}
+		if _, ok := parsers[provider.Format]; !ok {
+			return fmt.Errorf("provider %s: unknown format %q", provider.Name, provider.Format)
+		}
+	}
+	return nil
+}
+
+// PriceUpdate is a changed price on its way to the catalog
+type PriceUpdate struct {
+	Record PriceRecord
+	Value  string
+	// StaleIndexKeys are gpu_idx sets the instance must leave because its
+	// memory or interconnect changed
+	StaleIndexKeys []string
+}
+
+// CatalogStore is the price catalog the pipeline diffs against and writes to
+// (Redis in production, a map in tests)
+type CatalogStore interface {
+	// Values returns the stored value of each key, nil where a key is missing
+	Values(ctx context.Context, keys []string) ([]*string, error)
+	SetMembers(ctx context.Context, key string) ([]string, error)
+	// Apply writes a batch of updates atomically and bumps prices:version once
+	Apply(ctx context.Context, updates []PriceUpdate) error
+	LoadValidators(ctx context.Context) (map[string]Validators, error)
+	SaveValidators(ctx context.Context, validators map[string]Validators) error
+}
+
+// Stats counts one scrape run; counters are updated concurrently by the stages
+type Stats struct {
+	Pages       atomic.Int64
+	NotModified atomic.Int64
+	FetchErrors atomic.Int64
+	Bytes       atomic.Int64
+	Records     atomic.Int64
+	Invalid     atomic.Int64
+	Unchanged   atomic.Int64
+	Updated     atomic.Int64
+	Batches     atomic.Int64
+
+	Started      time.Time
+	FetchElapsed time.Duration
+	Elapsed      time.Duration
+}
+
+func perSecond(n int64, d time.Duration) float64 {
+	if d <= 0 {
+		return 0
+	}
+	return float64(n) / d.Seconds()
+}
+
+// String reports fetch and update throughput
+func (s *Stats) String() string {
+	return fmt.Sprintf(
+		"fetched %d pages (%d not modified, %d failed), %.1f MB in %s (%.1f MB/s, %.0f records/s); "+
+			"%d records (%d invalid, %d unchanged) -> %d keys written in %d batches in %s (%.0f keys/s)",
+		s.Pages.Load(), s.NotModified.Load(), s.FetchErrors.Load(),
+		float64(s.Bytes.Load())/1e6, s.FetchElapsed.Round(time.Millisecond),
+		perSecond(s.Bytes.Load(), s.FetchElapsed)/1e6, perSecond(s.Records.Load(), s.FetchElapsed),
+		s.Records.Load(), s.Invalid.Load(), s.Unchanged.Load(),
+		s.Updated.Load(), s.Batches.Load(), s.Elapsed.Round(time.Millisecond),
+		perSecond(s.Updated.Load(), s.Elapsed),
+	)
+}
+
+// Pipeline scrapes every configured source and writes the prices that changed.
+//
+// Stages run concurrently, connected by channels:
+//
+//	fetch+parse (Concurrency workers, per-provider rate limits, conditional GETs)
+//	  -> normalize -> diff (batched MGET against the catalog) -> write (pipelined batches)
+//
+// Pages are parsed as they stream in, so memory does not grow with feed size.
+// Validators (ETag/Last-Modified) are saved only after every write succeeded,
+// so a failed run refetches its pages in full next time.
+type Pipeline struct {
+	config  *Config
+	fetcher *Fetcher
+	store   CatalogStore
+	// Force ignores saved validators and refetches every page
+	Force bool
+	// FlushInterval bounds how long a partial write batch waits for more updates
+	FlushInterval time.Duration
+}
+
+func NewPipeline(config *Config, fetcher *Fetcher, store CatalogStore) *Pipeline {
+	return &Pipeline{config: config, fetcher: fetcher, store: store, FlushInterval: 200 * time.Millisecond}
+}
+
+type page struct {
+	provider ProviderConfig
+	url      string
+}
+
+// Run performs one scrape. Failing sources are counted and skipped; an error
+// is returned only when the catalog could not be read or written.
+func (p *Pipeline) Run(ctx context.Context) (*Stats, error) {
+	stats := &Stats{Started: time.Now()}
+	ctx, cancel := context.WithCancel(ctx)
+	defer cancel()
+
+	previous := map[string]Validators{}
+	if !p.Force {
+		loaded, err := p.store.LoadValidators(ctx)
+		if err != nil {
+			log.Printf("WARNING: failed to load validators, fetching every page: %v", err)
+		} else {
+			previous = loaded
+		}
+	}
+	var freshMu sync.Mutex
+	fresh := map[string]Validators{}
+
+	records := make(chan PriceRecord, 4*p.config.DiffBatch)
+	updates := make(chan PriceUpdate, p.config.WriteBatch)
+
+	sources := make(chan page)
+	var workers sync.WaitGroup
+	for i := 0; i < p.config.Concurrency; i++ {
+		workers.Add(1)
+		go func() {
+			defer workers.Done()
+			for source := range sources {
+				p.scrapeSource(ctx, source, previous, stats, records, func(pageURL string, v Validators) {
+					freshMu.Lock()
+					fresh[pageURL] = v
+					freshMu.Unlock()
+				})
+			}
+		}()
+	}
+	go func() {
+		defer close(sources)
+		for _, provider := range p.config.Providers {
+			for _, sourceURL := range provider.URLs {
+				select {
+				case sources <- page{provider, sourceURL}:
+				case <-ctx.Done():
+					return
+				}
+			}
+		}
+	}()
+	go func() {
+		workers.Wait()
+		stats.FetchElapsed = time.Since(stats.Started)
+		close(records)
+	}()
+
+	diffErr := make(chan error, 1)
+	go func() {
+		defer close(updates)
+		err := p.diff(ctx, records, updates, stats)
+		if err != nil {
+			cancel()
+		}
+		diffErr <- err
+	}()
+
+	err := p.write(ctx, updates, stats)
+	if err != nil {
+		cancel()
+	}
+	// Let the fetch workers notice a cancellation and finish
+	for range records {
+	}
+	if derr := <-diffErr; err == nil {
+		err = derr
+	}
+	stats.Elapsed = time.Since(stats.Started)
+	if err != nil {
+		return stats, err
+	}
+
+	if len(fresh) > 0 {
+		if err := p.store.SaveValidators(ctx, fresh); err != nil {
+			log.Printf("WARNING: failed to save validators: %v", err)
+		}
+	}
+	return stats, nil
+}
+
+// scrapeSource fetches a source and its following pages, streaming their records
+func (p *Pipeline) scrapeSource(
+	ctx context.Context,
+	source page,
+	previous map[string]Validators,
+	stats *Stats,
+	records chan<- PriceRecord,
+	saveValidators func(string, Validators),
+) {
+	parse := parsers[source.provider.Format]
+	emit := func(record PriceRecord) error {
+		stats.Records.Add(1)
+		record.Provider = source.provider.Name
+		record, err := Normalize(record)
+		if err != nil {
+			if stats.Invalid.Add(1) <= 10 {
+				log.Printf("WARNING: skipping %s record: %v", source.provider.Name, err)
+			}
+			return nil
+		}
+		select {
+		case records <- record:
+			return nil
+		case <-ctx.Done():
+			return ctx.Err()
+		}
+	}
+
+	seen := map[string]bool{}
+	for pageURL := source.url; pageURL != "" && !seen[pageURL]; {
+		seen[pageURL] = true
+		result, err := p.fetcher.Fetch(ctx, source.provider.Name, pageURL, previous[pageURL])
+		if err != nil {
+			if ctx.Err() == nil {
+				stats.FetchErrors.Add(1)
+				log.Printf("WARNING: %s: %v", source.provider.Name, err)
+			}
+			return
+		}
+		stats.Pages.Add(1)
+		if result.Body == nil {
+			stats.NotModified.Add(1)
+			pageURL = result.Validators.Next
+			continue
+		}
+		next, err := parse(&countingReader{r: result.Body, n: &stats.Bytes}, emit)
+		result.Body.Close()
+		if err == nil {
+			next, err = resolveNext(pageURL, next)
+		}
+		if err != nil {
+			if ctx.Err() == nil {
+				stats.FetchErrors.Add(1)
+				log.Printf("WARNING: %s: failed to parse %s: %v", source.provider.Name, pageURL, err)
+			}
+			return
+		}
+		result.Validators.Next = next
+		saveValidators(pageURL, result.Validators)
+		pageURL = next
+	}
+}
+
+// resolveNext makes a next-page link absolute against the page it came from
+func resolveNext(pageURL, next string) (string, error) {
+	if next == "" {
+		return "", nil
+	}
+	base, err := url.Parse(pageURL)
+	if err != nil {
+		return "", err
+	}
+	ref, err := url.Parse(next)
+	if err != nil {
+		return "", fmt.Errorf("invalid next page link %q: %w", next, err)
+	}
+	return base.ResolveReference(ref).String(), nil
+}
+
+// diff drops records whose stored value (and GPU map membership) already match
+func (p *Pipeline) diff(ctx context.Context, records <-chan PriceRecord, updates chan<- PriceUpdate, stats *Stats) error {
+	members := map[string]map[string]bool{} // gpu_map key -> instance keys, loaded on first use
+	queued := map[string]string{}           // key -> value already sent this run
+	batch := make([]PriceRecord, 0, p.config.DiffBatch)
+
+	flush := func() error {
+		if len(batch) == 0 {
+			return nil
+		}
+		defer func() { batch = batch[:0] }()
+		keys := make([]string, len(batch))
+		for i, record := range batch {
+			keys[i] = record.Key()
+		}
+		stored, err := p.store.Values(ctx, keys)
+		if err != nil {
+			return fmt.Errorf("failed to read current prices: %w", err)
+		}
+
+		for i, record := range batch {
+			value, err := record.Value()
+			if err != nil {
+				return err
+			}
+			key := keys[i]
+			if queued[key] == value {
+				stats.Unchanged.Add(1) // Listed twice (e.g. by two sources) in this run
+				continue
+			}
+
+			inMap := true
+			if record.Kind == KindCompute {
+				mapKey := record.GPUMapKey()
+				if members[mapKey] == nil {
+					list, err := p.store.SetMembers(ctx, mapKey)
+					if err != nil {
+						return fmt.Errorf("failed to read %s: %w", mapKey, err)
+					}
+					members[mapKey] = make(map[string]bool, len(list))
+					for _, member := range list {
+						members[mapKey][member] = true
+					}
+				}
+				inMap = members[mapKey][record.InstanceKey()]
+				members[mapKey][record.InstanceKey()] = true
+			}
+
+			// A key earlier in this batch may have changed it since the MGET
+			current := stored[i]
+			if previous, ok := queued[key]; ok {
+				current = &previous
+			}
+			if current != nil && inMap && sameValue(*current, value) {
+				stats.Unchanged.Add(1)
+				continue
+			}
+
+			update := PriceUpdate{Record: record, Value: value}
+			if record.Kind == KindCompute && current != nil {
+				update.StaleIndexKeys = staleIndexKeys(record, *current)
+			}
+			queued[key] = value
+			select {
+			case updates <- update:
+			case <-ctx.Done():
+				return ctx.Err()
+			}
+		}
+		return nil
+	}
+
+	for record := range records {
+		batch = append(batch, record)
+		if len(batch) >= p.config.DiffBatch {
+			if err := flush(); err != nil {
+				return err
+			}
+		}
+	}
+	return flush()
+}
+
+// write applies updates in pipelined batches, flushing partial batches after FlushInterval
+func (p *Pipeline) write(ctx context.Context, updates <-chan PriceUpdate, stats *Stats) error {
+	batch := make([]PriceUpdate, 0, p.config.WriteBatch)
+	flush := func() error {
+		if len(batch) == 0 {
+			return nil
+		}
+		if err := p.store.Apply(ctx, batch); err != nil {
+			return fmt.Errorf("failed to write prices: %w", err)
+		}
+		stats.Batches.Add(1)
+		stats.Updated.Add(int64(len(batch)))
+		batch = batch[:0]
+		return nil
+	}
+
+	ticker := time.NewTicker(p.FlushInterval)
+	defer ticker.Stop()
+	for {
+		select {
+		case update, ok := <-updates:
+			if !ok {
+				return flush()
+			}
+			batch = append(batch, update)
+			if len(batch) >= p.config.WriteBatch {
+				if err := flush(); err != nil {
+					return err
+				}
+			}
+		case <-ticker.C:
+			if err := flush(); err != nil {
+				return err
+			}
+		}
+	}
+}
+
+// sameValue compares two stored price documents by content, so values written
+// by other tools (e.g. "16.0" vs "16", explicit nulls) do not count as changes
+func sameValue(a, b string) bool {
+	var left, right map[string]interface{}
+	if json.Unmarshal([]byte(a), &left) != nil || json.Unmarshal([]byte(b), &right) != nil {
+		return a == b
+	}
+	for _, m := range []map[string]interface{}{left, right} {
+		for key, value := range m {
+			if value == nil {
+				delete(m, key)
+			}
+		}
+	}
+	return reflect.DeepEqual(left, right)
+}
+
+// staleIndexKeys are the index sets of the stored price that the new record no longer belongs to
+func staleIndexKeys(record PriceRecord, stored string) []string {
+	var old computeValue
+	if json.Unmarshal([]byte(stored), &old) != nil {
+		return nil
+	}
+	previous := record
+	previous.GPUMemoryGB, previous.Interconnect = old.GPUMemoryGB, old.Interconnect
+	current := map[string]bool{}
+	for _, key := range record.IndexKeys() {
+		current[key] = true
+	}
+	var stale []string
+	for _, key := range previous.IndexKeys() {
+		if !current[key] {
+			stale = append(stale, key)
+		}
+	}
+	return stale
+}
+
+type countingReader struct {
+	r io.Reader
+	n *atomic.Int64
+}
+
+func (c *countingReader) Read(p []byte) (int, error) {
+	n, err := c.r.Read(p)
+	c.n.Add(int64(n))
+	return n, err
+}
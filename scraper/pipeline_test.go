@@ -0,0 +1,364 @@
+package main
+
+import (
+	"context"
+	"errors"
+	"net/http"
+	"net/http/httptest"
+	"os"
+	"sort"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"testing"
+	"time"
+)
+
+// memoryStore is an in-memory CatalogStore
+type memoryStore struct {
+	mu         sync.Mutex
+	values     map[string]string
+	sets       map[string]map[string]bool
+	validators map[string]Validators
+	versions   int
+	applyErr   error
+}
+
+func newMemoryStore() *memoryStore {
+	return &memoryStore{
+		values:     map[string]string{},
+		sets:       map[string]map[string]bool{},
+		validators: map[string]Validators{},
+	}
+}
+
+func (m *memoryStore) Values(ctx context.Context, keys []string) ([]*string, error) {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+	values := make([]*string, len(keys))
+	for i, key := range keys {
+		if value, ok := m.values[key]; ok {
+			values[i] = &value
+		}
+	}
+	return values, nil
+}
+
+func (m *memoryStore) SetMembers(ctx context.Context, key string) ([]string, error) {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+	var members []string
+	for member := range m.sets[key] {
+		members = append(members, member)
+	}
+	return members, nil
+}
+
+func (m *memoryStore) sadd(key, member string) {
+	if m.sets[key] == nil {
+		m.sets[key] = map[string]bool{}
+	}
+	m.sets[key][member] = true
+}
+
+func (m *memoryStore) Apply(ctx context.Context, updates []PriceUpdate) error {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+	if m.applyErr != nil {
+		return m.applyErr
+	}
+	for _, update := range updates {
+		m.values[update.Record.Key()] = update.Value
+		if update.Record.Kind == KindCompute {
+			instance := update.Record.InstanceKey()
+			m.sadd(update.Record.GPUMapKey(), instance)
+			for _, key := range update.StaleIndexKeys {
+				delete(m.sets[key], instance)
+			}
+			for _, key := range update.Record.IndexKeys() {
+				m.sadd(key, instance)
+			}
+		}
+	}
+	m.versions++
+	return nil
+}
+
+func (m *memoryStore) LoadValidators(ctx context.Context) (map[string]Validators, error) {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+	validators := make(map[string]Validators, len(m.validators))
+	for url, v := range m.validators {
+		validators[url] = v
+	}
+	return validators, nil
+}
+
+func (m *memoryStore) SaveValidators(ctx context.Context, validators map[string]Validators) error {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+	for url, v := range validators {
+		m.validators[url] = v
+	}
+	return nil
+}
+
+// fixtureServer serves testdata/ with Last-Modified, so repeat fetches get 304s
+func fixtureServer(t *testing.T) (*httptest.Server, *atomic.Int64) {
+	var requests atomic.Int64
+	files := http.FileServer(http.Dir("testdata"))
+	server := httptest.NewServer(http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		requests.Add(1)
+		files.ServeHTTP(w, r)
+	}))
+	t.Cleanup(server.Close)
+	return server, &requests
+}
+
+func fixtureConfig(server *httptest.Server) *Config {
+	config := &Config{
+		Concurrency: 2,
+		DiffBatch:   3,
+		WriteBatch:  4,
+		Providers: []ProviderConfig{
+			{Name: "aws", Format: "feed", RatePerSecond: 100, URLs: []string{server.URL + "/aws.ndjson"}},
+			{Name: "azure", Format: "azure-retail", RatePerSecond: 100, URLs: []string{server.URL + "/azure-retail-1.json"}},
+		},
+	}
+	config.validate()
+	return config
+}
+
+func runPipeline(t *testing.T, config *Config, store CatalogStore, force bool) *Stats {
+	t.Helper()
+	pipeline := NewPipeline(config, NewFetcher(http.DefaultClient, config.Providers), store)
+	pipeline.Force = force
+	pipeline.FlushInterval = 10 * time.Millisecond
+	stats, err := pipeline.Run(context.Background())
+	if err != nil {
+		t.Fatalf("Run: %v", err)
+	}
+	return stats
+}
+
+func TestPipeline_WritesOnlyChangedPrices(t *testing.T) {
+	server, requests := fixtureServer(t)
+	config := fixtureConfig(server)
+	store := newMemoryStore()
+	// Seeded by scripts/seed-from-json.py: same prices, Python number formatting
+	store.values["compute:aws:us-east-1:p5.48xlarge"] = `{"provider":"AWS","region":"us-east-1","instance_type":"p5.48xlarge","cost_per_hour":16.0,"gpu_count":8,"gpu_memory_gb":80,"interconnect":"ethernet"}`
+	store.sadd("gpu_map:H100:8", "aws:us-east-1:p5.48xlarge")
+	store.values["egress:aws:s3:us-east-1:INTERNET"] = `{"cost_per_gb":0.09}`
+	// A price that changed upstream
+	store.values["egress:aws:s3:us-west-2:INTERNET"] = `{"cost_per_gb":0.08}`
+
+	stats := runPipeline(t, config, store, false)
+	// 8 feed records plus one on-demand Linux GPU price per Azure page
+	if stats.Records.Load() != 10 || stats.Invalid.Load() != 0 {
+		t.Fatalf("records = %d (%d invalid), want 10 valid", stats.Records.Load(), stats.Invalid.Load())
+	}
+	if stats.Unchanged.Load() != 2 || stats.Updated.Load() != 8 {
+		t.Errorf("unchanged/updated = %d/%d, want 2/8", stats.Unchanged.Load(), stats.Updated.Load())
+	}
+	if stats.Pages.Load() != 3 || stats.FetchErrors.Load() != 0 {
+		t.Errorf("pages = %d (%d failed), want 3 fetched", stats.Pages.Load(), stats.FetchErrors.Load())
+	}
+	if store.versions != int(stats.Batches.Load()) || store.versions < 2 {
+		t.Errorf("prices:version bumped %d times for %d batches", store.versions, stats.Batches.Load())
+	}
+
+	if got := store.values["egress:aws:s3:us-west-2:INTERNET"]; got != `{"cost_per_gb":0.09}` {
+		t.Errorf("changed egress price = %s", got)
+	}
+	azure := "azure:eastus:ND96isr_H100_v5"
+	if got := store.values["compute:"+azure]; !strings.Contains(got, `"provider":"Azure"`) || !strings.Contains(got, `"cost_per_hour":98.32`) {
+		t.Errorf("azure price = %s", got)
+	}
+	for _, set := range []string{"gpu_map:H100:8", "gpu_idx:H100:8:mem:80", "gpu_idx:H100:8:interconnect:infiniband"} {
+		if !store.sets[set][azure] {
+			t.Errorf("%s missing from %s", azure, set)
+		}
+	}
+	if !store.sets["gpu_map:A100:8"]["azure:westus2:ND96asr_v4"] {
+		t.Error("second Azure page was not followed")
+	}
+
+	// Nothing changed upstream: every page answers 304 and nothing is written
+	before := requests.Load()
+	stats = runPipeline(t, config, store, false)
+	if stats.NotModified.Load() != 3 || stats.Records.Load() != 0 || stats.Updated.Load() != 0 {
+		t.Errorf("second run: %s", stats)
+	}
+	if requests.Load()-before != 3 {
+		t.Errorf("second run made %d requests, want 3", requests.Load()-before)
+	}
+
+	// Forced refetch parses everything again but the diff still writes nothing
+	versions := store.versions
+	stats = runPipeline(t, config, store, true)
+	if stats.Records.Load() != 10 || stats.Updated.Load() != 0 || store.versions != versions {
+		t.Errorf("forced run: %s", stats)
+	}
+}
+
+func TestPipeline_FailedWriteKeepsPagesForNextRun(t *testing.T) {
+	server, _ := fixtureServer(t)
+	config := fixtureConfig(server)
+	store := newMemoryStore()
+	store.applyErr = errors.New("READONLY")
+
+	pipeline := NewPipeline(config, NewFetcher(http.DefaultClient, config.Providers), store)
+	if _, err := pipeline.Run(context.Background()); err == nil {
+		t.Fatal("expected the write error")
+	}
+	if len(store.validators) != 0 {
+		t.Errorf("validators saved after a failed write: %v", store.validators)
+	}
+
+	store.applyErr = nil
+	if stats := runPipeline(t, config, store, false); stats.NotModified.Load() != 0 || stats.Updated.Load() != 10 {
+		t.Errorf("retry: %s", stats)
+	}
+}
+
+func TestPipeline_FetchErrorsSkipSource(t *testing.T) {
+	server, _ := fixtureServer(t)
+	config := fixtureConfig(server)
+	config.Providers[1].URLs = []string{server.URL + "/missing.json"}
+	store := newMemoryStore()
+
+	stats := runPipeline(t, config, store, false)
+	if stats.FetchErrors.Load() != 1 || stats.Updated.Load() != 8 {
+		t.Errorf("stats: %s", stats)
+	}
+}
+
+func TestPipeline_MovesInstanceBetweenIndexes(t *testing.T) {
+	server, _ := fixtureServer(t)
+	config := fixtureConfig(server)
+	config.Providers = config.Providers[:1]
+	store := newMemoryStore()
+	instance := "aws:us-east-1:p4d.24xlarge"
+	store.values["compute:"+instance] = `{"provider":"AWS","region":"us-east-1","instance_type":"p4d.24xlarge","cost_per_hour":14.0,"gpu_count":8,"gpu_memory_gb":80,"interconnect":"infiniband"}`
+	store.sadd("gpu_map:A100:8", instance)
+	store.sadd("gpu_idx:A100:8:mem:80", instance)
+	store.sadd("gpu_idx:A100:8:interconnect:infiniband", instance)
+
+	runPipeline(t, config, store, false)
+	if store.sets["gpu_idx:A100:8:mem:80"][instance] || store.sets["gpu_idx:A100:8:interconnect:infiniband"][instance] {
+		t.Error("instance left in its old index sets")
+	}
+	if !store.sets["gpu_idx:A100:8:mem:40"][instance] || !store.sets["gpu_idx:A100:8:interconnect:ethernet"][instance] {
+		t.Error("instance missing from its new index sets")
+	}
+}
+
+func TestLoadConfigFromEnv_MissingDefaultMeansNoProviders(t *testing.T) {
+	wd, _ := os.Getwd()
+	if err := os.Chdir(t.TempDir()); err != nil {
+		t.Fatal(err)
+	}
+	defer os.Chdir(wd)
+
+	config, err := loadConfigFromEnv("")
+	if err != nil || len(config.Providers) != 0 || config.Concurrency != 4 {
+		t.Fatalf("expected an empty default config, got %+v, %v", config, err)
+	}
+	// An explicitly configured file must exist
+	if _, err := loadConfigFromEnv("missing.json"); err == nil {
+		t.Error("expected an error for a missing SCRAPER_CONFIG file")
+	}
+}
+
+func TestRateLimiter_SpacesRequests(t *testing.T) {
+	limiter := NewRateLimiter(50)
+	started := time.Now()
+	for i := 0; i < 5; i++ {
+		if err := limiter.Wait(context.Background()); err != nil {
+			t.Fatal(err)
+		}
+	}
+	if elapsed := time.Since(started); elapsed < 80*time.Millisecond {
+		t.Errorf("5 requests at 50/s took %s, want >= 80ms", elapsed)
+	}
+
+	ctx, cancel := context.WithCancel(context.Background())
+	cancel()
+	slow := NewRateLimiter(0.1)
+	slow.Wait(context.Background())
+	if err := slow.Wait(ctx); err == nil {
+		t.Error("Wait ignored a cancelled context")
+	}
+}
+
+func TestNormalize(t *testing.T) {
+	price := 1.23456789
+	interconnect := " InfiniBand "
+	record, err := Normalize(PriceRecord{
+		Kind: KindCompute, Provider: "CoreWeave", Region: "LVA", InstanceType: "HGX_H100_80G",
+		GPUType: "h100", GPUCount: 8, CostPerHour: &price, Interconnect: &interconnect,
+	})
+	if err != nil {
+		t.Fatal(err)
+	}
+	if record.Key() != "compute:coreweave:lva:HGX_H100_80G" || *record.CostPerHour != 1.234568 {
+		t.Errorf("normalized = %s %v", record.Key(), *record.CostPerHour)
+	}
+	if keys := record.IndexKeys(); len(keys) != 1 || keys[0] != "gpu_idx:H100:8:interconnect:infiniband" {
+		t.Errorf("index keys = %v", keys)
+	}
+
+	egress, err := Normalize(PriceRecord{Kind: KindEgress, Provider: "aws", Service: "S3", Region: "us-east-1", Destination: "AWS:us-west-2", CostPerGB: &price})
+	if err != nil || egress.Key() != "egress:aws:s3:us-east-1:aws:us-west-2" {
+		t.Errorf("egress key = %s (%v)", egress.Key(), err)
+	}
+
+	invalid := []PriceRecord{
+		{Kind: KindCompute, Provider: "aws", Region: "us-east-1", InstanceType: "p5", GPUType: "H100", GPUCount: 8},
+		{Kind: KindCompute, Provider: "aws", Region: "us:east", InstanceType: "p5", GPUType: "H100", GPUCount: 8, CostPerHour: &price},
+		{Kind: KindEgress, Provider: "aws", Service: "s3", Region: "us-east-1", Destination: "mars", CostPerGB: &price},
+		{Kind: "storage", Provider: "aws", Region: "us-east-1"},
+	}
+	for _, r := range invalid {
+		if _, err := Normalize(r); err == nil {
+			t.Errorf("expected %+v to be rejected", r)
+		}
+	}
+}
+
+func TestParseAzureRetail_FiltersAndPaginates(t *testing.T) {
+	server, _ := fixtureServer(t)
+	resp, err := http.Get(server.URL + "/azure-retail-1.json")
+	if err != nil {
+		t.Fatal(err)
+	}
+	defer resp.Body.Close()
+
+	var keys []string
+	next, err := parseAzureRetail(resp.Body, func(r PriceRecord) error {
+		r.Provider = "azure"
+		r, err := Normalize(r)
+		keys = append(keys, r.Key())
+		return err
+	})
+	if err != nil {
+		t.Fatal(err)
+	}
+	sort.Strings(keys)
+	// Spot, Windows and non-GPU sizes are skipped
+	if len(keys) != 1 || keys[0] != "compute:azure:eastus:ND96isr_H100_v5" {
+		t.Errorf("keys = %v", keys)
+	}
+	if next != "/azure-retail-2.json" {
+		t.Errorf("next = %q", next)
+	}
+}
+
+func TestSameValue(t *testing.T) {
+	if !sameValue(`{"cost_per_gb":0.1,"x":null}`, `{"cost_per_gb":0.10}`) {
+		t.Error("equal prices compared different")
+	}
+	if sameValue(`{"cost_per_gb":0.1}`, `{"cost_per_gb":0.11}`) {
+		t.Error("different prices compared equal")
+	}
+}
@@ -0,0 +1,175 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"math"
+	"regexp"
+	"strings"
+)
+
+// Record kinds
+const (
+	KindCompute = "compute"
+	KindEgress  = "egress"
+)
+
+// providerNames are the display names stored in compute prices; the provider in
+// keys is always the lowercase id
+var providerNames = map[string]string{
+	"aws":       "AWS",
+	"gcp":       "GCP",
+	"azure":     "Azure",
+	"coreweave": "CoreWeave",
+	"lambda":    "Lambda",
+	"oracle":    "Oracle",
+}
+
+var keyPart = regexp.MustCompile(`^[a-z0-9-]+$`)
+
+// PriceRecord is one price as parsed from a provider, before and after normalization
+type PriceRecord struct {
+	Kind     string `json:"kind"`
+	Provider string `json:"provider,omitempty"`
+	Region   string `json:"region"`
+
+	// Compute prices
+	InstanceType string   `json:"instance_type,omitempty"`
+	GPUType      string   `json:"gpu_type,omitempty"`
+	GPUCount     int      `json:"gpu_count,omitempty"`
+	GPUMemoryGB  *int     `json:"gpu_memory_gb,omitempty"`
+	Interconnect *string  `json:"interconnect,omitempty"`
+	CostPerHour  *float64 `json:"cost_per_hour,omitempty"`
+
+	// Egress prices: from Service in Region to Destination ("INTERNET" or "provider:region")
+	Service     string   `json:"service,omitempty"`
+	Destination string   `json:"destination,omitempty"`
+	CostPerGB   *float64 `json:"cost_per_gb,omitempty"`
+}
+
+// computeValue and egressValue are the JSON documents the Cost Engine reads
+type computeValue struct {
+	Provider     string  `json:"provider"`
+	Region       string  `json:"region"`
+	InstanceType string  `json:"instance_type"`
+	CostPerHour  float64 `json:"cost_per_hour"`
+	GPUCount     int     `json:"gpu_count"`
+	GPUMemoryGB  *int    `json:"gpu_memory_gb,omitempty"`
+	Interconnect *string `json:"interconnect,omitempty"`
+}
+
+type egressValue struct {
+	CostPerGB float64 `json:"cost_per_gb"`
+}
+
+// Normalize validates a record and brings it into the catalog's canonical form:
+// lowercase ids, trimmed strings and prices rounded to 6 decimals, so the same
+// price always encodes to the same bytes and diffs only see real changes
+func Normalize(r PriceRecord) (PriceRecord, error) {
+	r.Provider = strings.ToLower(strings.TrimSpace(r.Provider))
+	r.Region = strings.ToLower(strings.TrimSpace(r.Region))
+	if !keyPart.MatchString(r.Provider) || !keyPart.MatchString(r.Region) {
+		return r, fmt.Errorf("invalid provider/region %q/%q", r.Provider, r.Region)
+	}
+
+	switch r.Kind {
+	case KindCompute:
+		r.InstanceType = strings.TrimSpace(r.InstanceType)
+		r.GPUType = strings.ToUpper(strings.TrimSpace(r.GPUType))
+		if r.InstanceType == "" || strings.Contains(r.InstanceType, ":") || r.GPUType == "" || r.GPUCount <= 0 {
+			return r, fmt.Errorf("compute price needs instance_type, gpu_type and gpu_count")
+		}
+		if r.CostPerHour == nil || *r.CostPerHour < 0 || math.IsNaN(*r.CostPerHour) {
+			return r, fmt.Errorf("compute price %s needs a non-negative cost_per_hour", r.InstanceType)
+		}
+		r.CostPerHour = roundPrice(*r.CostPerHour)
+		if r.Interconnect != nil {
+			interconnect := strings.ToLower(strings.TrimSpace(*r.Interconnect))
+			r.Interconnect = &interconnect
+			if interconnect == "" {
+				r.Interconnect = nil
+			}
+		}
+	case KindEgress:
+		r.Service = strings.ToLower(strings.TrimSpace(r.Service))
+		r.Destination = strings.TrimSpace(r.Destination)
+		if strings.EqualFold(r.Destination, "internet") {
+			r.Destination = "INTERNET"
+		} else {
+			r.Destination = strings.ToLower(r.Destination)
+			provider, region, ok := strings.Cut(r.Destination, ":")
+			if !ok || !keyPart.MatchString(provider) || !keyPart.MatchString(region) {
+				return r, fmt.Errorf("egress destination must be INTERNET or provider:region, got %q", r.Destination)
+			}
+		}
+		if !keyPart.MatchString(r.Service) {
+			return r, fmt.Errorf("invalid egress service %q", r.Service)
+		}
+		if r.CostPerGB == nil || *r.CostPerGB < 0 || math.IsNaN(*r.CostPerGB) {
+			return r, fmt.Errorf("egress price needs a non-negative cost_per_gb")
+		}
+		r.CostPerGB = roundPrice(*r.CostPerGB)
+	default:
+		return r, fmt.Errorf("unknown record kind %q", r.Kind)
+	}
+	return r, nil
+}
+
+func roundPrice(price float64) *float64 {
+	rounded := math.Round(price*1e6) / 1e6
+	return &rounded
+}
+
+// InstanceKey is the member stored in gpu_map sets (provider:region:instance_type)
+func (r PriceRecord) InstanceKey() string {
+	return fmt.Sprintf("%s:%s:%s", r.Provider, r.Region, r.InstanceType)
+}
+
+// Key is the Redis key the record is stored under
+func (r PriceRecord) Key() string {
+	if r.Kind == KindCompute {
+		return "compute:" + r.InstanceKey()
+	}
+	return fmt.Sprintf("egress:%s:%s:%s:%s", r.Provider, r.Service, r.Region, r.Destination)
+}
+
+// GPUMapKey is the gpu_map set a compute record belongs to
+func (r PriceRecord) GPUMapKey() string {
+	return fmt.Sprintf("gpu_map:%s:%d", r.GPUType, r.GPUCount)
+}
+
+// IndexKeys are the gpu_idx sets a compute record belongs to
+func (r PriceRecord) IndexKeys() []string {
+	var keys []string
+	if r.GPUMemoryGB != nil {
+		keys = append(keys, fmt.Sprintf("gpu_idx:%s:%d:mem:%d", r.GPUType, r.GPUCount, *r.GPUMemoryGB))
+	}
+	if r.Interconnect != nil {
+		keys = append(keys, fmt.Sprintf("gpu_idx:%s:%d:interconnect:%s", r.GPUType, r.GPUCount, *r.Interconnect))
+	}
+	return keys
+}
+
+// Value is the JSON stored under Key, in the catalog's format
+func (r PriceRecord) Value() (string, error) {
+	var value interface{}
+	if r.Kind == KindCompute {
+		name, ok := providerNames[r.Provider]
+		if !ok {
+			name = r.Provider
+		}
+		value = computeValue{
+			Provider:     name,
+			Region:       r.Region,
+			InstanceType: r.InstanceType,
+			CostPerHour:  *r.CostPerHour,
+			GPUCount:     r.GPUCount,
+			GPUMemoryGB:  r.GPUMemoryGB,
+			Interconnect: r.Interconnect,
+		}
+	} else {
+		value = egressValue{CostPerGB: *r.CostPerGB}
+	}
+	encoded, err := json.Marshal(value)
+	return string(encoded), err
+}
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Measure how seeding, engine startup and analyze latency scale with catalog size.
+
+For each scale (REGIONSxINSTANCES_PER_SHAPE) a catalog is generated with
+scripts/generate-catalog.py and loaded into Redis. Then the Cost Engine is
+(re)started against it and sent sequential /analyze calls built from the
+catalog. The report shows, per scale: seed time, Redis memory, engine startup
+and egress graph build time, engine RSS, and analyze latency. Between
+consecutive scales it shows the growth exponent of each metric against catalog
+size (1.0 = linear). Exponents above --superlinear are flagged.
+
+    (cd cost-engine && go build -o bin/cost-engine .)
+    python scripts/bench-catalog-scaling.py --redis localhost:6379 --flush \\
+        --engine-bin cost-engine/bin/cost-engine --scales 8x100,16x1000,32x5000
+
+Without --engine-bin an already running engine (--engine-url, --engine-pid) is
+used. Its egress graph only picks up a new catalog on its next refresh
+(EGRESS_GRAPH_REFRESH), so restarting it per scale gives cleaner numbers.
+--flush empties the Redis database first, so only use it on a scratch Redis.
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+SCRIPTS = Path(__file__).parent
+
+
+def load_script(filename: str):
+    """Import a sibling script (hyphenated file names are not importable as modules)"""
+    spec = importlib.util.spec_from_file_location(filename[:-3].replace("-", "_"), SCRIPTS / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+generator = load_script("generate-catalog.py")
+seeder = load_script("seed-from-json.py")
+loadgen = load_script("load-generator.py")
+
+
+def parse_scales(spec: str) -> List[Tuple[int, int]]:
+    scales = []
+    for item in spec.split(","):
+        regions, _, instances = item.partition("x")
+        scales.append((int(regions), int(instances)))
+    return scales
+
+
+def process_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Resident set size of a process from /proc (Linux only)"""
+    if pid is None:
+        return None
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class EngineProcess:
+    """Cost Engine started for one scale; startup time is measured until /health answers"""
+
+    def __init__(self, binary: str, redis_addr: str, env: Dict[str, str]):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.log = tempfile.TemporaryFile(mode="w+")
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [binary],
+            env={**os.environ, **env, "REDIS_ADDR": redis_addr, "PORT": str(self.port)},
+            stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = started + 120
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Cost Engine exited during startup:\n{self.output()}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline:
+                self.stop()
+                raise RuntimeError("Cost Engine did not become healthy within 120s")
+            time.sleep(0.02)
+        self.startup_seconds = time.perf_counter() - started
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def output(self) -> str:
+        self.log.seek(0)
+        return self.log.read()
+
+    def egress_graph_seconds(self) -> Optional[float]:
+        """Build time from the engine's "Egress graph loaded ... in <duration>" log line"""
+        match = re.search(r"Egress graph loaded: .* in ([0-9.]+)(ns|µs|us|ms|s)\b", self.output())
+        if match is None:
+            return None
+        scale = {"ns": 1e-9, "µs": 1e-6, "us": 1e-6, "ms": 1e-3, "s": 1.0}[match.group(2)]
+        return float(match.group(1)) * scale
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+def measure_analyze(url: str, catalog: Dict[str, Any], calls: int, warmup: int, seed: int) -> Dict[str, Any]:
+    jobs = loadgen.synthesize(catalog, random.Random(seed))
+    latencies = []
+    response_bytes = []
+    errors = 0
+    with httpx.Client(timeout=60) as client:
+        for i in range(warmup + calls):
+            job = next(jobs)
+            started = time.perf_counter()
+            response = client.post(f"{url}/analyze", json=job)
+            elapsed = time.perf_counter() - started
+            if i < warmup:
+                continue
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(elapsed * 1000)
+            response_bytes.append(len(response.content))
+    latencies.sort()
+    return {
+        "analyze_p50_ms": statistics.median(latencies) if latencies else None,
+        "analyze_p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else None,
+        "response_kb": statistics.fmean(response_bytes) / 1024 if response_bytes else None,
+        "analyze_errors": errors,
+    }
+
+
+def run_scale(args: argparse.Namespace, regions: int, instances_per_shape: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"regions": regions, "instances_per_shape": instances_per_shape}
+
+    started = time.perf_counter()
+    catalog = generator.generate_catalog(
+        providers=min(args.providers, regions),
+        regions=regions,
+        gpu_types=args.gpu_types,
+        gpu_counts=[1, 8],
+        instances_per_shape=instances_per_shape,
+        seed=args.seed,
+    )
+    result["generate_s"] = time.perf_counter() - started
+    result["instances"] = len(catalog["compute"])
+    result["egress_prices"] = len(catalog["egress"])
+
+    host, _, port = args.redis.partition(":")
+    redis = seeder.RespConnection(host, int(port or 6379), args.db)
+    if args.flush:
+        redis.execute(["FLUSHDB"])
+    started = time.perf_counter()
+    commands = seeder.build_commands(catalog)
+    redis.pipeline(commands)
+    result["seed_s"] = time.perf_counter() - started
+    try:
+        used = re.search(r"used_memory:(\d+)", redis.execute(["INFO", "memory"]) or "")
+    except seeder.RedisError:
+        used = None  # INFO can be disabled on managed Redis
+    result["redis_mb"] = int(used.group(1)) / 2**20 if used else None
+
+    engine = None
+    url, pid = args.engine_url, args.engine_pid
+    if args.engine_bin:
+        engine = EngineProcess(args.engine_bin, args.redis, {"PRICE_CACHE_SIZE": str(args.price_cache_size)})
+        url, pid = engine.url, engine.pid
+        result["engine_startup_s"] = engine.startup_seconds
+        result["egress_graph_s"] = engine.egress_graph_seconds()
+    try:
+        result.update(measure_analyze(url, catalog, args.calls, args.warmup, args.seed))
+        result["engine_rss_mb"] = process_rss_mb(pid)
+    finally:
+        if engine is not None:
+            engine.stop()
+    return result
+
+
+# Metrics reported per scale: (key, column header, format)
+METRICS = [
+    ("seed_s", "seed s", "{:.2f}"),
+    ("redis_mb", "redis MB", "{:.1f}"),
+    ("engine_startup_s", "startup s", "{:.2f}"),
+    ("egress_graph_s", "egress graph s", "{:.3f}"),
+    ("engine_rss_mb", "engine MB", "{:.1f}"),
+    ("analyze_p50_ms", "p50 ms", "{:.1f}"),
+    ("analyze_p99_ms", "p99 ms", "{:.1f}"),
+    ("response_kb", "resp KB", "{:.1f}"),
+]
+
+
+def growth_exponents(results: List[Dict[str, Any]]) -> List[Dict[str, Optional[float]]]:
+    """log(metric ratio) / log(instance ratio) between consecutive scales"""
+    exponents = []
+    for previous, current in zip(results, results[1:]):
+        size_ratio = current["instances"] / previous["instances"]
+        row: Dict[str, Optional[float]] = {}
+        for key, _, _ in METRICS:
+            before, after = previous.get(key), current.get(key)
+            if before and after and size_ratio > 1:
+                row[key] = math.log(after / before) / math.log(size_ratio)
+            else:
+                row[key] = None
+        exponents.append(row)
+    return exponents
+
+
+def print_report(results: List[Dict[str, Any]], exponents: List[Dict[str, Optional[float]]], superlinear: float) -> None:
+    headers = ["scale", "instances", "egress"] + [header for _, header, _ in METRICS]
+    print("  ".join(f"{header:>10}" for header in headers))
+    for result in results:
+        cells = [f"{result['regions']}x{result['instances_per_shape']}", str(result["instances"]), str(result["egress_prices"])]
+        for key, _, fmt in METRICS:
+            value = result.get(key)
+            cells.append("-" if value is None else fmt.format(value))
+        print("  ".join(f"{cell:>10}" for cell in cells))
+
+    if not exponents:
+        return
+    print(f"\nGrowth exponent vs instance count (1.0 = linear, flagged above {superlinear:g}):")
+    flagged = []
+    for result, row in zip(results[1:], exponents):
+        cells = [f"{result['regions']}x{result['instances_per_shape']}", "", ""]
+        for key, header, _ in METRICS:
+            value = row[key]
+            if value is None:
+                cells.append("-")
+            else:
+                cells.append(f"{value:.2f}{'!' if value > superlinear else ''}")
+                if value > superlinear:
+                    flagged.append(f"{header} ({value:.2f} at {cells[0]})")
+        print("  ".join(f"{cell:>10}" for cell in cells))
+    if flagged:
+        print("\nSuper-linear: " + ", ".join(flagged))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the system as the price catalog grows")
+    parser.add_argument("--scales", default="8x100,16x1000,32x5000",
+                        help="Comma-separated REGIONSxINSTANCES_PER_SHAPE, smallest first")
+    parser.add_argument("--providers", type=int, default=4)
+    parser.add_argument("--gpu-types", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis", default="localhost:6379", help="Redis host:port the engine also uses")
+    parser.add_argument("--db", type=int, default=0)
+    parser.add_argument("--flush", action="store_true", help="FLUSHDB before loading each scale")
+    parser.add_argument("--engine-bin", help="Cost Engine binary to start per scale")
+    parser.add_argument("--engine-url", default="http://localhost:8080", help="Running engine, when --engine-bin is not given")
+    parser.add_argument("--engine-pid", type=int, help="Running engine's pid, to report its RSS")
+    parser.add_argument("--price-cache-size", type=int, default=10000, help="PRICE_CACHE_SIZE for started engines")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--superlinear", type=float, default=1.2, help="Growth exponent above which a metric is flagged")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.engine_bin and args.db:
+        parser.error("the engine always uses Redis database 0; --db only works with a running engine")
+
+    results = []
+    for regions, instances_per_shape in parse_scales(args.scales):
+        print(f"Scale {regions}x{instances_per_shape}...", file=sys.stderr)
+        results.append(run_scale(args, regions, instances_per_shape))
+    exponents = growth_exponents(results)
+
+    if args.json:
+        print(json.dumps({"scales": results, "growth_exponents": exponents}, indent=2))
+    else:
+        print_report(results, exponents, args.superlinear)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare per-invocation CLI latency with and without the CLI daemon.
+
+Runs the same finops-analyze command --runs times as a fresh process, once
+in-process (FINOPS_DAEMON unset) and once through a warm daemon (FINOPS_DAEMON=1
+on a private socket, started by a warm-up run that is not counted), and reports
+wall-clock latency per invocation.
+
+    python scripts/bench-cli-daemon.py --runs 30
+    python scripts/bench-cli-daemon.py --runs 30 -- analyze -f examples/job.yaml -o json
+
+The default command (--help) needs no API and measures start-up alone; pass an
+analyze command against a running API to include the connection and response
+cache reuse.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+LAUNCHER = Path(__file__).parent.parent / "cli" / "launcher.py"
+
+
+def run_mode(mode: str, command: List[str], runs: int, env: Dict[str, str]) -> Dict[str, Any]:
+    def invoke() -> float:
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, str(LAUNCHER), *command], env=env, capture_output=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            sys.exit(f"{mode}: command failed ({result.returncode}): {result.stderr.decode()[-500:]}")
+        return elapsed
+
+    invoke()  # Warm-up: page cache, and in daemon mode the daemon's start
+    latencies = sorted(invoke() for _ in range(runs))
+    return {
+        "mode": mode,
+        "runs": runs,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-invocation CLI latency with and without the daemon")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("command", nargs="*", help="finops-analyze arguments (default: --help)")
+    args = parser.parse_args()
+    command = args.command or ["--help"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket = os.path.join(directory, "daemon.sock")
+        env = {key: value for key, value in os.environ.items() if not key.startswith("FINOPS_DAEMON")}
+        results = [run_mode("in-process", command, args.runs, env)]
+        daemon_env = {**env, "FINOPS_DAEMON": "1", "FINOPS_DAEMON_SOCKET": socket}
+        try:
+            results.append(run_mode("daemon", command, args.runs, daemon_env))
+        finally:
+            subprocess.run([sys.executable, str(LAUNCHER), "daemon", "stop"], env=daemon_env, capture_output=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"finops-analyze {' '.join(command)}")
+    print(f"{'mode':<12} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for result in results:
+        print(f"{result['mode']:<12} {result['mean_ms']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+    speedup = results[0]["p50_ms"] / results[1]["p50_ms"]
+    print(f"daemon p50 speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Compare Cost Engine price-cache locality under round-robin and consistent-hash routing.
+
+Starts --replicas engines against the same Redis, sends the same synthesized
+job mix to them once round-robin and once through the API's CostEngineClient
+(consistent hashing with bounded loads on the job's location and GPU shape),
+and reports each mode's price-cache hit ratio from the engines' /metrics and its
+analyze latency. Engines are restarted between modes so both start cold.
+
+    (cd cost-engine && go build -o bin/cost-engine .)
+    python scripts/seed-from-json.py --redis localhost:6379 data/sample-prices.json
+    python scripts/bench-engine-routing.py --engine-bin cost-engine/bin/cost-engine \\
+        --replicas 3 --calls 3000 --price-cache-size 500
+
+Locality only matters once the key space does not fit in every replica's cache:
+keep --price-cache-size well below the catalog's entry count (or load a larger
+catalog with scripts/generate-catalog.py).
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+SCRIPTS = Path(__file__).parent
+sys.path.insert(0, str(SCRIPTS.parent / "api"))
+
+from cost_engine_client import CostEngineClient  # noqa: E402
+from models import JobRequest  # noqa: E402
+
+METRIC = re.compile(r'price_cache_requests_total\{kind="(\w+)",result="(hit|miss)"\} (\d+)')
+
+
+def load_script(filename: str):
+    """Import a sibling script (hyphenated file names are not importable as modules)"""
+    spec = importlib.util.spec_from_file_location(filename[:-3].replace("-", "_"), SCRIPTS / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+loadgen = load_script("load-generator.py")
+scaling = load_script("bench-catalog-scaling.py")
+
+
+def cache_counters(url: str) -> Dict[str, int]:
+    """Price cache hits and misses summed over entry kinds"""
+    counters = {"hit": 0, "miss": 0}
+    for _, result, count in METRIC.findall(httpx.get(f"{url}/metrics", timeout=5).text):
+        counters[result] += int(count)
+    return counters
+
+
+def run_mode(args: argparse.Namespace, mode: str, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    engines = [
+        scaling.EngineProcess(args.engine_bin, args.redis, {"PRICE_CACHE_SIZE": str(args.price_cache_size)})
+        for _ in range(args.replicas)
+    ]
+    try:
+        urls = [engine.url for engine in engines]
+        if mode == "hash":
+            client = CostEngineClient(",".join(urls), pool_size=args.concurrency)
+            send: Callable[[Dict[str, Any]], None] = lambda job: client.analyze(JobRequest(**job))
+        else:
+            http = httpx.Client(timeout=60, limits=httpx.Limits(max_keepalive_connections=args.concurrency))
+            next_url = itertools.cycle(urls).__next__
+
+            def send(job: Dict[str, Any]) -> None:
+                http.post(f"{next_url()}/analyze", json=job).raise_for_status()
+
+        def timed(job: Dict[str, Any]) -> float:
+            started = time.perf_counter()
+            send(job)
+            return (time.perf_counter() - started) * 1000
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = sorted(pool.map(timed, jobs))
+
+        per_engine = [cache_counters(url) for url in urls]
+        hits = sum(counters["hit"] for counters in per_engine)
+        misses = sum(counters["miss"] for counters in per_engine)
+        return {
+            "mode": mode,
+            "hit_ratio": hits / (hits + misses) if hits + misses else None,
+            "engine_hit_ratios": [
+                c["hit"] / (c["hit"] + c["miss"]) if c["hit"] + c["miss"] else None for c in per_engine
+            ],
+            "misses": misses,
+            "p50_ms": statistics.median(latencies),
+            "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        }
+    finally:
+        for engine in engines:
+            engine.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Price-cache locality of round-robin vs consistent-hash engine routing")
+    parser.add_argument("--engine-bin", required=True, help="Cost Engine binary to start the replicas from")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--redis", default="localhost:6379", help="Redis host:port, already seeded with a catalog")
+    parser.add_argument("--catalog", default="data/sample-prices.json", help="The seeded catalog, to synthesize jobs from")
+    parser.add_argument("--price-cache-size", type=int, default=500, help="PRICE_CACHE_SIZE of each replica")
+    parser.add_argument("--calls", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with open(args.catalog) as f:
+        catalog = json.load(f)
+    jobs = list(itertools.islice(loadgen.synthesize(catalog, random.Random(args.seed)), args.calls))
+
+    results = []
+    for mode in ("round-robin", "hash"):
+        print(f"Running {args.calls} analyses {mode} over {args.replicas} engines...", file=sys.stderr)
+        results.append(run_mode(args, mode, jobs))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<12} {'hit ratio':>9} {'misses':>8} {'p50 ms':>8} {'p99 ms':>8}  per engine")
+    for result in results:
+        per_engine = " ".join(f"{ratio:.2f}" if ratio is not None else "-" for ratio in result["engine_hit_ratios"])
+        print(f"{result['mode']:<12} {result['hit_ratio']:>9.3f} {result['misses']:>8} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}  {per_engine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compare Cost Engine call latency and CPU over TCP keep-alive and a Unix domain socket.
+
+Start the engine with both listeners (PORT and UNIX_SOCKET set), then:
+
+    python scripts/bench-engine-transport.py \\
+        --tcp http://localhost:8080 --unix /tmp/engine.sock \\
+        --calls 5000 --engine-pid $(pgrep cost-engine)
+
+Each transport gets one keep-alive connection, a warm-up, and then --calls
+sequential requests. By default the requests go to /health, which measures
+mostly the transport. Pass --job examples/job.yaml to POST real analyses instead.
+Client CPU is this process's CPU time. Engine CPU is read from /proc (Linux
+only) when --engine-pid is given.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+
+def engine_cpu_seconds(pid: Optional[int]) -> Optional[float]:
+    """User + system CPU time of a process from /proc/<pid>/stat"""
+    if pid is None:
+        return None
+    with open(f"/proc/{pid}/stat") as f:
+        # Fields after the parenthesised command name; utime and stime are 14th and 15th overall
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(name: str, client: httpx.Client, base_url: str, job: Optional[dict], calls: int, warmup: int,
+        engine_pid: Optional[int]) -> Dict[str, float]:
+    def call() -> None:
+        if job is None:
+            response = client.get(f"{base_url}/health")
+        else:
+            response = client.post(f"{base_url}/analyze", json=job)
+        response.raise_for_status()
+
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    cpu_start, engine_start = time.process_time(), engine_cpu_seconds(engine_pid)
+    wall_start = time.perf_counter()
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    engine_end = engine_cpu_seconds(engine_pid)
+
+    latencies.sort()
+    result = {
+        "transport": name,
+        "calls": calls,
+        "calls_per_second": calls / wall,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p90_us": percentile(latencies, 90) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "client_cpu_us_per_call": cpu / calls * 1e6,
+    }
+    if engine_start is not None and engine_end is not None:
+        result["engine_cpu_us_per_call"] = (engine_end - engine_start) / calls * 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Cost Engine transports")
+    parser.add_argument("--tcp", help="Engine base URL over TCP, e.g. http://localhost:8080")
+    parser.add_argument("--unix", help="Engine Unix socket path, e.g. /run/finops/engine.sock")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--job", help="job.yaml/.json to POST to /analyze instead of calling /health")
+    parser.add_argument("--engine-pid", type=int, help="Engine process id, to report its CPU per call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if not args.tcp and not args.unix:
+        parser.error("give --tcp, --unix or both")
+
+    job = None
+    if args.job:
+        with open(args.job) as f:
+            if args.job.endswith(".json"):
+                job = json.load(f)
+            else:
+                import yaml
+                job = yaml.safe_load(f)
+
+    limits = httpx.Limits(max_keepalive_connections=1)
+    results = []
+    if args.tcp:
+        with httpx.Client(limits=limits) as client:
+            results.append(run("tcp", client, args.tcp.rstrip("/"), job, args.calls, args.warmup, args.engine_pid))
+    if args.unix:
+        transport = httpx.HTTPTransport(uds=args.unix, limits=limits)
+        with httpx.Client(transport=transport) as client:
+            results.append(run("unix", client, "http://cost-engine", job, args.calls, args.warmup, args.engine_pid))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = ["transport", "calls_per_second", "mean_us", "p50_us", "p90_us", "p99_us",
+               "client_cpu_us_per_call", "engine_cpu_us_per_call"]
+    print("  ".join(columns))
+    for result in results:
+        cells = []
+        for column in columns:
+            value = result.get(column)
+            width = len(column)
+            cells.append(f"{value:>{width}}" if isinstance(value, str) else
+                         f"{value:>{width}.1f}" if value is not None else f"{'-':>{width}}")
+        print("  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic price catalog in the data/sample-prices.json schema.
+
+The output is deterministic for a given seed and parameters, so benchmark runs
+at the same scale see the same catalog. Instances of every GPU shape are spread
+round-robin over all regions, so every region has a data-local option once
+--instances-per-shape is at least the region count. Egress is dense: every
+storage location gets an INTERNET price and a price to every other region of
+its own provider.
+
+    python scripts/generate-catalog.py --regions 20 --instances-per-shape 1000 -o /tmp/catalog.json
+    python scripts/seed-from-json.py --replace /tmp/catalog.json
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, List
+
+# Storage service and price level per provider; extra providers get synthetic names
+PROVIDERS = [
+    ("aws", "AWS", "s3"),
+    ("gcp", "GCP", "gcs"),
+    ("azure", "Azure", "blob"),
+    ("coreweave", "CoreWeave", "storage"),
+    ("lambda", "Lambda", "storage"),
+    ("oracle", "Oracle", "objectstorage"),
+]
+
+# GPU type -> (memory options in GB, on-demand $/GPU-hour around which prices scatter)
+GPU_TYPES = {
+    "H100": ([80], 2.0),
+    "A100": ([40, 80], 1.6),
+    "L40S": ([48], 1.1),
+    "A10G": ([24], 0.6),
+    "H200": ([141], 2.6),
+    "MI300X": ([192], 2.2),
+}
+
+INTERCONNECTS = ["ethernet", "infiniband"]
+
+
+def provider_list(count: int) -> List[tuple]:
+    providers = list(PROVIDERS[:count])
+    for i in range(len(providers), count):
+        providers.append((f"cloud{i}", f"Cloud{i}", "storage"))
+    return providers
+
+
+def generate_catalog(
+    providers: int = 4,
+    regions: int = 8,
+    gpu_types: int = 3,
+    gpu_counts: List[int] = (1, 8),
+    instances_per_shape: int = 100,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Build a catalog with `regions` regions spread over `providers` providers"""
+    rng = random.Random(seed)
+    provider_defs = provider_list(providers)
+
+    # (provider id, display name, storage service, region) per region, providers round-robin
+    region_defs = []
+    for i in range(regions):
+        provider_id, display, service = provider_defs[i % len(provider_defs)]
+        region_defs.append((provider_id, display, service, f"region-{i // len(provider_defs) + 1}"))
+    # Per-region price level, so some regions are consistently cheaper than others
+    region_factor = {region: rng.uniform(0.8, 1.25) for region in region_defs}
+
+    catalog: Dict[str, Any] = {"gpu_maps": {}, "compute": {}, "egress": {}, "spot_api": {}}
+    for gpu_type in list(GPU_TYPES)[:gpu_types]:
+        memory_options, per_gpu_hour = GPU_TYPES[gpu_type]
+        for gpu_count in gpu_counts:
+            shape = f"{gpu_type}:{gpu_count}"
+            members = []
+            for n in range(instances_per_shape):
+                region = region_defs[n % len(region_defs)]
+                provider_id, display, _, region_name = region
+                instance_type = f"{gpu_type.lower()}-{gpu_count}x-v{n // len(region_defs) + 1}"
+                key = f"{provider_id}:{region_name}:{instance_type}"
+                catalog["compute"][key] = {
+                    "provider": display,
+                    "region": region_name,
+                    "instance_type": instance_type,
+                    "cost_per_hour": round(per_gpu_hour * gpu_count * region_factor[region] * rng.uniform(0.9, 1.1), 2),
+                    "gpu_count": gpu_count,
+                    "gpu_memory_gb": rng.choice(memory_options),
+                    "interconnect": rng.choice(INTERCONNECTS) if gpu_count > 1 else "ethernet",
+                }
+                members.append(key)
+            catalog["gpu_maps"][shape] = members
+
+    for provider_id, _, service, region_name in region_defs:
+        source = f"{provider_id}:{service}:{region_name}"
+        catalog["egress"][f"{source}:INTERNET"] = {"cost_per_gb": round(rng.uniform(0.05, 0.12), 3)}
+        for dest_provider, _, _, dest_region in region_defs:
+            if dest_provider == provider_id and dest_region != region_name:
+                catalog["egress"][f"{source}:{dest_provider}:{dest_region}"] = {
+                    "cost_per_gb": round(rng.uniform(0.01, 0.03), 3)
+                }
+
+    if any(provider_id == "aws" for provider_id, _, _ in provider_defs):
+        catalog["spot_api"]["aws"] = {"endpoint": "https://ec2.amazonaws.com", "instance_key_format": "{instance_type}"}
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic price catalog")
+    parser.add_argument("--providers", type=int, default=4)
+    parser.add_argument("--regions", type=int, default=8, help="Total regions, spread over the providers")
+    parser.add_argument("--gpu-types", type=int, default=3, help=f"How many of {', '.join(GPU_TYPES)} to include")
+    parser.add_argument("--gpu-counts", default="1,8", help="Comma-separated GPU counts per instance")
+    parser.add_argument("--instances-per-shape", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.providers < 1 or args.regions < args.providers:
+        parser.error("need at least one provider and one region per provider")
+    if not 1 <= args.gpu_types <= len(GPU_TYPES):
+        parser.error(f"--gpu-types must be between 1 and {len(GPU_TYPES)}")
+
+    catalog = generate_catalog(
+        providers=args.providers,
+        regions=args.regions,
+        gpu_types=args.gpu_types,
+        gpu_counts=[int(count) for count in args.gpu_counts.split(",")],
+        instances_per_shape=args.instances_per_shape,
+        seed=args.seed,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(catalog, f, indent=1)
+    else:
+        json.dump(catalog, sys.stdout, indent=1)
+    print(f"Generated {len(catalog['gpu_maps'])} GPU shapes, {len(catalog['compute'])} instances, "
+          f"{len(catalog['egress'])} egress prices", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the FinOps API.
+
+Drives POST /api/v1/analyze at fixed target rates, regardless of how fast
+responses come back. Latency is measured from each request's scheduled send
+time, so a slow server cannot hide its queueing delay (no coordinated omission).
+Each step reports a latency histogram, percentiles and error rates. The
+saturation point is the first rate where p99 exceeds --p99-slo-ms, errors exceed
+--max-error-rate, or throughput falls below 95% of the offered load.
+
+Synthesized job mix (locations and GPU shapes drawn from a price catalog):
+
+    python scripts/load-generator.py --url http://localhost:8000 --rates 10,20,50,100 --duration 30
+
+Replay of a request log recorded by the API (REQUEST_LOG=requests.ndjson):
+
+    python scripts/load-generator.py --replay requests.ndjson --rates 50
+    python scripts/load-generator.py --replay requests.ndjson --replay-timing --speedup 4
+
+Two tagged runs side by side check fair scheduling; compare per-tenant queue
+waits at GET /api/v1/scheduler afterwards:
+
+    python scripts/load-generator.py --tenant team-a --priority batch --rates 200 &
+    python scripts/load-generator.py --tenant team-b --priority interactive --rates 5
+
+Pair it with scripts/stub-engine.py to load the API alone with injected engine
+latency, or with scripts/seed-from-json.py to run the real engine on local Redis.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+# Throughput below this share of the offered rate means the server fell behind
+MIN_THROUGHPUT_RATIO = 0.95
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: ~2% relative error at any scale, O(1) per sample"""
+
+    BUCKETS_PER_DOUBLING = 32
+    MIN_MS = 0.01
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.max_ms = 0.0
+        self.sum_ms = 0.0
+
+    def _index(self, ms: float) -> int:
+        if ms <= self.MIN_MS:
+            return 0
+        return int(math.log2(ms / self.MIN_MS) * self.BUCKETS_PER_DOUBLING) + 1
+
+    def _upper_ms(self, index: int) -> float:
+        return self.MIN_MS * 2 ** (index / self.BUCKETS_PER_DOUBLING)
+
+    def record(self, ms: float) -> None:
+        self.counts[self._index(ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper_ms(index), self.max_ms)
+        return self.max_ms
+
+    def mean(self) -> Optional[float]:
+        return self.sum_ms / self.total if self.total else None
+
+    def coarse_buckets(self) -> List[Tuple[float, int]]:
+        """Counts per power-of-two latency range, as (upper bound ms, count)"""
+        coarse: Counter = Counter()
+        for index, count in self.counts.items():
+            coarse[2 ** math.ceil(math.log2(max(self._upper_ms(index), self.MIN_MS)))] += count
+        return sorted(coarse.items())
+
+
+class StepResult:
+    def __init__(self, target_rate: float, duration: float):
+        self.target_rate = target_rate
+        self.duration = duration
+        self.histogram = LatencyHistogram()
+        self.sent = 0
+        self.ok = 0
+        self.errors: Counter = Counter()
+        # Arrivals skipped because --max-inflight requests were already outstanding
+        self.dropped = 0
+        self.elapsed = 0.0
+
+    @property
+    def completed(self) -> int:
+        return self.ok + sum(self.errors.values())
+
+    @property
+    def error_rate(self) -> float:
+        attempted = self.sent + self.dropped
+        return (sum(self.errors.values()) + self.dropped) / attempted if attempted else 0.0
+
+    @property
+    def offered_rate(self) -> float:
+        """Arrivals per second actually generated (Poisson arrivals scatter around the target)"""
+        return (self.sent + self.dropped) / self.duration if self.duration else 0.0
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.ok / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "target_rps": self.target_rate,
+            "offered_rps": round(self.offered_rate, 2),
+            "achieved_rps": round(self.achieved_rate, 2),
+            "sent": self.sent,
+            "ok": self.ok,
+            "errors": dict(self.errors),
+            "dropped": self.dropped,
+            "error_rate": round(self.error_rate, 4),
+            "latency_ms": {
+                name: None if value is None else round(value, 2)
+                for name, value in [
+                    ("mean", self.histogram.mean()),
+                    ("p50", self.histogram.percentile(50)),
+                    ("p90", self.histogram.percentile(90)),
+                    ("p99", self.histogram.percentile(99)),
+                    ("p999", self.histogram.percentile(99.9)),
+                    ("max", self.histogram.max_ms if self.histogram.total else None),
+                ]
+            },
+            "histogram_ms": [[upper, count] for upper, count in self.histogram.coarse_buckets()],
+        }
+
+
+def load_replay(path: str) -> List[Tuple[Optional[float], Dict[str, Any]]]:
+    """
+    Read a request log: one JSON object per line, either a bare JobRequest or
+    {"timestamp": <unix seconds>, "request": <JobRequest>} as written by the API
+    """
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "request" in record:
+                entries.append((record.get("timestamp"), record["request"]))
+            else:
+                entries.append((None, record))
+    if not entries:
+        raise ValueError(f"No requests in {path}")
+    return entries
+
+
+def synthesize(catalog: Dict[str, Any], rng: random.Random, risk_fraction: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """
+    Endless mix of jobs over the catalog's storage locations and GPU shapes.
+
+    Dataset sizes are log-normal around ~500 GB. A risk_fraction share of jobs
+    asks for a spot interruption simulation.
+    """
+    # Egress keys are source:destination; sources on compute services (ec2) are not data locations
+    locations = sorted({
+        ":".join(key.split(":")[:3]) for key in catalog.get("egress", {}) if key.split(":")[1] != "ec2"
+    })
+    shapes = sorted(catalog.get("gpu_maps", {}))
+    if not locations or not shapes:
+        raise ValueError("Catalog needs egress prices and gpu_maps to synthesize jobs")
+
+    n = 0
+    while True:
+        n += 1
+        gpu_type, gpu_count = rng.choice(shapes).split(":")
+        job: Dict[str, Any] = {
+            "job_name": f"load-{n}",
+            "data": {"location": rng.choice(locations), "size_gb": round(rng.lognormvariate(math.log(500), 1.0), 1)},
+            "compute": {"gpu_type": gpu_type, "gpu_count": int(gpu_count)},
+        }
+        if rng.random() < risk_fraction:
+            job["risk"] = {
+                "duration_hours": rng.choice([24, 72, 168]),
+                "checkpoint_interval_hours": rng.choice([1, 4]),
+                "trials": 2000,
+                "seed": n,
+            }
+        yield job
+
+
+async def run_step(
+    client: httpx.AsyncClient,
+    url: str,
+    jobs: Iterator[Dict[str, Any]],
+    rate: float,
+    duration: float,
+    arrival: str,
+    max_inflight: int,
+    rng: random.Random,
+    offsets: Optional[List[float]] = None,
+) -> StepResult:
+    """
+    Send jobs open-loop for `duration` seconds at `rate` requests per second
+    (or at the given arrival `offsets`, for timed replay) and wait for the stragglers
+    """
+    loop = asyncio.get_running_loop()
+    result = StepResult(rate, duration)
+    inflight: set = set()
+
+    async def send(job: Dict[str, Any], scheduled: float) -> None:
+        try:
+            response = await client.post(url, json=job)
+            if response.status_code < 400:
+                result.ok += 1
+            else:
+                result.errors[str(response.status_code)] += 1
+        except httpx.TimeoutException:
+            result.errors["timeout"] += 1
+        except httpx.HTTPError as e:
+            result.errors[type(e).__name__] += 1
+        result.histogram.record((loop.time() - scheduled) * 1000)
+
+    if offsets is None:
+        offsets = []
+        t = 0.0
+        while True:
+            t += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+            if t >= duration:
+                break
+            offsets.append(t)
+
+    start = loop.time()
+    for offset in offsets:
+        scheduled = start + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            result.dropped += 1
+            continue
+        task = asyncio.ensure_future(send(next(jobs), scheduled))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+        result.sent += 1
+
+    if inflight:
+        await asyncio.wait(set(inflight))
+    result.elapsed = max(loop.time() - start, duration)
+    return result
+
+
+def find_saturation(results: List[StepResult], p99_slo_ms: float, max_error_rate: float) -> Optional[StepResult]:
+    """First step whose p99, error rate or throughput misses its target"""
+    for result in results:
+        p99 = result.histogram.percentile(99)
+        if (
+            (p99 is not None and p99 > p99_slo_ms)
+            or result.error_rate > max_error_rate
+            or result.achieved_rate < MIN_THROUGHPUT_RATIO * result.offered_rate
+        ):
+            return result
+    return None
+
+
+def format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_report(results: List[StepResult], saturation: Optional[StepResult], p99_slo_ms: float) -> None:
+    print(f"{'target rps':>10} {'offered':>8} {'achieved':>9} {'sent':>7} {'errors':>7} {'dropped':>7} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9} {'max ms':>8}")
+    for result in results:
+        h = result.histogram
+        print(f"{result.target_rate:>10.1f} {result.offered_rate:>8.1f} {result.achieved_rate:>9.1f} {result.sent:>7} "
+              f"{sum(result.errors.values()):>7} {result.dropped:>7} "
+              f"{format_ms(h.percentile(50)):>8} {format_ms(h.percentile(90)):>8} "
+              f"{format_ms(h.percentile(99)):>8} {format_ms(h.percentile(99.9)):>9} "
+              f"{format_ms(h.max_ms if h.total else None):>8}")
+
+    last = results[-1]
+    if last.histogram.total:
+        print(f"\nLatency histogram at {last.target_rate:.1f} rps:")
+        peak = max(count for _, count in last.histogram.coarse_buckets())
+        for upper, count in last.histogram.coarse_buckets():
+            print(f"  <= {upper:>8g} ms {count:>7}  {'#' * max(1, round(40 * count / peak))}")
+
+    for result in results:
+        if result.errors:
+            print(f"\nErrors at {result.target_rate:g} rps: {dict(result.errors)}")
+
+    if saturation is None:
+        print(f"\nNo saturation up to {results[-1].target_rate:g} rps (p99 SLO {p99_slo_ms:g} ms)")
+    else:
+        print(f"\nSaturation at {saturation.target_rate:g} rps "
+              f"(p99 {format_ms(saturation.histogram.percentile(99))} ms, "
+              f"errors {saturation.error_rate:.1%}, achieved {saturation.achieved_rate:.1f} rps)")
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    url = args.url.rstrip("/") + "/api/v1/analyze"
+
+    offsets = None
+    if args.replay:
+        entries = load_replay(args.replay)
+        bodies = [body for _, body in entries]
+        jobs: Iterator[Dict[str, Any]] = (bodies[i % len(bodies)] for i in range(sys.maxsize))
+        if args.replay_timing:
+            timestamps = [ts for ts, _ in entries]
+            if any(ts is None for ts in timestamps):
+                raise SystemExit("--replay-timing needs a timestamp on every log entry")
+            offsets = [(ts - timestamps[0]) / args.speedup for ts in timestamps]
+    else:
+        with open(args.catalog) as f:
+            jobs = synthesize(json.load(f), rng, args.risk_fraction)
+
+    if offsets is not None:
+        duration = offsets[-1] + 1e-3
+        rates = [len(offsets) / duration]
+    else:
+        rates = [float(rate) for rate in args.rates.split(",")]
+
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    headers = {"X-Priority": args.priority}
+    if args.tenant:
+        headers["X-Tenant-Id"] = args.tenant
+    results = []
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits, headers=headers) as client:
+        for rate in rates:
+            print(f"Running {rate:.1f} rps for {args.duration if offsets is None else duration:.1f}s...", file=sys.stderr)
+            result = await run_step(
+                client, url, jobs, rate, args.duration if offsets is None else duration,
+                args.arrival, args.max_inflight, rng, offsets,
+            )
+            results.append(result)
+            if args.stop_at_saturation and find_saturation([result], args.p99_slo_ms, args.max_error_rate):
+                break
+            if args.cooldown:
+                await asyncio.sleep(args.cooldown)
+
+    saturation = find_saturation(results, args.p99_slo_ms, args.max_error_rate)
+    if args.json:
+        print(json.dumps({
+            "steps": [result.to_dict() for result in results],
+            "saturation_rps": saturation.target_rate if saturation else None,
+        }, indent=2))
+    else:
+        print_report(results, saturation, args.p99_slo_ms)
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Open-loop load generator for /api/v1/analyze")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--rates", default="5,10,20,50", help="Comma-separated target rates (requests/second)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per rate step")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--catalog", default="data/sample-prices.json", help="Price catalog to synthesize jobs from")
+    parser.add_argument("--risk-fraction", type=float, default=0.0, help="Share of synthesized jobs with a risk block")
+    parser.add_argument("--replay", help="NDJSON request log to replay instead of synthesizing jobs")
+    parser.add_argument("--replay-timing", action="store_true", help="Replay at the recorded arrival times")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Time compression for --replay-timing")
+    parser.add_argument("--max-inflight", type=int, default=512, help="Outstanding request cap; further arrivals count as dropped")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--tenant", help="Tenant id sent as X-Tenant-Id")
+    parser.add_argument("--priority", choices=["interactive", "batch"], default="batch", help="Priority class sent as X-Priority")
+    parser.add_argument("--p99-slo-ms", type=float, default=500.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--stop-at-saturation", action="store_true", help="Skip higher rates once saturated")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Pause between steps (seconds)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -24,8 +24,17 @@ fi
 # Update the key
 echo "Updating Redis key: $REDIS_KEY"
 redis-cli -h localhost SET "$REDIS_KEY" "$JSON_VALUE"
+# Cost Engines cache prices; bumping the version flushes them even without keyspace notifications
+redis-cli -h localhost INCR prices:version > /dev/null
 
 echo "Successfully updated $REDIS_KEY"
+
+case "$REDIS_KEY" in
+    compute:*)
+        echo "NOTE: If gpu_memory_gb or interconnect changed, also update the matching"
+        echo "      gpu_idx:<gpu_type>:<gpu_count>:mem:<gb> / :interconnect:<name> sets"
+        ;;
+esac
 echo "New value:"
 redis-cli -h localhost GET "$REDIS_KEY"
 
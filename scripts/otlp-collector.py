@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Minimal local trace collector.
+
+Accepts OTLP/JSON exports on POST /v1/traces and appends one line per span to a
+file, so traces from the CLI, API and Cost Engine can be inspected without a full
+OpenTelemetry stack:
+
+    python scripts/otlp-collector.py --port 4318 --output traces.ndjson
+    TRACE_OTLP_ENDPOINT=http://localhost:4318 TRACE_SAMPLE_RATE=0.1 ...
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def flatten(payload):
+    """Yield (service, span) pairs from an ExportTraceServiceRequest"""
+    for resource_spans in payload.get("resourceSpans", []):
+        service = ""
+        for attribute in resource_spans.get("resource", {}).get("attributes", []):
+            if attribute.get("key") == "service.name":
+                service = attribute.get("value", {}).get("stringValue", "")
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                yield service, span
+
+
+def make_handler(output_path, lock):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError:
+                self.send_error(400, "Expected OTLP/JSON")
+                return
+
+            with lock, open(output_path, "a") as f:
+                for service, span in flatten(payload):
+                    f.write(json.dumps({"service": service, **span}) + "\n")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect OTLP/JSON traces into a file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="traces.ndjson")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.output, threading.Lock()))
+    print(f"Collecting traces on http://{args.host}:{args.port}/v1/traces -> {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
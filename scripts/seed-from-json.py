@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Load a price catalog JSON file (the data/sample-prices.json layout) into Redis.
+
+Writes the same keys as scripts/seed-redis.sh: the gpu_map sets, the gpu_idx
+secondary indexes, compute/egress/spot_api prices, and a prices:version bump.
+It derives all of them from the file, so it also loads generated or edited
+catalogs (e.g. for load tests). Talks RESP directly, so it needs neither
+redis-cli nor a Redis client library.
+
+    python scripts/seed-from-json.py --redis localhost:6379 data/sample-prices.json
+    python scripts/seed-from-json.py --replace catalog.json   # drop stale sets of the same shapes first
+"""
+
+import argparse
+import json
+import socket
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Set
+
+# Commands sent per pipelined batch
+BATCH_SIZE = 1000
+
+
+class RedisError(Exception):
+    pass
+
+
+class RespConnection:
+    """Minimal pipelined RESP2 client"""
+
+    def __init__(self, host: str, port: int, db: int = 0):
+        self.sock = socket.create_connection((host, port))
+        self.reader = self.sock.makefile("rb")
+        if db:
+            self.execute(["SELECT", str(db)])
+
+    @staticmethod
+    def _encode(command: List[str]) -> bytes:
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg.encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self.reader.readline()
+        if not line:
+            raise RedisError("Connection closed by Redis")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2].decode()
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def pipeline(self, commands: List[List[str]]) -> List[Any]:
+        replies = []
+        for start in range(0, len(commands), BATCH_SIZE):
+            batch = commands[start:start + BATCH_SIZE]
+            self.sock.sendall(b"".join(self._encode(command) for command in batch))
+            replies.extend(self._read_reply() for _ in batch)
+        errors = [reply for reply in replies if isinstance(reply, RedisError)]
+        if errors:
+            raise RedisError(f"{len(errors)} commands failed, first: {errors[0]}")
+        return replies
+
+    def execute(self, command: List[str]) -> Any:
+        return self.pipeline([command])[0]
+
+    def scan(self, pattern: str) -> List[str]:
+        keys, cursor = [], "0"
+        while True:
+            cursor, batch = self.execute(["SCAN", cursor, "MATCH", pattern, "COUNT", "1000"])
+            keys.extend(batch)
+            if cursor == "0":
+                return keys
+
+
+def build_commands(catalog: Dict[str, Any]) -> List[List[str]]:
+    """Redis commands that load the catalog, in the order seed-redis.sh writes them"""
+    compute = catalog.get("compute", {})
+    commands: List[List[str]] = []
+    indexes: Dict[str, Set[str]] = defaultdict(set)
+    indexed_shapes = []
+
+    for shape, instances in catalog.get("gpu_maps", {}).items():
+        if instances:
+            commands.append(["SADD", f"gpu_map:{shape}", *instances])
+        # A shape's indexes are only complete if every member has its attributes
+        complete = True
+        for instance in instances:
+            price = compute.get(instance)
+            if price is None or price.get("gpu_memory_gb") is None or not price.get("interconnect"):
+                complete = False
+                continue
+            indexes[f"gpu_idx:{shape}:mem:{price['gpu_memory_gb']}"].add(instance)
+            indexes[f"gpu_idx:{shape}:interconnect:{price['interconnect']}"].add(instance)
+        if complete:
+            indexed_shapes.append(shape)
+
+    for key, members in sorted(indexes.items()):
+        commands.append(["SADD", key, *sorted(members)])
+    if indexed_shapes:
+        commands.append(["SADD", "gpu_idx:indexed", *indexed_shapes])
+
+    for key, price in compute.items():
+        commands.append(["SET", f"compute:{key}", json.dumps(price, separators=(",", ":"))])
+    for key, price in catalog.get("egress", {}).items():
+        commands.append(["SET", f"egress:{key}", json.dumps(price, separators=(",", ":"))])
+    for key, info in catalog.get("spot_api", {}).items():
+        commands.append(["SET", f"spot_api:{key}", json.dumps(info, separators=(",", ":"))])
+
+    # Tell running Cost Engines to drop cached prices
+    commands.append(["INCR", "prices:version"])
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a price catalog JSON file into Redis")
+    parser.add_argument("catalog", nargs="?", default="data/sample-prices.json")
+    parser.add_argument("--redis", default="localhost:6379", help="Redis host:port")
+    parser.add_argument("--db", type=int, default=0)
+    parser.add_argument("--replace", action="store_true",
+                        help="Delete existing gpu_map/gpu_idx sets of the catalog's shapes before loading")
+    args = parser.parse_args()
+
+    with open(args.catalog) as f:
+        catalog = json.load(f)
+    host, _, port = args.redis.partition(":")
+    redis = RespConnection(host, int(port or 6379), args.db)
+
+    if args.replace:
+        shapes = list(catalog.get("gpu_maps", {}))
+        stale = []
+        for shape in shapes:
+            stale.append(f"gpu_map:{shape}")
+            stale.extend(redis.scan(f"gpu_idx:{shape}:*"))
+        cleanup = [["DEL", key] for key in stale]
+        if shapes:
+            cleanup.append(["SREM", "gpu_idx:indexed", *shapes])
+        redis.pipeline(cleanup)
+
+    commands = build_commands(catalog)
+    redis.pipeline(commands)
+    print(f"Loaded {len(catalog.get('gpu_maps', {}))} GPU maps, {len(catalog.get('compute', {}))} compute prices, "
+          f"{len(catalog.get('egress', {}))} egress prices from {args.catalog} ({len(commands)} commands)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
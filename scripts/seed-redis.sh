@@ -19,6 +19,19 @@ redis-cli -h redis SADD gpu_map:H100:8 "aws:us-east-1:p5.48xlarge" "aws:us-west-
 redis-cli -h redis SADD gpu_map:H100:1 "aws:us-east-1:p5.xlarge" > /dev/null
 redis-cli -h redis SADD gpu_map:A100:8 "aws:us-east-1:p4d.24xlarge" "gcp:us-central1:a2-highgpu-8g" > /dev/null
 
+# Secondary indexes per GPU shape (gpu_memory_gb and interconnect filters).
+# Keep in sync with the compute prices below; gpu_idx:indexed marks shapes whose
+# indexes are complete, other shapes fall back to reading every compute price.
+echo "Loading GPU map indexes..."
+redis-cli -h redis SADD gpu_idx:H100:8:mem:80 "aws:us-east-1:p5.48xlarge" "aws:us-west-2:p5.48xlarge" "gcp:us-central1:a3-highgpu-8g" "coreweave:lva:HGX_H100_80G" > /dev/null
+redis-cli -h redis SADD gpu_idx:H100:8:interconnect:ethernet "aws:us-east-1:p5.48xlarge" "aws:us-west-2:p5.48xlarge" "gcp:us-central1:a3-highgpu-8g" > /dev/null
+redis-cli -h redis SADD gpu_idx:H100:8:interconnect:infiniband "coreweave:lva:HGX_H100_80G" > /dev/null
+redis-cli -h redis SADD gpu_idx:H100:1:mem:80 "aws:us-east-1:p5.xlarge" > /dev/null
+redis-cli -h redis SADD gpu_idx:H100:1:interconnect:ethernet "aws:us-east-1:p5.xlarge" > /dev/null
+redis-cli -h redis SADD gpu_idx:A100:8:mem:40 "aws:us-east-1:p4d.24xlarge" "gcp:us-central1:a2-highgpu-8g" > /dev/null
+redis-cli -h redis SADD gpu_idx:A100:8:interconnect:ethernet "aws:us-east-1:p4d.24xlarge" "gcp:us-central1:a2-highgpu-8g" > /dev/null
+redis-cli -h redis SADD gpu_idx:indexed "H100:8" "H100:1" "A100:8" > /dev/null
+
 # Load compute prices
 echo "Loading compute prices..."
 redis-cli -h redis SET compute:aws:us-east-1:p5.48xlarge '{"provider":"AWS","region":"us-east-1","instance_type":"p5.48xlarge","cost_per_hour":16.00,"gpu_count":8,"gpu_memory_gb":80,"interconnect":"ethernet"}' > /dev/null
@@ -42,5 +55,8 @@ redis-cli -h redis SET egress:coreweave:storage:lva:INTERNET '{"cost_per_gb":0.0
 echo "Loading spot API info..."
 redis-cli -h redis SET spot_api:aws '{"endpoint":"https://ec2.amazonaws.com","instance_key_format":"{instance_type}"}' > /dev/null
 
+# Tell running Cost Engines to drop cached prices
+redis-cli -h redis INCR prices:version > /dev/null
+
 echo "Redis seeding complete!"
 
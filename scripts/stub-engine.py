@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Stand-in Cost Engine with injected latency, for load testing the API on its own.
+
+Serves POST /analyze, GET /health, /price-version and /changes (prices never
+change) like the real engine. Answers are built from a price catalog
+(data/sample-prices.json by default) with a simplified pricing rule: every instance in the requested GPU map is an option. The option
+in the data's provider and region is data-local. Remote options pay internet
+egress for the dataset. Each /analyze call sleeps for --latency-ms plus
+exponentially distributed --jitter-ms. A --error-rate share of calls fails with 500.
+
+    python scripts/stub-engine.py --port 8080 --latency-ms 20 --jitter-ms 10
+    python scripts/stub-engine.py --unix /tmp/engine.sock --latency-ms 5
+
+Point the API at it with COST_ENGINE_URL=http://localhost:8080 (or
+unix:///tmp/engine.sock), then drive the API with scripts/load-generator.py.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+def build_response(catalog: Dict[str, Any], job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Analysis for a job from the catalog, or None if no instance matches its GPU shape"""
+    shape = f"{job['compute']['gpu_type']}:{job['compute']['gpu_count']}"
+    location = job["data"]["location"]
+    provider, _, region = location.split(":")
+    egress = catalog.get("egress", {}).get(f"{location}:INTERNET", {}).get("cost_per_gb", 0.0)
+
+    local: Optional[Dict[str, Any]] = None
+    remote: List[Dict[str, Any]] = []
+    dependencies = [f"gpu_map:{shape}", f"egress:{location}:INTERNET"]
+    for instance_key in catalog.get("gpu_maps", {}).get(shape, []):
+        price = catalog.get("compute", {}).get(instance_key)
+        if price is None:
+            continue
+        dependencies.append(f"compute:{instance_key}")
+        option = {
+            "provider": price["provider"],
+            "region": price["region"],
+            "instance_type": price["instance_type"],
+            "compute_cost_per_hour": price["cost_per_hour"],
+            "one_time_egress_cost": 0.0,
+            "advisory_message": "",
+        }
+        if local is None and price["provider"].lower() == provider and price["region"] == region:
+            option["advisory_message"] = "Data-local option (stub engine)"
+            local = option
+        else:
+            option["one_time_egress_cost"] = round(egress * job["data"]["size_gb"], 2)
+            remote.append(option)
+
+    if local is None:
+        if not remote:
+            return None
+        local = remote.pop(0)
+        local["one_time_egress_cost"] = 0.0
+        local["advisory_message"] = "No instance in the data's region; cheapest listed option (stub engine)"
+
+    for option in remote:
+        savings = local["compute_cost_per_hour"] - option["compute_cost_per_hour"]
+        if savings > 0:
+            option["break_even_hours"] = round(option["one_time_egress_cost"] / savings, 2)
+            option["advisory_message"] = f"Cheaper after {option['break_even_hours']} hours (stub engine)"
+        else:
+            option["advisory_message"] = "Not cheaper than data-local (stub engine)"
+    return {"data_local_option": local, "remote_options": remote, "dependencies": sorted(dependencies)}
+
+
+def make_handler(catalog: Dict[str, Any], latency: float, jitter: float, error_rate: float, price_version: str = "1"):
+    class StubEngineHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            # Headers and body go out in separate writes; over TCP, Nagle would hold
+            # the body back until the client's delayed ACK
+            self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+            super().setup()
+
+        def _send(self, status: int, body: Dict[str, Any]) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("X-Price-Version", price_version)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "healthy"})
+            elif self.path == "/price-version":
+                self._send(200, {"version": price_version})
+            elif self.path.split("?")[0] == "/changes":
+                # Prices never change here
+                self._send(200, {"seq": 0, "keys": [], "reset": False, "version": price_version})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/analyze":
+                self._send(404, {"error": "not found"})
+                return
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+            time.sleep(latency + (random.expovariate(1 / jitter) if jitter > 0 else 0.0))
+            if random.random() < error_rate:
+                self._send(500, {"error": "injected failure"})
+                return
+            response = build_response(catalog, job)
+            if response is not None and not self.headers.get("X-Record-Dependencies"):
+                del response["dependencies"]
+            if response is None:
+                self._send(404, {"error": "no instances match the requested GPU shape"})
+            else:
+                self._send(200, response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubEngineHandler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("unix", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Cost Engine with injected latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", help="Also listen on this Unix socket path")
+    parser.add_argument("--catalog", default="data/sample-prices.json")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Fixed latency per /analyze call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Mean of extra exponential latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of /analyze calls answered with 500")
+    parser.add_argument("--price-version", default="1", help="Price snapshot version to report")
+    args = parser.parse_args()
+
+    with open(args.catalog) as f:
+        catalog = json.load(f)
+    handler = make_handler(catalog, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.price_version)
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        unix_server = ThreadingUnixHTTPServer(args.unix, handler)
+        os.chmod(args.unix, 0o666)
+        threading.Thread(target=unix_server.serve_forever, daemon=True).start()
+        print(f"Stub engine listening on unix://{args.unix}")
+
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Stub engine listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms:g} ms + exp({args.jitter_ms:g} ms), errors {args.error_rate:.1%})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
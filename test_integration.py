@@ -12,6 +12,29 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / "api"))
 sys.path.insert(0, str(Path(__file__).parent / "cli"))
 
+def _import_api_module(name):
+    """Import an api/ module whose flat `from models import ...` must see api/models.py"""
+    import importlib
+    import api.models as api_models
+    saved = sys.modules.get("models")
+    sys.modules["models"] = api_models
+    try:
+        return importlib.import_module(f"api.{name}")
+    finally:
+        if saved is not None:
+            sys.modules["models"] = saved
+        else:
+            sys.modules.pop("models", None)
+
+def _import_script(filename):
+    """Import a scripts/ tool (hyphenated file names are not importable as modules)"""
+    import importlib.util
+    path = Path(__file__).parent / "scripts" / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
 def test_job_yaml_structure():
     """Test that job.yaml has correct structure"""
     print("Testing job.yaml structure...")
@@ -293,6 +316,1311 @@ def test_egress_key_structure():
     print("✓ Egress key structure is correct")
     return True
 
+def test_formatter_sort_and_writers():
+    """Test option sorting, --top truncation and machine-readable writers"""
+    print("\nTesting formatter sorting and writers...")
+    import csv
+    import io
+    from cli.formatter import select_options, write_analysis_response
+
+    response = {
+        "data_local_option": {"provider": "aws", "region": "us-east-1", "compute_cost_per_hour": 16.0,
+                              "one_time_egress_cost": 0.0, "break_even_hours": None,
+                              "advisory_message": "This is your data-local option."},
+        "remote_options": [
+            {"provider": "gcp", "region": "us-central1", "compute_cost_per_hour": 17.0,
+             "one_time_egress_cost": 1200.0, "break_even_hours": None, "advisory_message": "Not recommended."},
+            {"provider": "coreweave", "region": "lva", "compute_cost_per_hour": 12.0,
+             "one_time_egress_cost": 900.0, "break_even_hours": 225.0, "advisory_message": "Cheaper"},
+            {"provider": "aws", "region": "us-west-2", "compute_cost_per_hour": 15.0,
+             "one_time_egress_cost": 200.0, "break_even_hours": 200.0, "advisory_message": "Cheaper"},
+        ],
+    }
+
+    by_break_even = select_options(response["remote_options"], sort_by="break-even")
+    assert [o["provider"] for o in by_break_even] == ["aws", "coreweave", "gcp"], "None break-even should sort last"
+    top_cost = select_options(response["remote_options"], sort_by="hourly-cost", top=1)
+    assert [o["provider"] for o in top_cost] == ["coreweave"], "--top should keep the cheapest option"
+
+    out = io.StringIO()
+    write_analysis_response(response, "ndjson", sort_by="egress", top=2, stream=out)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row["role"] for row in lines] == ["data-local", "remote", "remote"]
+    assert lines[1]["provider"] == "aws", "Cheapest egress should be first"
+
+    out = io.StringIO()
+    write_analysis_response(response, "csv", stream=out)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert len(rows) == 4, f"Expected 4 CSV rows, got {len(rows)}"
+
+    print("✓ Formatter sorting and writers work correctly")
+    return True
+
+def test_portfolio_vectorized_analysis():
+    """Test columnar portfolio analysis against a stub Cost Engine"""
+    print("\nTesting portfolio analysis...")
+    from api.models import AnalysisOption, AnalysisResponse, PortfolioRequest
+    portfolio = _import_api_module("portfolio")
+
+    class StubEngine:
+        def __init__(self):
+            self.calls = 0
+
+        def analyze(self, request):
+            self.calls += 1
+            if request.data.location.startswith("gcp"):
+                raise Exception("no instances found")
+            local = AnalysisOption(provider="aws", region="us-east-1", compute_cost_per_hour=16.0,
+                                   one_time_egress_cost=0.0, advisory_message="local")
+            remote = AnalysisOption(provider="coreweave", region="lva", compute_cost_per_hour=12.0,
+                                    one_time_egress_cost=0.05 * request.data.size_gb, advisory_message="remote")
+            return AnalysisResponse(data_local_option=local, remote_options=[remote])
+
+    engine = StubEngine()
+    request = PortfolioRequest(
+        job_name=["short", "long", "broken"],
+        location=["aws:s3:us-east-1", "aws:s3:us-east-1", "gcp:gcs:us-central1"],
+        size_gb=[10000.0, 10000.0, 10.0],
+        gpu_type=["H100", "H100", "H100"],
+        gpu_count=[8, 8, 8],
+        duration_hours=[100.0, 1000.0, 10.0],
+    )
+    result = portfolio.analyze_portfolio(request, engine)
+
+    assert engine.calls == 2, f"Expected one engine call per group, got {engine.calls}"
+    assert result.columns["recommended"] == ["data-local", "remote", None]
+    assert result.columns["break_even_hours"] == [None, 125.0, None]
+    assert result.totals.jobs_moved == 1 and result.totals.jobs_failed == 1
+    assert abs(result.totals.savings - 3500.0) < 1e-6, f"Unexpected savings {result.totals.savings}"
+    assert len(result.errors) == 1
+
+    # A zero or negative runtime would rank padding columns or costlier moves first
+    from pydantic import ValidationError
+    for hours in (0.0, -5.0):
+        try:
+            PortfolioRequest(**{**request.model_dump(), "duration_hours": [100.0, hours, 10.0]})
+            assert False, f"duration_hours={hours} should be rejected"
+        except ValidationError as e:
+            assert "duration_hours" in str(e)
+
+    print("✓ Portfolio analysis works correctly")
+    return True
+
+def test_spot_risk_simulation():
+    """Test Monte Carlo spot interruption model"""
+    print("\nTesting spot risk simulation...")
+    import math
+    import numpy as np
+    from api.models import AnalysisOption, AnalysisResponse, JobRisk
+    risk = _import_api_module("risk")
+
+    # Mean billed hours should match the closed form for Poisson interruptions
+    rate, interval, duration, overhead = 0.01, 10.0, 100.0, 1.0
+    sim = risk.simulate_billed_hours(duration, interval, overhead, rate, 200_000, np.random.default_rng(7))
+    q = math.exp(-rate * interval)
+    failures = (duration / interval) * (1 - q) / q
+    lost_per_failure = 1 / rate - interval * q / (1 - q)
+    expected = duration + failures * (lost_per_failure + overhead)
+    assert abs(sim["billed_hours"].mean() - expected) < 0.1, f"{sim['billed_hours'].mean()} vs {expected}"
+
+    local = AnalysisOption(provider="aws", region="us-east-1", compute_cost_per_hour=16.0,
+                           one_time_egress_cost=0.0, advisory_message="local")
+    spot = AnalysisOption(provider="aws", region="us-east-1", compute_cost_per_hour=8.0,
+                          one_time_egress_cost=0.0, break_even_hours=0.0, advisory_message="spot",
+                          is_spot_instance=True, interruption_risk="HIGH")
+    response = AnalysisResponse(data_local_option=local, remote_options=[spot])
+    risk.apply_risk_model(response, JobRisk(duration_hours=500, checkpoint_interval_hours=4,
+                                            restart_overhead_hours=0.5, trials=50_000, seed=1))
+
+    assert local.expected_cost == local.p90_cost == 8000.0
+    assert spot.expected_cost > 4000.0, "Interruptions should add to the spot cost"
+    assert spot.p90_cost >= spot.expected_cost * 0.99
+    assert spot.risk_adjusted_break_even_hours == 0.0
+
+    print("✓ Spot risk simulation works correctly")
+    return True
+
+def test_trace_propagation():
+    """Test traceparent propagation and debug span collection"""
+    print("\nTesting trace propagation...")
+    tracing = _import_api_module("tracing")
+
+    assert tracing.parse_traceparent("garbage") == (None, None, False)
+    trace_id, parent_id, sampled = tracing.parse_traceparent(f"00-{'a' * 32}-{'b' * 16}-01")
+    assert (trace_id, parent_id, sampled) == ("a" * 32, "b" * 16, True)
+
+    # Unsampled requests record nothing and send no headers
+    tracer = tracing.Tracer("api", sample_rate=0.0)
+    assert tracer.start_trace() is None
+    with tracer.span("ignored") as span:
+        assert span is None
+    assert tracer.inject({}) == {}
+
+    # Spans are only returned to callers presenting the debug token
+    assert not tracer.debug_authorized("1"), "Debug spans must be off without TRACE_DEBUG_TOKEN"
+    tracer = tracing.Tracer("api", sample_rate=0.0, debug_token="s3cret")
+    assert tracer.debug_authorized("s3cret") and not tracer.debug_authorized("1")
+    assert not tracer.debug_authorized(None)
+
+    # A sampled caller's trace continues, and child spans parent to the current span
+    trace = tracer.start_trace(f"00-{'a' * 32}-{'b' * 16}-01", debug=True)
+    with tracer.span("outer") as outer:
+        with tracer.span("inner"):
+            headers = tracer.inject({})
+        tracer.collect({tracing.TRACE_SPANS_HEADER: json.dumps([{"span_id": "c" * 16, "name": "engine"}])})
+    spans = {span["name"]: span for span in trace.all_spans()}
+    assert spans["outer"]["parent_id"] == "b" * 16
+    assert spans["inner"]["parent_id"] == outer.span_id
+    assert headers[tracing.TRACEPARENT_HEADER].startswith(f"00-{'a' * 32}-")
+    assert headers[tracing.TRACE_DEBUG_HEADER] == "s3cret"
+    assert "engine" in spans, "Downstream spans should be kept for debug traces"
+    assert len(json.loads(tracer.finish(trace))) == 3
+
+    print("✓ Trace propagation works correctly")
+    return True
+
+def test_request_profiling():
+    """Test X-Profile token checks and report contents"""
+    print("\nTesting request profiling...")
+    import time
+    profiling = _import_api_module("profiling")
+
+    assert not profiling.Profiler(token=None).authorized("anything"), "Profiling must be off without a token"
+    profiler = profiling.Profiler(token="s3cret", interval=0.0005, history=1)
+    assert profiler.authorized("s3cret") and not profiler.authorized("wrong")
+
+    profile = profiler.begin("POST /api/v1/analyze")
+    assert profiler.begin("concurrent") is None, "Only one request is profiled at a time"
+    data = [list(range(1000)) for _ in range(200)]
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(len(row) for row in data)
+    profiler.end(profile)
+
+    assert profiler.get(profile.id) is profile
+    assert "Top 25 functions" in profile.report and "allocation sites" in profile.report
+    assert "test_request_profiling" in profile.folded
+
+    # Only the most recent `history` profiles are kept, and the lock is released
+    second = profiler.begin("GET /health")
+    profiler.end(second)
+    assert profiler.get(profile.id) is None and profiler.list() == {second.id: "GET /health"}
+
+    print("✓ Request profiling works correctly")
+    return True
+
+def test_readiness_gating():
+    """Test that the API only reports ready after a successful warm-up probe"""
+    print("\nTesting readiness gating...")
+    readiness = _import_api_module("readiness")
+    from api.models import JobRequest
+
+    class FakeEngine:
+        def __init__(self):
+            self.up = False
+        def warm(self, connections):
+            return connections if self.up else 0
+        def analyze(self, request):
+            if not self.up:
+                raise Exception("Failed to connect to Cost Engine")
+        def health(self):
+            if not self.up:
+                raise Exception("Failed to connect to Cost Engine")
+            return 0.002
+
+    engine = FakeEngine()
+    state = readiness.Readiness(engine, 3, JobRequest(**readiness.DEFAULT_PROBE_JOB), retry_interval=60)
+    assert not state.warm_up()
+    status = state.status()
+    assert not status["ready"] and not status["engine"]["reachable"] and status["probe"]["error"]
+
+    engine.up = True
+    assert state.warm_up()
+    status = state.status()
+    assert status["ready"] and status["warmed_connections"] == 3 and status["engine"]["latency_ms"] == 2.0
+
+    # A warmed replica whose engine goes away stops reporting ready
+    engine.up = False
+    assert not state.status()["ready"]
+
+    print("✓ Readiness gating works correctly")
+    return True
+
+def test_load_generator():
+    """Test open-loop load generation, latency percentiles and saturation detection"""
+    print("\nTesting load generator...")
+    import asyncio
+    import random
+    import httpx
+    from api.models import JobRequest
+    loadgen = _import_script("load-generator.py")
+    seeder = _import_script("seed-from-json.py")
+
+    histogram = loadgen.LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(float(ms))
+    assert abs(histogram.percentile(50) - 500) / 500 < 0.03
+    assert abs(histogram.percentile(99) - 990) / 990 < 0.03
+    assert histogram.percentile(100) == 1000.0
+
+    with open("data/sample-prices.json") as f:
+        catalog = json.load(f)
+    jobs = loadgen.synthesize(catalog, random.Random(7), risk_fraction=0.5)
+    for _ in range(50):
+        job = JobRequest(**next(jobs))
+        assert f"{job.compute.gpu_type}:{job.compute.gpu_count}" in catalog["gpu_maps"]
+        assert not job.data.location.startswith("aws:ec2")
+
+    # A server with 2 workers taking 10 ms each saturates at 200 rps; open-loop
+    # arrivals keep coming past that, so the queueing shows up in the latency
+    async def run(rate):
+        workers = asyncio.Semaphore(2)
+        async def handler(request):
+            async with workers:
+                await asyncio.sleep(0.01)
+            return httpx.Response(200, json={})
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await loadgen.run_step(client, "http://api/api/v1/analyze", jobs, rate, 0.5,
+                                          "uniform", 1000, random.Random(1))
+
+    light, heavy = asyncio.run(run(50)), asyncio.run(run(400))
+    assert light.sent == 24 and light.ok == 24 and light.error_rate == 0
+    assert light.histogram.percentile(99) < 50
+    assert heavy.histogram.percentile(99) >= 100
+    assert loadgen.find_saturation([light, heavy], p99_slo_ms=50, max_error_rate=0.01) is heavy
+
+    commands = seeder.build_commands(catalog)
+    assert ["SADD", "gpu_idx:H100:8:interconnect:infiniband", "coreweave:lva:HGX_H100_80G"] in commands
+    assert ["SADD", "gpu_idx:indexed", "H100:8", "H100:1", "A100:8"] in commands
+    assert commands[-1] == ["INCR", "prices:version"]
+
+    print("✓ Load generator works correctly")
+    return True
+
+def test_catalog_generator():
+    """Test that generated catalogs are deterministic and match the sample-prices schema"""
+    print("\nTesting catalog generator...")
+    import random
+    from api.models import JobRequest
+    generator = _import_script("generate-catalog.py")
+    loadgen = _import_script("load-generator.py")
+
+    catalog = generator.generate_catalog(providers=3, regions=9, gpu_types=2, gpu_counts=[1, 8],
+                                         instances_per_shape=40, seed=3)
+    assert catalog == generator.generate_catalog(providers=3, regions=9, gpu_types=2, gpu_counts=[1, 8],
+                                                 instances_per_shape=40, seed=3)
+    assert len(catalog["gpu_maps"]) == 4 and len(catalog["compute"]) == 160
+    # One INTERNET price per region plus one to each other region of the same provider
+    assert len(catalog["egress"]) == 9 + 9 * 2
+
+    with open("data/sample-prices.json") as f:
+        sample = json.load(f)
+    sample_fields = set(next(iter(sample["compute"].values())))
+    for key, price in catalog["compute"].items():
+        assert set(price) == sample_fields
+        provider, region, instance_type = key.split(":")
+        assert (region, instance_type) == (price["region"], price["instance_type"])
+    # Every region has a data-local instance of every shape
+    for members in catalog["gpu_maps"].values():
+        assert len({tuple(key.split(":")[:2]) for key in members}) == 9
+
+    jobs = loadgen.synthesize(catalog, random.Random(0))
+    for _ in range(20):
+        JobRequest(**next(jobs))
+
+    print("✓ Catalog generator works correctly")
+    return True
+
+def test_conditional_requests_and_cache():
+    """Test ETag revalidation, --max-stale reuse and the size bound of the CLI cache"""
+    print("\nTesting conditional requests and the response cache...")
+    import tempfile
+    import httpx
+    etag = _import_api_module("etag")
+    from api.models import JobRequest as APIJobRequest
+    from cli.models import JobRequest
+    from cli.api_client import APIClient
+    from cli.response_cache import ResponseCache
+
+    job = {
+        "job_name": "train",
+        "data": {"location": "aws:s3:us-east-1", "size_gb": 100},
+        "compute": {"gpu_type": "H100", "gpu_count": 8},
+    }
+    tag = etag.make_etag(APIJobRequest(**job), "7")
+    assert tag == etag.make_etag(APIJobRequest(**{**job, "job_name": "renamed"}), "7")
+    assert tag != etag.make_etag(APIJobRequest(**job), "8")
+    assert tag != etag.make_etag(APIJobRequest(**{**job, "data": {**job["data"], "size_gb": 101}}), "7")
+    assert etag.etag_matches(f'"other", W/{tag}', tag) and not etag.etag_matches('"other"', tag)
+
+    price_version = "1"
+    calls = []
+    def handler(request):
+        calls.append(request.headers.get("If-None-Match"))
+        current = etag.make_etag(APIJobRequest(**json.loads(request.content)), price_version)
+        if etag.etag_matches(request.headers.get("If-None-Match"), current):
+            return httpx.Response(304, headers={"ETag": current})
+        return httpx.Response(200, json={"data_local_option": {"version": price_version}}, headers={"ETag": current})
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(Path(directory), max_bytes=10_000)
+        def client(max_stale=None):
+            api = APIClient("http://api", cache=cache, max_stale=max_stale)
+            api.client = httpx.Client(transport=httpx.MockTransport(handler))
+            return api
+
+        first = client().analyze(JobRequest(**job))
+        assert calls == [None] and first["data_local_option"]["version"] == "1"
+
+        api = client()
+        assert api.analyze(JobRequest(**job)) == first and api.last_cache_status == "revalidated"
+        assert calls[-1] == etag.make_etag(APIJobRequest(**job), "1")
+
+        api = client(max_stale=60)
+        assert api.analyze(JobRequest(**job)) == first and api.last_cache_status == "hit"
+        assert len(calls) == 2, "--max-stale must not contact the API"
+
+        # A price reload changes the ETag, so the next revalidation downloads the new result
+        price_version = "2"
+        api = client()
+        assert api.analyze(JobRequest(**job))["data_local_option"]["version"] == "2"
+        assert api.last_cache_status == "miss"
+
+        # The least recently used entries go once the directory outgrows max_bytes
+        for size in range(1, 200):
+            cache.put(f"key{size}", '"x"', {"padding": "x" * 200})
+        assert sum(f.stat().st_size for f in Path(directory).glob("*.json")) <= 10_000
+        assert cache.get("key199") is not None and cache.get("key1") is None
+
+    print("✓ Conditional requests and response cache work correctly")
+    return True
+
+def test_saved_job_incremental_recompute():
+    """Test the saved-job reverse index, change-driven recomputes and SSE events"""
+    print("\nTesting saved jobs...")
+    import asyncio
+    import threading
+    saved_jobs = _import_api_module("saved_jobs")
+    from api.models import AnalysisOption, AnalysisResponse, SavedJobRequest
+
+    prices = {
+        "compute:aws:us-east-1:p5.48xlarge": 98.0,
+        "compute:gcp:us-central1:a3-highgpu-8g": 88.0,
+        "egress:aws:s3:us-east-1:INTERNET": 0.05,
+        "egress:gcp:gcs:us-central1:INTERNET": 0.12,
+    }
+    remotes = {"aws": "gcp:us-central1:a3-highgpu-8g", "gcp": "aws:us-east-1:p5.48xlarge"}
+    analyzed = []
+
+    def analyze(job):
+        analyzed.append(job.job_name)
+        provider, service, region = job.data.location.split(":")
+        if job.job_name == "broken":
+            raise Exception("Cost Engine returned error 404: no instances")
+        local_key = next(key for key in prices if key.startswith(f"compute:{provider}:{region}:"))
+        remote_key = f"compute:{remotes[provider]}"
+        egress_key = f"egress:{job.data.location}:INTERNET"
+        egress = round(prices[egress_key] * job.data.size_gb, 2)
+        savings = prices[local_key] - prices[remote_key]
+        local = AnalysisOption(provider=provider, region=region, instance_type=local_key.split(":")[3],
+                               compute_cost_per_hour=prices[local_key], one_time_egress_cost=0,
+                               advisory_message="local")
+        remote = AnalysisOption(provider=remote_key.split(":")[1], region=remote_key.split(":")[2],
+                                instance_type=remote_key.split(":")[3], compute_cost_per_hour=prices[remote_key],
+                                one_time_egress_cost=egress, advisory_message="remote",
+                                break_even_hours=round(egress / savings, 1) if savings > 0 else None)
+        return AnalysisResponse(data_local_option=local, remote_options=[remote]), "1", sorted(
+            [local_key, remote_key, egress_key, "gpu_map:H100:8"])
+
+    class FakeEngine:
+        def __init__(self):
+            self.seq, self.version, self.pending, self.reset = 0, "1", [], False
+
+        def change(self, key, price):
+            prices[key] = price
+            self.seq += 1
+            self.pending.append(key)
+
+        def changes(self, since=None):
+            result = {"seq": self.seq, "keys": [], "reset": False, "version": self.version}
+            if since is not None:
+                result.update(keys=self.pending, reset=self.reset)
+                self.pending, self.reset = [], False
+            return result
+
+    def job(name, location, size_gb=1000):
+        return SavedJobRequest(job={
+            "job_name": name,
+            "data": {"location": location, "size_gb": size_gb},
+            "compute": {"gpu_type": "H100", "gpu_count": 8},
+        }, break_even_threshold_hours=10)
+
+    engine = FakeEngine()
+    registry = saved_jobs.JobRegistry(":memory:")
+    broker = saved_jobs.EventBroker()
+    watcher = saved_jobs.SavedJobWatcher(registry, engine, analyze, broker, poll_interval=1, workers=2)
+
+    # aws job: 50 GB-dollars of egress, saves $10/h -> breaks even after 5h
+    aws = watcher.register(job("aws-train", "aws:s3:us-east-1"))
+    assert aws.recommendation == "gcp:us-central1:a3-highgpu-8g" and aws.best_break_even_hours == 5.0
+    gcp = watcher.register(job("gcp-train", "gcp:gcs:us-central1"))
+    assert gcp.recommendation == "gcp:us-central1:a3-highgpu-8g" and gcp.best_break_even_hours is None
+    assert registry.jobs_for_keys(["gpu_map:H100:8"]) == {aws.id, gcp.id}
+    assert registry.jobs_for_keys(["egress:aws:s3:us-east-1:INTERNET", "compute:azure:eastus:x"]) == {aws.id}
+
+    # Startup recomputes everything once; an empty change feed recomputes nothing
+    assert watcher.poll() == 2 and watcher.poll() == 0
+
+    # Egress doubles: only the aws job is recomputed, and it now breaks even after 10h (still within 10)
+    analyzed.clear()
+    engine.change("egress:aws:s3:us-east-1:INTERNET", 0.10)
+    assert watcher.poll() == 1 and analyzed == ["aws-train"]
+    assert registry.get(aws.id).best_break_even_hours == 10.0 and not broker._history
+
+    # Crossing the threshold flips the recommendation back to data-local
+    engine.change("egress:aws:s3:us-east-1:INTERNET", 0.20)
+    watcher.poll()
+    events = {event.type: event.data for event in broker._history}
+    assert events["recommendation_changed"]["current"] == "aws:us-east-1:p5.48xlarge"
+    assert events["break_even_crossed"]["direction"] == "above"
+    assert events["break_even_crossed"]["previous"] == 10.0 and events["break_even_crossed"]["current"] == 20.0
+
+    # A reset (or a version change without key events) recomputes every job
+    engine.reset = True
+    assert watcher.poll() == 2
+    engine.version = "2"
+    assert watcher.poll() == 2 and watcher.poll() == 0
+
+    # Failed recomputes are reported once and retried on later polls
+    broken = watcher.register(job("broken", "aws:s3:us-east-1"))
+    assert broken.error and broken.recommendation is None
+    assert watcher.poll() == 1 and registry.failed_ids() == [broken.id]
+
+    # Deleting a job drops its dependencies from the reverse index
+    assert registry.delete(aws.id) and not registry.delete(aws.id)
+    assert registry.jobs_for_keys(["egress:aws:s3:us-east-1:INTERNET"]) == set()
+    assert registry.dependencies(aws.id) == []
+
+    # SSE: a live subscriber gets events published from other threads, filtered by job;
+    # a reconnecting one replays what it missed
+    async def subscribe():
+        stream = broker.stream(job_id=gcp.id, keepalive=0.05)
+        assert (await stream.__anext__()).startswith("retry:")
+        assert await stream.__anext__() == ": ping\n\n"
+        threading.Thread(target=broker.publish, args=("break_even_crossed", {"job_id": aws.id})).start()
+        threading.Thread(target=broker.publish, args=("recommendation_changed", {"job_id": gcp.id})).start()
+        chunk = await stream.__anext__()
+        while chunk.startswith(":"):
+            chunk = await stream.__anext__()
+        await stream.aclose()
+        replay = broker.stream(last_event_id=1, keepalive=0.05)
+        await replay.__anext__()
+        resumed = await replay.__anext__()
+        await replay.aclose()
+        return chunk, resumed
+
+    chunk, resumed = asyncio.run(subscribe())
+    assert "event: recommendation_changed" in chunk and gcp.id in chunk
+    assert resumed.startswith("id: 2\n")
+    assert not broker._subscribers
+    registry.close()
+
+    print("✓ Saved jobs recompute only on relevant price changes and notify subscribers")
+    return True
+
+
+def test_columnar_responses():
+    """Test the dictionary-encoded columnar analysis format and its lazy CLI decoding"""
+    print("\nTesting columnar responses...")
+    import io
+    import httpx
+    columnar = _import_api_module("columnar")
+    from api.models import AnalysisOption, AnalysisResponse
+    import cli.columnar as cli_columnar
+    from cli.api_client import APIClient
+    from cli.formatter import select_options, write_analysis_response
+    from cli.models import JobRequest
+
+    providers = [("aws", "us-east-1", "p5.48xlarge"), ("gcp", "us-central1", "a3-highgpu-8g"),
+                 ("azure", "eastus", "ND96isr_H100_v5"), ("coreweave", "lva", "HGX_H100_80G")]
+    options = []
+    for i in range(400):
+        provider, region, instance = providers[i % 4]
+        break_even = round(1 + i * 0.37, 1) if i % 5 else None
+        options.append(AnalysisOption(
+            provider=provider, region=f"{region}-{i % 7}", instance_type=instance,
+            compute_cost_per_hour=round(60 + i * 0.11, 2), one_time_egress_cost=round(i * 1.5, 2),
+            break_even_hours=break_even, is_spot_instance=i % 3 == 0,
+            interruption_risk=["LOW", "MEDIUM", "HIGH"][i % 3] if i % 3 == 0 else None,
+            egress_route=["aws:s3:us-east-1", "aws:s3:us-west-2", f"{provider}:x:{region}"] if i % 10 == 0 else None,
+            advisory_message=(f"Cheaper than data-local provider if your job runs for MORE than {break_even:.1f} hours."
+                              if break_even else "Not recommended. Compute cost is higher than the data-local option."),
+        ))
+    analysis = AnalysisResponse(data_local_option=options[0], remote_options=options[1:])
+    plain = json.dumps(analysis.model_dump())
+    encoded = json.loads(json.dumps(columnar.encode_analysis(analysis)))
+    assert len(json.dumps(encoded)) < 0.5 * len(plain), "columnar form should be much smaller"
+    assert len(encoded["remote_options"]["dictionaries"]["advisory_message"]) == 2
+    assert encoded["remote_options"]["columns"]["expected_cost"] is None
+
+    # Decoding gives back every option exactly
+    decoded = cli_columnar.decode_analysis(encoded)
+    assert len(decoded["remote_options"]) == 399
+    assert [dict(option) for option in decoded["remote_options"]] == [o.model_dump() for o in options[1:]]
+    assert decoded["remote_options"][-1]["provider"] == options[-1].provider
+    assert cli_columnar.decode_analysis({"remote_options": []}) == {"remote_options": []}
+
+    # Sorting reads only the sort column; advisory text is expanded only for written rows
+    expanded = []
+    original_expand = cli_columnar.expand_template
+    cli_columnar.expand_template = lambda template, args: expanded.append(1) or original_expand(template, args)
+    try:
+        top = select_options(decoded["remote_options"], sort_by="break-even", top=3)
+        assert [row["break_even_hours"] for row in top] == sorted(
+            o.break_even_hours for o in options[1:] if o.break_even_hours is not None)[:3]
+        assert not expanded
+        stream = io.StringIO()
+        write_analysis_response(decoded, "ndjson", sort_by="break-even", top=3, stream=stream)
+        assert len(expanded) == 3
+        assert json.loads(stream.getvalue().splitlines()[1])["advisory_message"].startswith("Cheaper than")
+    finally:
+        cli_columnar.expand_template = original_expand
+
+    # Negotiation: only a positive q for the columnar type selects it
+    assert columnar.wants_columnar(f"{columnar.COLUMNAR_MEDIA_TYPE}, application/json;q=0.9")
+    assert not columnar.wants_columnar(f"application/json, {columnar.COLUMNAR_MEDIA_TYPE};q=0")
+    assert not columnar.wants_columnar("application/json") and not columnar.wants_columnar(None)
+
+    accepts = []
+    def handler(request):
+        accepts.append(request.headers.get("Accept", ""))
+        if columnar.wants_columnar(request.headers.get("Accept")):
+            return httpx.Response(200, json=encoded, headers={"Content-Type": columnar.COLUMNAR_MEDIA_TYPE})
+        return httpx.Response(200, content=plain, headers={"Content-Type": "application/json"})
+
+    job = JobRequest(**{
+        "job_name": "train",
+        "data": {"location": "aws:s3:us-east-1", "size_gb": 100},
+        "compute": {"gpu_type": "H100", "gpu_count": 8},
+    })
+    for use_columnar in (True, False):
+        api = APIClient("http://api", columnar=use_columnar)
+        api.client = httpx.Client(transport=httpx.MockTransport(handler))
+        result = api.analyze(job)
+        assert len(result["remote_options"]) == 399
+        assert dict(result["remote_options"][5]) == options[6].model_dump()
+    assert columnar.COLUMNAR_MEDIA_TYPE in accepts[0] and columnar.COLUMNAR_MEDIA_TYPE not in accepts[1]
+
+    print("✓ Columnar responses encode compactly and decode lazily")
+    return True
+
+
+def test_request_deadlines():
+    """Test deadline propagation from the CLI through the API to the engine, and partial results"""
+    print("\nTesting request deadlines...")
+    import httpx
+    client_module = _import_api_module("cost_engine_client")
+    import deadline
+    from api.models import JobRequest as APIJobRequest
+    from cli.api_client import APIClient
+    from cli.models import JobRequest
+
+    job = {
+        "job_name": "train",
+        "data": {"location": "aws:s3:us-east-1", "size_gb": 100},
+        "compute": {"gpu_type": "H100", "gpu_count": 8},
+    }
+    local = {"provider": "aws", "region": "us-east-1", "instance_type": "p5.48xlarge",
+             "compute_cost_per_hour": 98.0, "one_time_egress_cost": 0, "advisory_message": "local"}
+    partial = {"data_local_option": local, "remote_options": [], "partial": True, "options_skipped": 3}
+
+    assert deadline.parse_budget("1500") == 1.5
+    assert deadline.parse_budget(None) is None and deadline.parse_budget("soon") is None
+
+    # The API forwards what is left of the caller's budget, keeping a reserve back
+    received = []
+    status = 200
+    def engine(request):
+        received.append(request.headers.get(deadline.REQUEST_DEADLINE_HEADER))
+        if status == 504:
+            return httpx.Response(504, text="Deadline exceeded before any option was priced")
+        return httpx.Response(200, json=partial)
+
+    engine_client = client_module.CostEngineClient("http://engine")
+    engine_client.client = httpx.Client(transport=httpx.MockTransport(engine))
+    partial["partial"] = False
+    analysis = engine_client.analyze(APIJobRequest(**job))
+    assert received == [None], "no deadline header without a caller deadline"
+    assert not analysis.partial
+
+    partial["partial"] = True
+    token = deadline.start(2.0)
+    try:
+        analysis = engine_client.analyze(APIJobRequest(**job))
+        assert analysis.partial and analysis.options_skipped == 3
+        assert 1700 <= int(received[-1]) <= 1800, received[-1]
+
+        status = 504
+        try:
+            engine_client.analyze(APIJobRequest(**job))
+            assert False, "an engine 504 within a deadline should raise DeadlineExceeded"
+        except deadline.DeadlineExceeded:
+            pass
+    finally:
+        deadline.reset(token)
+
+    calls = len(received)
+    token = deadline.start(0.01)
+    try:
+        engine_client.analyze(APIJobRequest(**job))
+        assert False, "an exhausted budget should not reach the engine"
+    except deadline.DeadlineExceeded:
+        assert len(received) == calls
+    finally:
+        deadline.reset(token)
+
+    # The CLI sends its own timeout as the budget and gets the partial flag back
+    sent = []
+    def api(request):
+        sent.append(request.headers.get("X-Request-Deadline-Ms"))
+        return httpx.Response(200, json=partial, headers={"Cache-Control": "no-store"})
+    cli_client = APIClient("http://api", timeout=5)
+    cli_client.client = httpx.Client(transport=httpx.MockTransport(api))
+    result = cli_client.analyze(JobRequest(**job))
+    assert sent == ["5000"] and result["partial"] and result["options_skipped"] == 3
+
+    print("✓ Request deadlines propagate and partial results are flagged")
+    return True
+
+
+def test_option_constraints():
+    """Test job constraints: validation, engine request body, risk-model sort and CLI pushdown"""
+    print("\nTesting option constraints...")
+    import httpx
+    from pydantic import ValidationError
+    from api.models import AnalysisOption, AnalysisResponse, JobRequest as APIJobRequest
+    client_module = _import_api_module("cost_engine_client")
+    risk = _import_api_module("risk")
+    from cli.main import push_down_selection
+    from cli.models import JobRequest
+
+    job = {
+        "job_name": "train",
+        "data": {"location": "aws:s3:us-east-1", "size_gb": 100},
+        "compute": {"gpu_type": "H100", "gpu_count": 8},
+    }
+    risk_block = {"duration_hours": 100, "checkpoint_interval_hours": 4, "trials": 1000, "seed": 3}
+    for invalid in ({"sort_by": "expected-cost"}, {"top_k": 0}, {"sort_by": "price"}, {"max_cost_per_hour": 0}):
+        try:
+            APIJobRequest(**job, constraints=invalid)
+            assert False, f"constraints {invalid} should be rejected"
+        except ValidationError:
+            pass
+
+    # Engine sort keys go to the engine; expected-cost is left to the API
+    bodies = []
+    local = {"provider": "aws", "region": "us-east-1", "instance_type": "p5.48xlarge",
+             "compute_cost_per_hour": 98.0, "one_time_egress_cost": 0, "advisory_message": "local"}
+    def engine(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"data_local_option": local, "remote_options": []})
+    engine_client = client_module.CostEngineClient("http://engine")
+    engine_client.client = httpx.Client(transport=httpx.MockTransport(engine))
+    engine_client.analyze(APIJobRequest(**job, constraints={"exclude_providers": ["gcp"], "sort_by": "egress", "top_k": 2}))
+    engine_client.analyze(APIJobRequest(**job, risk=risk_block, constraints={"sort_by": "expected-cost", "top_k": 2}))
+    assert bodies[0]["constraints"]["sort_by"] == "egress" and bodies[0]["constraints"]["top_k"] == 2
+    assert bodies[0]["constraints"]["exclude_providers"] == ["gcp"] and "risk" not in bodies[0]
+    assert bodies[1]["constraints"]["sort_by"] is None and bodies[1]["constraints"]["top_k"] is None
+
+    # The risk model applies an expected-cost top-k itself
+    request = APIJobRequest(**job, risk=risk_block, constraints={"sort_by": "expected-cost", "top_k": 2})
+    options = [AnalysisOption(provider="gcp", region=f"r{i}", compute_cost_per_hour=cost, one_time_egress_cost=0,
+                              advisory_message="") for i, cost in enumerate([90.0, 70.0, 95.0, 70.0])]
+    analysis = risk.apply_risk_model(
+        AnalysisResponse(data_local_option=AnalysisOption(**local), remote_options=options),
+        request.risk, request.constraints,
+    )
+    assert [option.region for option in analysis.remote_options] == ["r1", "r3"]
+
+    # The CLI asks the server for its --sort/--top selection unless the job sets its own
+    cli_job = JobRequest(**job)
+    pushed = push_down_selection(cli_job, "break-even", 3)
+    assert pushed.constraints.sort_by == "break-even" and pushed.constraints.top_k == 3
+    assert cli_job.constraints is None
+    assert push_down_selection(cli_job, "break-even", None).constraints is None
+    assert push_down_selection(cli_job, "expected-cost", 3).constraints is None
+    own = JobRequest(**job, constraints={"sort_by": "egress", "top_k": 10, "spot": False})
+    assert push_down_selection(own, "break-even", 3) is own
+
+    print("✓ Option constraints are validated and pushed down")
+    return True
+
+
+def test_catalog_browsing():
+    """Test catalog pages streamed through the API and followed by the CLI catalog command"""
+    print("\nTesting catalog browsing...")
+    import httpx
+    from typer.testing import CliRunner
+    client_module = _import_api_module("cost_engine_client")
+    import cli.main as cli_main
+
+    entries = [{"key": f"compute:aws:us-east-1:p{i}", "provider": "aws", "region": "us-east-1",
+                "instance_type": f"p{i}", "cost_per_hour": 10.0 + i, "gpu_count": 8} for i in range(5)]
+    requests = []
+    def engine(request):
+        requests.append(dict(request.url.params))
+        if request.url.params.get("cursor") == "bad":
+            return httpx.Response(400, text="invalid cursor for this query\n")
+        start = int(request.url.params.get("cursor", "s0")[1:])
+        end = start + int(request.url.params["limit"])
+        page = {"kind": "compute", "items": entries[start:end],
+                "next_cursor": f"s{end}" if end < len(entries) else None}
+        return httpx.Response(200, json=page)
+
+    engine_client = client_module.CostEngineClient("http://engine")
+    engine_client.client = httpx.Client(transport=httpx.MockTransport(engine))
+    body = b"".join(engine_client.catalog("compute", {"provider": "aws", "limit": 2}))
+    assert json.loads(body)["next_cursor"] == "s2" and requests[-1] == {"provider": "aws", "limit": "2"}
+    try:
+        engine_client.catalog("compute", {"cursor": "bad", "limit": 2})
+        assert False, "a rejected cursor should raise ValueError"
+    except ValueError as e:
+        assert "invalid cursor" in str(e)
+
+    # The CLI follows cursors with --all and writes entries as each page arrives
+    def api(request):
+        return engine(request)
+    original = cli_main.APIClient
+    class MockedAPIClient(original):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.client = httpx.Client(transport=httpx.MockTransport(api))
+    cli_main.APIClient = MockedAPIClient
+    try:
+        runner = CliRunner()
+        result = runner.invoke(cli_main.app, ["catalog", "compute", "--limit", "2", "--all", "-o", "ndjson"])
+        assert result.exit_code == 0, result.output
+        lines = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [line["instance_type"] for line in lines] == [f"p{i}" for i in range(5)]
+
+        result = runner.invoke(cli_main.app, ["catalog", "compute", "--limit", "2", "-o", "json"])
+        assert result.exit_code == 0, result.output
+        assert len(json.loads(result.stdout)) == 2
+        assert "--cursor s2" in result.stderr
+
+        result = runner.invoke(cli_main.app, ["catalog", "prices"])
+        assert result.exit_code == 1
+    finally:
+        cli_main.APIClient = original
+
+    print("✓ Catalog pages stream through the API and the CLI follows cursors")
+    return True
+
+
+def test_fair_scheduling():
+    """Test weighted fair queueing across tenants, per-tenant caps and queue-wait stats"""
+    print("\nTesting fair scheduling...")
+    import asyncio
+    import httpx
+    scheduler_module = _import_api_module("scheduler")
+    from cli.api_client import APIClient
+    from cli.models import JobRequest
+
+    FairScheduler = scheduler_module.FairScheduler
+    assert scheduler_module.parse_weights("interactive=8,batch=1") == {"interactive": 8.0, "batch": 1.0}
+    assert scheduler_module.tenant_id(None) == "default" and scheduler_module.tenant_id(" a ") == "a"
+
+    async def run_order(scheduler, requests):
+        """Occupy every slot, queue `requests` (tenant, priority), then free slots one by one"""
+        order = []
+        holders = [await scheduler.acquire("holder", "batch") for _ in range(scheduler.slots)]
+
+        async def request(tenant, priority):
+            await scheduler.acquire(tenant, priority)
+            order.append(f"{tenant}:{priority}")
+
+        tasks = [asyncio.ensure_future(request(*r)) for r in requests]
+        await asyncio.sleep(0.01)
+        for _ in holders:
+            scheduler.release("holder")
+        for started in range(1, len(requests) + 1):
+            while len(order) < started:
+                await asyncio.sleep(0)
+            tenant, priority = order[-1].split(":")
+            scheduler.release(tenant)
+        await asyncio.gather(*tasks)
+        return order
+
+    # A burst of batch work from one tenant does not hold back another tenant's request
+    scheduler = FairScheduler(slots=1, tenant_limit=1)
+    order = asyncio.run(run_order(scheduler, [("a", "batch")] * 4 + [("b", "batch")]))
+    assert order.index("b:batch") <= 1, order
+
+    # Interactive work gets weights["interactive"] times the share of batch work
+    scheduler = FairScheduler(slots=1, tenant_limit=1)
+    order = asyncio.run(run_order(scheduler, [("a", "batch")] * 4 + [("b", "interactive")] * 4))
+    assert order[:5].count("b:interactive") == 4, order
+
+    # The per-tenant cap leaves slots to other tenants even when one queued first
+    async def capped():
+        scheduler = FairScheduler(slots=2, tenant_limit=1)
+        await scheduler.acquire("a", "batch")
+        second_a = asyncio.ensure_future(scheduler.acquire("a", "batch"))
+        first_b = asyncio.ensure_future(scheduler.acquire("b", "batch"))
+        await asyncio.sleep(0.01)
+        assert first_b.done() and not second_a.done()
+        scheduler.release("a")
+        await asyncio.sleep(0.01)
+        assert second_a.done()
+
+        # Waits are bounded by the deadline and by the tenant's queue
+        try:
+            await scheduler.acquire("a", "batch", timeout=0.01)
+            assert False, "a request that cannot start before its deadline should time out"
+        except scheduler_module.QueueTimeout:
+            pass
+        scheduler.max_queued = 0
+        try:
+            await scheduler.acquire("a", "batch")
+            assert False, "a tenant over its queue limit should be rejected"
+        except scheduler_module.QueueFull:
+            pass
+        return scheduler.status()
+
+    status = asyncio.run(capped())
+    wait = status["tenants"]["a"]["wait"]["batch"]
+    assert status["running"] == 2 and status["queued"] == 0
+    assert wait["count"] == 2 and wait["timed_out"] == 1 and wait["rejected"] == 1
+    assert sum(wait["buckets"].values()) == wait["count"]
+
+    # The CLI tags its requests with its tenant and as interactive work
+    sent = []
+    def api(request):
+        sent.append((request.headers.get("X-Tenant-Id"), request.headers.get("X-Priority")))
+        return httpx.Response(200, json={"remote_options": []})
+    client = APIClient("http://api", tenant="team-a")
+    client.client = httpx.Client(transport=httpx.MockTransport(api))
+    client.analyze(JobRequest(
+        job_name="train",
+        data={"location": "aws:s3:us-east-1", "size_gb": 100},
+        compute={"gpu_type": "H100", "gpu_count": 8},
+    ))
+    assert sent == [("team-a", "interactive")]
+
+    print("✓ Tenants are scheduled fairly and queue waits are recorded")
+    return True
+
+
+def test_popularity_cache_warming():
+    """Test the frequency sketch, hot-job tracking, the analysis cache and warming after a price reload"""
+    print("\nTesting popularity-driven cache warming...")
+    import asyncio
+    cache_module = _import_api_module("analysis_cache")
+    from api.models import AnalysisResponse, JobRequest as APIJobRequest
+    from api.etag import job_key
+
+    # Conservative counting, saturation and aging
+    sketch = cache_module.FrequencySketch(width=64)
+    indexes = sketch.indexes("job")
+    for _ in range(20):
+        sketch.increment(indexes)
+    assert sketch.estimate(indexes) == sketch.MAX_COUNT
+    assert sketch.estimate(sketch.indexes("other")) <= 1
+    sketch._age()
+    assert sketch.estimate(indexes) == sketch.MAX_COUNT // 2
+
+    def job(location, gpus=8, name="train"):
+        return APIJobRequest(
+            job_name=name,
+            data={"location": location, "size_gb": 100},
+            compute={"gpu_type": "H100", "gpu_count": gpus},
+        )
+
+    # The most requested jobs win the bounded candidate set; names do not matter
+    hot = cache_module.HotJobs(capacity=2)
+    popular, warm, cold = job("aws:s3:us-east-1"), job("gcp:gcs:us-central1"), job("aws:s3:eu-west-1")
+    for i in range(5):
+        hot.record(job_key(popular), job("aws:s3:us-east-1", name=f"user-{i}"))
+    for _ in range(3):
+        hot.record(job_key(warm), warm)
+    hot.record(job_key(cold), cold)
+    assert [key for key, _ in hot.top(2)] == [job_key(popular), job_key(warm)]
+    for _ in range(6):
+        hot.record(job_key(cold), cold)
+    assert [key for key, _ in hot.top(2)] == [job_key(cold), job_key(popular)]
+
+    # Cached analyses are only served for the price version they were computed at
+    local = {"provider": "aws", "region": "us-east-1", "compute_cost_per_hour": 98.0,
+             "one_time_egress_cost": 0, "advisory_message": "local"}
+    analysis = AnalysisResponse(data_local_option=local, remote_options=[])
+    cache = cache_module.AnalysisCache(capacity=2)
+    cache.put("a", "v1", analysis)
+    cache.put("p", "v1", AnalysisResponse(data_local_option=local, remote_options=[], partial=True))
+    assert cache.get("a", "v1") is analysis and cache.get("a", "v2") is None and "p" not in cache
+
+    # After a price reload the hot jobs are re-analyzed, through the scheduler
+    class Engine:
+        version = "v1"
+        def price_version(self):
+            return self.version
+
+    engine = Engine()
+    analyzed = []
+    def analyze(job_request):
+        analyzed.append(job_key(job_request))
+        return analysis, engine.version
+
+    scheduler = _import_api_module("scheduler").FairScheduler(slots=1, tenant_limit=1)
+    warmer = cache_module.CacheWarmer(engine, cache, hot, analyze, scheduler, top_n=1)
+
+    async def reload():
+        assert await warmer.poll() == 0, "nothing to warm before the first reload"
+        engine.version = "v2"
+        warmed = await warmer.poll()
+        return warmed, scheduler.status()
+
+    warmed, status = asyncio.run(reload())
+    assert warmed == 1 and analyzed == [job_key(cold)]
+    assert cache.is_fresh(job_key(cold), "v2")
+    assert status["tenants"][cache_module.WARMING_TENANT]["wait"]["batch"]["count"] == 1
+
+    print("✓ Hot jobs are tracked in bounded memory and re-analyzed after price reloads")
+    return True
+
+
+def test_engine_routing():
+    """Test consistent-hash routing to engine replicas, bounded loads and failover"""
+    print("\nTesting engine routing...")
+    import httpx
+    ring_module = _import_api_module("engine_ring")
+    client_module = _import_api_module("cost_engine_client")
+    from api.models import JobRequest as APIJobRequest
+
+    def job(location, gpus=8, name="train"):
+        return APIJobRequest(
+            job_name=name,
+            data={"location": location, "size_gb": 100},
+            compute={"gpu_type": "H100", "gpu_count": gpus},
+        )
+
+    # The route key is the (location, GPU shape), whatever else the job asks for
+    assert ring_module.route_key(job("aws:s3:us-east-1", name="a")) == ring_module.route_key(job("aws:s3:us-east-1", name="b"))
+    assert ring_module.route_key(job("aws:s3:us-east-1")) != ring_module.route_key(job("aws:s3:us-east-1", gpus=4))
+
+    # Keys spread over engines, and removing one only moves the keys it owned
+    nodes = [ring_module.EngineNode(f"http://engine-{i}", f"http://engine-{i}") for i in range(3)]
+    ring = ring_module.HashRing(nodes)
+    keys = [f"aws:s3:region-{i}|H100|8" for i in range(3000)]
+    owners = {key: ring.route(key)[0].endpoint for key in keys}
+    counts = {node.endpoint: list(owners.values()).count(node.endpoint) for node in nodes}
+    assert all(700 < count < 1300 for count in counts.values()), counts
+    smaller = ring_module.HashRing(nodes[:2])
+    moved = [key for key in keys if smaller.route(key)[0].endpoint != owners[key]]
+    assert all(owners[key] == "http://engine-2" for key in moved)
+
+    # Bounded loads: an owner far above the mean in-flight load is passed over
+    key = keys[0]
+    owner = ring.route(key)[0]
+    owner.inflight = 10
+    assert ring.route(key)[0] is not owner
+    owner.inflight = 0
+
+    # Failover: an engine that cannot be reached is marked down and the next one answers
+    local = {"provider": "aws", "region": "us-east-1", "compute_cost_per_hour": 98.0,
+             "one_time_egress_cost": 0, "advisory_message": "local"}
+    served = []
+    down = set()
+    seq = {"engine-0": 40, "engine-1": 7, "engine-2": 12}
+    def engines(request):
+        if request.url.host in down:
+            raise httpx.ConnectError("connection refused", request=request)
+        served.append(request.url.host)
+        if request.url.path == "/changes":
+            return httpx.Response(200, json={"seq": seq[request.url.host], "keys": ["compute:x"], "reset": False})
+        return httpx.Response(200, json={"data_local_option": local, "remote_options": []})
+
+    engine_client = client_module.CostEngineClient("http://engine-0:8080, http://engine-1:8080,http://engine-2:8080")
+    engine_client.client = httpx.Client(transport=httpx.MockTransport(engines))
+    hot = job("aws:s3:us-east-1")
+    for _ in range(3):
+        engine_client.analyze(hot)
+    assert len(set(served)) == 1, "one (location, shape) sticks to one engine"
+    down.add(served[0])
+    engine_client.analyze(hot)
+    assert served[-1] != served[0]
+    health = {n["endpoint"]: n["healthy"] for n in engine_client.ring.status()}
+    assert health == {f"http://{host}:8080": host not in down for host in seq}
+
+    # /changes sequence numbers belong to one engine: a failover reports a reset
+    down.clear()
+    first = engine_client.changes()
+    assert not engine_client.changes(since=first["seq"])["reset"]
+    down.add(httpx.URL(engine_client._changes_node.base_url).host)
+    changed = engine_client.changes(since=first["seq"])
+    assert changed["reset"] and changed["keys"] == []
+
+    # When every engine is unavailable, the last 503 surfaces with its body, streamed or not
+    def unavailable(request):
+        return httpx.Response(503, content=iter([b"redis unavailable"]))
+    engine_client = client_module.CostEngineClient("http://engine-0:8080,http://engine-1:8080")
+    engine_client.client = httpx.Client(transport=httpx.MockTransport(unavailable))
+    try:
+        engine_client.catalog("compute", {"limit": 2})
+        assert False, "a 503 from every engine should raise"
+    except ValueError:
+        raise
+    except Exception as e:
+        assert "503" in str(e) and "redis unavailable" in str(e), str(e)
+    try:
+        client_module.CostEngineClient(" , ")
+        assert False, "a client without endpoints should be rejected"
+    except ValueError:
+        pass
+
+    print("✓ Engines are chosen by consistent hashing with bounded loads and fail over")
+    return True
+
+
+def test_multi_node_options():
+    """Test multi-node request fields and composition options through the API models, columnar form and CLI"""
+    print("\nTesting multi-node options...")
+    import csv
+    import io
+    from pydantic import ValidationError
+    columnar = _import_api_module("columnar")
+    from api.models import AnalysisResponse, JobRequest as APIJobRequest
+    import cli.columnar as cli_columnar
+    from cli.formatter import write_analysis_response
+    from cli.models import JobRequest
+
+    job = {
+        "job_name": "pretrain",
+        "data": {"location": "aws:s3:us-east-1", "size_gb": 500},
+        "compute": {"gpu_type": "H100", "gpu_count": 16, "max_nodes": 4, "mixed_shapes": True},
+    }
+    # The CLI forwards the fields as they are; the API bounds max_nodes like the engine
+    assert APIJobRequest(**JobRequest(**job).model_dump()).compute.max_nodes == 4
+    for bad in (0, 257):
+        try:
+            APIJobRequest(**{**job, "compute": {**job["compute"], "max_nodes": bad}})
+            assert False, f"max_nodes={bad} should be rejected"
+        except ValidationError:
+            pass
+
+    node = {"instance_type": "p5.48xlarge", "gpu_count": 8, "count": 2, "cost_per_hour": 98.32}
+    engine_response = {
+        "data_local_option": {
+            "provider": "aws", "region": "us-east-1", "instance_type": "2x p5.48xlarge",
+            "compute_cost_per_hour": 196.64, "one_time_egress_cost": 0, "break_even_hours": None,
+            "advisory_message": "This is your data-local option.", "is_spot_instance": False,
+            "node_count": 2, "nodes": [node],
+        },
+        "remote_options": [
+            {"provider": "gcp", "region": "us-central1", "instance_type": "a3-highgpu-8g",
+             "compute_cost_per_hour": 88.0, "one_time_egress_cost": 45.0, "break_even_hours": 0.4,
+             "advisory_message": "Cheaper than data-local provider if your job runs for MORE than 0.4 hours.",
+             "is_spot_instance": False},
+            {"provider": "gcp", "region": "us-east4", "instance_type": "2x a3-highgpu-8g",
+             "compute_cost_per_hour": 176.0, "one_time_egress_cost": 45.0, "break_even_hours": 2.2,
+             "advisory_message": "Cheaper than data-local provider if your job runs for MORE than 2.2 hours.",
+             "is_spot_instance": False, "node_count": 2,
+             "nodes": [{"instance_type": "a3-highgpu-8g", "gpu_count": 8, "count": 2, "cost_per_hour": 88.0}]},
+        ],
+    }
+    analysis = AnalysisResponse(**engine_response)
+    assert analysis.data_local_option.nodes[0].count == 2
+    assert analysis.remote_options[0].node_count is None
+
+    # Node lists survive the columnar encoding
+    decoded = cli_columnar.decode_analysis(json.loads(json.dumps(columnar.encode_analysis(analysis))))
+    assert dict(decoded["remote_options"][1])["nodes"] == engine_response["remote_options"][1]["nodes"]
+    assert decoded["remote_options"][0]["node_count"] is None
+
+    stream = io.StringIO()
+    write_analysis_response(analysis.model_dump(), "csv", stream=stream)
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert [row["node_count"] for row in rows] == ["2", "", "2"]
+    assert rows[2]["instance_type"] == "2x a3-highgpu-8g"
+
+    print("✓ Multi-node options carry node counts and node lists end to end")
+    return True
+
+
+def test_data_placement():
+    """Test the placement request model, engine client, API errors and CLI rendering"""
+    print("\nTesting data placement...")
+    import io
+    import httpx
+    import typer
+    from pydantic import ValidationError
+    from rich.console import Console
+    from api.models import PlacementRequest
+    client_module = _import_api_module("cost_engine_client")
+    import cli.formatter as formatter
+    from cli.main import parse_shape
+
+    for invalid in ({"size_gb": 10, "shapes": []}, {"size_gb": 0, "shapes": [{"gpu_type": "H100", "gpu_count": 8}]},
+                    {"size_gb": 10, "shapes": [{"gpu_type": "H100", "gpu_count": 8}], "locations": ["us-east-1"]}):
+        try:
+            PlacementRequest(**invalid)
+            assert False, f"{invalid} should be rejected"
+        except ValidationError:
+            pass
+
+    matrix = {
+        "locations": ["aws:s3:us-east-1", "azure:blob:eastus", "gcp:gcs:us-central1"],
+        "shapes": [{"gpu_type": "H100", "gpu_count": 8}, {"gpu_type": "H100", "gpu_count": 16}],
+        "instances": [
+            {"provider": "coreweave", "region": "lva", "instance_type": "HGX_H100_80G", "cost_per_hour": 40.0},
+            {"provider": "aws", "region": "us-east-1", "instance_type": "p5.48xlarge", "cost_per_hour": 98.0},
+            {"provider": "gcp", "region": "us-central1", "instance_type": "2x a3-highgpu-8g",
+             "cost_per_hour": 176.0, "node_count": 2},
+        ],
+        "cells": [
+            [{"local": 1, "best": 0, "one_time_egress_cost": 90.0, "break_even_hours": 1.6},
+             {"local": None, "best": 2, "one_time_egress_cost": 90.0}],
+            [None, None],
+            [{"local": None, "best": 0, "one_time_egress_cost": 120.0},
+             {"local": 2, "best": 2, "one_time_egress_cost": 0.0}],
+        ],
+    }
+    bodies = []
+    def engine(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        if body["size_gb"] > 1e6:
+            return httpx.Response(400, text="Invalid request: placement matrix too large")
+        return httpx.Response(200, json=matrix)
+
+    engine_client = client_module.CostEngineClient("http://engine")
+    engine_client.client = httpx.Client(transport=httpx.MockTransport(engine))
+    request = PlacementRequest(size_gb=1000, shapes=[parse_shape(s).model_dump() for s in ("H100x8", "H100x16")])
+    placement = engine_client.placement(request)
+    assert placement.cells[1][0] is None and placement.instances[2].node_count == 2
+    # Unset fields are left to the engine's defaults
+    assert "locations" not in bodies[0] and "max_nodes" not in bodies[0]["shapes"][0]
+    try:
+        engine_client.placement(PlacementRequest(size_gb=2e6, shapes=[parse_shape("H100x8").model_dump()]))
+        assert False, "an engine 400 should surface as ValueError"
+    except ValueError as e:
+        assert "too large" in str(e)
+    try:
+        parse_shape("H100")
+        assert False, "a shape without a count should be rejected"
+    except typer.BadParameter:
+        pass
+
+    # The table marks each shape's cheapest location and data-local plans
+    original_console = formatter.console
+    formatter.console = Console(file=io.StringIO(), width=200, no_color=True)
+    try:
+        formatter.format_placement(placement.model_dump())
+        output = formatter.console.file.getvalue()
+    finally:
+        formatter.console = original_console
+    assert "unreachable" in output and "data-local" in output and "after 1.6 h" in output
+    assert "2x a3-highgpu-8g" in output
+
+    stream = io.StringIO()
+    formatter.write_placement(placement.model_dump(), "json", stream=stream)
+    assert json.loads(stream.getvalue())["cells"][1] == [None, None]
+    try:
+        formatter.write_placement(matrix, "csv", stream=io.StringIO())
+        assert False, "csv is not a placement output format"
+    except ValueError:
+        pass
+
+    print("✓ Placement matrices are requested, validated and rendered")
+    return True
+
+
+def test_cli_daemon():
+    """Test that the CLI daemon runs commands like the in-process CLI, warm state and idle exit"""
+    print("\nTesting the CLI daemon...")
+    import os
+    import subprocess
+    import tempfile
+    import time
+    import cli.api_client as api_client
+    from cli.response_cache import ResponseCache
+
+    # In the daemon, clients share pooled connections that outlive each command
+    api_client.share_connections()
+    try:
+        first, second = api_client.APIClient("http://api"), api_client.APIClient("http://api")
+        assert first.client is second.client
+        first.close()
+        assert not second.client.is_closed
+    finally:
+        api_client.close_shared_connections()
+    assert api_client.APIClient("http://api").client is not second.client and second.client.is_closed
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Recent entries are served from memory, the rest from disk
+        cache = ResponseCache(Path(directory) / "cache", max_entries=1)
+        cache.put("a", '"1"', {"n": 1})
+        cache.put("b", '"2"', {"n": 2})
+        for path in (Path(directory) / "cache").glob("*.json"):
+            path.unlink()
+        assert cache.get("b").body == {"n": 2} and cache.get("a") is None
+
+        launcher = Path(__file__).parent / "cli" / "launcher.py"
+        socket_path = Path(directory) / "daemon.sock"
+        env = {
+            **{key: value for key, value in os.environ.items() if not key.startswith("FINOPS_")},
+            "FINOPS_DAEMON_SOCKET": str(socket_path), "FINOPS_DAEMON_IDLE": "2",
+            "FINOPS_CACHE_DIR": str(Path(directory) / "cache"),
+        }
+        def run(*args, daemon=True):
+            return subprocess.run(
+                [sys.executable, str(launcher), *args], capture_output=True, text=True, cwd=directory,
+                env={**env, "FINOPS_DAEMON": "1" if daemon else "0"}, timeout=30,
+            )
+
+        in_process = run("--help", daemon=False)
+        for _ in range(2):  # The first run starts the daemon
+            result = run("--help")
+            assert (result.returncode, result.stdout) == (0, in_process.stdout)
+        assert socket_path.exists()
+
+        # Errors and exit codes come back; relative paths resolve in the caller's directory
+        result = run("analyze", "-f", "missing.yaml")
+        assert result.returncode == 1 and "File not found: missing.yaml" in result.stderr and not result.stdout
+        assert run("no-such-command").returncode == 2
+
+        status = run("daemon", "status")
+        assert "4 command(s)" in status.stdout, status.stdout
+
+        # Idle daemons exit and remove their socket
+        deadline = time.time() + 10
+        while socket_path.exists() and time.time() < deadline:
+            time.sleep(0.1)
+        assert not socket_path.exists(), "an idle daemon should exit"
+        assert "not running" in run("daemon", "status").stdout
+
+    print("✓ CLI daemon forwards commands, keeps state warm and exits when idle")
+    return True
+
+
+def test_default_analyze_command():
+    """Test that `finops-analyze -f job.yaml` still runs analyze alongside the other commands"""
+    print("\nTesting the default analyze command...")
+    from typer.testing import CliRunner
+    import cli.main as cli_main
+
+    runner = CliRunner()
+    for args in (["-f", "missing.yaml"], ["analyze", "-f", "missing.yaml"], ["-f", "missing.yaml", "-o", "json"]):
+        result = runner.invoke(cli_main.app, args)
+        assert result.exit_code == 1 and "File not found: missing.yaml" in result.stderr, (args, result.output)
+
+    result = runner.invoke(cli_main.app, ["--help"])
+    assert result.exit_code == 0 and "portfolio" in result.stdout and "placement" in result.stdout
+    assert runner.invoke(cli_main.app, ["--no-such-option"]).exit_code == 2
+
+    print("✓ analyze runs when no command is named")
+    return True
+
+
 def main():
     """Run all tests"""
     print("=" * 60)
@@ -308,6 +1636,27 @@ def main():
         test_break_even_calculations,
         test_hardware_map_key_structure,
         test_egress_key_structure,
+        test_formatter_sort_and_writers,
+        test_portfolio_vectorized_analysis,
+        test_spot_risk_simulation,
+        test_trace_propagation,
+        test_request_profiling,
+        test_readiness_gating,
+        test_load_generator,
+        test_catalog_generator,
+        test_conditional_requests_and_cache,
+        test_saved_job_incremental_recompute,
+        test_columnar_responses,
+        test_request_deadlines,
+        test_option_constraints,
+        test_catalog_browsing,
+        test_fair_scheduling,
+        test_popularity_cache_warming,
+        test_engine_routing,
+        test_multi_node_options,
+        test_data_placement,
+        test_cli_daemon,
+        test_default_analyze_command,
     ]
     
     results = []